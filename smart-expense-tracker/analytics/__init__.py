@@ -0,0 +1,4 @@
+"""
+analytics/
+Pure analytics engines (forecasting, aggregation) fed from the model layer.
+"""
@@ -0,0 +1,93 @@
+"""
+analytics/categorize.py
+Description -> category classifier: multinomial naive Bayes over word
+unigrams, bigrams and 4-letter prefixes. Training is counting, so a model
+learns one expense at a time (services/categorizer.py keeps them warm).
+Prediction is a dictionary lookup per token per category, a few
+microseconds for a typical description.
+"""
+
+import math
+import re
+
+ALPHA  = 0.5                    # additive smoothing
+PREFIX = 4                      # "swiggy" also counts as "swig", "ubereats" as "uber"
+
+_WORD = re.compile(r"[a-z]+")   # digits are dates, amounts and order numbers: noise
+
+
+def tokens(text):
+    words = _WORD.findall(text.lower())
+    out = list(words)
+    out += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    out += [f"{w[:PREFIX]}*" for w in words if len(w) > PREFIX]
+    return out
+
+
+class NaiveBayes:
+    """Token counts per category. Not thread-safe: the caller serialises learn/predict."""
+
+    __slots__ = ("docs", "totals", "counts")
+
+    def __init__(self):
+        self.docs   = {}        # category_id -> examples
+        self.totals = {}        # category_id -> token occurrences
+        self.counts = {}        # token -> {category_id: occurrences}
+
+    @classmethod
+    def train(cls, rows):
+        """Model from (description, category_id) pairs."""
+        model = cls()
+        for description, category_id in rows:
+            model.learn(description, category_id)
+        return model
+
+    @property
+    def examples(self):
+        return sum(self.docs.values())
+
+    def learn(self, description, category_id):
+        self.docs[category_id] = self.docs.get(category_id, 0) + 1
+        toks = tokens(description)
+        self.totals[category_id] = self.totals.get(category_id, 0) + len(toks)
+        for t in toks:
+            per_cat = self.counts.setdefault(t, {})
+            per_cat[category_id] = per_cat.get(category_id, 0) + 1
+
+    def predict(self, description):
+        """
+        (category_id, probability) of the likeliest category, or (None, 0.0)
+        when no token of the description has been seen in training.
+        """
+        known = [self.counts[t] for t in tokens(description) if t in self.counts]
+        if not known:
+            return None, 0.0
+        vocab = len(self.counts) + 1
+        n     = sum(self.docs.values())
+        scores = {}
+        for c, docs in self.docs.items():
+            denom = math.log(self.totals[c] + ALPHA * vocab)
+            score = math.log(docs / n)
+            for per_cat in known:
+                score += math.log(per_cat.get(c, 0) + ALPHA) - denom
+            scores[c] = score
+        best = max(scores, key=scores.get)
+        top  = scores[best]
+        return best, 1 / sum(math.exp(s - top) for s in scores.values())
+
+
+def choose(user_model, global_model, description, min_examples, threshold):
+    """
+    (category_id, probability, source): the user's own model when it has
+    min_examples and is at least `threshold` sure, else the global model
+    under the same bar, else (None, 0.0, None).
+    """
+    if user_model is not None and user_model.examples >= min_examples:
+        category_id, p = user_model.predict(description)
+        if category_id is not None and p >= threshold:
+            return category_id, p, "user"
+    if global_model is not None:
+        category_id, p = global_model.predict(description)
+        if category_id is not None and p >= threshold:
+            return category_id, p, "global"
+    return None, 0.0, None
@@ -0,0 +1,257 @@
+"""
+analytics/forecast.py
+Next-month spend forecast: known recurring charges plus a per-category
+exponential-smoothing model with a yearly seasonal correction.
+
+All maths runs on NumPy arrays shaped (..., categories, months), so the same
+code serves one user inline and a whole batch of users in one pass. Rollup
+totals are fetched as integer paise (sql_paise) and summed into int64
+arrays, so aggregation is exact and never touches Decimal; only the model
+itself works in float rupees. Results are Money.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from db import get_cursor, group_by_shard
+from models.metrics import month_key, shift_month
+from models.money import Money, sql_paise
+from models.schedule import monthly_amount_sql
+from models.recurring import Recurring
+
+HISTORY_MONTHS = 24
+ALPHA          = 0.3    # smoothing factor for the level
+SEASON         = 12     # months in a seasonal cycle
+GAMMA          = 0.25   # weight of last year's seasonal deviation
+Z              = 1.645  # two-sided 90% interval
+
+Forecast = namedtuple("Forecast", "point low high recurring by_category")
+
+
+# ── Core model (vectorised) ───────────────────────────────────
+
+def smooth(history, alpha=ALPHA, season=SEASON, gamma=GAMMA, steps=1):
+    """
+    Forecast `steps` months past the end of `history` (shape (..., T)).
+    Returns (point, sigma) arrays of shape (...).
+    """
+    history = np.asarray(history, dtype=np.float64)
+    T       = history.shape[-1]
+    levels  = np.empty_like(history)
+    errors  = np.zeros_like(history)
+    # Series only start smoothing at their first non-zero month, so a new
+    # user's leading empty months don't drag the level towards zero.
+    started = np.cumsum(history > 0, axis=-1) > 0
+    level   = history[..., 0]
+    levels[..., 0] = level
+    for t in range(1, T):
+        err   = history[..., t] - level
+        live  = started[..., t - 1]
+        errors[..., t] = np.where(live, err, 0.0)
+        level = np.where(live, level + alpha * err, history[..., t])
+        levels[..., t] = level
+
+    point = level.copy()
+    # Seasonal correction: how far the target month last year sat above the
+    # level going into it. Needs one full cycle of history.
+    ref = T - 1 + steps - season
+    if ref >= 1:
+        point += gamma * (history[..., ref] - levels[..., ref - 1])
+
+    n     = np.maximum(started[..., :-1].sum(axis=-1), 1)
+    sigma = np.sqrt((errors[..., 1:] ** 2).sum(axis=-1) / n)
+    # Level uncertainty grows with the horizon: var * (1 + (h-1) * alpha^2)
+    sigma = sigma * np.sqrt(1 + (steps - 1) * alpha ** 2)
+    return np.clip(point, 0, None), sigma
+
+
+def combine(history, recurring, steps=1, z=Z):
+    """
+    history: (..., C, T) monthly totals; recurring: (..., C) committed monthly
+    charges. Recurring amounts are taken out of history so they are not
+    double-counted, then added back as a known component.
+    Returns (point, low, high, per_category) with per_category shaped (..., C).
+    """
+    recurring     = np.asarray(recurring, dtype=np.float64)
+    discretionary = np.clip(history - recurring[..., None], 0, None)
+    disc, sigma   = smooth(discretionary, steps=steps)
+    per_category  = recurring + disc
+    point         = per_category.sum(axis=-1)
+    spread        = z * np.sqrt((sigma ** 2).sum(axis=-1))
+    committed     = recurring.sum(axis=-1)
+    low           = np.maximum(point - spread, committed)
+    return point, low, point + spread, per_category
+
+
+# ── Data loading ──────────────────────────────────────────────
+
+def history_window(today=None, months=HISTORY_MONTHS):
+    """Month keys of the last `months` complete months, oldest first."""
+    current = month_key(today or date.today())
+    return [shift_month(current, -i) for i in range(months, 0, -1)]
+
+
+def scatter_paise(shape, index_rows):
+    """
+    Sum (index..., paise) rows into an int64 array of `shape` with one
+    vectorised np.add.at; returns it in rupees (float64) for the model.
+    """
+    total = np.zeros(shape, dtype=np.int64)
+    if index_rows:
+        *index, paise = zip(*index_rows)
+        np.add.at(total, tuple(np.array(ix) for ix in index),
+                  np.array(paise, dtype=np.int64))
+    return total / 100
+
+
+def build_matrix(rows, months, cat_index):
+    """Scatter rollup rows {month, category_id, paise} into a (C, T) array."""
+    m_index = {m: i for i, m in enumerate(months)}
+    return scatter_paise((len(cat_index), len(months)), [
+        (cat_index[r["category_id"]], m_index[r["month"]], r["paise"])
+        for r in rows if r["category_id"] in cat_index and r["month"] in m_index
+    ])
+
+
+def category_index():
+    cur = get_cursor(readonly=True)
+    cur.execute("SELECT id, name FROM categories ORDER BY id")
+    cats = cur.fetchall()
+    cur.close()
+    return {c["id"]: i for i, c in enumerate(cats)}, {c["id"]: c["name"] for c in cats}
+
+
+def _money(rupees):
+    return Money(round(float(rupees) * 100))
+
+
+def _to_forecast(point, low, high, recurring, per_category, cat_index, names):
+    by_category = {
+        names[cid]: _money(per_category[i])
+        for cid, i in cat_index.items() if per_category[i] > 0
+    }
+    return Forecast(_money(point), _money(low), _money(high),
+                    _money(recurring.sum()), by_category)
+
+
+def forecast_next_month(user_id, today=None):
+    """Inline forecast for one user: two small indexed queries + NumPy."""
+    months            = history_window(today)
+    cat_index, names  = category_index()
+    cur = get_cursor(readonly=True, user_id=user_id)
+    cur.execute(
+        f"""SELECT month, category_id, {sql_paise("total")} AS paise FROM expense_rollups
+            WHERE user_id = %s AND month >= %s AND month <= %s""",
+        (user_id, months[0], months[-1])
+    )
+    rows = cur.fetchall()
+    cur.close()
+
+    history   = build_matrix(rows, months, cat_index)
+    recurring = scatter_paise((len(cat_index),), [
+        (cat_index[cid], amount.paise)
+        for cid, amount in Recurring.get_monthly_commitments(user_id).items()
+        if cid in cat_index
+    ])
+
+    # History ends last month; next month is two steps past it.
+    point, low, high, per_cat = combine(history, recurring, steps=2)
+    return _to_forecast(point, low, high, recurring, per_cat, cat_index, names)
+
+
+def forecast_batch(user_ids, today=None):
+    """
+    Forecast many users with one rollup scan per shard and one vectorised
+    model pass. Returns {user_id: Forecast}.
+    """
+    if not user_ids:
+        return {}
+    months = history_window(today)
+    cur = get_cursor(readonly=True)
+    cur.execute("SELECT id, name FROM categories ORDER BY id")
+    categories = cur.fetchall()
+    cur.close()
+
+    rows, rec_rows = [], []
+    for shard, ids in group_by_shard(user_ids).items():
+        marks = ", ".join(["%s"] * len(ids))
+        cur = get_cursor(readonly=True, shard=shard)
+        cur.execute(
+            f"""SELECT user_id, month, category_id, {sql_paise("total")} AS paise
+                FROM expense_rollups
+                WHERE user_id IN ({marks}) AND month >= %s AND month <= %s""",
+            (*ids, months[0], months[-1])
+        )
+        rows += cur.fetchall()
+        cur.execute(
+            f"""SELECT user_id, category_id, {sql_paise(f"SUM({monthly_amount_sql()})")} AS paise
+                FROM recurring_expenses
+                WHERE user_id IN ({marks}) AND active = 1 AND next_due IS NOT NULL
+                GROUP BY user_id, category_id""",
+            tuple(ids)
+        )
+        rec_rows += cur.fetchall()
+        cur.close()
+    return forecast_rows(user_ids, rows, rec_rows, categories, today)
+
+
+def forecast_rows(user_ids, rows, rec_rows, categories, today=None):
+    """
+    Pure batch forecast from pre-fetched rows (no DB access, safe to run in a
+    worker process). rows: {user_id, month, category_id, paise};
+    rec_rows: {user_id, category_id, paise}; categories: {id, name}.
+    """
+    months    = history_window(today)
+    cat_index = {c["id"]: i for i, c in enumerate(categories)}
+    names     = {c["id"]: c["name"] for c in categories}
+    u_index   = {uid: i for i, uid in enumerate(user_ids)}
+    m_index   = {m: j for j, m in enumerate(months)}
+    history   = scatter_paise((len(user_ids), len(cat_index), len(months)), [
+        (u_index[r["user_id"]], cat_index[r["category_id"]], m_index[r["month"]], r["paise"])
+        for r in rows if r["month"] in m_index and r["category_id"] in cat_index
+    ])
+    recurring = scatter_paise((len(user_ids), len(cat_index)), [
+        (u_index[r["user_id"]], cat_index[r["category_id"]], r["paise"])
+        for r in rec_rows if r["category_id"] in cat_index
+    ])
+
+    point, low, high, per_cat = combine(history, recurring, steps=2)
+    return {
+        uid: _to_forecast(point[i], low[i], high[i], recurring[i], per_cat[i],
+                          cat_index, names)
+        for uid, i in u_index.items()
+    }
+
+
+# ── Backtest ──────────────────────────────────────────────────
+
+def backtest(history, holdout=6):
+    """
+    Walk-forward backtest over the last `holdout` months of history
+    (shape (U, C, T)); each target month is predicted from data ending two
+    months earlier, as in production. Compares against the 3-month average.
+    Returns a dict of MAE / interval coverage for both methods.
+    """
+    totals = history.sum(axis=-2)            # (U, T)
+    T      = history.shape[-1]
+    zero   = np.zeros(history.shape[:-1])
+    errs, base_errs, covered, n = 0.0, 0.0, 0, 0
+    # Each target needs three months of past before its one-month gap
+    for target in range(max(T - holdout, 4), T):
+        past = history[..., :target - 1]
+        point, low, high, _ = combine(past, zero, steps=2)
+        actual   = totals[:, target]
+        baseline = totals[:, target - 4:target - 1].mean(axis=-1)
+        errs      += np.abs(point - actual).sum()
+        base_errs += np.abs(baseline - actual).sum()
+        covered   += int(((actual >= low) & (actual <= high)).sum())
+        n         += actual.size
+    div = max(n, 1)
+    return {
+        "mae":          errs / div,
+        "baseline_mae": base_errs / div,
+        "coverage":     covered / div,
+        "samples":      n,
+    }
@@ -0,0 +1,103 @@
+"""
+analytics/payload.py
+Assembles the /api/analytics JSON payload from already-loaded inputs.
+Kept free of DB access so the live endpoint and the batch precompute job
+(which runs it in worker processes) produce identical output. Amounts are
+Money (models/money.py); services/jsonresp encodes them directly.
+"""
+
+from models.money import Money, ZERO
+
+
+def budget_status(budgets, metrics):
+    """
+    Current-month budget status from budget rows and the rollup-backed
+    metrics state. Same shape as Budget.get_status, less the period fields.
+    """
+    result = []
+    for b in budgets:
+        if b["category_id"] is None:
+            spent = metrics.current_total
+        else:
+            spent = metrics.by_cat.get(b["category_id"], ZERO)
+        budget = Money.of(b["amount"])
+        pct    = spent.percent_of(budget)
+        result.append({
+            "id":           b["id"],
+            "category_id":  b["category_id"],
+            "label":        b["category_name"] if b["category_name"] else "Overall",
+            "budget":       budget,
+            "spent":        spent,
+            "pct":          pct,
+            "over_80":      pct >= 80 and pct < 100,
+            "overspent":    pct >= 100,
+        })
+    return result
+
+
+# List-of-object sections that ?layout=columns ships as column arrays
+COLUMNAR_SECTIONS = ("budgets", "recent", "anomalies")
+
+
+def build_payload(metrics, forecast, recent, budgets, anomalies=()):
+    """
+    Dashboard payload dict; `budgets` are raw rows from Budget.get_for_month,
+    `anomalies` rows from Anomaly.recent.
+    """
+    month_labels, month_data = metrics.monthly_series()
+    cat_rows = metrics.category_distribution()
+    top3     = cat_rows[:3]
+    top_cat  = top3[0] if top3 else None
+
+    return {
+        "monthly": {
+            "labels": month_labels,
+            "data":   month_data,
+        },
+        "category": {
+            "labels": [r["category"] for r in cat_rows],
+            "data":   [r["total"] for r in cat_rows],
+        },
+        "month_total": metrics.current_total,
+        "top_category": {
+            "name":  top_cat["category"] if top_cat else "N/A",
+            "total": top_cat["total"] if top_cat else ZERO,
+        },
+        "smart": {
+            "top3_categories": [
+                {"name": r["category"], "total": r["total"]} for r in top3
+            ],
+            "avg_daily_spend":   metrics.avg_daily,
+            "last_month_total":  metrics.last_total,
+            "growth_pct":        metrics.growth_pct,
+            "predicted_next":    forecast.point,
+            "predicted_low":     forecast.low,
+            "predicted_high":    forecast.high,
+            "predicted_recurring": forecast.recurring,
+        },
+        "budgets": budget_status(budgets, metrics),
+        "recent": [
+            {
+                "id":          r["id"],
+                "amount":      r["amount"],
+                "description": r["description"],
+                "date":        r["date"],
+                "category":    r["category_name"],
+            }
+            for r in recent
+        ],
+        "anomalies": [
+            {
+                "expense_id":  r["expense_id"],
+                "kind":        r["kind"],
+                "score":       r["score"],
+                "typical":     Money.of(r["typical"]) if r["typical"] is not None else None,
+                "ref_id":      r["ref_id"],
+                "amount":      r["amount"],
+                "description": r["description"],
+                "date":        r["date"],
+                "category":    r["category_name"],
+            }
+            for r in anomalies
+        ],
+    }
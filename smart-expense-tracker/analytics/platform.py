@@ -0,0 +1,227 @@
+"""
+analytics/platform.py
+Platform-wide views for the admin analytics page: active users, spend by
+category, signup-cohort retention and top spenders.
+
+Everything reads the rollups (expense_daily, expense_rollups), never raw
+expenses. Every query runs on each shard and sends back aggregates, not
+a row per user. Active users come back as HyperLogLog registers per
+day, and per-user spend comes back as quantile-sketch buckets
+(analytics/sketches.py). Both are merged here: across shards, and across
+days for the 7- and 30-day counts. Sums, cohort cells and top spenders
+are exact, because a user's rows live on one shard.
+
+A view is computed at most once per PLATFORM_STATS_TTL seconds per
+worker (cached()).
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from db import scatter
+from analytics.sketches import HyperLogLog, QuantileSketch, hll_hash_sql, hll_sql, bucket_sql
+from models.expense import Expense
+from models.metrics import month_key, shift_month
+from models.money import Money, ZERO, sql_paise
+from models.user import User
+from services import counters
+
+ACTIVE_DAYS    = 30
+COHORT_MONTHS  = 6
+TOP_SPENDERS   = 10
+QUANTILES      = (0.5, 0.9, 0.99)
+
+_lock  = threading.Lock()
+_cache = {}         # (view name, args) -> (expires at, computed at, result)
+_pid   = None
+
+
+def cached(view, *args):
+    """
+    (view(*args), computed_at), reusing this worker's result for
+    PLATFORM_STATS_TTL seconds. Concurrent misses each compute.
+    """
+    global _pid
+    key, now = (view.__name__, args), time.monotonic()
+    with _lock:
+        if _pid != os.getpid():
+            _cache.clear()
+            _pid = os.getpid()
+        hit = _cache.get(key)
+        if hit is not None and hit[0] > now:
+            counters.incr("platform_stats_hits")
+            return hit[2], hit[1]
+
+    counters.incr("platform_stats_misses")
+    result, computed_at = view(*args), datetime.now()
+    with _lock:
+        for k in [k for k, v in _cache.items() if v[0] <= now]:
+            del _cache[k]
+        _cache[key] = (now + current_app.config["PLATFORM_STATS_TTL"], computed_at, result)
+    return result, computed_at
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def _quantiles(sketch):
+    """{'p50': Money, ...} from a QuantileSketch of rupee amounts (None when empty)."""
+    out = {}
+    for q in QUANTILES:
+        value = sketch.quantile(q)
+        out[f"p{round(q * 100)}"] = None if value is None else Money.of(round(value, 2))
+    return out
+
+
+# ── Views ─────────────────────────────────────────────────────
+
+def activity(today, days=ACTIVE_DAYS):
+    """
+    Users with spend dated on each of the last `days` days, and over the
+    last 7 and `days` days: {"days": [{day, users}], "week": n, "month": n}.
+    Each shard returns at most days x 4096 register rows.
+    """
+    start = today - timedelta(days=days - 1)
+    register, rank = hll_sql("h")
+    rows = scatter(
+        f"""SELECT day, {register} AS reg, MAX({rank}) AS rnk
+            FROM (SELECT day, {hll_hash_sql("user_id")} AS h
+                  FROM (SELECT DISTINCT day, user_id FROM expense_daily
+                        WHERE day BETWEEN %s AND %s) u) d
+            GROUP BY day, reg""",
+        (start, today)
+    )
+    sketches = {}
+    for r in rows:
+        sketches.setdefault(r["day"], HyperLogLog()).set(int(r["reg"]), int(r["rnk"]))
+
+    window = [start + timedelta(days=i) for i in range(days)]
+
+    def active(n):
+        return HyperLogLog.union(sketches[d] for d in window[-n:] if d in sketches).count()
+
+    return {"days":  [{"day": d, "users": sketches[d].count() if d in sketches else 0}
+                      for d in window],
+            "week":  active(7),
+            "month": active(days)}
+
+
+def category_spend(month):
+    """
+    Spend per category in a 'YYYY-MM' month across every user, with the
+    number of users who spent in it and quantiles of their spend, plus the
+    quantiles of each user's total for the month.
+    """
+    totals = scatter(
+        f"""SELECT category_id, {sql_paise("SUM(total)")} AS paise,
+                   SUM(cnt) AS cnt, COUNT(*) AS users
+            FROM expense_rollups
+            WHERE month = %s AND total > 0
+            GROUP BY category_id""",
+        (month,)
+    )
+    buckets = scatter(
+        f"""SELECT category_id, {bucket_sql("total")} AS bucket, COUNT(*) AS n
+            FROM expense_rollups
+            WHERE month = %s AND total > 0
+            GROUP BY category_id, bucket""",
+        (month,)
+    )
+    user_buckets = scatter(
+        f"""SELECT {bucket_sql("spent")} AS bucket, COUNT(*) AS n
+            FROM (SELECT SUM(total) AS spent FROM expense_rollups
+                  WHERE month = %s
+                  GROUP BY user_id HAVING spent > 0) t
+            GROUP BY bucket""",
+        (month,)
+    )
+
+    by_cat = {}
+    for r in totals:
+        c = by_cat.setdefault(r["category_id"], {"total": ZERO, "count": 0, "users": 0,
+                                                 "sketch": QuantileSketch()})
+        c["total"] += Money(r["paise"])
+        c["count"] += int(r["cnt"])
+        c["users"] += r["users"]
+    for r in buckets:
+        if r["category_id"] in by_cat:
+            by_cat[r["category_id"]]["sketch"].add_bucket(int(r["bucket"]), r["n"])
+    per_user = QuantileSketch.from_rows((r["bucket"], r["n"]) for r in user_buckets)
+
+    names = {c["id"]: c["name"] for c in Expense.get_all_categories()}
+    categories = sorted(
+        ({"category": names.get(cat_id, "Unknown"), "total": c["total"], "count": c["count"],
+          "users": c["users"], **_quantiles(c["sketch"])}
+         for cat_id, c in by_cat.items()),
+        key=lambda c: c["total"], reverse=True
+    )
+    return {"month":      month,
+            "categories": categories,
+            "total":      sum((c["total"] for c in categories), ZERO),
+            "users":      per_user.n,
+            "per_user":   _quantiles(per_user)}
+
+
+def retention(today, months=COHORT_MONTHS):
+    """
+    Signup cohorts of the last `months` months: [{cohort, users, retention}]
+    where retention[k] is the percentage of the cohort with spend in its
+    k-th month after signing up (None for an empty cohort).
+    """
+    first = shift_month(month_key(today), -(months - 1))
+    since = date.fromisoformat(f"{first}-01")
+    sizes = User.signups_by_month(since)
+    rows  = scatter(
+        """SELECT DATE_FORMAT(u.created_at, '%%Y-%%m') AS cohort, r.month,
+                  COUNT(DISTINCT r.user_id) AS users
+           FROM users u
+           JOIN expense_rollups r ON r.user_id = u.id
+           WHERE u.created_at >= %s AND r.month >= %s AND r.total > 0
+           GROUP BY cohort, r.month""",
+        (since, first)
+    )
+    active = {}
+    for r in rows:
+        key = (r["cohort"], r["month"])
+        active[key] = active.get(key, 0) + r["users"]
+
+    cohorts = []
+    for i in range(months):
+        cohort = shift_month(first, i)
+        size   = sizes.get(cohort, 0)
+        cohorts.append({
+            "cohort":    cohort,
+            "users":     size,
+            "retention": [round(100 * active.get((cohort, shift_month(cohort, k)), 0) / size)
+                          if size else None
+                          for k in range(months - i)],
+        })
+    return cohorts
+
+
+def top_spenders(month=None, n=TOP_SPENDERS):
+    """The n users with the most spend in a 'YYYY-MM' month (or ever): [{user_id, username, total, count}]."""
+    where = "WHERE month = %s" if month else ""
+    rows  = scatter(
+        f"""SELECT user_id, {sql_paise("SUM(total)")} AS paise, SUM(cnt) AS cnt
+            FROM expense_rollups {where}
+            GROUP BY user_id
+            ORDER BY paise DESC
+            LIMIT %s""",
+        (month, n) if month else (n,)
+    )
+    best = {}
+    for r in rows:                  # a user being moved can show up on two shards
+        if r["user_id"] not in best or r["paise"] > best[r["user_id"]]["paise"]:
+            best[r["user_id"]] = r
+    top   = heapq.nlargest(n, best.values(), key=lambda r: r["paise"])
+    names = User.get_usernames([r["user_id"] for r in top])
+    return [{"user_id": r["user_id"], "username": names.get(r["user_id"], "—"),
+             "total": Money(r["paise"]), "count": int(r["cnt"])} for r in top]
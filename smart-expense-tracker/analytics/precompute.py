@@ -0,0 +1,197 @@
+"""
+analytics/precompute.py
+Batch job that warms analytics_cache for every user before morning traffic.
+
+Users are walked in id order, one chunk at a time. Each chunk is loaded with
+a fixed handful of set-based queries (not one per user) in the parent
+process (per shard when sharded), then turned into payloads by a process
+pool. Only the parent talks to MySQL, and workers are spawned rather than
+forked, so no connection is ever shared with a child.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from db import get_cursor, group_by_shard, end_snapshot
+from models.user import User
+from models.metrics import UserMetrics, month_key
+from models.money import Money, sql_paise
+from models.schedule import monthly_amount_sql
+from models.analytics_cache import AnalyticsCache
+from models.anomaly import RECENT_DAYS, RECENT_LIMIT
+from models.job_checkpoint import JobCheckpoint
+from analytics.forecast import history_window, forecast_rows
+from analytics.payload import build_payload
+from services.jsonresp import dumps
+
+JOB = "analytics_precompute"
+
+
+def fetch_chunk(user_ids, today):
+    """All inputs for a chunk of users, as plain picklable rows."""
+    end_snapshot()          # each chunk sees current placement and cache versions
+    months = history_window(today)
+    month  = month_key(today)
+    chunk  = {"versions": {}, "shard_of": {}, "user_ids": list(user_ids),
+              "rollups": [], "recurring": [], "recent": [], "budgets": [], "anomalies": []}
+
+    cur = get_cursor()
+    cur.execute("SELECT id, name FROM categories ORDER BY id")
+    chunk["categories"] = cur.fetchall()
+    cur.close()
+
+    for shard, shard_ids in group_by_shard(user_ids).items():
+        marks = ", ".join(["%s"] * len(shard_ids))
+        ids   = tuple(shard_ids)
+        chunk["shard_of"].update((uid, shard) for uid in ids)
+        cur = get_cursor(shard=shard)
+        # Same connection, so the same snapshot as the inputs read below
+        chunk["versions"].update(AnalyticsCache.versions(cur, ids))
+
+        # 24 complete months for the forecast plus the current month for metrics
+        cur.execute(
+            f"""SELECT user_id, month, category_id, {sql_paise("total")} AS paise
+                FROM expense_rollups
+                WHERE user_id IN ({marks}) AND month >= %s""",
+            (*ids, months[0])
+        )
+        chunk["rollups"] += cur.fetchall()
+
+        cur.execute(
+            f"""SELECT user_id, category_id, {sql_paise(f"SUM({monthly_amount_sql()})")} AS paise
+                FROM recurring_expenses
+                WHERE user_id IN ({marks}) AND active = 1 AND next_due IS NOT NULL
+                GROUP BY user_id, category_id""",
+            ids
+        )
+        chunk["recurring"] += cur.fetchall()
+
+        cur.execute(
+            f"""SELECT * FROM (
+                    SELECT e.user_id, e.id, e.amount, e.description, e.date,
+                           c.name AS category_name,
+                           ROW_NUMBER() OVER (PARTITION BY e.user_id
+                                              ORDER BY e.date DESC, e.id DESC) AS rn
+                    FROM expenses e
+                    JOIN categories c ON c.id = e.category_id
+                    WHERE e.user_id IN ({marks})
+                ) ranked
+                WHERE rn <= 5""",
+            ids
+        )
+        chunk["recent"] += cur.fetchall()
+
+        cur.execute(
+            f"""SELECT b.user_id, b.id, b.category_id, b.month, b.amount,
+                       c.name AS category_name
+                FROM budgets b
+                LEFT JOIN categories c ON c.id = b.category_id
+                WHERE b.user_id IN ({marks}) AND b.month = %s""",
+            (*ids, month)
+        )
+        chunk["budgets"] += cur.fetchall()
+
+        cur.execute(
+            f"""SELECT * FROM (
+                    SELECT a.user_id, a.expense_id, a.kind, a.score, a.typical, a.ref_id,
+                           e.amount, e.description, e.date, c.name AS category_name,
+                           ROW_NUMBER() OVER (PARTITION BY a.user_id
+                                              ORDER BY a.created_at DESC,
+                                                       a.expense_id DESC) AS rn
+                    FROM expense_anomalies a
+                    JOIN expenses e   ON e.id = a.expense_id AND e.user_id = a.user_id
+                    JOIN categories c ON c.id = e.category_id
+                    WHERE a.user_id IN ({marks})
+                      AND a.created_at >= NOW() - INTERVAL %s DAY
+                ) ranked
+                WHERE rn <= %s""",
+            (*ids, RECENT_DAYS, RECENT_LIMIT)
+        )
+        chunk["anomalies"] += cur.fetchall()
+        cur.close()
+
+    return chunk
+
+
+def store(entries, chunk, today):
+    """Write computed payloads back, per shard, guarded by each user's cache version."""
+    by_shard = {}
+    for uid, payload in entries:
+        by_shard.setdefault(chunk["shard_of"][uid], []).append(
+            (uid, payload, chunk["versions"][uid]))
+    for shard, shard_entries in by_shard.items():
+        AnalyticsCache.put_many(shard_entries, today, shard)
+
+
+def _group(rows):
+    grouped = {}
+    for r in rows:
+        grouped.setdefault(r["user_id"], []).append(r)
+    return grouped
+
+
+def compute_chunk(chunk, today):
+    """Pure: chunk rows -> [(user_id, payload_json)]. Runs in a worker."""
+    user_ids  = chunk["user_ids"]
+    names     = {c["id"]: c["name"] for c in chunk["categories"]}
+    forecasts = forecast_rows(user_ids, chunk["rollups"], chunk["recurring"],
+                              chunk["categories"], today)
+    rollups, budgets = _group(chunk["rollups"]), _group(chunk["budgets"])
+    recent = _group(sorted(chunk["recent"], key=lambda r: r["rn"]))
+    anomalies = _group(sorted(chunk["anomalies"], key=lambda r: r["rn"]))
+
+    metric_start = history_window(today, UserMetrics.HISTORY_MONTHS - 1)[0]
+    out = []
+    for uid in user_ids:
+        metrics = UserMetrics(today)
+        for r in rollups.get(uid, ()):
+            if r["month"] >= metric_start:
+                metrics.apply(r["month"], r["category_id"], Money(r["paise"]),
+                              names.get(r["category_id"]))
+        payload = build_payload(metrics, forecasts[uid],
+                                recent.get(uid, []), budgets.get(uid, []),
+                                anomalies.get(uid, []))
+        out.append((uid, dumps(payload).decode("utf-8")))
+    return out
+
+
+def run(today, chunk_size=500, workers=2, resume=True, echo=print):
+    """
+    Warm the cache for all users. Returns (users_done, seconds).
+    Checkpoints after every chunk, so an interrupted run picks up where it
+    stopped when re-run the same day with resume=True.
+    """
+    last_id = JobCheckpoint.get(JOB, today) if resume else 0
+    if last_id:
+        echo(f"Resuming after user id {last_id}")
+    total   = User.count_after(last_id)
+    done    = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=get_context("spawn")) as pool:
+        pending = deque()   # (future, chunk, max user id), in submission order
+        while True:
+            ids = User.get_ids_after(last_id, chunk_size)
+            if ids:
+                last_id = ids[-1]
+                chunk   = fetch_chunk(ids, today)
+                pending.append((pool.submit(compute_chunk, chunk, today),
+                                chunk, last_id))
+            # Keep at most `workers` chunks in flight; drain oldest first so the
+            # checkpoint only ever advances past fully written chunks.
+            while pending and (len(pending) >= workers or not ids):
+                future, chunk, chunk_last = pending.popleft()
+                entries = future.result()
+                store(entries, chunk, today)
+                JobCheckpoint.save(JOB, today, chunk_last)
+                done += len(entries)
+                elapsed = time.perf_counter() - started
+                echo(f"{done}/{total} users  "
+                     f"{done / max(elapsed, 1e-9):.1f} users/s")
+            if not ids:
+                break
+
+    return done, time.perf_counter() - started
@@ -0,0 +1,156 @@
+"""
+analytics/series.py
+Time-bucketed spend series for /api/analytics/series.
+
+Whole months come from expense_rollups; only the partial months at either
+end of the range (and day/week buckets) need a (user_id, date) range scan
+over expenses. A range that would produce more than MAX_BUCKETS points is
+automatically re-bucketed to the next coarser granularity.
+"""
+
+from datetime import date, timedelta
+
+from models.expense import Expense
+from models.metrics import UserMetrics
+from models.money import Money, to_paise
+
+BUCKETS     = ("day", "week", "month", "year")
+MAX_BUCKETS = 366
+
+
+class SeriesError(ValueError):
+    """Bad query parameters (reported as HTTP 400)."""
+
+
+# ── Bucket arithmetic ─────────────────────────────────────────
+
+def bucket_key(d, bucket):
+    if bucket == "day":
+        return d.isoformat()
+    if bucket == "week":
+        return (d - timedelta(days=d.weekday())).isoformat()   # Monday
+    if bucket == "month":
+        return d.strftime("%Y-%m")
+    return d.strftime("%Y")
+
+
+def bucket_labels(start, end, bucket):
+    """Every bucket key between start and end inclusive, in order."""
+    labels, d = [], start
+    while d <= end:
+        key = bucket_key(d, bucket)
+        if not labels or labels[-1] != key:
+            labels.append(key)
+        if bucket == "day":
+            d += timedelta(days=1)
+        elif bucket == "week":
+            d += timedelta(days=7 - d.weekday())
+        elif bucket == "month":
+            d = (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+        else:
+            d = date(d.year + 1, 1, 1)
+    return labels
+
+
+def count_buckets(start, end, bucket):
+    if bucket == "day":
+        return (end - start).days + 1
+    if bucket == "week":
+        return ((end - timedelta(days=end.weekday()))
+                - (start - timedelta(days=start.weekday()))).days // 7 + 1
+    if bucket == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+
+def fit_bucket(start, end, bucket):
+    """Coarsen `bucket` until the range fits in MAX_BUCKETS points."""
+    idx = BUCKETS.index(bucket)
+    while idx < len(BUCKETS) - 1 and count_buckets(start, end, BUCKETS[idx]) > MAX_BUCKETS:
+        idx += 1
+    return BUCKETS[idx]
+
+
+def _month_start(d):
+    return d.replace(day=1)
+
+
+def _month_end(d):
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+# ── Query ─────────────────────────────────────────────────────
+
+def parse_args(args, today=None):
+    today = today or date.today()
+    try:
+        end   = date.fromisoformat(args["to"]) if args.get("to") else today
+        start = (date.fromisoformat(args["from"]) if args.get("from")
+                 else _month_start(end).replace(year=end.year - 1))
+    except ValueError:
+        raise SeriesError("from/to must be YYYY-MM-DD dates")
+    if start > end:
+        raise SeriesError("from must not be after to")
+    bucket = args.get("bucket", "month")
+    if bucket not in BUCKETS:
+        raise SeriesError("bucket must be one of: " + ", ".join(BUCKETS))
+    group = args.get("group") or None
+    if group not in (None, "category"):
+        raise SeriesError("group must be 'category' or omitted")
+    return start, end, bucket, group
+
+
+def build_series(user_id, start, end, bucket, group=None):
+    """
+    Returns {bucket, requested_bucket, labels, series: [{name, data}], source}.
+    """
+    requested = bucket
+    bucket    = fit_bucket(start, end, bucket)
+    labels    = bucket_labels(start, end, bucket)
+    by_cat    = group == "category"
+    totals    = {}      # (series name, bucket key) -> paise
+    sources   = set()
+
+    def add(name, key, amount):
+        totals[(name, key)] = totals.get((name, key), 0) + to_paise(amount)
+
+    if bucket in ("month", "year"):
+        # Whole months inside the range come from rollups...
+        first_full = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+        last_full  = end if end == _month_end(end) else _month_start(end) - timedelta(days=1)
+        scan_ranges = []
+        if first_full <= last_full:
+            sources.add("rollup")
+            for r in UserMetrics.monthly_totals(user_id, first_full.strftime("%Y-%m"),
+                                                last_full.strftime("%Y-%m")):
+                key = r["month"] if bucket == "month" else r["month"][:4]
+                add(r["category_name"] if by_cat else "Total", key, r["total"])
+            if start < first_full:
+                scan_ranges.append((start, first_full - timedelta(days=1)))
+            if last_full < end:
+                scan_ranges.append((last_full + timedelta(days=1), end))
+        else:
+            scan_ranges.append((start, end))
+    else:
+        scan_ranges = [(start, end)]
+
+    # ...partial edge months and day/week buckets from an index range scan.
+    for lo, hi in scan_ranges:
+        sources.add("scan")
+        for r in Expense.get_daily_totals(user_id, lo, hi, by_category=by_cat):
+            add(r["category_name"] if by_cat else "Total",
+                bucket_key(r["date"], bucket), r["total"])
+
+    names = sorted({name for name, _ in totals}) or ["Total"]
+    return {
+        "bucket":           bucket,
+        "requested_bucket": requested,
+        "from":             start,
+        "to":               end,
+        "labels":           labels,
+        "series": [
+            {"name": n, "data": [Money(totals.get((n, key), 0)) for key in labels]}
+            for n in names
+        ],
+        "source":           "+".join(sorted(sources)),
+    }
@@ -0,0 +1,152 @@
+"""
+analytics/sketches.py
+Mergeable approximate aggregates for platform analytics (analytics/platform.py).
+
+HyperLogLog counts distinct users in 2^HLL_P one-byte registers: about
+1.6% standard error for any number of users. QuantileSketch keeps counts
+of log-spaced buckets, so every quantile it reports is within
+QUANTILE_ALPHA (1%) of a true value, using a few hundred buckets for any
+spend range.
+
+Both are built inside MySQL. Each shard returns its register maxima or
+bucket counts (hll_sql(), bucket_sql()) rather than one row per user.
+The app merges those across shards and across days or months. Merging is
+a max or a sum, so it is exact, and a user counted on two shards (while
+being moved) or on several days counts once in an HLL union. The Python
+functions below compute the same registers and buckets as the SQL, for the
+benchmark and for sketching values that are already in memory.
+"""
+
+import hashlib
+import math
+
+HLL_P = 12                                  # 4096 registers
+_HLL_M = 1 << HLL_P
+_HLL_Q = 64 - HLL_P                         # hash bits left for the rank
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_M)
+
+QUANTILE_ALPHA = 0.01
+_GAMMA = (1 + QUANTILE_ALPHA) / (1 - QUANTILE_ALPHA)
+_LN_GAMMA = math.log(_GAMMA)
+
+
+# ── HyperLogLog ───────────────────────────────────────────────
+
+def hll_hash_sql(column):
+    """SQL for the 64-bit hash of an integer column: the first 16 hex digits of its MD5."""
+    return f"CAST(CONV(LEFT(MD5({column}), 16), 16, 10) AS UNSIGNED)"
+
+
+def hll_sql(h):
+    """
+    (register, rank) SQL over a hll_hash_sql() column: the top HLL_P bits
+    pick the register, and the rank is the position of the first 1 bit
+    in the rest.
+    """
+    return f"({h} >> {_HLL_Q})", f"({_HLL_Q + 1} - LENGTH(BIN({h} & {(1 << _HLL_Q) - 1})))"
+
+
+def hll_position(value):
+    """(register, rank) of one value, as hll_sql(hll_hash_sql()) computes it."""
+    h = int(hashlib.md5(str(value).encode()).hexdigest()[:16], 16)
+    w = h & ((1 << _HLL_Q) - 1)
+    return h >> _HLL_Q, _HLL_Q + 1 - max(w.bit_length(), 1)
+
+
+class HyperLogLog:
+    """Approximate distinct count. add() and merge() are idempotent."""
+
+    __slots__ = ("registers",)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers or _HLL_M)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Sketch from (register, rank) rows, e.g. one shard's GROUP BY register."""
+        sketch = cls()
+        for register, rank in rows:
+            sketch.set(int(register), int(rank))
+        return sketch
+
+    @classmethod
+    def union(cls, sketches):
+        out = cls()
+        for s in sketches:
+            out.merge(s)
+        return out
+
+    def set(self, register, rank):
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def add(self, value):
+        self.set(*hll_position(value))
+
+    def merge(self, other):
+        regs = self.registers
+        for i, rank in enumerate(other.registers):
+            if rank > regs[i]:
+                regs[i] = rank
+        return self
+
+    def count(self):
+        regs = self.registers
+        estimate = _HLL_ALPHA * _HLL_M * _HLL_M / sum(2.0 ** -r for r in regs)
+        zeros = regs.count(0)
+        if estimate <= 2.5 * _HLL_M and zeros:      # small range: linear counting
+            estimate = _HLL_M * math.log(_HLL_M / zeros)
+        return round(estimate)
+
+
+# ── Quantiles ─────────────────────────────────────────────────
+
+def bucket_sql(expr):
+    """SQL bucket index of a positive amount (bucket i holds (gamma^(i-1), gamma^i])."""
+    return f"CEIL(LN({expr}) / {_LN_GAMMA!r})"
+
+
+def bucket_of(x):
+    """bucket_sql() for one amount, in Python."""
+    return math.ceil(math.log(x) / _LN_GAMMA)
+
+
+class QuantileSketch:
+    """Counts per log bucket. Amounts must be positive."""
+
+    __slots__ = ("buckets", "n")
+
+    def __init__(self):
+        self.buckets = {}       # bucket index -> count
+        self.n       = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Sketch from (bucket, count) rows, e.g. one shard's GROUP BY bucket."""
+        sketch = cls()
+        for bucket, count in rows:
+            sketch.add_bucket(int(bucket), int(count))
+        return sketch
+
+    def add_bucket(self, bucket, count=1):
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.n += count
+
+    def add(self, x):
+        self.add_bucket(bucket_of(x))
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.add_bucket(bucket, count)
+        return self
+
+    def quantile(self, q):
+        """Value at rank q (0..1), within QUANTILE_ALPHA of the true one; None if empty."""
+        if not self.n:
+            return None
+        rank, seen = q * (self.n - 1), 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.buckets) / (_GAMMA + 1)
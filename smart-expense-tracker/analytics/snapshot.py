@@ -0,0 +1,222 @@
+"""
+analytics/snapshot.py
+Columnar expense snapshots for offline analysis (flask expenses snapshot).
+
+Rows come from Expense.stream_snapshot() in batches and are written as
+they arrive, so memory stays at one batch however large the export is.
+Two on-disk formats, both uncompressed so a reader can memory-map them
+and use the columns in place, without parsing or copying:
+
+- "arrow": one Arrow IPC file (Feather v2). Needs pyarrow, which is
+  optional; pandas, polars and DuckDB read it directly.
+- "npy":   a directory with one NumPy .npy file per column, plus
+  description_offsets.npy / description_data.npy holding the UTF-8
+  descriptions (Arrow's string layout) and meta.json. Needs only NumPy.
+
+Amounts are int64 paise (amount_paise), so totals are exact. Category
+names are in the metadata, keyed by category_id. Read either format back
+with load().
+"""
+
+import json
+import os
+import shutil
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from models.expense import SNAPSHOT_COLUMNS
+
+FORMATS = ("arrow", "npy")
+
+# NumPy dtypes of the fixed-width columns (description is variable-width)
+DTYPES = {
+    "id":           np.dtype("<u4"),
+    "user_id":      np.dtype("<u4"),
+    "category_id":  np.dtype("<u4"),
+    "amount_paise": np.dtype("<i8"),
+    "date":         np.dtype("<M8[D]"),
+    "created_at":   np.dtype("<M8[s]"),
+    "archived":     np.dtype("|b1"),
+}
+
+_NPY_HEADER = 128       # bytes; fixed, so the row count can be filled in at the end
+
+
+def available_formats():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ("npy",)
+    return FORMATS
+
+
+def _columns(rows):
+    """A batch of SNAPSHOT_COLUMNS tuples as {name: array}; description stays a tuple of str."""
+    values = dict(zip(SNAPSHOT_COLUMNS, zip(*rows)))
+    cols   = {name: np.array(values[name], dtype=dtype) for name, dtype in DTYPES.items()}
+    cols["description"] = values["description"]
+    return cols
+
+
+# ── NumPy directory ───────────────────────────────────────────
+
+def _npy_header(dtype, n):
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (dtype.str, n)
+    header = header.ljust(_NPY_HEADER - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class _NpyColumn:
+    """A .npy file written by appending; the header is rewritten with the final length."""
+
+    def __init__(self, path, dtype):
+        self.dtype = dtype
+        self.count = 0
+        self.file  = open(path, "wb")
+        self.file.write(_npy_header(dtype, 0))
+
+    def append(self, arr):
+        self.file.write(np.ascontiguousarray(arr, dtype=self.dtype).tobytes())
+        self.count += len(arr)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(_npy_header(self.dtype, self.count))
+        self.file.close()
+
+
+class _NpyWriter:
+
+    def __init__(self, path, meta):
+        os.makedirs(path)
+        self.path = path
+        self.meta = meta
+        self.cols = {name: _NpyColumn(os.path.join(path, f"{name}.npy"), dtype)
+                     for name, dtype in DTYPES.items()}
+        self.offsets = _NpyColumn(os.path.join(path, "description_offsets.npy"),
+                                  np.dtype("<i8"))
+        self.data    = _NpyColumn(os.path.join(path, "description_data.npy"),
+                                  np.dtype("|u1"))
+        self.offsets.append(np.zeros(1, dtype=np.int64))
+
+    def write(self, cols):
+        for name, column in self.cols.items():
+            column.append(cols[name])
+        encoded = [s.encode("utf-8") for s in cols["description"]]
+        ends    = self.data.count + np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+                                                          count=len(encoded)))
+        self.offsets.append(ends)
+        self.data.append(np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def close(self):
+        for column in (*self.cols.values(), self.offsets, self.data):
+            column.close()
+        self.meta["rows"] = self.offsets.count - 1
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=1)
+
+
+class Descriptions:
+    """Read-only sequence of str over memory-mapped offsets + UTF-8 bytes (decoded on access)."""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data    = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+# ── Arrow IPC ─────────────────────────────────────────────────
+
+class _ArrowWriter:
+
+    def __init__(self, path, meta):
+        import pyarrow as pa
+
+        self.pa     = pa
+        self.types  = {
+            "id": pa.uint32(), "user_id": pa.uint32(), "category_id": pa.uint32(),
+            "amount_paise": pa.int64(), "date": pa.date32(),
+            "created_at": pa.timestamp("s"), "archived": pa.bool_(),
+            "description": pa.string(),
+        }
+        self.schema = pa.schema([(name, self.types[name]) for name in SNAPSHOT_COLUMNS],
+                                metadata={"expenseiq": json.dumps(meta)})
+        self.sink   = pa.OSFile(path, "wb")
+        self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write(self, cols):
+        arrays = [self.pa.array(cols[name], type=self.types[name]) for name in SNAPSHOT_COLUMNS]
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+# ── Write / load ──────────────────────────────────────────────
+
+def write(path, batches, categories, fmt=None, scope="all"):
+    """
+    Stream batches of SNAPSHOT_COLUMNS tuples to a snapshot at `path`
+    (replacing any existing one once complete). fmt None = arrow when
+    pyarrow is installed, else npy. Returns (fmt, rows written).
+    """
+    fmt = fmt or available_formats()[0]
+    if fmt not in available_formats():
+        raise ValueError(f"format {fmt!r} needs pyarrow" if fmt == "arrow"
+                         else f"unknown format {fmt!r}")
+    meta = {
+        "scope":      scope,
+        "created":    datetime.now().isoformat(timespec="seconds"),
+        "categories": {str(c["id"]): c["name"] for c in categories},
+    }
+    tmp    = f"{path}.tmp"
+    if os.path.isdir(tmp):              # left by an interrupted run
+        shutil.rmtree(tmp)
+    writer = (_ArrowWriter if fmt == "arrow" else _NpyWriter)(tmp, meta)
+    rows   = 0
+    try:
+        for batch in batches:
+            writer.write(_columns(batch))
+            rows += len(batch)
+    finally:
+        writer.close()
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return fmt, rows
+
+
+def load(path):
+    """
+    Memory-map a snapshot. Returns (columns, meta): for arrow, a
+    pyarrow.Table whose buffers point into the mapped file; for npy, a dict
+    of read-only memory-mapped arrays with description as Descriptions.
+    """
+    if os.path.isdir(path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        cols = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in DTYPES}
+        cols["description"] = Descriptions(
+            np.load(os.path.join(path, "description_offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "description_data.npy"), mmap_mode="r"),
+        )
+        return cols, meta
+
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table, json.loads(table.schema.metadata[b"expenseiq"])
@@ -3,11 +3,17 @@ app.py — Application factory (updated with new blueprints).
 """
 
 import os
-from flask import Flask, render_template
+from flask import Flask, render_template, request, g
 from extensions import bcrypt, login_manager, csrf
 from config.settings import config_map
-from db import get_db, close_db
+from db import get_db, close_db, ShardMoving, DatabaseBusy
 from models.user import User
+from models.api_token import ApiToken
+from models.money import Money
+from models.schedule import describe as describe_schedule
+from services import jsonresp, ratelimit
+from services.groupcommit import GroupCommitBusy
+from services.ratelimit import RateLimited, Overloaded
 
 
 def create_app():
@@ -20,7 +26,9 @@ def create_app():
     # ── Extensions ────────────────────────────────────────────
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    ratelimit.init_app(app)         # before CSRF: rejected floods cost nothing
     csrf.init_app(app)
+    jsonresp.init_app(app)
 
     login_manager.login_view     = "auth.login"
     login_manager.login_message  = "Please log in to access this page."
@@ -30,6 +38,18 @@ def create_app():
     def load_user(user_id):
         return User.get_by_id(int(user_id))
 
+    @login_manager.request_loader
+    def load_user_from_token(req):
+        # JSON API clients: "Authorization: Bearer <token>" (`flask api token`)
+        scheme, _, token = req.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            return None
+        user_id = ApiToken.user_id_for(token.strip())
+        if user_id is None:
+            return None
+        g.api_token_auth = True     # no cookie involved, so no CSRF check
+        return User.get_by_id(user_id)
+
     # ── Database teardown ─────────────────────────────────────
     app.teardown_appcontext(close_db)
 
@@ -40,6 +60,7 @@ def create_app():
     from routes.budgets   import budgets_bp
     from routes.recurring import recurring_bp
     from routes.admin     import admin_bp
+    from routes.api       import api_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
@@ -47,15 +68,24 @@ def create_app():
     app.register_blueprint(budgets_bp)
     app.register_blueprint(recurring_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
+
+    # ── CLI commands ──────────────────────────────────────────
+    from commands import register_commands
+    register_commands(app)
 
     # ── Jinja2 filters ────────────────────────────────────────
     @app.template_filter("inr")
     def inr_filter(value):
         try:
-            return "₹{:,.2f}".format(float(value))
-        except (TypeError, ValueError):
+            return "₹{:,.2f}".format(Money.of(value))
+        except (TypeError, ValueError, ArithmeticError):
             return "₹0.00"
 
+    @app.template_filter("schedule")
+    def schedule_filter(rule):
+        return describe_schedule(rule)
+
     # ── Error handlers ────────────────────────────────────────
     @app.errorhandler(404)
     def not_found(e):
@@ -69,6 +99,32 @@ def create_app():
     def server_error(e):
         return render_template("errors/500.html"), 500
 
+    def retry_later(status, retry_after, error, page_text=None):
+        if request.path.startswith("/api/"):
+            response = jsonresp.json_response({"error": error}, status=status)
+        else:
+            response = app.make_response(
+                (render_template(f"errors/{status}.html", message=page_text), status))
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    @app.errorhandler(ShardMoving)
+    def shard_moving(e):
+        # The user's rows are mid-move between shards (a few seconds)
+        return retry_later(503, int(app.config["SHARD_MOVE_GRACE"]) + 1,
+                           "Temporarily read-only, retry shortly")
+
+    @app.errorhandler(RateLimited)
+    def rate_limited(e):
+        return retry_later(429, e.retry_after, "Too many requests, slow down")
+
+    @app.errorhandler(Overloaded)
+    @app.errorhandler(DatabaseBusy)
+    @app.errorhandler(GroupCommitBusy)
+    def overloaded(e):
+        return retry_later(503, getattr(e, "retry_after", 2), "Server busy, retry shortly",
+                           "The server is very busy right now.")
+
     return app
 
 
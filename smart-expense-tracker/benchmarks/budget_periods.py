@@ -0,0 +1,107 @@
+"""
+benchmarks/budget_periods.py
+Cost of evaluating one user's budgets (current week, month, quarter and
+year, plus 7/30/90-day rolling windows, overall and per category) as the
+user's expense history grows. Compares a range SUM over the raw expenses
+(what a per-budget SELECT SUM(amount) ... WHERE date BETWEEN does) with
+models/periods.DailySpend over expense_daily rows, which the app keeps up
+to date on every write. Synthetic data, no database needed. Every budget's
+spent amount is checked against the range SUM.
+
+    python benchmarks/budget_periods.py                     # 10k, 100k, 1M expenses
+    python benchmarks/budget_periods.py --sizes 1000 5000000
+"""
+
+import argparse
+import random
+import sys
+import time
+from bisect import bisect_left
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import periods                 # noqa: E402
+from models.money import Money             # noqa: E402
+
+CATEGORIES = (1, 2, 3, 4, 5, 6)
+HISTORY    = 5 * 366                        # days of history the expenses spread over
+TODAY      = date(2026, 10, 19)
+
+
+def budgets():
+    keys = [periods.key_for(p, TODAY) for p in ("week", "month", "quarter", "year")]
+    keys += ["7d", "30d", "90d"]
+    return [(key, cat) for key in keys for cat in (None, *CATEGORIES)]
+
+
+def generate(n, seed):
+    """Expenses as (day, category_id, paise) sorted by day, and their daily rollups."""
+    rng   = random.Random(seed)
+    first = TODAY - timedelta(days=HISTORY - 1)
+    rows  = sorted((first + timedelta(days=rng.randrange(HISTORY)),
+                    rng.choice(CATEGORIES), rng.randrange(100, 500_000)) for _ in range(n))
+    daily = {}
+    for day, cat, paise in rows:
+        daily[day, cat] = daily.get((day, cat), 0) + paise
+    return rows, sorted((day, cat, paise) for (day, cat), paise in daily.items())
+
+
+def range_sum(rows, days, budget_list):
+    """A range SUM per budget: touches every expense in the budget's period."""
+    out, touched = [], 0
+    for key, cat in budget_list:
+        start, end = periods.bounds(key, TODAY)
+        lo, hi = bisect_left(days, start), bisect_left(days, end)
+        touched += hi - lo
+        out.append(Money(sum(p for _, c, p in rows[lo:hi] if cat is None or c == cat)))
+    return out, touched
+
+
+def prefix_sums(daily, daily_days, budget_list):
+    """What Budget.get_status does: one range read of daily rows, then O(1) per budget."""
+    ranges = [periods.bounds(key, TODAY) for key, _ in budget_list]
+    start, end = min(s for s, _ in ranges), max(e for _, e in ranges)
+    lo, hi = bisect_left(daily_days, start), bisect_left(daily_days, end)
+    spend = periods.DailySpend(start, end, daily[lo:hi])
+    return [spend.spent(s, e, cat) for (s, e), (_, cat) in zip(ranges, budget_list)], hi - lo
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    budget_list = budgets()
+    print(f"{len(budget_list)} budgets, expenses spread over {HISTORY} days, "
+          f"{len(CATEGORIES)} categories")
+    print(f"{'expenses':>10}  {'range SUM':>12} {'rows read':>10}  "
+          f"{'prefix sums':>12} {'rows read':>10}  check")
+    failed = False
+    for n in args.sizes:
+        rows, daily = generate(n, args.seed)
+        days, daily_days = [r[0] for r in rows], [r[0] for r in daily]
+        (slow, slow_rows), slow_ms = timed(lambda: range_sum(rows, days, budget_list), args.repeat)
+        (fast, fast_rows), fast_ms = timed(
+            lambda: prefix_sums(daily, daily_days, budget_list), args.repeat)
+        ok = slow == fast
+        failed |= not ok
+        print(f"{n:>10}  {slow_ms:9.2f} ms {slow_rows:>10}  "
+              f"{fast_ms:9.2f} ms {fast_rows:>10}  {'exact' if ok else 'MISMATCH'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+benchmarks/categorize.py
+Category suggestion accuracy and prediction latency on real expenses.
+Each evaluated user's newest expenses are held out; the rest train their
+own model and, together with everyone else's, the global one
+(analytics/categorize.py). Reports top-1 accuracy, how many held-out
+expenses would get a suggestion at CATEGORIZER_MIN_CONFIDENCE and how many
+of those are right, and p50/p99 prediction time. Reads the configured
+database; writes nothing.
+
+    python benchmarks/categorize.py                       # the 200 newest users
+    python benchmarks/categorize.py --users 1000 --holdout 0.3
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics.categorize import NaiveBayes, choose  # noqa: E402
+from app import app                                   # noqa: E402
+from models.expense import Expense                    # noqa: E402
+from models.user import User                          # noqa: E402
+
+
+def split(users, holdout, train_rows):
+    """[(train pairs, test pairs)] per user: the oldest rows train, the newest test."""
+    data = []
+    for u in User.get_all()[-users:]:
+        rows = Expense.get_labelled(u["id"], train_rows)[::-1]     # oldest first
+        cut  = int(len(rows) * (1 - holdout))
+        if cut and cut < len(rows):
+            data.append(([(r["description"], r["category_id"]) for r in rows[:cut]],
+                         [(r["description"], r["category_id"]) for r in rows[cut:]]))
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--users", type=int, default=200,
+                        help="users evaluated (the most recently registered)")
+    parser.add_argument("--holdout", type=float, default=0.2,
+                        help="share of each user's newest expenses held out for testing")
+    args = parser.parse_args()
+    if not 0.05 <= args.holdout <= 0.9:
+        parser.error("--holdout must be between 0.05 and 0.9")
+
+    with app.app_context():
+        cfg  = app.config
+        data = split(args.users, args.holdout, cfg["CATEGORIZER_TRAIN_ROWS"])
+    if not data:
+        print("No users with enough expenses to split.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    global_model = NaiveBayes.train(pair for train, _ in data for pair in train)
+    user_models  = [NaiveBayes.train(train) for train, _ in data]
+    train_s = time.perf_counter() - t0
+
+    tested = correct = suggested = right = 0
+    latencies = []
+    for model, (_, test) in zip(user_models, data):
+        for description, category_id in test:
+            t = time.perf_counter()
+            guess, _, _ = choose(model, global_model, description,
+                                 cfg["CATEGORIZER_MIN_EXAMPLES"], 0.0)
+            latencies.append(time.perf_counter() - t)
+            best, _, _ = choose(model, global_model, description,
+                                cfg["CATEGORIZER_MIN_EXAMPLES"],
+                                cfg["CATEGORIZER_MIN_CONFIDENCE"])
+            tested    += 1
+            correct   += guess == category_id
+            suggested += best is not None
+            right     += best is not None and best == category_id
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+    print(f"{len(data)} user(s), {tested} held-out expense(s); "
+          f"trained {len(data) + 1} model(s) in {train_s * 1000:.0f} ms")
+    print(f"top-1 accuracy:  {correct / tested:.1%}")
+    print(f"suggested:       {suggested / tested:.1%} of expenses at "
+          f">= {cfg['CATEGORIZER_MIN_CONFIDENCE']:.0%} confidence, "
+          f"{right / max(suggested, 1):.1%} of them right")
+    print(f"predict latency: p50 {pct(0.5):.0f} us, p99 {pct(0.99):.0f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+benchmarks/cold_start.py
+Cold-start budget for a web worker: time `import wsgi` in fresh interpreters
+and fail (exit 1) if the median exceeds the budget.
+
+    python benchmarks/cold_start.py                 # check against budget
+    python benchmarks/cold_start.py --report        # also refresh importtime.txt
+    COLD_START_BUDGET_MS=400 python benchmarks/cold_start.py
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT        = Path(__file__).resolve().parent.parent
+REPORT      = Path(__file__).resolve().parent / "importtime.txt"
+BUDGET_MS   = float(os.environ.get("COLD_START_BUDGET_MS", 500))
+# Modules that must stay off the boot path (loaded on first use instead)
+DEFERRED    = ("mysql.connector", "numpy", "reportlab")
+
+
+def _run(extra=()):
+    return subprocess.run([sys.executable, *extra, "-c", "import wsgi"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        _run()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def importtime():
+    """
+    (module, cumulative_us) pairs from -X importtime, slowest first. A module
+    is listed again for every attempt to import it (failed optional imports,
+    modules removed from sys.modules and re-imported); keep its slowest one.
+    """
+    slowest = {}
+    for line in _run(("-X", "importtime")).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = line.split("|")
+        name = name.strip()
+        slowest[name] = max(slowest.get(name, 0), int(cum_us))
+    return sorted(slowest.items(), key=lambda r: -r[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--report", action="store_true",
+                        help=f"write the top imports to {REPORT.name}")
+    args = parser.parse_args()
+
+    rows    = importtime()
+    loaded  = {name for name, _ in rows}
+    leaked  = [m for m in DEFERRED if m in loaded]
+    median  = measure(args.runs)
+
+    if args.report:
+        lines = [f"# python -X importtime -c 'import wsgi'  (python {sys.version.split()[0]})",
+                 f"# median cold start over {args.runs} runs: {median:.0f} ms",
+                 "# cumulative_us  module"]
+        lines += [f"{cum:>14}  {name}" for name, cum in rows[:40]]
+        REPORT.write_text("\n".join(lines) + "\n")
+
+    print(f"cold start median: {median:.0f} ms (budget {BUDGET_MS:.0f} ms)")
+    if leaked:
+        print("eagerly imported at boot: " + ", ".join(leaked))
+    if median > BUDGET_MS or leaked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+benchmarks/commits.py
+Insert throughput for three write paths: a commit per row
+(Expense.create), one transaction for all rows (Expense.create_many), and
+concurrent single-row writes through group commit (services/groupcommit.py).
+Prints rows/s and the number of COMMITs each path issued. Writes to the
+configured database, so use a scratch one; the rows are deleted afterwards.
+
+    python benchmarks/commits.py --user 1                       # 500 rows per path
+    python benchmarks/commits.py --user 1 --rows 2000 --threads 32 --window 5
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import app                          # noqa: E402
+from db import transaction                   # noqa: E402
+from models.expense import Expense           # noqa: E402
+from services import counters, groupcommit   # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--user", type=int, required=True,
+                        help="user to insert the benchmark rows for")
+    parser.add_argument("--rows", type=int, default=500, help="rows per path")
+    parser.add_argument("--threads", type=int, default=16,
+                        help="concurrent writers for the group-commit run")
+    parser.add_argument("--window", type=float, default=2.0,
+                        help="GROUP_COMMIT_MS for the group-commit run")
+    args = parser.parse_args()
+    user_id, rows = args.user, args.rows
+
+    with app.app_context():
+        cat  = Expense.get_all_categories()[0]["id"]
+        row  = {"category_id": cat, "amount": Decimal("1.00"),
+                "description": "benchmarks/commits.py", "date": date.today()}
+        made = []
+
+        def single(_):
+            with app.app_context():
+                return groupcommit.write(user_id, lambda: Expense.create(user_id=user_id, **row))
+
+        def per_row():
+            return [Expense.create(user_id=user_id, **row) for _ in range(rows)]
+
+        def one_txn():
+            return Expense.create_many(user_id, [row] * rows)
+
+        def grouped():
+            app.config["GROUP_COMMIT_MS"] = args.window
+            try:
+                with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                    return list(pool.map(single, range(rows)))
+            finally:
+                app.config["GROUP_COMMIT_MS"] = 0
+
+        try:
+            for name, run in (("commit per row", per_row), ("one transaction", one_txn),
+                              (f"group commit x{args.threads}", grouped)):
+                before = counters.snapshot()["counters"].get("db_commits", 0)
+                t0 = time.perf_counter()
+                made += run()
+                elapsed = time.perf_counter() - t0
+                commits = counters.snapshot()["counters"].get("db_commits", 0) - before
+                print(f"{name:<18} {rows / elapsed:8.0f} rows/s  {commits:>5} commit(s)")
+        finally:
+            with transaction():
+                for expense_id in made:
+                    Expense.delete(expense_id, user_id)
+            print(f"Cleaned up {len(made)} benchmark row(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
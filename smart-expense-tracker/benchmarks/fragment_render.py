@@ -0,0 +1,76 @@
+"""
+benchmarks/fragment_render.py
+Time per page view (queries + rendering) of the expense list, budgets and
+recurring pages with the fragment cache (services/fragments.py) off, cold
+and warm, for one user. Reads the configured database; writes nothing.
+
+    python benchmarks/fragment_render.py --user 1
+    python benchmarks/fragment_render.py --user 1 --repeat 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask_login import login_user                    # noqa: E402
+
+from app import app                                   # noqa: E402
+from models.expense import Expense                    # noqa: E402
+from models.user import User                          # noqa: E402
+from routes.budgets import manage_budgets             # noqa: E402
+from routes.expenses import list_expenses             # noqa: E402
+from routes.recurring import manage_recurring         # noqa: E402
+from services import fragments                        # noqa: E402
+
+PAGES = (("/expenses", list_expenses), ("/budgets", manage_budgets),
+         ("/recurring", manage_recurring))
+
+
+def view(user, path, fn):
+    """One page view as `user`: (html, ms)."""
+    with app.test_request_context(path):
+        login_user(user)
+        t0 = time.perf_counter()
+        html = fn()
+        return html, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--user", type=int, required=True,
+                        help="a user with a long expense list")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    repeat = args.repeat
+
+    with app.app_context():
+        user = User.get_by_id(args.user)
+        if user is None:
+            print(f"no user {args.user}", file=sys.stderr)
+            return 1
+        rows = len(Expense.get_all(args.user))
+
+    enabled = app.config["FRAGMENT_CACHE"]
+    print(f"user {args.user}: {rows} expense(s), {repeat} view(s) per page")
+    try:
+        for path, fn in PAGES:
+            app.config["FRAGMENT_CACHE"] = False
+            off = sum(view(user, path, fn)[1] for _ in range(repeat)) / repeat
+            app.config["FRAGMENT_CACHE"] = True
+            with app.app_context():
+                fragments.clear()
+            html, cold = view(user, path, fn)
+            warm = sum(view(user, path, fn)[1] for _ in range(repeat)) / repeat
+            print(f"{path:<11} off {off:8.2f} ms  cold {cold:8.2f} ms  "
+                  f"warm {warm:8.2f} ms  ({off / max(warm, 1e-9):.1f}x, "
+                  f"{len(html) / 1024:.0f} KiB page)")
+    finally:
+        app.config["FRAGMENT_CACHE"] = enabled
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+benchmarks/json_payloads.py
+Size and serialisation time of one user's JSON payloads: the old path
+(convert Decimals and dates, then json.dumps) against services/jsonresp.py,
+with gzip and brotli sizes and the columnar expense list. Reads the
+configured database; writes nothing.
+
+    python benchmarks/json_payloads.py --user 1
+    python benchmarks/json_payloads.py --user 1 --repeat 200
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics.forecast import forecast_next_month    # noqa: E402
+from analytics.payload import build_payload            # noqa: E402
+from app import app                                    # noqa: E402
+from models.budget import Budget                       # noqa: E402
+from models.expense import Expense                     # noqa: E402
+from models.metrics import UserMetrics                 # noqa: E402
+from services import jsonresp                          # noqa: E402
+
+
+def legacy(obj):
+    """What the endpoints used to do: convert each value, then json.dumps."""
+    if isinstance(obj, dict):
+        return {k: legacy(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [legacy(v) for v in obj]
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return str(obj)
+    return obj
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--user", type=int, required=True, help="a heavy user to serialise")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    user_id = args.user
+
+    with app.app_context():
+        today   = date.today()
+        payload = build_payload(UserMetrics.load(user_id, today),
+                                forecast_next_month(user_id, today),
+                                Expense.get_recent(user_id, limit=5),
+                                Budget.get_for_month(user_id, today.strftime("%Y-%m")))
+        rows = [{"id": r["id"], "amount": r["amount"], "description": r["description"],
+                 "date": r["date"], "category": r["category_name"]}
+                for r in Expense.get_all(user_id)]
+    datasets = {"analytics": payload, "all expenses": {"expenses": rows}}
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            out = fn()
+        return out, (time.perf_counter() - t0) * 1000 / args.repeat
+
+    print(f"serializer: {'orjson' if jsonresp.orjson else 'stdlib json'}, "
+          f"brotli: {'yes' if jsonresp.brotli else 'no'}")
+    for name, obj in datasets.items():
+        old, old_ms = timed(lambda: json.dumps(legacy(obj)).encode("utf-8"))
+        new, new_ms = timed(lambda: jsonresp.dumps(obj))
+        packed = jsonresp.dumps({"expenses": jsonresp.columnar(rows)}) \
+            if name == "all expenses" else new
+        print(f"{name} ({len(rows)} rows)" if name == "all expenses" else name)
+        print(f"  before: {len(old):>9} B  {old_ms:7.2f} ms")
+        print(f"  after:  {len(new):>9} B  {new_ms:7.2f} ms   "
+              f"gzip {len(gzip.compress(new, 6))} B"
+              + (f"  br {len(jsonresp.brotli.compress(new, quality=4))} B"
+                 if jsonresp.brotli else ""))
+        if packed is not new:
+            print(f"  columns:{len(packed):>9} B   gzip {len(gzip.compress(packed, 6))} B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
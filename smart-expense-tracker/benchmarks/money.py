@@ -0,0 +1,66 @@
+"""
+benchmarks/money.py
+Totalling a column of DECIMAL(10,2) amounts in Python: float (the old
+code path), Decimal, Money via to_paise, and NumPy int64 paise. Checks each
+total against the exact integer sum and reports time per method (no
+database needed; `flask expenses verify-money` does the same against SQL
+SUM).
+
+    python benchmarks/money.py                  # 1M amounts
+    python benchmarks/money.py --rows 10000000  # needs ~2 GB for the Decimals
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.money import Money, paise_array, sum_paise, to_paise   # noqa: E402
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paise    = np.random.default_rng(args.seed).integers(1, 99_999_999, size=args.rows,
+                                                          dtype=np.int64)
+    expected = Money(int(paise.sum()))
+    amounts  = [Decimal(int(p)).scaleb(-2) for p in paise]    # what the connector returns
+    print(f"{args.rows} amounts, exact total {expected}")
+
+    methods = (
+        ("float",              lambda: sum(float(a) for a in amounts)),
+        ("Decimal",            lambda: sum(amounts, Decimal(0))),
+        ("Money (python int)", lambda: sum(to_paise(a) for a in amounts)),
+        ("Money (int64)",      lambda: sum_paise(paise_array(amounts)).paise),
+        ("int64 paise only",   lambda: int(paise.sum())),
+    )
+    failed = False
+    for name, fn in methods:
+        total, ms = timed(fn)
+        if isinstance(total, float):
+            drift  = total - float(expected)
+            status = "exact" if drift == 0 else f"drifts by {drift:+.6f}"
+        else:
+            got    = Money.of(total) if isinstance(total, Decimal) else Money(total)
+            status = "exact" if got == expected else f"MISMATCH: {got}"
+            failed |= got != expected
+        print(f"{name:<20} {ms:9.1f} ms  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
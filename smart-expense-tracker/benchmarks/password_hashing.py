@@ -0,0 +1,60 @@
+"""
+benchmarks/password_hashing.py
+Login verification throughput through the bounded hashing pool
+(services/hashing.py) at several bcrypt costs: concurrent clients check
+one password, retrying when the pool answers HashPoolBusy as a real client
+would after a 503. Prints logins/s and busy rejections per cost. Uses the
+app's HASH_POOL_* settings; no database is needed.
+
+    python benchmarks/password_hashing.py
+    python benchmarks/password_hashing.py --costs 11,12 --clients 32 --logins 256
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import app                         # noqa: E402
+from services import counters, hashing      # noqa: E402
+
+PASSWORD = "correct horse battery"
+
+
+def login(hashed):
+    with app.app_context():
+        while True:
+            try:
+                return hashing.check_password(hashed, PASSWORD)
+            except hashing.HashPoolBusy:
+                time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--costs", default="10,11,12,13",
+                        help="comma-separated bcrypt work factors to compare")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent logins")
+    parser.add_argument("--logins", type=int, default=64, help="logins per cost")
+    args = parser.parse_args()
+
+    for cost in [int(c) for c in args.costs.split(",")]:
+        app.config["BCRYPT_LOG_ROUNDS"] = cost
+        with app.app_context():
+            hashed = hashing.hash_password(PASSWORD)
+        rejected_before = counters.snapshot()["counters"].get("hash_rejected", 0)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            assert all(clients.map(login, [hashed] * args.logins))
+        elapsed = time.perf_counter() - t0
+        rejected = counters.snapshot()["counters"].get("hash_rejected", 0) - rejected_before
+        print(f"cost {cost:>2}: {args.logins / elapsed:7.1f} logins/s  "
+              f"({elapsed * 1000 / args.logins:6.1f} ms each, {rejected} busy rejections)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
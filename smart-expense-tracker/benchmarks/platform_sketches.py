@@ -0,0 +1,170 @@
+"""
+benchmarks/platform_sketches.py
+Admin platform analytics (analytics/platform.py) over a large synthetic
+platform. The exact answers need every user id that was active in the
+window, or every user's monthly total, read from the expenses and
+de-duplicated in one place. The sketches cost one row per HyperLogLog
+register per day, and one row per spend bucket, on each shard, however
+many users there are. The benchmark reports the rows each approach ships
+to the app, the time to merge the shard sketches, and how far every
+estimate is from the exact answer. It exits non-zero if any estimate is
+outside its error bound. No database is needed.
+
+    python benchmarks/platform_sketches.py                        # 10M expenses
+    python benchmarks/platform_sketches.py --expenses 50000000 --users 1000000
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics import sketches                      # noqa: E402
+from analytics.platform import ACTIVE_DAYS, QUANTILES  # noqa: E402
+
+TODAY      = date(2026, 10, 19)
+HISTORY    = 365
+CATEGORIES = 8
+HLL_BOUND  = 4 * 1.04 / (1 << sketches.HLL_P) ** 0.5     # 4 standard errors
+Q_BOUND    = sketches.QUANTILE_ALPHA + 1e-9
+
+
+def generate(n, users, seed):
+    """Expenses as (user, day index, category, paise) arrays; a few users spend a lot more."""
+    rng    = np.random.default_rng(seed)
+    weight = rng.lognormal(0, 1.2, users)
+    user   = rng.choice(users, size=n, p=weight / weight.sum()).astype(np.int64) + 1
+    day    = rng.integers(0, HISTORY, size=n)
+    cat    = rng.integers(1, CATEGORIES + 1, size=n)
+    paise  = rng.lognormal(6.5, 1.1, n).astype(np.int64) * 100 + rng.integers(0, 100, size=n)
+    return user, day, cat, paise
+
+
+def exact(user, day, paise, month_days):
+    """Active users per day, over the last 7 and ACTIVE_DAYS days, and per-user spend quantiles."""
+    recent = day >= HISTORY - ACTIVE_DAYS
+    pairs  = np.unique(day[recent] * (user.max() + 1) + user[recent])
+    dau    = np.bincount(pairs // (user.max() + 1) - (HISTORY - ACTIVE_DAYS),
+                         minlength=ACTIVE_DAYS)
+    wau    = len(np.unique(user[day >= HISTORY - 7]))
+    mau    = len(np.unique(user[recent]))
+    in_month = day >= HISTORY - month_days
+    spent  = np.bincount(user[in_month], weights=paise[in_month])
+    spent  = np.sort(spent[spent > 0]) / 100
+    return dau, wau, mau, [spent[int(q * (len(spent) - 1))] for q in QUANTILES], len(spent)
+
+
+def shard_sketches(user, day, cat, paise, shards, month_days):
+    """
+    What each shard's GROUP BY returns: (day, register, rank) rows over
+    its distinct (day, user) pairs, and (bucket, count) rows over its
+    users' monthly totals. Also the expense_daily rows the shard reads.
+    """
+    positions = {}
+    out = []
+    for s in range(shards):
+        mine = user % shards == s
+        u, d, c, p = user[mine], day[mine], cat[mine], paise[mine]
+        daily_rows = len(np.unique((u * HISTORY + d) * (CATEGORIES + 1) + c))
+
+        recent = d >= HISTORY - ACTIVE_DAYS
+        pairs  = np.unique(d[recent] * (user.max() + 1) + u[recent])
+        p_day, p_user = pairs // (user.max() + 1), pairs % (user.max() + 1)
+        for uid in np.unique(p_user).tolist():
+            if uid not in positions:
+                positions[uid] = sketches.hll_position(uid)
+        reg  = np.array([positions[x][0] for x in p_user.tolist()], dtype=np.int64)
+        rank = np.array([positions[x][1] for x in p_user.tolist()], dtype=np.int64)
+        grid = np.zeros(ACTIVE_DAYS * (1 << sketches.HLL_P), dtype=np.int64)
+        np.maximum.at(grid, (p_day - (HISTORY - ACTIVE_DAYS)) * (1 << sketches.HLL_P) + reg, rank)
+        cells = np.nonzero(grid)[0]
+        hll_rows = list(zip((cells >> sketches.HLL_P).tolist(),
+                            (cells & ((1 << sketches.HLL_P) - 1)).tolist(),
+                            grid[cells].tolist()))
+
+        in_month = d >= HISTORY - month_days
+        spent    = np.bincount(u[in_month], weights=p[in_month])
+        spent    = spent[spent > 0] / 100
+        buckets, counts = np.unique([sketches.bucket_of(x) for x in spent.tolist()],
+                                    return_counts=True)
+        out.append({"hll": hll_rows, "buckets": list(zip(buckets.tolist(), counts.tolist())),
+                    "daily_rows": daily_rows, "pairs": len(pairs), "users": len(spent)})
+    return out
+
+
+def merge(shards):
+    """What analytics/platform.py does with the shard rows."""
+    days = {}
+    for shard in shards:
+        for d, reg, rank in shard["hll"]:
+            days.setdefault(d, sketches.HyperLogLog()).set(reg, rank)
+    window = [days.get(d, sketches.HyperLogLog()) for d in range(ACTIVE_DAYS)]
+    dau = [s.count() for s in window]
+    wau = sketches.HyperLogLog.union(window[-7:]).count()
+    mau = sketches.HyperLogLog.union(window).count()
+    spend = sketches.QuantileSketch()
+    for shard in shards:
+        spend.merge(sketches.QuantileSketch.from_rows(shard["buckets"]))
+    return dau, wau, mau, [spend.quantile(q) for q in QUANTILES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--expenses", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    month_days = TODAY.day      # the current month so far
+    t0 = time.perf_counter()
+    user, day, cat, paise = generate(args.expenses, args.users, args.seed)
+    print(f"{args.expenses} expenses, {args.users} users, {args.shards} shards, "
+          f"{HISTORY} days (generated in {time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    dau, wau, mau, quantiles, month_users = exact(user, day, paise, month_days)
+    exact_ms = (time.perf_counter() - t0) * 1000
+    recent = int((day >= HISTORY - ACTIVE_DAYS).sum())
+
+    shards = shard_sketches(user, day, cat, paise, args.shards, month_days)
+    t0 = time.perf_counter()
+    s_dau, s_wau, s_mau, s_quantiles = merge(shards)
+    merge_ms = (time.perf_counter() - t0) * 1000
+
+    pairs    = sum(s["pairs"] for s in shards)
+    hll_rows = sum(len(s["hll"]) for s in shards)
+    q_rows   = sum(len(s["buckets"]) for s in shards)
+    print(f"expense_daily rows: {sum(s['daily_rows'] for s in shards)} "
+          f"(the raw table has {args.expenses})")
+    print(f"active users, last {ACTIVE_DAYS} days: exact needs {recent} expenses "
+          f"-> {pairs} (day, user) rows; sketches ship {hll_rows} register rows")
+    print(f"per-user spend, {TODAY:%Y-%m}: exact needs {month_users} user totals; "
+          f"sketches ship {q_rows} bucket rows")
+    print(f"exact in NumPy {exact_ms:8.1f} ms   merge shard sketches {merge_ms:8.1f} ms")
+
+    failed = 0
+    errs = [abs(s - e) / e for s, e in zip(s_dau, dau) if e]
+    print(f"daily active: {dau[-1]} today, sketch {s_dau[-1]}; "
+          f"worst of {len(errs)} days {max(errs):.2%}, mean {np.mean(errs):.2%}")
+    failed += max(errs) > HLL_BOUND
+    for name, e, s in (("7-day active", wau, s_wau), (f"{ACTIVE_DAYS}-day active", mau, s_mau)):
+        err = abs(s - e) / e
+        failed += err > HLL_BOUND
+        print(f"{name}: exact {e}, sketch {s} ({err:.2%})")
+    for q, e, s in zip(QUANTILES, quantiles, s_quantiles):
+        err = abs(s - e) / e
+        failed += err > Q_BOUND
+        print(f"per-user spend p{round(q * 100)}: exact {e:,.2f}, sketch {s:,.2f} ({err:.2%})")
+    print(f"bounds: {HLL_BOUND:.1%} for distinct counts, {Q_BOUND:.0%} for quantiles: "
+          f"{'all within' if not failed else f'{failed} OUTSIDE'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+benchmarks/recurring_schedule.py
+One day's materializer run over many recurring rules. The old way was
+every active rule, each checked against its month's expenses. The new
+way is a range scan of the next_due index for the rules that are due,
+then their occurrences and new next_due from models/schedule.py. The
+index is stood in for by a sorted list. Synthetic rules, no database
+needed. Every occurrence is checked against a day-by-day expansion of the
+rule.
+
+    python benchmarks/recurring_schedule.py                    # 1M rules
+    python benchmarks/recurring_schedule.py --rules 5000000 --missed 30
+"""
+
+import argparse
+import calendar
+import random
+import sys
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import schedule     # noqa: E402
+
+TODAY = date(2026, 10, 19)
+
+
+def generate(n, missed, seed):
+    """Rules with next_due kept up to date by daily runs, some `missed` days behind."""
+    rng, rules = random.Random(seed), []
+    for i in range(n):
+        start = TODAY - timedelta(days=rng.randrange(3 * 365))
+        rule  = {"id": i, "frequency": rng.choice(schedule.FREQUENCIES),
+                 "day_of_month": rng.choice((*range(1, 29), schedule.LAST_DAY)),
+                 "starts_on": start,
+                 "ends_on": None if rng.random() < 0.8 else start + timedelta(days=rng.randrange(4 * 365))}
+        behind = missed if rng.random() < 0.01 else 1     # 1%: the runner was down
+        rule["next_due"] = schedule.next_on_or_after(rule, TODAY - timedelta(days=behind - 1))
+        rules.append(rule)
+    return rules
+
+
+def expand(rule, start, end):
+    """Reference: walk every day and test it against the rule's definition."""
+    out, d = [], max(start, rule["starts_on"])
+    while d <= end and (rule["ends_on"] is None or d <= rule["ends_on"]):
+        freq = rule["frequency"]
+        if freq in ("weekly", "biweekly"):
+            hit = (d - rule["starts_on"]).days % (7 if freq == "weekly" else 14) == 0
+        else:
+            step  = {"monthly": 1, "quarterly": 3, "yearly": 12}[freq]
+            month = (d.year - rule["starts_on"].year) * 12 + d.month - rule["starts_on"].month
+            last  = calendar.monthrange(d.year, d.month)[1]
+            hit   = month % step == 0 and d.day == min(rule["day_of_month"], last)
+        if hit:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--rules", type=int, default=1_000_000)
+    parser.add_argument("--missed", type=int, default=10,
+                        help="days behind for the 1%% of rules whose runs were missed")
+    parser.add_argument("--check", type=int, default=20_000, help="due rules verified")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rules = generate(args.rules, args.missed, args.seed)
+    index = sorted((r["next_due"], r["id"]) for r in rules if r["next_due"] is not None)
+    print(f"{args.rules} rules, {len(index)} still running")
+
+    t0 = time.perf_counter()
+    scanned = sum(1 for r in rules if r["next_due"] is not None)   # old: every active rule
+    scan_ms = (time.perf_counter() - t0) * 1000
+
+    t0  = time.perf_counter()
+    due = [rules[i] for _, i in index[:bisect_right(index, (TODAY, args.rules))]]
+    select_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    inserted = moved = 0
+    for rule in due:
+        inserted += len(schedule.occurrences(rule, rule["next_due"], TODAY))
+        moved    += schedule.next_on_or_after(rule, TODAY + timedelta(days=1)) is not None
+    run_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"select   every active rule  {scanned:>9} rows  {scan_ms:8.1f} ms "
+          f"(plus one expense lookup per rule)")
+    print(f"select   next_due <= today  {len(due):>9} rows  {select_ms:8.1f} ms")
+    print(f"schedule occurrences + next {inserted:>9} exp.  {run_ms:8.1f} ms "
+          f"({run_ms * 1000 / max(len(due), 1):.1f} us per due rule, {moved} still running)")
+
+    failed = 0
+    for rule in due[:args.check]:
+        if schedule.occurrences(rule, rule["next_due"], TODAY) != expand(rule, rule["next_due"], TODAY):
+            failed += 1
+    print(f"checked {min(len(due), args.check)} due rules against a day-by-day expansion: "
+          f"{'exact' if not failed else f'{failed} MISMATCH(ES)'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
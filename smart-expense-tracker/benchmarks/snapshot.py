@@ -0,0 +1,125 @@
+"""
+benchmarks/snapshot.py
+Export and load time of the CSV export (the /expenses/export/csv format)
+against columnar snapshots (analytics/snapshot.py). Synthetic rows, no
+database needed. "load" is what an analyst does first: read the file and
+total the amounts exactly. Every method's total is checked against the
+generated data.
+
+    python benchmarks/snapshot.py                      # 1M rows, in a temp dir
+    python benchmarks/snapshot.py --rows 10000000 --dir /data/tmp
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics import snapshot                    # noqa: E402
+from models.money import Money, to_paise          # noqa: E402
+
+CATEGORIES = [{"id": i + 1, "name": n} for i, n in
+              enumerate(("Food", "Travel", "Shopping", "Bills", "Health", "Others"))]
+EPOCH      = date(1970, 1, 1)
+WORDS      = ("lunch", "cab", "groceries", "rent", "pharmacy", "coffee", "fuel", "movie")
+
+
+def synthetic(rows, batch, seed):
+    """Batches of Expense.stream_snapshot() tuples."""
+    rng     = np.random.default_rng(seed)
+    start   = (date(2018, 1, 1) - EPOCH).days
+    created = int((datetime(2026, 1, 1) - datetime(1970, 1, 1)).total_seconds())
+    for lo in range(0, rows, batch):
+        n     = min(batch, rows - lo)
+        paise = rng.integers(100, 5_000_000, size=n).tolist()
+        cats  = rng.integers(1, len(CATEGORIES) + 1, size=n).tolist()
+        days  = (start + rng.integers(0, 3000, size=n)).tolist()
+        words = rng.integers(0, len(WORDS), size=n).tolist()
+        yield [(lo + i + 1, (lo + i) % 5000 + 1, cats[i], paise[i],
+                f"{WORDS[words[i]]} #{lo + i}", days[i], created, 0)
+               for i in range(n)]
+
+
+def csv_export(path, batches):
+    """The export_csv() row format, streamed to a file."""
+    names = {c["id"]: c["name"] for c in CATEGORIES}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Category", "Description", "Amount (₹)"])
+        for batch in batches:
+            for r in batch:
+                writer.writerow([str(EPOCH + timedelta(days=r[5])), names[r[2]], r[4],
+                                 str(Money(r[3]))])
+
+
+def csv_load(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = [(date.fromisoformat(r[0]), r[1], r[2], to_paise(r[3])) for r in reader]
+    return sum(r[3] for r in rows)
+
+
+def snapshot_load(path):
+    cols, _ = snapshot.load(path)
+    if isinstance(cols, dict):
+        return int(cols["amount_paise"].sum())
+    import pyarrow.compute as pc
+    return pc.sum(cols["amount_paise"]).as_py()
+
+
+def size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dir", default=None, help="Where to write (default: a temp dir).")
+    args = parser.parse_args()
+
+    expected = sum(r[3] for b in synthetic(args.rows, args.batch, args.seed) for r in b)
+    print(f"{args.rows} rows, exact total {Money(expected)}")
+    print(f"{'format':<8} {'export ms':>10} {'load ms':>10} {'MB':>8}  total")
+
+    failed = False
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        runs = [("csv", os.path.join(tmp, "expenses.csv"),
+                 lambda p: csv_export(p, synthetic(args.rows, args.batch, args.seed)),
+                 csv_load)]
+        for fmt in snapshot.available_formats():
+            runs.append((fmt, os.path.join(tmp, f"expenses.{fmt}"),
+                         lambda p, fmt=fmt: snapshot.write(
+                             p, synthetic(args.rows, args.batch, args.seed), CATEGORIES, fmt),
+                         snapshot_load))
+        for name, path, export, load in runs:
+            _, export_ms = timed(lambda: export(path))
+            total, load_ms = timed(lambda: load(path))
+            status = "exact" if total == expected else f"MISMATCH: {Money(total)}"
+            failed |= total != expected
+            print(f"{name:<8} {export_ms:10.1f} {load_ms:10.1f} "
+                  f"{size(path) / 2**20:8.1f}  {status}")
+    print("(export times include generating the synthetic rows, the same for every format)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
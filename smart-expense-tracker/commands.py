@@ -0,0 +1,729 @@
+"""
+commands.py
+Flask CLI commands for maintenance jobs (run with `flask <group> <command>`).
+"""
+
+import time
+
+import click
+from flask import current_app, g
+from flask.cli import AppGroup
+
+from db import get_cursor, all_shards, all_databases, scatter
+from models.user import User
+from models.expense import Expense
+from models.metrics import UserMetrics
+from models.money import Money
+
+# Heavy modules (NumPy, process pools) are imported inside the commands that
+# need them, so registering the CLI adds nothing to web worker start-up.
+
+metrics_cli   = AppGroup("metrics",  help="Incremental smart-metric rollups.")
+forecast_cli  = AppGroup("forecast", help="Spend forecasting engine.")
+analytics_cli = AppGroup("analytics", help="Dashboard analytics cache.")
+auth_cli      = AppGroup("auth",      help="Authentication tooling.")
+expenses_cli  = AppGroup("expenses",  help="Expense table maintenance.")
+db_cli        = AppGroup("db",        help="Schema migrations and query plans.")
+shards_cli    = AppGroup("shards",    help="Per-user data shards.")
+api_cli       = AppGroup("api",       help="JSON API tokens and sync housekeeping.")
+notify_cli    = AppGroup("notify",    help="Notification delivery (email / webhook outbox).")
+recurring_cli = AppGroup("recurring", help="Recurring expense schedules.")
+
+
+@metrics_cli.command("rebuild")
+@click.option("--user", "user_id", type=int, default=None,
+              help="Rebuild a single user (default: everyone).")
+def metrics_rebuild(user_id):
+    """Recompute expense_rollups from the raw expenses table."""
+    UserMetrics.rebuild(user_id)
+    click.echo("Rollups rebuilt.")
+
+
+@metrics_cli.command("verify")
+@click.option("--user", "user_id", type=int, default=None,
+              help="Verify a single user (default: everyone).")
+def metrics_verify(user_id):
+    """Compare rollup-backed metrics against the raw SQL aggregates."""
+    from datetime import date
+    from models.metrics import month_bounds
+
+    ids = [user_id] if user_id else [u["id"] for u in User.get_all()]
+    mismatches = 0
+    for uid in ids:
+        state = UserMetrics.load(uid)
+        sql_top = [Money.of(r["total"]) for r in Expense.get_top3_categories(uid)]
+        # Daily rollups (budget periods) must add up to the monthly ones
+        months = sorted(state.months)
+        bounds = [tuple(map(date.fromisoformat, month_bounds(m))) for m in months]
+        cur    = get_cursor(readonly=True, user_id=uid)
+        daily  = UserMetrics.daily_spend(cur, uid, bounds[0][0], bounds[-1][1]) if months else None
+        cur.close()
+        checks = {
+            "month_total": (state.current_total, Expense.get_current_month_total(uid)),
+            "last_total":  (state.last_total, Expense.get_last_month_total(uid)),
+            "avg_daily":   (state.avg_daily, Expense.get_avg_daily_spend(uid)),
+            "predicted":   (state.predicted_next, Expense.get_predicted_next_month(uid)),
+            "top3_totals": ([r["total"] for r in state.top_categories(3)], sql_top),
+            "daily_rollups": ([daily.spent(*b) for b in bounds] if daily else [],
+                              [state.months[m] for m in months]),
+        }
+        for name, (fast, slow) in checks.items():
+            if fast != slow:
+                mismatches += 1
+                click.echo(f"user {uid}: {name} rollup={fast} sql={slow}")
+    click.echo(f"Checked {len(ids)} user(s), {mismatches} mismatch(es).")
+    if mismatches:
+        raise SystemExit(1)
+
+
+@forecast_cli.command("backtest")
+@click.option("--holdout", default=6, show_default=True,
+              help="Number of trailing months to predict.")
+@click.option("--sample", default=200, show_default=True,
+              help="Users timed through the inline (per-request) path.")
+def forecast_backtest(holdout, sample):
+    """Accuracy vs the 3-month average, plus inline and batch runtime."""
+    from analytics import forecast
+    from models.money import sql_paise
+
+    user_ids = [u["id"] for u in User.get_all()]
+    if not user_ids:
+        click.echo("No users.")
+        return
+    months = forecast.history_window(months=forecast.HISTORY_MONTHS + holdout)
+    u_index = {uid: i for i, uid in enumerate(user_ids)}
+    cat_index, _ = forecast.category_index()
+    m_index = {m: j for j, m in enumerate(months)}
+
+    rows = scatter(
+        f"""SELECT user_id, month, category_id, {sql_paise("total")} AS paise
+            FROM expense_rollups
+            WHERE month >= %s AND month <= %s""",
+        (months[0], months[-1])
+    )
+    history = forecast.scatter_paise((len(user_ids), len(cat_index), len(months)), [
+        (u_index[r["user_id"]], cat_index[r["category_id"]], m_index[r["month"]], r["paise"])
+        for r in rows if r["user_id"] in u_index and r["category_id"] in cat_index
+    ])
+
+    result = forecast.backtest(history, holdout=holdout)
+    click.echo(f"samples={result['samples']}  "
+               f"MAE={result['mae']:.2f}  "
+               f"3-month-avg MAE={result['baseline_mae']:.2f}  "
+               f"interval coverage={result['coverage']:.1%}")
+
+    timed = user_ids[:sample]
+    t0 = time.perf_counter()
+    for uid in timed:
+        forecast.forecast_next_month(uid)
+    inline_ms = (time.perf_counter() - t0) * 1000 / len(timed)
+
+    t0 = time.perf_counter()
+    forecast.forecast_batch(user_ids)
+    batch_s = time.perf_counter() - t0
+    click.echo(f"inline: {inline_ms:.2f} ms/user (incl. queries)   "
+               f"batch: {len(user_ids)} users in {batch_s:.2f}s "
+               f"({len(user_ids) / max(batch_s, 1e-9):.0f} users/s)")
+
+
+@analytics_cli.command("precompute")
+@click.option("--chunk-size", default=500, show_default=True,
+              help="Users loaded per set-based scan.")
+@click.option("--workers", default=2, show_default=True,
+              help="Process pool size (concurrency cap).")
+@click.option("--restart", is_flag=True,
+              help="Ignore today's checkpoint and start from the first user.")
+def analytics_precompute(chunk_size, workers, restart):
+    """Warm analytics_cache for all users (run nightly, e.g. from cron)."""
+    from datetime import date
+    from analytics import precompute
+
+    done, seconds = precompute.run(date.today(), chunk_size=chunk_size,
+                                   workers=max(1, workers),
+                                   resume=not restart, echo=click.echo)
+    click.echo(f"Precomputed {done} user(s) in {seconds:.1f}s "
+               f"({done / max(seconds, 1e-9):.1f} users/s).")
+
+
+@analytics_cli.command("anomalies-rebuild")
+@click.option("--user", "user_id", type=int, default=None,
+              help="Rebuild a single user (default: everyone).")
+@click.option("--days", default=30, show_default=True,
+              help="Re-score expenses entered in the last N days (0 = none).")
+def analytics_anomalies_rebuild(user_id, days):
+    """Recompute per-category statistics, then re-score recent expenses inline."""
+    from models.anomaly import Anomaly, CategoryStats
+    from services import anomalies
+
+    CategoryStats.rebuild(user_id)
+    pending = Anomaly.unscored(user_id, days) if days else []
+    flagged = 0
+    for uid, expense_id in pending:
+        flagged += anomalies.score(uid, [expense_id])
+    click.echo(f"Statistics rebuilt; scored {len(pending)} expense(s), {flagged} flagged.")
+
+
+@analytics_cli.command("anomalies-prune")
+def analytics_anomalies_prune():
+    """Drop anomaly flags older than ANOMALY_KEEP_DAYS."""
+    from models.anomaly import Anomaly
+
+    removed = Anomaly.prune(current_app.config["ANOMALY_KEEP_DAYS"])
+    click.echo(f"Removed {removed} flag(s).")
+
+
+@analytics_cli.command("platform")
+@click.option("--month", default=None, help="YYYY-MM for category spend (default: this month).")
+@click.option("--verify", is_flag=True,
+              help="Also count active users and per-user spend exactly, and compare.")
+def analytics_platform(month, verify):
+    """Platform-wide numbers behind /admin/analytics, sketches against exact counts."""
+    from datetime import date, timedelta
+    from analytics import platform
+    from models.metrics import month_key
+
+    today = date.today()
+    month = month or month_key(today)
+    t0 = time.perf_counter()
+    activity = platform.activity(today)
+    spend    = platform.category_spend(month)
+    took_ms  = (time.perf_counter() - t0) * 1000
+    click.echo(f"active users: today {activity['days'][-1]['users']}, "
+               f"7 days {activity['week']}, {len(activity['days'])} days {activity['month']}")
+    click.echo(f"{month}: {spend['total']} from {spend['users']} user(s); per user "
+               + ", ".join(f"{k} {v}" for k, v in spend["per_user"].items()))
+    click.echo(f"computed from sketches in {took_ms:.0f} ms")
+    if not verify:
+        return
+
+    def distinct(start):
+        # Exact, and only additive because every user lives on one shard
+        return sum(r["users"] for r in scatter(
+            """SELECT COUNT(DISTINCT user_id) AS users FROM expense_daily
+               WHERE day BETWEEN %s AND %s""", (start, today)))
+
+    t0 = time.perf_counter()
+    exact = {"today": distinct(today),
+             "week":  distinct(today - timedelta(days=6)),
+             "month": distinct(today - timedelta(days=len(activity["days"]) - 1))}
+    totals = sorted(Money.of(r["spent"]) for r in scatter(
+        """SELECT SUM(total) AS spent FROM expense_rollups
+           WHERE month = %s GROUP BY user_id HAVING spent > 0""", (month,)))
+    took_ms = (time.perf_counter() - t0) * 1000
+    estimates = {"today": activity["days"][-1]["users"],
+                 "week": activity["week"], "month": activity["month"]}
+    for name, n in exact.items():
+        err = (estimates[name] - n) / n * 100 if n else 0.0
+        click.echo(f"  active {name:<5} sketch {estimates[name]:>9}  exact {n:>9}  {err:+.2f}%")
+    for key, value in spend["per_user"].items():
+        if totals:
+            true = totals[int(int(key[1:]) / 100 * (len(totals) - 1))]
+            err  = float((value - true).percent_of(true, 2))
+            click.echo(f"  per-user {key:<4} sketch {value}  exact {true}  {err:+.2f}%")
+    click.echo(f"exact counts took {took_ms:.0f} ms")
+
+
+@auth_cli.command("signup-load")
+@click.option("--signups", default=200, show_default=True,
+              help="Signup attempts (half reuse an earlier username or email).")
+@click.option("--clients", default=16, show_default=True,
+              help="Concurrent signups.")
+def auth_signup_load(signups, clients):
+    """
+    Concurrent-signup load test against the configured database (use a
+    scratch DB). Checks that duplicates surface as DuplicateUserError and
+    that the unique keys hold; test users are removed afterwards.
+    """
+    import uuid
+    from concurrent.futures import ThreadPoolExecutor
+    from models.user import DuplicateUserError
+
+    app    = current_app._get_current_object()
+    prefix = "load_" + uuid.uuid4().hex[:8]
+    names  = [f"{prefix}_{i // 2}" for i in range(signups)]   # every name twice
+
+    def signup(i):
+        with app.app_context():
+            try:
+                User.create(names[i], f"{names[i]}@example.test", "x" * 60)
+                return "created"
+            except DuplicateUserError as e:
+                return "dup_" + e.field
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        outcomes = list(pool.map(signup, range(signups)))
+    elapsed = time.perf_counter() - t0
+
+    created = outcomes.count("created")
+    expected = len(set(names))
+    click.echo(f"{signups} signups in {elapsed:.2f}s ({signups / elapsed:.0f}/s): "
+               f"{created} created, {outcomes.count('dup_username')} duplicate "
+               f"username, {outcomes.count('dup_email')} duplicate email")
+    removed = User.delete_where_username_like(prefix + "_%")
+    click.echo(f"Cleaned up {removed} test user(s).")
+    if created != expected:
+        click.echo(f"FAIL: expected {expected} distinct users, created {created}")
+        raise SystemExit(1)
+
+
+@expenses_cli.command("archive")
+@click.option("--years", default=2, show_default=True, type=click.IntRange(min=1),
+              help="Archive expenses dated more than this many years ago.")
+@click.option("--batch", default=5000, show_default=True, type=click.IntRange(min=1),
+              help="Rows moved per transaction.")
+def expenses_archive(years, batch):
+    """Move old expenses into the compressed expenses_archive table."""
+    from datetime import date
+    from models.archive import Archive, CUTOFF_TTL
+
+    today  = date.today()
+    cutoff = today.replace(year=today.year - years, day=1).isoformat()
+
+    # Publish first and wait out every worker's cached cutoff, so no reader
+    # can miss rows that are about to leave the hot table.
+    Archive.publish_cutoff(cutoff)
+    click.echo(f"Cutoff {cutoff} published; waiting {CUTOFF_TTL + 1}s for workers...")
+    time.sleep(CUTOFF_TTL + 1)
+
+    moved, t0 = 0, time.perf_counter()
+    for shard in all_shards():
+        last_id = 0
+        while True:
+            last_id, n = Archive.move_batch(cutoff, last_id, batch, shard)
+            if last_id is None:
+                break
+            moved += n
+            click.echo(f"  {'' if shard is None else f'shard {shard} '}"
+                       f"up to id {last_id}: {moved} row(s) moved")
+    click.echo(f"Archived {moved} row(s) dated before {cutoff} in "
+               f"{time.perf_counter() - t0:.1f}s.")
+
+
+@expenses_cli.command("snapshot")
+@click.argument("path", type=click.Path(dir_okay=True, writable=True))
+@click.option("--user", "user_id", type=int, default=None,
+              help="Export a single user (default: everyone, shard by shard).")
+@click.option("--format", "fmt", type=click.Choice(["arrow", "npy"]), default=None,
+              help="Default: arrow when pyarrow is installed, else npy.")
+@click.option("--batch", default=50_000, show_default=True, type=click.IntRange(min=1),
+              help="Rows fetched and written at a time.")
+def expenses_snapshot(path, user_id, fmt, batch):
+    """Write expenses (archive included) as a memory-mappable columnar snapshot."""
+    from itertools import chain
+    from analytics import snapshot
+
+    if user_id is not None:
+        batches = Expense.stream_snapshot(user_id, batch=batch)
+    else:
+        batches = chain.from_iterable(Expense.stream_snapshot(shard=shard, batch=batch)
+                                      for shard in all_shards())
+    t0 = time.perf_counter()
+    try:
+        fmt, rows = snapshot.write(path, batches, Expense.get_all_categories(), fmt,
+                                   scope="all" if user_id is None else f"user {user_id}")
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"Wrote {rows} row(s) to {path} ({fmt}) in {time.perf_counter() - t0:.1f}s.")
+
+
+@expenses_cli.command("verify-money")
+@click.option("--rows", default=10_000_000, show_default=True,
+              help="Random amounts to generate in a temporary table.")
+@click.option("--batch", default=50_000, show_default=True)
+@click.option("--seed", default=42, show_default=True)
+def expenses_verify_money(rows, batch, seed):
+    """
+    Check integer-paise totals against SQL SUM over `rows` random DECIMAL(10,2)
+    amounts (a TEMPORARY table on the primary; nothing persists). Also times
+    each way of totalling the fetched column in Python. Exit 1 on a mismatch.
+    """
+    import numpy as np
+    from decimal import Decimal
+    from models.money import paise_array, sql_paise, sum_paise
+
+    rng = np.random.default_rng(seed)
+    cur = get_cursor()
+    cur.execute("""CREATE TEMPORARY TABLE money_check (
+                       id     INT AUTO_INCREMENT PRIMARY KEY,
+                       amount DECIMAL(10,2) NOT NULL
+                   )""")
+    generated = 0
+    t0 = time.perf_counter()
+    for start in range(0, rows, batch):
+        paise = rng.integers(1, 99_999_999, size=min(batch, rows - start), dtype=np.int64)
+        generated += int(paise.sum())
+        cur.executemany("INSERT INTO money_check (amount) VALUES (%s)",
+                        [(f"{p // 100}.{p % 100:02d}",) for p in paise.tolist()])
+    cur.execute("SELECT SUM(amount) AS total FROM money_check")
+    sql_total = cur.fetchone()["total"]
+    click.echo(f"{rows} row(s) loaded in {time.perf_counter() - t0:.0f}s; "
+               f"SQL SUM = {sql_total}")
+
+    timings = {"float": 0.0, "Decimal": 0.0, "Money (to_paise + int64)": 0.0,
+               "int64 (paise from SQL)": 0.0}
+    totals  = {"float": 0.0, "Decimal": Decimal(0), "Money (to_paise + int64)": 0,
+               "int64 (paise from SQL)": 0}
+    cur.execute(f"SELECT amount, {sql_paise('amount')} AS paise FROM money_check")
+    while True:
+        chunk = cur.fetchmany(batch)
+        if not chunk:
+            break
+        amounts = [r["amount"] for r in chunk]
+        paise   = [r["paise"] for r in chunk]
+        for name, fold in (
+            ("float",                    lambda: sum(float(a) for a in amounts)),
+            ("Decimal",                  lambda: sum(amounts, Decimal(0))),
+            ("Money (to_paise + int64)", lambda: sum_paise(paise_array(amounts)).paise),
+            ("int64 (paise from SQL)",   lambda: int(np.fromiter(paise, np.int64, len(paise)).sum())),
+        ):
+            t1 = time.perf_counter()
+            totals[name] += fold()
+            timings[name] += time.perf_counter() - t1
+    cur.execute("DROP TEMPORARY TABLE money_check")
+    cur.close()
+
+    expected   = Money(generated)
+    mismatches = int(Money.of(sql_total) != expected)
+    click.echo(f"generated total {expected}: SQL SUM "
+               f"{'matches' if not mismatches else 'DIFFERS'}")
+    for name, total in totals.items():
+        if name == "float":             # the old code path: drift is reported, not failed
+            drift  = total - float(expected)
+            status = "exact" if drift == 0 else f"drifts by {drift:+.6f}"
+        else:
+            got    = Money.of(total) if name == "Decimal" else Money(total)
+            status = "exact" if got == expected else f"MISMATCH: {got}"
+            mismatches += got != expected
+        click.echo(f"{name:<26} {timings[name] * 1000:9.0f} ms  {status}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+@db_cli.command("upgrade")
+@click.option("--to", "target", type=int, default=None,
+              help="Stop after this migration version (default: latest).")
+def db_upgrade(target):
+    """Apply pending migrations from migrations/."""
+    import migrations
+
+    for shard in all_databases():
+        if shard is not None:
+            click.echo(f"shard {shard}:")
+        count = migrations.upgrade(target, echo=click.echo, shard=shard)
+        click.echo(f"{count} migration(s) applied.")
+
+
+@db_cli.command("status")
+def db_status():
+    """List migrations and whether each is applied, pending or modified."""
+    import migrations
+
+    rows = []
+    for shard in all_databases():
+        where = "directory" if shard is None else f"shard {shard}"
+        for m, state, applied_at in migrations.status(shard):
+            rows.append(state)
+            click.echo(f"{where:<10} {m.version:04d}  {state:<8}  "
+                       f"{applied_at or '':<19}  {m.name}")
+    if "modified" in rows:
+        click.echo("WARNING: applied migration files have been edited since.")
+        raise SystemExit(1)
+
+
+@db_cli.command("replicas")
+def db_replicas():
+    """Health and lag of every configured read replica."""
+    import db
+
+    status = db.replica_status(refresh=True)
+    if not status:
+        click.echo("No MYSQL_REPLICAS configured; all reads use the primary.")
+        return
+    for addr, st in status.items():
+        lag = "unreachable/not replicating" if st["lag"] is None else f"{st['lag']:.0f}s behind"
+        click.echo(f"{'ok  ' if st['ok'] else 'DOWN'}  {addr:<25} {lag}")
+
+
+# Sample arguments for model read methods, by parameter name
+def _explain_samples(user_id):
+    from datetime import date
+
+    today = date.today()
+    cur   = get_cursor(user_id=user_id)
+    cur.execute("SELECT id FROM expenses WHERE user_id = %s LIMIT 1", (user_id,))
+    row   = cur.fetchone()
+    cur.close()
+    month = today.strftime("%Y-%m")
+    return {
+        "user_id":     user_id,
+        "expense_id":  row["id"] if row else 0,
+        "month":       month,
+        "start_month": f"{today.year - 1}-{today.month:02d}",
+        "end_month":   month,
+        "date_from":   today.replace(day=1),
+        "date_to":     today,
+        "day":         today,
+        "today":       today,
+        "run_date":    today,
+        "job":         "precompute",
+        "last_id":     0,
+        "limit":       50,
+        "email":       "nobody@example.com",
+        "username":    "nobody",
+    }
+
+
+def _explain_calls(samples):
+    """(label, thunk) for every model read method, plus get_all variants."""
+    import inspect
+    from models.analytics_cache import AnalyticsCache
+    from models.archive import Archive
+    from models.budget import Budget
+    from models.job_checkpoint import JobCheckpoint
+    from models.recurring import Recurring
+
+    calls, skipped = [], []
+    for cls in (Expense, Budget, Recurring, UserMetrics, User,
+                AnalyticsCache, JobCheckpoint, Archive):
+        for name, fn in vars(cls).items():
+            if not isinstance(fn, staticmethod) or not (
+                    name.startswith("get") or name in ("load", "monthly_totals",
+                                                       "count_after", "cutoff")):
+                continue
+            fn, kwargs = fn.__func__, {}
+            for p in inspect.signature(fn).parameters.values():
+                if p.name in samples:
+                    kwargs[p.name] = samples[p.name]
+                elif p.default is inspect.Parameter.empty:
+                    skipped.append(f"{cls.__name__}.{name}")
+                    break
+            else:
+                calls.append((f"{cls.__name__}.{name}",
+                              lambda fn=fn, kwargs=kwargs: fn(**kwargs)))
+
+    uid = samples["user_id"]
+    for sort in ("date_desc", "amount_desc"):
+        calls.append((f"Expense.get_all(sort={sort})",
+                      lambda sort=sort: Expense.get_all(uid, sort=sort)))
+    calls.append(("Expense.get_all(category, range)",
+                  lambda: Expense.get_all(uid, samples["date_from"], samples["date_to"],
+                                          category_id=1)))
+    calls.append(("Expense.get_all(search)",
+                  lambda: Expense.get_all(uid, samples["date_from"], search="a")))
+    calls.append(("Expense.get_daily_totals(by_category)",
+                  lambda: Expense.get_daily_totals(uid, samples["date_from"],
+                                                   samples["date_to"], by_category=True)))
+    return calls, skipped
+
+
+def _plan_problems(plan):
+    """Tables in an EXPLAIN plan that are not read from an index alone."""
+    problems = []
+    for row in plan:
+        table = row.get("table")
+        if not table or table.startswith("<"):
+            continue                          # derived / union result rows
+        extra  = [e.strip() for e in (row.get("Extra") or "").split(";")]
+        access = row.get("type")
+        if row.get("key") == "PRIMARY" and access in ("const", "eq_ref", "ref", "range"):
+            continue                          # clustered index holds the row
+        if "Using index" in extra:
+            continue
+        if access in (None, "system") and not row.get("key"):
+            continue                          # no table access at all
+        reason = "full scan" if access == "ALL" else f"row lookups via {row.get('key')}"
+        if "Using filesort" in extra:
+            reason += ", filesort"
+        problems.append(f"{table}: {reason}")
+    return problems
+
+
+@db_cli.command("explain")
+@click.option("--user", "user_id", type=int, default=None,
+              help="User whose data drives the queries (default: most expenses).")
+def db_explain(user_id):
+    """EXPLAIN every model read query and report those that are not index-only."""
+    if user_id is None:
+        rows = scatter("""SELECT user_id, SUM(cnt) AS cnt FROM expense_rollups
+                          GROUP BY user_id ORDER BY cnt DESC LIMIT 1""")
+        if not rows:
+            click.echo("No expenses to explain against.")
+            return
+        user_id = max(rows, key=lambda r: r["cnt"])["user_id"]
+
+    calls, skipped = _explain_calls(_explain_samples(user_id))
+    seen, flagged = set(), 0
+    for label, thunk in calls:
+        g.sql_trace = []
+        try:
+            thunk()
+        finally:
+            trace, g.sql_trace = g.sql_trace, None
+        for sql, params, conn in trace:
+            if not sql.lstrip().upper().startswith("SELECT") or sql in seen:
+                continue
+            seen.add(sql)
+            cur = conn.cursor(dictionary=True)      # same database (shard) as the query
+            cur.execute("EXPLAIN " + sql, params)
+            problems = _plan_problems(cur.fetchall())
+            cur.close()
+            flagged += bool(problems)
+            click.echo(f"{'MISS' if problems else 'ok  '}  {label}"
+                       + (f"  [{'; '.join(problems)}]" if problems else ""))
+    for label in skipped:
+        click.echo(f"skip  {label} (no sample arguments)")
+    click.echo(f"{len(seen)} distinct queries, {flagged} not index-only.")
+
+
+@shards_cli.command("status")
+def shards_status():
+    """Configured shards and how many users live on each."""
+    from models.shards import Shards
+
+    if not current_app.config["SHARD_MAP"]:
+        click.echo("SHARD_MAP is empty: one database, no sharding.")
+        return
+    counts = Shards.counts()
+    for shard in all_shards():
+        host, port, database = current_app.config["SHARD_MAP"][shard]
+        click.echo(f"shard {shard}: {host}:{port}/{database}  "
+                   f"{counts.get(shard, 0)} user(s)")
+
+
+@shards_cli.command("init")
+@click.option("--shard", type=int, required=True, help="Shard id from SHARD_MAP.")
+def shards_init(shard):
+    """Load the schema into a new (empty, already created) shard database."""
+    import os
+    import migrations
+    from models.shards import Shards
+
+    if shard not in current_app.config["SHARD_MAP"]:
+        raise click.BadParameter(f"shard {shard} is not in SHARD_MAP")
+    path = os.path.join(current_app.root_path, "schema.sql")
+    with open(path, encoding="utf-8") as f:
+        Shards.init_shard(shard, f.read())
+    count = migrations.upgrade(echo=click.echo, shard=shard)
+    click.echo(f"Shard {shard} ready ({count} migration(s) applied).")
+
+
+@shards_cli.command("move")
+@click.option("--user", "user_ids", type=int, multiple=True, required=True,
+              help="User to move (repeatable).")
+@click.option("--to", "target", type=int, required=True, help="Destination shard.")
+def shards_move(user_ids, target):
+    """Move users' rows to another shard while the app stays online."""
+    from models.shards import Shards
+
+    if target not in current_app.config["SHARD_MAP"]:
+        raise click.BadParameter(f"shard {target} is not in SHARD_MAP")
+    for uid in user_ids:
+        t0 = time.perf_counter()
+        copied = Shards.move_user(uid, target)
+        detail = ", ".join(f"{t}={n}" for t, n in copied.items()) or "already there"
+        click.echo(f"user {uid} -> shard {target}: {detail} "
+                   f"({time.perf_counter() - t0:.1f}s)")
+
+
+@api_cli.command("token")
+@click.option("--user", "user_id", type=int, required=True, help="Token owner.")
+@click.option("--name", default="cli", show_default=True, help="Label to tell tokens apart.")
+def api_token(user_id, name):
+    """Issue a bearer token for /api/v1 (printed once, stored hashed)."""
+    from models.api_token import ApiToken
+
+    if User.get_by_id(user_id) is None:
+        raise click.BadParameter(f"no user {user_id}")
+    token_id, token = ApiToken.create(user_id, name)
+    click.echo(f"Token {token_id} ({name}) for user {user_id}:")
+    click.echo(token)
+
+
+@api_cli.command("tokens")
+@click.option("--user", "user_id", type=int, required=True)
+@click.option("--revoke", "revoke_id", type=int, default=None, help="Token id to revoke.")
+def api_tokens(user_id, revoke_id):
+    """List a user's API tokens, or revoke one."""
+    from models.api_token import ApiToken
+
+    if revoke_id is not None:
+        revoked = ApiToken.revoke(revoke_id, user_id)
+        click.echo(f"Token {revoke_id} {'revoked' if revoked else 'not found'}.")
+        return
+    for t in ApiToken.get_for_user(user_id):
+        click.echo(f"{t['id']:>5}  {t['name']:<20} created {t['created_at']}")
+
+
+@api_cli.command("prune")
+def api_prune():
+    """Drop expired idempotency keys and sync tombstones past the horizon."""
+    from models.idempotency import Idempotency
+    from models.sync import Sync
+
+    cfg  = current_app.config
+    keys = Idempotency.prune(cfg["IDEMPOTENCY_TTL_HOURS"])
+    tomb = Sync.prune(cfg["SYNC_TOMBSTONE_DAYS"])
+    click.echo(f"Removed {keys} idempotency key(s) and {tomb} tombstone(s).")
+
+
+@notify_cli.command("deliver")
+@click.option("--batch", default=100, show_default=True, type=click.IntRange(min=1),
+              help="Entries claimed per database per round.")
+@click.option("--loop", "interval", type=float, default=None,
+              help="Keep running, polling every N seconds (default: one pass).")
+def notify_deliver(batch, interval):
+    """Send pending outbox entries (NOTIFY_CHANNELS)."""
+    from services import outbox
+
+    while True:
+        sent, failed = outbox.deliver(batch)
+        if sent or failed or interval is None:
+            click.echo(f"Sent {sent}, failed {failed}.")
+        if interval is None:
+            break
+        if sent < batch:
+            time.sleep(interval)
+
+
+@notify_cli.command("prune")
+def notify_prune():
+    """Drop read notifications older than NOTIFY_KEEP_DAYS."""
+    from models.notification import Notification
+
+    removed = Notification.prune(current_app.config["NOTIFY_KEEP_DAYS"])
+    click.echo(f"Removed {removed} notification(s).")
+
+
+@recurring_cli.command("materialize")
+@click.option("--batch", default=1000, show_default=True, type=click.IntRange(min=1),
+              help="Due rules read per query.")
+@click.option("--loop", "interval", type=float, default=None,
+              help="Keep running, checking every N seconds (default: one pass).")
+def recurring_materialize(batch, interval):
+    """Insert every recurring expense that has fallen due, for all users."""
+    from models.recurring import Recurring
+
+    while True:
+        t0 = time.perf_counter()
+        rules, inserted = Recurring.materialize_due(batch)
+        if rules or interval is None:
+            click.echo(f"{rules} due rule(s), {inserted} expense(s) inserted "
+                       f"in {time.perf_counter() - t0:.1f}s.")
+        if interval is None:
+            break
+        time.sleep(interval)
+
+
+def register_commands(app):
+    """Attach all CLI groups to the app."""
+    app.cli.add_command(metrics_cli)
+    app.cli.add_command(forecast_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(auth_cli)
+    app.cli.add_command(expenses_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(shards_cli)
+    app.cli.add_command(api_cli)
+    app.cli.add_command(notify_cli)
+    app.cli.add_command(recurring_cli)
@@ -12,6 +12,17 @@ from dotenv import load_dotenv
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
 
+def _parse_shard_map(raw):
+    """'0=host:port/db,1=host:port/db' -> {0: (host, port, db), 1: ...}."""
+    shards = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        index, _, target = part.partition("=")
+        addr, _, database = target.partition("/")
+        host, _, port = addr.partition(":")
+        shards[int(index)] = (host, int(port or 3306), database)
+    return shards
+
+
 class Config:
     # ── Security ─────────────────────────────────────────────────
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-in-production")
@@ -23,6 +34,101 @@ class Config:
     MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "")
     MYSQL_DB       = os.environ.get("MYSQL_DB",       "smart_expense_tracker")
 
+    # ── Read replicas ─────────────────────────────────────────────
+    # Comma-separated host:port list; empty = every query on MYSQL_HOST.
+    MYSQL_REPLICAS = [h.strip() for h in os.environ.get("MYSQL_REPLICAS", "").split(",")
+                      if h.strip()]
+    REPLICA_MAX_LAG         = float(os.environ.get("REPLICA_MAX_LAG", 5))      # seconds
+    REPLICA_HEALTH_TTL      = float(os.environ.get("REPLICA_HEALTH_TTL", 10))  # seconds
+    REPLICA_CONNECT_TIMEOUT = int(os.environ.get("REPLICA_CONNECT_TIMEOUT", 2))
+    # Off = skip SHOW REPLICA STATUS (e.g. a plain second server as a stand-in)
+    REPLICA_LAG_CHECK       = os.environ.get("REPLICA_LAG_CHECK", "1") == "1"
+
+    # ── Shards ────────────────────────────────────────────────────
+    # Per-user data lives on SHARD_MAP databases ('0=host:port/db,1=...');
+    # empty = one database. The MYSQL_* database stays the directory (users,
+    # categories, app state) and may double as one of the shards.
+    SHARD_MAP        = _parse_shard_map(os.environ.get("SHARD_MAP", ""))
+    SHARD_MOVE_GRACE = float(os.environ.get("SHARD_MOVE_GRACE", 5))   # seconds
+
+    # ── Write batching ───────────────────────────────────────────
+    # >0: coalesce small expense writes from concurrent requests for up to
+    # this many ms and commit them together (services/groupcommit.py).
+    GROUP_COMMIT_MS      = float(os.environ.get("GROUP_COMMIT_MS", 0))
+    GROUP_COMMIT_MAX     = int(os.environ.get("GROUP_COMMIT_MAX", 64))
+    GROUP_COMMIT_TIMEOUT = float(os.environ.get("GROUP_COMMIT_TIMEOUT", 10))   # seconds
+    EXPENSE_BATCH_MAX    = int(os.environ.get("EXPENSE_BATCH_MAX", 500))
+    EXPENSE_PAGE_SIZE    = int(os.environ.get("EXPENSE_PAGE_SIZE", 100))    # rows per list page
+
+    # ── Rate limiting / admission control (services/ratelimit.py) ──
+    RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "1") == "1"
+    # "memory": buckets per worker; a file path: one SQLite file shared by
+    # every worker on the host.
+    RATELIMIT_STORAGE = os.environ.get("RATELIMIT_STORAGE", "memory")
+    RATELIMIT_RULES   = {                 # class: (requests per minute, burst)
+        "auth":      (10, 5),             # login / register POSTs, per IP
+        "export":    (6, 3),
+        "analytics": (60, 20),
+        "api":       (300, 60),
+        "default":   (600, 120),
+    }
+    RATELIMIT_IP      = (1200, 300)       # per IP, all classes together
+    RATELIMIT_CONCURRENCY  = {"export": int(os.environ.get("EXPORT_CONCURRENCY", 2))}   # per worker
+    ADMISSION_MAX_INFLIGHT = int(os.environ.get("ADMISSION_MAX_INFLIGHT", 0))   # 0 = off
+
+    # ── Password hashing (bcrypt) ───────────────────────────────
+    # Raising the cost re-hashes each user's password on their next login.
+    BCRYPT_LOG_ROUNDS   = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    HASH_POOL_WORKERS   = int(os.environ.get("HASH_POOL_WORKERS", 0))   # 0 = CPU count
+    HASH_POOL_MAX_QUEUE = int(os.environ.get("HASH_POOL_MAX_QUEUE", 32))
+    HASH_TIMEOUT        = float(os.environ.get("HASH_TIMEOUT", 10))     # seconds
+
+    # ── JSON responses ────────────────────────────────────────────
+    JSON_COMPRESS_MIN_BYTES = int(os.environ.get("JSON_COMPRESS_MIN_BYTES", 1024))
+
+    # ── JSON API (/api/v1) ────────────────────────────────────────
+    IDEMPOTENCY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", 24))
+    # ?since= replies hand back a cursor this many seconds behind the
+    # database clock, so writes still committing at read time are not skipped.
+    SYNC_OVERLAP          = int(os.environ.get("SYNC_OVERLAP", 5))
+    SYNC_TOMBSTONE_DAYS   = int(os.environ.get("SYNC_TOMBSTONE_DAYS", 90))
+    SYNC_PAGE             = int(os.environ.get("SYNC_PAGE", 500))   # change-log entries per reply
+
+    # ── Rendered fragment cache (services/fragments.py) ──────────
+    FRAGMENT_CACHE    = os.environ.get("FRAGMENT_CACHE", "1") == "1"
+    FRAGMENT_CACHE_MB = float(os.environ.get("FRAGMENT_CACHE_MB", 32))    # per worker
+
+    # ── Spending anomalies (models/anomaly.py, services/anomalies.py) ──
+    ANOMALY_ENABLED     = os.environ.get("ANOMALY_ENABLED", "1") == "1"
+    ANOMALY_Z           = float(os.environ.get("ANOMALY_Z", 3.0))        # std devs above the category
+    ANOMALY_MIN_SAMPLES = int(os.environ.get("ANOMALY_MIN_SAMPLES", 8))  # before amounts are judged
+    ANOMALY_DUP_DAYS    = int(os.environ.get("ANOMALY_DUP_DAYS", 1))
+    ANOMALY_QUEUE_MAX   = int(os.environ.get("ANOMALY_QUEUE_MAX", 10000))   # per worker
+    ANOMALY_KEEP_DAYS   = int(os.environ.get("ANOMALY_KEEP_DAYS", 90))
+
+    # ── Category suggestions (services/categorizer.py) ───────────
+    CATEGORIZER_ENABLED        = os.environ.get("CATEGORIZER_ENABLED", "1") == "1"
+    CATEGORIZER_USERS          = int(os.environ.get("CATEGORIZER_USERS", 1000))   # per worker
+    CATEGORIZER_TTL            = float(os.environ.get("CATEGORIZER_TTL", 900))    # seconds
+    CATEGORIZER_TRAIN_ROWS     = int(os.environ.get("CATEGORIZER_TRAIN_ROWS", 5000))
+    CATEGORIZER_GLOBAL_ROWS    = int(os.environ.get("CATEGORIZER_GLOBAL_ROWS", 50000))
+    CATEGORIZER_MIN_EXAMPLES   = int(os.environ.get("CATEGORIZER_MIN_EXAMPLES", 20))
+    CATEGORIZER_MIN_CONFIDENCE = float(os.environ.get("CATEGORIZER_MIN_CONFIDENCE", 0.6))
+
+    # ── Admin platform analytics (analytics/platform.py) ─────────
+    PLATFORM_STATS_TTL = float(os.environ.get("PLATFORM_STATS_TTL", 300))   # seconds, per worker
+
+    # ── Notifications (models/notification.py, services/outbox.py) ──
+    # Channels beyond the in-app list, e.g. "email,webhook"; empty = in-app only
+    NOTIFY_CHANNELS    = [c.strip() for c in os.environ.get("NOTIFY_CHANNELS", "").split(",")
+                          if c.strip()]
+    NOTIFY_WEBHOOK_URL = os.environ.get("NOTIFY_WEBHOOK_URL", "")
+    NOTIFY_TIMEOUT     = float(os.environ.get("NOTIFY_TIMEOUT", 10))      # seconds
+    NOTIFY_KEEP_DAYS   = int(os.environ.get("NOTIFY_KEEP_DAYS", 90))      # read ones
+    SMTP_HOST          = os.environ.get("SMTP_HOST", "localhost")
+    SMTP_PORT          = int(os.environ.get("SMTP_PORT", 25))
+    SMTP_FROM          = os.environ.get("SMTP_FROM", "ExpenseIQ <noreply@localhost>")
+
     # ── CSRF (Flask-WTF) ─────────────────────────────────────────
     WTF_CSRF_ENABLED    = True
     WTF_CSRF_TIME_LIMIT = 3600  # 1 hour
@@ -36,11 +142,13 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG                = True
     SESSION_COOKIE_SECURE = False   # HTTP is fine locally
+    BCRYPT_LOG_ROUNDS    = int(os.environ.get("BCRYPT_LOG_ROUNDS", 10))
 
 
 class ProductionConfig(Config):
     DEBUG                = False
     SESSION_COOKIE_SECURE = True    # HTTPS required in production
+    RATELIMIT_STORAGE    = os.environ.get("RATELIMIT_STORAGE", "/tmp/expenseiq-ratelimit.sqlite")
 
 
 config_map = {
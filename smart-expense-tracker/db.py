@@ -3,41 +3,506 @@ db.py — MySQL connection helper
 Uses Flask's g object to maintain one connection per request.
 mysql-connector-python is used as the driver (pure Python, no system libs needed).
 Cursor returns dictionaries so columns are accessed by name just like sqlite3.Row.
+
+The driver is imported on first connect (it pulls in ~100 ms of dnspython and
+friends), and connections only ever exist inside a request or CLI context, so
+the app can be preloaded in a gunicorn master and forked safely.
+
+Read/write splitting: get_cursor(readonly=True) may be served by one of the
+MYSQL_REPLICAS. A replica is used only while it is healthy and its lag is
+below REPLICA_MAX_LAG, and for a user's rows only once it has that user's
+latest sync seq (the per-user write counter every expense, budget and
+recurring write bumps), so a user always reads their own writes, however
+they connect; everything else (and every read after a write in the same
+request) goes to the primary.
+
+Units of work: inside `with transaction():` model commits are deferred and
+every connection used is committed once when the block ends.
+
+Sharding: with SHARD_MAP set, get_cursor(user_id=...) goes to the shard that
+holds that user's rows (the user_shards directory table, default shard 0);
+cross-user reads use scatter(). Shard connections use an auto-increment
+stride so row ids stay unique across shards and users can be moved. While a
+user is being moved, their cursors still read but raise ShardMoving on the
+first write.
 """
 
-import mysql.connector
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 from flask import current_app, g
 
+from services import counters
 
-def get_db():
-    """Return the per-request MySQL connection, creating it if needed."""
-    if "db" not in g:
-        cfg = current_app.config
-        g.db = mysql.connector.connect(
-            host=cfg["MYSQL_HOST"],
-            port=cfg["MYSQL_PORT"],
+_opened   = 0    # connections opened by this process (checked before fork)
+_replicas = {}   # "host:port" -> {"ok": bool, "lag": seconds, "at": monotonic}
+
+
+class DatabaseBusy(Exception):
+    """MySQL refused a connection (too many connections); shed the request."""
+
+
+def driver():
+    """The mysql.connector module, imported lazily."""
+    import mysql.connector
+    return mysql.connector
+
+
+def connections_opened():
+    return _opened
+
+
+def reset_after_fork():
+    """Called in each freshly forked worker: forget the parent's bookkeeping."""
+    global _opened
+    _opened = 0
+    _replicas.clear()
+
+
+def _connect(host, port, database=None, **extra):
+    global _opened
+    cfg = current_app.config
+    _opened += 1
+    try:
+        return driver().connect(
+            host=host,
+            port=port,
             user=cfg["MYSQL_USER"],
             password=cfg["MYSQL_PASSWORD"],
-            database=cfg["MYSQL_DB"],
+            database=database or cfg["MYSQL_DB"],
             charset="utf8mb4",
             use_unicode=True,
             autocommit=False,          # explicit commits for safety
+            **extra,
         )
+    except driver().Error as e:
+        if e.errno in (driver().errorcode.ER_CON_COUNT_ERROR,
+                       driver().errorcode.ER_TOO_MANY_USER_CONNECTIONS):
+            counters.incr("db_busy")
+            raise DatabaseBusy() from e
+        raise
+
+
+def get_db():
+    """Return the per-request MySQL connection, creating it if needed."""
+    if "db" not in g:
+        cfg = current_app.config
+        g.db = _connect(cfg["MYSQL_HOST"], cfg["MYSQL_PORT"])
+        shard = _directory_shard()
+        if shard is not None:
+            _set_id_stride(g.db, shard)
     return g.db
 
 
-def get_cursor(dictionary=True):
+def commit(cur):
+    """
+    Commit the cursor's transaction (deferred to the end of the enclosing
+    transaction() block, if any) and pin this request's reads to the primary.
+    """
+    if not g.get("uow_depth"):
+        _commit(cur._connection)
+    note_write()
+
+
+def _commit(conn):
+    conn.commit()
+    counters.incr("db_commits")
+
+
+def note_write():
+    """
+    Record that this request wrote: its later reads must see the primary's
+    data. Later requests find out from the user's sync seq (_caught_up).
+    """
+    pin_primary()
+
+
+def after_commit(fn):
+    """
+    Run fn() once the caller's write is durable: at the end of the enclosing
+    transaction() block (dropped if it rolls back), or right away outside
+    one, where commit() has already run. For hand-offs such as queueing
+    background work, not for further writes.
+    """
+    if g.get("uow_depth"):
+        g.uow_after.append(fn)
+    else:
+        fn()
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work. Model writes inside the block share one transaction per
+    connection: their commit() calls are deferred and the outermost block
+    commits every connection it touched once, or rolls them all back if the
+    block raises. Nestable. Spanning several shards is not atomic (each
+    shard commits in turn), so keep a unit to one user.
+    """
+    depth = g.get("uow_depth", 0)
+    if depth == 0:
+        g.uow_conns = []
+        g.uow_after = []
+    g.uow_depth = depth + 1
+    try:
+        yield
+        if depth == 0:
+            for conn in g.uow_conns:
+                _commit(conn)
+    except BaseException:
+        if depth == 0:
+            for conn in g.uow_conns:
+                conn.rollback()
+        raise
+    finally:
+        g.uow_depth = depth
+        if depth == 0:
+            g.uow_conns = []
+            after, g.uow_after = g.uow_after, []
+    if depth == 0:
+        for fn in after:
+            fn()
+
+
+def pin_primary():
+    """Send the rest of this request's reads to the primary."""
+    g.db_primary = True
+
+
+# ── Read replicas ─────────────────────────────────────────────
+
+def _parse_addr(addr):
+    host, _, port = addr.partition(":")
+    return host, int(port or 3306)
+
+
+def _replica_lag(conn):
+    """Seconds behind the primary, or None if replication is not running."""
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("SHOW REPLICA STATUS")
+    except driver().Error:                  # MySQL < 8.0.22
+        cur.execute("SHOW SLAVE STATUS")
+    row = cur.fetchone()
+    cur.close()
+    if row is None:
+        return None
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+def _check_replica(addr):
+    cfg = current_app.config
+    try:
+        conn = _connect(*_parse_addr(addr),
+                        connection_timeout=cfg["REPLICA_CONNECT_TIMEOUT"])
+        try:
+            lag = _replica_lag(conn) if cfg["REPLICA_LAG_CHECK"] else 0.0
+        finally:
+            conn.close()
+    except driver().Error as e:
+        current_app.logger.warning(f"Replica {addr} unreachable: {e}")
+        lag = None
+    ok = lag is not None and lag <= cfg["REPLICA_MAX_LAG"]
+    _replicas[addr] = {"ok": ok, "lag": lag, "at": time.monotonic()}
+    counters.gauge(f"replica_lag[{addr}]", lag)
+    return _replicas[addr]
+
+
+def replica_status(refresh=False):
+    """{addr: {ok, lag, at}} for every replica, re-checked after REPLICA_HEALTH_TTL."""
+    ttl = current_app.config["REPLICA_HEALTH_TTL"]
+    for addr in current_app.config["MYSQL_REPLICAS"]:
+        state = _replicas.get(addr)
+        if refresh or state is None or time.monotonic() - state["at"] > ttl:
+            _check_replica(addr)
+    return {addr: _replicas[addr] for addr in current_app.config["MYSQL_REPLICAS"]}
+
+
+def _pick_replica():
+    """A healthy replica within REPLICA_MAX_LAG, or None."""
+    usable = [addr for addr, st in replica_status().items() if st["ok"]]
+    return random.choice(usable) if usable else None
+
+
+def _seq(conn, user_id):
+    cur = conn.cursor()
+    cur.execute("SELECT seq FROM sync_seq WHERE user_id = %s", (user_id,))
+    row = cur.fetchone()
+    cur.close()
+    return row[0] if row else 0
+
+
+def _caught_up(replica, user_id):
+    """
+    Whether the replica has applied every write the user had committed when
+    this request started: its sync seq is at least the primary's. Read on
+    the primary first, so a write committing in between cannot slip past.
+    Checked once per user per request.
+    """
+    checked = g.setdefault("db_caught_up", set())
+    if user_id not in checked:
+        primary = _seq(get_db(), user_id)
+        if _seq(replica, user_id) < primary:
+            counters.incr("replica_behind_user")
+            return False
+        checked.add(user_id)
+    return True
+
+
+def get_read_db(user_id=None):
+    """
+    Connection for read-only queries: a replica when safe, else the primary.
+    For a user's rows (user_id given) the replica must also have caught up
+    with that user's writes; if not, the rest of the request reads the primary.
+    """
+    if not current_app.config["MYSQL_REPLICAS"] or g.get("db_primary"):
+        counters.incr("db_reads_primary")
+        return get_db()
+    if "db_read" not in g:
+        g.db_read, addr = None, _pick_replica()
+        if addr is not None:
+            try:
+                g.db_read = _connect(*_parse_addr(addr))
+            except (driver().Error, DatabaseBusy):
+                _replicas[addr]["ok"] = False
+    if g.db_read is not None and user_id is not None and not _caught_up(g.db_read, user_id):
+        g.db_read.close()
+        g.db_read = None
+        pin_primary()
+    if g.db_read is None:
+        counters.incr("db_reads_primary")
+        return get_db()
+    counters.incr("db_reads_replica")
+    return g.db_read
+
+
+def read_from_replica():
+    """True if this request has read from a replica (results may lag)."""
+    return g.get("db_read") is not None
+
+
+# ── Shards ────────────────────────────────────────────────────
+
+DEFAULT_SHARD = 0     # users with no user_shards row (pre-sharding data)
+ID_STRIDE     = 64    # max shards; shard n allocates ids ≡ n + 1 (mod stride)
+
+
+class ShardMoving(Exception):
+    """The user's rows are being moved between shards; retry the write shortly."""
+
+
+def sharded():
+    return bool(current_app.config["SHARD_MAP"])
+
+
+def all_shards():
+    """Shard ids in order, or [None] (the single database) when unsharded."""
+    return sorted(current_app.config["SHARD_MAP"]) or [None]
+
+
+def _directory_shard():
+    """The shard that is the directory database itself, if any."""
+    cfg = current_app.config
+    here = (cfg["MYSQL_HOST"], cfg["MYSQL_PORT"], cfg["MYSQL_DB"])
+    for shard, spec in cfg["SHARD_MAP"].items():
+        if spec == here:
+            return shard
+    return None
+
+
+def all_databases():
+    """None (the directory) followed by every shard that is a separate database."""
+    return [None] + [s for s in sorted(current_app.config["SHARD_MAP"])
+                     if not is_directory(s)]
+
+
+def is_directory(shard):
+    return shard is None or shard == _directory_shard()
+
+
+def _set_id_stride(conn, shard):
+    cur = conn.cursor()
+    cur.execute("SET SESSION auto_increment_increment = %s, auto_increment_offset = %s",
+                (ID_STRIDE, shard + 1))
+    cur.close()
+
+
+def get_shard_db(shard):
+    """Per-request connection to a shard (the directory connection if it is one)."""
+    if is_directory(shard) or not sharded():
+        return get_db()
+    conns = g.setdefault("db_shards", {})
+    if shard not in conns:
+        host, port, database = current_app.config["SHARD_MAP"][shard]
+        conns[shard] = _connect(host, port, database)
+        _set_id_stride(conns[shard], shard)
+    return conns[shard]
+
+
+def shard_for(user_id):
+    """(shard, moving) for a user from the directory, cached for the request."""
+    cache = g.setdefault("shard_of", {})
+    if user_id not in cache:
+        cur = get_db().cursor(dictionary=True)
+        cur.execute("SELECT shard, moving FROM user_shards WHERE user_id = %s",
+                    (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        cache[user_id] = (row["shard"], bool(row["moving"])) if row else (DEFAULT_SHARD, False)
+    return cache[user_id]
+
+
+def group_by_shard(user_ids):
+    """{shard: [user ids]} with one directory query ({None: ids} when unsharded)."""
+    if not sharded():
+        return {None: list(user_ids)}
+    placed = {}
+    if user_ids:
+        cur = get_db().cursor(dictionary=True)
+        cur.execute(
+            f"""SELECT user_id, shard FROM user_shards
+                WHERE user_id IN ({", ".join(["%s"] * len(user_ids))})""",
+            tuple(user_ids)
+        )
+        placed = {r["user_id"]: r["shard"] for r in cur.fetchall()}
+        cur.close()
+    groups = {}
+    for uid in user_ids:
+        groups.setdefault(placed.get(uid, DEFAULT_SHARD), []).append(uid)
+    return groups
+
+
+def scatter(sql, params=()):
+    """
+    Run a read query on every shard in parallel (one thread and connection
+    each) and return all rows, shard by shard.
+    """
+    if not sharded():
+        cur = get_cursor(readonly=True)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    app = current_app._get_current_object()
+
+    def run(shard):
+        with app.app_context():          # own g, so own connection; closed on exit
+            cur = get_cursor(shard=shard)
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            cur.close()
+            return rows
+
+    shards = all_shards()
+    with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="scatter") as pool:
+        return [row for rows in pool.map(run, shards) for row in rows]
+
+
+_READ_ONLY = re.compile(r"^[\s(]*(SELECT|SHOW|EXPLAIN|DESCRIBE)\b", re.IGNORECASE)
+_LOCKING   = re.compile(r"\bFOR\s+(UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b",
+                        re.IGNORECASE)
+
+
+def _writes(operation):
+    """Whether a statement writes or takes row locks (anything but a plain read)."""
+    return not _READ_ONLY.match(operation) or bool(_LOCKING.search(operation))
+
+
+class _MovingCursor:
+    """
+    Cursor proxy for a user whose rows are being moved between shards:
+    plain reads go through, the first write or locking read raises
+    ShardMoving before it reaches the database.
+    """
+
+    def __init__(self, cur, user_id):
+        self._cur     = cur
+        self._user_id = user_id
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        if _writes(operation):
+            raise ShardMoving(self._user_id)
+        return self._cur.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        if _writes(operation):
+            raise ShardMoving(self._user_id)
+        return self._cur.executemany(operation, seq_params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _TracingCursor:
+    """Cursor proxy that records (statement, params, connection) (flask db explain)."""
+
+    def __init__(self, cur, trace):
+        self._cur   = cur
+        self._trace = trace
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        result = self._cur.execute(operation, params, *args, **kwargs)
+        self._trace.append((operation, params, self._cur._connection))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def get_cursor(dictionary=True, readonly=False, user_id=None, shard=None):
     """Return a fresh cursor from the current connection.
     dictionary=True → rows behave like dicts (column access by name).
+    readonly=True   → may be served by a read replica (never write with it).
+    user_id=...     → the shard holding that user's rows (when sharded);
+                      while they are being moved, writes raise ShardMoving.
+    shard=...       → a specific shard (batch jobs walking every shard).
+    Statements are recorded when g.sql_trace is a list.
+    """
+    moving = False
+    if user_id is not None and sharded():
+        shard, moving = shard_for(user_id)
+    if shard is not None and sharded():
+        conn = get_shard_db(shard)
+    else:
+        conn = get_read_db(user_id) if readonly else get_db()
+    if g.get("uow_depth") and not readonly and conn not in g.uow_conns:
+        g.uow_conns.append(conn)
+    cur   = conn.cursor(dictionary=dictionary)
+    if moving and not readonly:
+        cur = _MovingCursor(cur, user_id)
+    trace = g.get("sql_trace")
+    return cur if trace is None else _TracingCursor(cur, trace)
+
+
+def end_snapshot():
+    """
+    Roll back whatever this context has open and forget its cached shard
+    placement. Long-lived contexts (background threads, batch commands)
+    call it between units of work; otherwise REPEATABLE READ keeps them
+    reading the directory and their data as of their first query.
     """
-    return get_db().cursor(dictionary=dictionary)
+    conns = [g.get("db"), g.get("db_read"), *g.get("db_shards", {}).values()]
+    for db in conns:
+        if db is not None and db.is_connected():
+            db.rollback()
+    g.pop("shard_of", None)
+    g.pop("db_caught_up", None)
 
 
 def close_db(e=None):
-    """Close the MySQL connection at the end of the request."""
-    db = g.pop("db", None)
-    if db is not None and db.is_connected():
-        db.close()
+    """Close the MySQL connections at the end of the request."""
+    conns = [g.pop("db", None), g.pop("db_read", None),
+             *g.pop("db_shards", {}).values()]
+    for db in conns:
+        if db is not None and db.is_connected():
+            db.close()
+    g.pop("db_primary", None)
+    g.pop("db_caught_up", None)
 
 
 def init_app(app):
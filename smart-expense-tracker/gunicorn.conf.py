@@ -0,0 +1,43 @@
+"""
+gunicorn.conf.py
+Picked up automatically by `gunicorn wsgi:app`.
+
+preload_app imports the application once in the master; workers are forked
+from it with all modules already loaded, which keeps worker (re)start cheap
+during deploys and autoscaling.
+
+Workers are threaded (gthread), so one worker keeps serving requests while
+others wait on bcrypt (services/hashing.py), a group commit
+(services/groupcommit.py) or MySQL. With sync workers those pools would only
+ever see one request per process.
+"""
+
+import os
+
+bind         = "0.0.0.0:" + os.environ.get("PORT", "8000")
+workers      = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads      = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app  = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from wsgi import warm_imports
+        warm_imports()
+
+
+def pre_fork(server, worker):
+    # A connection opened in the master would be shared by every worker's
+    # socket — refuse to fork rather than corrupt the protocol stream.
+    import db
+    if db.connections_opened():
+        raise RuntimeError("DB connection opened before fork; "
+                           "keep DB access inside requests or CLI commands")
+
+
+def post_fork(server, worker):
+    import db
+    from services import counters
+    db.reset_after_fork()
+    counters.reset()
@@ -0,0 +1,19 @@
+-- Covering indexes for the expense queries in models/ (check with `flask db explain`).
+--
+-- idx_expense_user_date_cover     date-range listing, exports, daily/monthly
+--                                 totals and the current/last-month metrics:
+--                                 every column they read is in the index.
+-- idx_expense_user_category_cover category-filtered listing and per-category
+--                                 budget spend for a month.
+-- idx_expense_user_amount         list sorted by amount (PK id is implicit).
+--
+-- The two original indexes are strict prefixes of the new ones.
+ALTER TABLE expenses
+    ADD INDEX idx_expense_user_date_cover
+        (user_id, date, category_id, amount, description, created_at),
+    ADD INDEX idx_expense_user_category_cover
+        (user_id, category_id, date, amount),
+    ADD INDEX idx_expense_user_amount
+        (user_id, amount),
+    DROP INDEX idx_expense_user_date,
+    DROP INDEX idx_expense_user_category;
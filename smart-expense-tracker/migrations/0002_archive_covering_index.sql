@@ -0,0 +1,5 @@
+-- Same covering index as expenses, for listings that reach into the archive.
+ALTER TABLE expenses_archive
+    ADD INDEX idx_archive_user_date_cover
+        (user_id, date, category_id, amount, description, created_at),
+    DROP INDEX idx_archive_user_date;
@@ -0,0 +1,4 @@
+-- Budget.get_for_month / get_status_for_month filter on (user_id, month);
+-- uq_budget_user_cat_month only helps with the user_id prefix.
+ALTER TABLE budgets
+    ADD INDEX idx_budget_user_month (user_id, month, category_id, amount);
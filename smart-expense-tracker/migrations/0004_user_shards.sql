@@ -0,0 +1,12 @@
+-- Shard directory: which shard holds each user's rows (see db.py and
+-- models/shards.py). Users without a row live on shard 0. Only the
+-- directory database's copy is used.
+CREATE TABLE IF NOT EXISTS user_shards (
+    user_id     INT UNSIGNED      NOT NULL,
+    shard       SMALLINT UNSIGNED NOT NULL,
+    moving      TINYINT(1)        NOT NULL DEFAULT 0,
+    updated_at  DATETIME          NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id),
+    INDEX idx_user_shards_shard (shard),
+    CONSTRAINT fk_user_shard_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,57 @@
+-- JSON API (/api/v1, routes/api.py).
+-- ETags and delta sync are built on updated_at, which recurring items lacked;
+-- every synced table gets a (user_id, updated_at) index for ?since= reads.
+ALTER TABLE recurring_expenses
+    ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP AFTER created_at,
+    ADD INDEX idx_rec_user_updated (user_id, updated_at);
+
+ALTER TABLE expenses
+    ADD INDEX idx_expense_user_updated (user_id, updated_at);
+
+ALTER TABLE expenses_archive
+    ADD INDEX idx_archive_user_updated (user_id, updated_at);
+
+ALTER TABLE budgets
+    ADD INDEX idx_budget_user_updated (user_id, updated_at);
+
+-- Tombstones: deletes that sync clients have not seen yet. Pruned after
+-- SYNC_TOMBSTONE_DAYS; older ?since= values get 410 (full re-sync).
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    user_id     INT UNSIGNED    NOT NULL,
+    kind        VARCHAR(20)     NOT NULL COMMENT 'expense | budget | recurring',
+    row_id      INT UNSIGNED    NOT NULL,
+    deleted_at  DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, kind, row_id),
+    INDEX idx_deleted_user_at (user_id, kind, deleted_at),
+    INDEX idx_deleted_at (deleted_at),
+    CONSTRAINT fk_deleted_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Idempotency-Key replay store: written in the same transaction as the
+-- request's own rows, so a key is recorded if and only if its write landed.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id     INT UNSIGNED      NOT NULL,
+    idem_key    VARCHAR(64)       NOT NULL,
+    fingerprint CHAR(64)          NOT NULL COMMENT 'sha256 of method, path and body',
+    status      SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    headers     TEXT              NULL,
+    body        MEDIUMBLOB        NULL,
+    created_at  DATETIME          NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idem_key),
+    INDEX idx_idem_created (created_at),
+    CONSTRAINT fk_idem_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Bearer tokens for API clients (only the sha256 is stored). Only the
+-- directory database's copy is used.
+CREATE TABLE IF NOT EXISTS api_tokens (
+    id          INT UNSIGNED    NOT NULL AUTO_INCREMENT,
+    user_id     INT UNSIGNED    NOT NULL,
+    name        VARCHAR(50)     NOT NULL,
+    token_hash  CHAR(64)        NOT NULL,
+    created_at  DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_api_token_hash (token_hash),
+    CONSTRAINT fk_api_token_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
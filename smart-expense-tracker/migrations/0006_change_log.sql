@@ -0,0 +1,37 @@
+-- Per-user change log for offline sync (/api/v1/sync, models/sync.py).
+-- sync_seq hands out each user's sequence numbers. Its row lock is held to
+-- commit, so a user's changes commit in seq order.
+CREATE TABLE IF NOT EXISTS sync_seq (
+    user_id     INT UNSIGNED    NOT NULL,
+    seq         BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    pruned_seq  BIGINT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'cursors below this must re-sync',
+    PRIMARY KEY (user_id),
+    CONSTRAINT fk_sync_seq_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- One entry per row ever written: its latest seq and whether it still exists.
+CREATE TABLE IF NOT EXISTS change_log (
+    user_id     INT UNSIGNED             NOT NULL,
+    kind        VARCHAR(20)              NOT NULL COMMENT 'expense | budget | recurring',
+    row_id      INT UNSIGNED             NOT NULL,
+    seq         BIGINT UNSIGNED          NOT NULL,
+    op          ENUM('upsert', 'delete') NOT NULL,
+    changed_at  DATETIME                 NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, kind, row_id),
+    INDEX idx_change_user_seq  (user_id, seq, op),
+    INDEX idx_change_user_time (user_id, op, changed_at),
+    INDEX idx_change_op_time   (op, changed_at),
+    CONSTRAINT fk_change_log_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Tombstones from 0005 become delete entries; the log replaces that table.
+INSERT INTO change_log (user_id, kind, row_id, seq, op, changed_at)
+SELECT user_id, kind, row_id,
+       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY deleted_at, kind, row_id),
+       'delete', deleted_at
+FROM deleted_rows;
+
+INSERT INTO sync_seq (user_id, seq)
+SELECT user_id, MAX(seq) FROM change_log GROUP BY user_id;
+
+DROP TABLE deleted_rows;
@@ -0,0 +1,40 @@
+-- Spending anomaly detection (models/anomaly.py, services/anomalies.py).
+-- category_stats: running Welford statistics of ln(amount in paise), one
+-- row per (user, category). Expense writes update it in their own
+-- transaction, like expense_rollups.
+CREATE TABLE IF NOT EXISTS category_stats (
+    user_id      INT UNSIGNED    NOT NULL,
+    category_id  INT UNSIGNED    NOT NULL,
+    n            BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    mean         DOUBLE          NOT NULL DEFAULT 0 COMMENT 'mean of ln(paise)',
+    m2           DOUBLE          NOT NULL DEFAULT 0 COMMENT 'sum of squared deviations',
+    PRIMARY KEY (user_id, category_id),
+    CONSTRAINT fk_catstats_user     FOREIGN KEY (user_id)     REFERENCES users(id)      ON DELETE CASCADE,
+    CONSTRAINT fk_catstats_category FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Flags written by the scoring worker. kind 'amount': z-score of the
+-- expense against the rest of its category; 'duplicate': ref_id looks like
+-- the same entry.
+CREATE TABLE IF NOT EXISTS expense_anomalies (
+    user_id      INT UNSIGNED                  NOT NULL,
+    expense_id   INT UNSIGNED                  NOT NULL,
+    kind         ENUM('amount', 'duplicate')   NOT NULL,
+    score        DOUBLE                        NOT NULL,
+    typical      DECIMAL(10,2)                 NULL COMMENT 'amount: typical amount in the category',
+    ref_id       INT UNSIGNED                  NULL COMMENT 'duplicate: the earlier expense',
+    created_at   DATETIME                      NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, expense_id, kind),
+    INDEX idx_anomaly_user_created (user_id, created_at),
+    CONSTRAINT fk_anomaly_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill from every existing expense (n, mean and population variance * n
+-- are exactly what the running updates would have produced).
+INSERT INTO category_stats (user_id, category_id, n, mean, m2)
+SELECT user_id, category_id, COUNT(*), AVG(LN(amount * 100)),
+       COALESCE(VAR_POP(LN(amount * 100)), 0) * COUNT(*)
+FROM (SELECT user_id, category_id, amount FROM expenses WHERE amount > 0
+      UNION ALL
+      SELECT user_id, category_id, amount FROM expenses_archive WHERE amount > 0) e
+GROUP BY user_id, category_id;
@@ -0,0 +1,48 @@
+-- Budget alerts (models/budget_alert.py) and in-app notifications
+-- (models/notification.py).
+-- budget_alerts: one row per budget and threshold ever crossed. The primary
+-- key is what makes each crossing fire exactly once; budgets are per month,
+-- so that is once per month.
+CREATE TABLE IF NOT EXISTS budget_alerts (
+    user_id          INT UNSIGNED     NOT NULL,
+    budget_id        INT UNSIGNED     NOT NULL,
+    threshold        TINYINT UNSIGNED NOT NULL COMMENT 'percent of the budget',
+    month            CHAR(7)          NOT NULL COMMENT 'YYYY-MM',
+    spent            DECIMAL(14, 2)   NOT NULL COMMENT 'running total when crossed',
+    budget           DECIMAL(10, 2)   NOT NULL,
+    created_at       DATETIME         NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, budget_id, threshold),
+    CONSTRAINT fk_budget_alert_user   FOREIGN KEY (user_id)   REFERENCES users(id)   ON DELETE CASCADE,
+    CONSTRAINT fk_budget_alert_budget FOREIGN KEY (budget_id) REFERENCES budgets(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id          BIGINT UNSIGNED  NOT NULL AUTO_INCREMENT,
+    user_id     INT UNSIGNED     NOT NULL,
+    kind        VARCHAR(20)      NOT NULL COMMENT 'budget',
+    title       VARCHAR(200)     NOT NULL,
+    body        VARCHAR(500)     NOT NULL,
+    link        VARCHAR(255)     NULL,
+    created_at  DATETIME         NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    read_at     DATETIME         NULL,
+    PRIMARY KEY (id),
+    INDEX idx_notification_user (user_id, id),
+    CONSTRAINT fk_notification_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Optional delivery beyond the app (NOTIFY_CHANNELS): written in the same
+-- transaction as the notification, sent later by `flask notify deliver`.
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id               BIGINT UNSIGNED           NOT NULL AUTO_INCREMENT,
+    user_id          INT UNSIGNED              NOT NULL,
+    notification_id  BIGINT UNSIGNED           NOT NULL,
+    channel          ENUM('email', 'webhook')  NOT NULL,
+    attempts         INT UNSIGNED              NOT NULL DEFAULT 0,
+    next_attempt_at  DATETIME                  NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at          DATETIME                  NULL,
+    last_error       VARCHAR(255)              NULL,
+    PRIMARY KEY (id),
+    INDEX idx_outbox_pending (sent_at, next_attempt_at),
+    CONSTRAINT fk_outbox_user         FOREIGN KEY (user_id)         REFERENCES users(id)         ON DELETE CASCADE,
+    CONSTRAINT fk_outbox_notification FOREIGN KEY (notification_id) REFERENCES notifications(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
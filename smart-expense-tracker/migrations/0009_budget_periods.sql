@@ -0,0 +1,42 @@
+-- Budget periods (models/periods.py): weekly, quarterly, yearly and rolling
+-- N-day budgets next to the monthly ones.
+-- expense_daily: per-day twin of expense_rollups, maintained by the same
+-- writes. Budget status loads one date range of it and answers every
+-- budget from prefix sums.
+CREATE TABLE IF NOT EXISTS expense_daily (
+    user_id     INT UNSIGNED    NOT NULL,
+    day         DATE            NOT NULL,
+    category_id INT UNSIGNED    NOT NULL,
+    total       DECIMAL(14, 2)  NOT NULL DEFAULT 0,
+    cnt         INT             NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, category_id),
+    CONSTRAINT fk_daily_user     FOREIGN KEY (user_id)     REFERENCES users(id)      ON DELETE CASCADE,
+    CONSTRAINT fk_daily_category FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO expense_daily (user_id, day, category_id, total, cnt)
+SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+FROM (SELECT user_id, category_id, amount, date FROM expenses
+      UNION ALL
+      SELECT user_id, category_id, amount, date FROM expenses_archive) e
+GROUP BY user_id, date, category_id;
+
+-- budgets.month now holds a period key: YYYY-MM, YYYY-Www (ISO week),
+-- YYYY-Qn, YYYY, or Nd for a rolling window of the last N days. Keys of
+-- different periods never collide, so uq_budget_user_cat_month still means
+-- one budget per category per period. starts_on/ends_on ([start, end)) are
+-- the calendar bounds, NULL for rolling budgets, whose window moves daily.
+ALTER TABLE budgets
+    MODIFY month  VARCHAR(8) NOT NULL COMMENT 'period key, see models/periods.py',
+    ADD COLUMN period ENUM('month', 'week', 'quarter', 'year', 'rolling')
+        NOT NULL DEFAULT 'month' AFTER category_id,
+    ADD COLUMN starts_on DATE NULL AFTER month,
+    ADD COLUMN ends_on   DATE NULL AFTER starts_on,
+    ADD INDEX idx_budget_user_start (user_id, starts_on);
+
+UPDATE budgets
+SET starts_on = STR_TO_DATE(CONCAT(month, '-01'), '%Y-%m-%d'),
+    ends_on   = STR_TO_DATE(CONCAT(month, '-01'), '%Y-%m-%d') + INTERVAL 1 MONTH;
+
+ALTER TABLE budget_alerts
+    MODIFY month VARCHAR(8) NOT NULL COMMENT 'period key of the budget';
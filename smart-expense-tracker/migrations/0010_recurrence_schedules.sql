@@ -0,0 +1,32 @@
+-- Recurrence schedules (models/schedule.py): weekly, biweekly, monthly,
+-- quarterly and yearly rules, a last-day-of-month option (day_of_month 31)
+-- and an optional end date.
+-- next_due is the earliest occurrence not yet inserted as an expense (NULL
+-- once the rule has ended). The materializer reads due rules by range scan
+-- on idx_rec_due / idx_rec_user_due instead of checking every active rule,
+-- then inserts the missed occurrences in one batch and moves next_due on.
+-- starts_on is backfilled and made NOT NULL by 0013.
+ALTER TABLE recurring_expenses
+    ADD COLUMN frequency ENUM('weekly', 'biweekly', 'monthly', 'quarterly', 'yearly')
+        NOT NULL DEFAULT 'monthly' AFTER description,
+    MODIFY day_of_month TINYINT UNSIGNED NOT NULL DEFAULT 1
+        COMMENT '1-28, or 31 = last day of the month',
+    ADD COLUMN starts_on DATE NULL
+        COMMENT 'first possible occurrence, weekday of weekly rules, month of quarterly/yearly'
+        AFTER day_of_month,
+    ADD COLUMN ends_on   DATE NULL COMMENT 'no occurrences after this day' AFTER starts_on,
+    ADD COLUMN next_due  DATE NULL COMMENT 'next occurrence not yet inserted' AFTER ends_on,
+    ADD INDEX idx_rec_due (active, next_due, user_id),
+    ADD INDEX idx_rec_user_due (user_id, active, next_due),
+    DROP INDEX idx_rec_user_active;
+
+-- Existing rules were inserted a month at a time, whenever the dashboard
+-- loaded. Their next occurrence is this month's, unless this month's
+-- expense already exists, in which case it is next month's.
+UPDATE recurring_expenses r
+SET r.next_due = STR_TO_DATE(CONCAT(DATE_FORMAT(CURDATE(), '%Y-%m-'), r.day_of_month), '%Y-%m-%d')
+    + INTERVAL (EXISTS (SELECT 1 FROM expenses e
+                        WHERE e.user_id = r.user_id AND e.category_id = r.category_id
+                          AND e.amount = r.amount AND e.description = r.description
+                          AND e.date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
+                          AND e.date <  DATE_FORMAT(CURDATE(), '%Y-%m-01') + INTERVAL 1 MONTH)) MONTH;
@@ -0,0 +1,13 @@
+-- Platform analytics for admins (analytics/platform.py). These queries read
+-- the rollups of every user for a range of days or for one month, and the
+-- primary keys start with user_id. InnoDB secondary indexes carry the
+-- primary key columns, so both of these indexes cover their queries.
+--
+-- idx_daily_day    (day, user_id, category_id): distinct users per day.
+-- idx_rollup_month (month, total, cnt, user_id, category_id): spend by
+--                  category, per-user spend, cohorts and top spenders.
+ALTER TABLE expense_daily
+    ADD INDEX idx_daily_day (day);
+
+ALTER TABLE expense_rollups
+    ADD INDEX idx_rollup_month (month, total, cnt);
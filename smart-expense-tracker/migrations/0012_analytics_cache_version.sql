@@ -0,0 +1,13 @@
+-- analytics_cache (models/analytics_cache.py): guard stored payloads with a
+-- per-user version instead of invalidated_at. invalidate() bumps the version
+-- and put() stores a payload only if the row still has the version read
+-- alongside its inputs. The timestamp was taken before the writer committed
+-- and compared with a clock read after the reader's snapshot existed, so a
+-- stale payload could slip past it and be served for the rest of the day.
+ALTER TABLE analytics_cache
+    ADD COLUMN version BIGINT UNSIGNED NOT NULL DEFAULT 0
+        COMMENT 'bumped by every invalidation' AFTER computed_at,
+    DROP COLUMN invalidated_at;
+
+-- Drop anything that may have been cached under the old guard.
+UPDATE analytics_cache SET payload = NULL;
@@ -0,0 +1,8 @@
+-- recurring_expenses.starts_on (added NULL by 0010): rules created before
+-- schedules start on the day they were created. Rules saved since 0010 set
+-- their own starts_on and are left alone. Its own file because 0010 already
+-- has this table's ALTER.
+UPDATE recurring_expenses SET starts_on = DATE(created_at) WHERE starts_on IS NULL;
+
+ALTER TABLE recurring_expenses MODIFY starts_on DATE NOT NULL
+    COMMENT 'first possible occurrence, weekday of weekly rules, month of quarterly/yearly';
@@ -0,0 +1,166 @@
+"""
+migrations/__init__.py
+Versioned schema migrations.
+
+schema.sql is the baseline for a fresh install. Every later schema change is
+a numbered file in this directory (NNNN_short_name.sql), applied once, in
+order, by `flask db upgrade` and recorded in schema_migrations together with
+a checksum of the file, so an edited migration shows up in `flask db status`.
+
+MySQL commits DDL implicitly, so a migration cannot be rolled back as a unit;
+keep each file to one ALTER per table so a failure leaves nothing half-done.
+
+When sharded, every function takes the database to act on: shard=None is
+the directory, otherwise a shard id (each shard tracks its own versions).
+"""
+
+import hashlib
+import os
+import re
+
+from db import get_cursor, commit
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_FILENAME = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+
+class Migration:
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name    = name
+        self.path    = path
+
+    @property
+    def sql(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    @property
+    def checksum(self):
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    def statements(self):
+        return split_statements(self.sql)
+
+
+def split_statements(sql):
+    """
+    Statements in a SQL script, split on `;`.
+
+    A `;` inside a quoted string or identifier ('...', "...", `...`) or a
+    comment does not end a statement. `-- ` and `/* */` comments are dropped;
+    quotes escape by doubling or, in strings, with a backslash.
+    """
+    statements, buf = [], []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if c in "'\"`":
+            j = i + 1
+            while j < n:
+                if sql[j] == "\\" and c != "`":
+                    j += 2
+                elif sql[j] == c:
+                    if sql[j + 1:j + 2] == c:
+                        j += 2
+                    else:
+                        break
+                else:
+                    j += 1
+            buf.append(sql[i:j + 1])
+            i = j + 1
+        elif sql.startswith("--", i) and (i + 2 == n or sql[i + 2].isspace()):
+            end = sql.find("\n", i)
+            i = n if end < 0 else end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            buf.append(" ")
+            i = n if end < 0 else end + 2
+        elif c == ";":
+            statements.append("".join(buf))
+            buf = []
+            i += 1
+        else:
+            buf.append(c)
+            i += 1
+    statements.append("".join(buf))
+    return [s.strip() for s in statements if s.strip()]
+
+
+def discover():
+    """All migration files, ordered by version."""
+    found = []
+    for fname in os.listdir(MIGRATIONS_DIR):
+        m = _FILENAME.match(fname)
+        if m:
+            found.append(Migration(int(m.group(1)), m.group(2),
+                                   os.path.join(MIGRATIONS_DIR, fname)))
+    found.sort(key=lambda m: m.version)
+    versions = [m.version for m in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version in " + MIGRATIONS_DIR)
+    return found
+
+
+def _ensure_table(cur):
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+               version     INT UNSIGNED  NOT NULL,
+               name        VARCHAR(100)  NOT NULL,
+               checksum    CHAR(64)      NOT NULL,
+               applied_at  DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (version)
+           ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+    )
+
+
+def applied(shard=None):
+    """{version: row} for every migration recorded as applied."""
+    cur = get_cursor(shard=shard)
+    _ensure_table(cur)
+    cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations")
+    rows = {r["version"]: r for r in cur.fetchall()}
+    cur.close()
+    return rows
+
+
+def status(shard=None):
+    """(migration, state, applied_at) for every file: applied / modified / pending."""
+    done = applied(shard)
+    result = []
+    for m in discover():
+        row = done.get(m.version)
+        if row is None:
+            result.append((m, "pending", None))
+        elif row["checksum"] != m.checksum:
+            result.append((m, "modified", row["applied_at"]))
+        else:
+            result.append((m, "applied", row["applied_at"]))
+    return result
+
+
+def apply(migration, shard=None):
+    cur = get_cursor(shard=shard)
+    for stmt in migration.statements():
+        cur.execute(stmt)
+    cur.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (migration.version, migration.name, migration.checksum)
+    )
+    commit(cur)
+    cur.close()
+
+
+def upgrade(target=None, echo=print, shard=None):
+    """Apply pending migrations up to `target` (default: latest). Returns count."""
+    done  = applied(shard)
+    count = 0
+    for m in discover():
+        if m.version in done or (target is not None and m.version > target):
+            continue
+        echo(f"Applying {m.version:04d}_{m.name} ...")
+        apply(m, shard)
+        count += 1
+    return count
@@ -0,0 +1,88 @@
+"""
+models/analytics_cache.py
+Precomputed /api/analytics payloads, one row per user, valid for one day.
+Filled by `flask analytics precompute` and by live requests; every write that
+changes a user's numbers clears the row in the same transaction.
+
+Invalidation also bumps the row's version. A payload is stored with the
+version read in the same snapshot as its inputs, and only while the row
+still has that version: a write the snapshot could not see bumps it when it
+commits (and holds the row lock until then), so a payload computed from
+data read *before* a write can never be stored over it afterwards.
+"""
+
+from db import get_cursor, commit, shard_for, sharded
+
+
+class AnalyticsCache:
+
+    @staticmethod
+    def version(user_id):
+        """
+        The user's cache version, read on the connection (and so in the
+        snapshot) that the payload inputs are about to be read from.
+        """
+        cur = get_cursor(readonly=True, user_id=user_id)
+        version = AnalyticsCache.versions(cur, [user_id])[user_id]
+        cur.close()
+        return version
+
+    @staticmethod
+    def versions(cur, user_ids):
+        """{user_id: version} on the caller's cursor; 0 for users with no row."""
+        marks = ", ".join(["%s"] * len(user_ids))
+        cur.execute(
+            f"SELECT user_id, version FROM analytics_cache WHERE user_id IN ({marks})",
+            tuple(user_ids)
+        )
+        found = {r["user_id"]: r["version"] for r in cur.fetchall()}
+        return {uid: found.get(uid, 0) for uid in user_ids}
+
+    @staticmethod
+    def get(user_id, day):
+        """Cached JSON payload computed on `day`, or None."""
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT payload FROM analytics_cache
+               WHERE user_id = %s AND computed_on = %s AND payload IS NOT NULL""",
+            (user_id, day)
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row["payload"] if row else None
+
+    @staticmethod
+    def put_many(entries, day, shard=None):
+        """
+        Store [(user_id, payload_json, version)] computed on `day`; all
+        users must live on `shard`. Rows whose version has moved on since
+        are left alone.
+        """
+        if not entries:
+            return
+        cur = get_cursor(shard=shard)
+        cur.executemany(
+            """INSERT INTO analytics_cache (user_id, payload, computed_on, version)
+               VALUES (%s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE
+                   payload     = IF(version = VALUES(version), VALUES(payload), payload),
+                   computed_on = IF(version = VALUES(version), VALUES(computed_on), computed_on)""",
+            [(uid, payload, day, version) for uid, payload, version in entries]
+        )
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def put(user_id, payload, day, version):
+        shard = shard_for(user_id)[0] if sharded() else None
+        AnalyticsCache.put_many([(user_id, payload, version)], day, shard)
+
+    @staticmethod
+    def invalidate(cur, user_id):
+        """Clear the user's payload and bump its version on the caller's cursor (caller commits)."""
+        cur.execute(
+            """INSERT INTO analytics_cache (user_id, payload, computed_on, version)
+               VALUES (%s, NULL, CURDATE(), 1)
+               ON DUPLICATE KEY UPDATE payload = NULL, version = version + 1""",
+            (user_id,)
+        )
@@ -0,0 +1,266 @@
+"""
+models/anomaly.py
+Spending anomalies: running per-category statistics and the flags scored
+from them.
+
+category_stats keeps, per (user, category), the count, mean and sum of
+squared deviations (Welford) of ln(amount in paise). That is one row per
+category, however many expenses there are. Amounts are compared on a log
+scale because spending is right-skewed: ₹50 vs ₹500 matters as much as
+₹5,000 vs ₹50,000. Expense writes call CategoryStats.record() on their own
+cursor, like the rollups. Deletes and edits run the update in reverse.
+
+Anomaly.score() runs on the background worker (services/anomalies.py),
+after the expense has committed. It flags:
+- amount: the expense sits more than ANOMALY_Z standard deviations above
+  the rest of its category (with at least ANOMALY_MIN_SAMPLES others);
+- duplicate: an expense with the same category and amount within
+  ANOMALY_DUP_DAYS, with the same description or entered minutes apart.
+"""
+
+import math
+
+from flask import current_app
+
+from db import get_cursor, commit, all_shards, scatter
+from models.analytics_cache import AnalyticsCache
+from models.money import Money, to_paise
+
+DUP_ENTRY_SECONDS = 600     # "entered minutes apart" for duplicates
+RECENT_DAYS       = 30      # flags shown on the dashboard
+RECENT_LIMIT      = 10
+
+
+class CategoryStats:
+
+    @staticmethod
+    def record(cur, user_id, category_id, amount, sign=1):
+        """
+        Fold one amount into (sign=1) or out of (sign=-1) the user's category
+        statistics on the caller's cursor (caller commits). Assignments run
+        left to right, so m2 sees the new n and the old mean.
+        """
+        paise = to_paise(amount)
+        if paise <= 0:
+            return
+        x = math.log(paise)
+        if sign > 0:
+            cur.execute(
+                """INSERT INTO category_stats (user_id, category_id, n, mean, m2)
+                   VALUES (%s, %s, 1, %s, 0)
+                   ON DUPLICATE KEY UPDATE
+                       n    = n + 1,
+                       m2   = m2 + (VALUES(mean) - mean)
+                                 * (VALUES(mean) - (mean + (VALUES(mean) - mean) / n)),
+                       mean = mean + (VALUES(mean) - mean) / n""",
+                (user_id, category_id, x)
+            )
+        else:
+            cur.execute(
+                """UPDATE category_stats
+                   SET n    = n - 1,
+                       m2   = IF(n = 0, 0, GREATEST(0, m2 - (%s - (mean * (n + 1) - %s) / n)
+                                                        * (%s - mean))),
+                       mean = IF(n = 0, 0, (mean * (n + 1) - %s) / n)
+                   WHERE user_id = %s AND category_id = %s AND n > 0""",
+                (x, x, x, x, user_id, category_id)
+            )
+
+    @staticmethod
+    def record_many(cur, user_id, rows):
+        """Fold many new expenses (dicts with category_id, amount) in, one statement."""
+        rows = [r for r in rows if to_paise(r["amount"]) > 0]
+        if not rows:
+            return
+        cur.executemany(
+            """INSERT INTO category_stats (user_id, category_id, n, mean, m2)
+               VALUES (%s, %s, 1, %s, 0)
+               ON DUPLICATE KEY UPDATE
+                   n    = n + 1,
+                   m2   = m2 + (VALUES(mean) - mean)
+                             * (VALUES(mean) - (mean + (VALUES(mean) - mean) / n)),
+                   mean = mean + (VALUES(mean) - mean) / n""",
+            [(user_id, r["category_id"], math.log(to_paise(r["amount"]))) for r in rows]
+        )
+
+    @staticmethod
+    def get(user_id, category_id):
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT n, mean, m2 FROM category_stats
+               WHERE user_id = %s AND category_id = %s""",
+            (user_id, category_id)
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row
+
+    @staticmethod
+    def without(stats, x):
+        """(n, mean, m2) with observation x taken back out (leave-one-out)."""
+        n = stats["n"] - 1
+        if n <= 0:
+            return 0, 0.0, 0.0
+        mean = (stats["mean"] * (n + 1) - x) / n
+        m2   = max(0.0, stats["m2"] - (x - mean) * (x - stats["mean"]))
+        return n, mean, m2
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute statistics from raw expenses, archive included (all users, or one)."""
+        params = (user_id, user_id)
+        for shard in ([None] if user_id is not None else all_shards()):
+            cur = get_cursor(user_id=user_id, shard=shard)
+            cur.execute("DELETE FROM category_stats WHERE (%s IS NULL OR user_id = %s)", params)
+            cur.execute(
+                """INSERT INTO category_stats (user_id, category_id, n, mean, m2)
+                   SELECT user_id, category_id, COUNT(*), AVG(LN(amount * 100)),
+                          COALESCE(VAR_POP(LN(amount * 100)), 0) * COUNT(*)
+                   FROM (SELECT user_id, category_id, amount FROM expenses
+                         WHERE (%s IS NULL OR user_id = %s) AND amount > 0
+                         UNION ALL
+                         SELECT user_id, category_id, amount FROM expenses_archive
+                         WHERE (%s IS NULL OR user_id = %s) AND amount > 0) e
+                   GROUP BY user_id, category_id""",
+                params * 2
+            )
+            commit(cur)
+            cur.close()
+
+
+class Anomaly:
+
+    # ── Write hooks ───────────────────────────────────────────
+
+    @staticmethod
+    def watch(user_id, expense_ids):
+        """Queue committed expenses for background scoring (see db.after_commit)."""
+        from services import anomalies
+
+        anomalies.enqueue(user_id, expense_ids)
+
+    @staticmethod
+    def forget(cur, user_id, expense_id):
+        """Drop flags on, or pointing at, an expense being edited or deleted (caller commits)."""
+        cur.execute(
+            """DELETE FROM expense_anomalies
+               WHERE user_id = %s AND (expense_id = %s OR ref_id = %s)""",
+            (user_id, expense_id, expense_id)
+        )
+
+    # ── Scoring (background worker) ───────────────────────────
+
+    @staticmethod
+    def _duplicate_of(cur, user_id, e, days):
+        cur.execute(
+            """SELECT id FROM expenses
+               WHERE user_id = %s AND category_id = %s AND amount = %s AND id <> %s
+                 AND date BETWEEN %s - INTERVAL %s DAY AND %s + INTERVAL %s DAY
+                 AND (LOWER(TRIM(description)) = LOWER(TRIM(%s))
+                      OR ABS(TIMESTAMPDIFF(SECOND, created_at, %s)) <= %s)
+               ORDER BY id LIMIT 1""",
+            (user_id, e["category_id"], e["amount"], e["id"],
+             e["date"], days, e["date"], days,
+             e["description"], e["created_at"], DUP_ENTRY_SECONDS)
+        )
+        row = cur.fetchone()
+        return row["id"] if row else None
+
+    @staticmethod
+    def score(user_id, expense_id):
+        """
+        Score one committed expense and store any flags. Always ends its
+        transaction (commit with flags, rollback without), so the next call
+        on the same connection reads a fresh snapshot. Returns the flags as
+        [{kind, score, ...}]; [] when it looks normal or is gone.
+        """
+        cfg = current_app.config
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT id, category_id, amount, description, date, created_at
+               FROM expenses WHERE id = %s AND user_id = %s""",
+            (expense_id, user_id)
+        )
+        e = cur.fetchone()
+        if e is None or e["amount"] <= 0:
+            cur._connection.rollback()
+            cur.close()
+            return []
+
+        flags = []
+        stats = CategoryStats.get(user_id, e["category_id"])
+        if stats:
+            x = math.log(to_paise(e["amount"]))
+            n, mean, m2 = CategoryStats.without(stats, x)
+            if n >= cfg["ANOMALY_MIN_SAMPLES"] and m2 > 0:
+                z = (x - mean) / math.sqrt(m2 / (n - 1))
+                if z >= cfg["ANOMALY_Z"]:
+                    flags.append({"kind": "amount", "score": round(z, 2),
+                                  "typical": Money(round(math.exp(mean))), "ref_id": None})
+
+        dup = Anomaly._duplicate_of(cur, user_id, e, cfg["ANOMALY_DUP_DAYS"])
+        if dup is not None and dup < e["id"]:
+            flags.append({"kind": "duplicate", "score": 1.0, "typical": None, "ref_id": dup})
+
+        if flags:
+            cur.executemany(
+                """INSERT INTO expense_anomalies
+                       (user_id, expense_id, kind, score, typical, ref_id)
+                   VALUES (%s, %s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE score   = VALUES(score),
+                                           typical = VALUES(typical),
+                                           ref_id  = VALUES(ref_id)""",
+                [(user_id, expense_id, f["kind"], f["score"],
+                  f["typical"].to_decimal() if f["typical"] is not None else None,
+                  f["ref_id"]) for f in flags]
+            )
+            AnalyticsCache.invalidate(cur, user_id)
+            commit(cur)
+        else:
+            cur._connection.rollback()
+        cur.close()
+        return flags
+
+    # ── Reads ─────────────────────────────────────────────────
+
+    @staticmethod
+    def recent(user_id, days=RECENT_DAYS, limit=RECENT_LIMIT):
+        """Flags on current (non-deleted, non-archived) expenses, newest first."""
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT a.expense_id, a.kind, a.score, a.typical, a.ref_id,
+                      e.amount, e.description, e.date, c.name AS category_name
+               FROM expense_anomalies a
+               JOIN expenses e   ON e.id = a.expense_id AND e.user_id = a.user_id
+               JOIN categories c ON c.id = e.category_id
+               WHERE a.user_id = %s AND a.created_at >= NOW() - INTERVAL %s DAY
+               ORDER BY a.created_at DESC, a.expense_id DESC
+               LIMIT %s""",
+            (user_id, days, limit)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def unscored(user_id=None, days=RECENT_DAYS):
+        """(user_id, expense_id) of recent expenses, for re-scoring after a rebuild."""
+        return [(r["user_id"], r["id"]) for r in scatter(
+            """SELECT user_id, id FROM expenses
+               WHERE (%s IS NULL OR user_id = %s) AND created_at >= NOW() - INTERVAL %s DAY
+               ORDER BY user_id, id""",
+            (user_id, user_id, days)
+        )]
+
+    @staticmethod
+    def prune(days):
+        """Drop flags older than `days` on every database; returns rows removed."""
+        removed = 0
+        for shard in all_shards():
+            cur = get_cursor(shard=shard)
+            cur.execute("DELETE FROM expense_anomalies WHERE created_at < NOW() - INTERVAL %s DAY",
+                        (days,))
+            removed += cur.rowcount
+            commit(cur)
+            cur.close()
+        return removed
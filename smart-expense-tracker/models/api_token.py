@@ -0,0 +1,64 @@
+"""
+models/api_token.py
+Bearer tokens for JSON API clients (mobile apps, scripts).
+Only a SHA-256 of each token is stored; the token itself is shown once.
+"""
+
+import hashlib
+import secrets
+
+from db import get_cursor, commit
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class ApiToken:
+
+    @staticmethod
+    def create(user_id, name):
+        """Issue a token for user_id; returns (token id, token)."""
+        token = secrets.token_urlsafe(32)
+        cur = get_cursor()
+        cur.execute(
+            "INSERT INTO api_tokens (user_id, name, token_hash) VALUES (%s, %s, %s)",
+            (user_id, name, _digest(token))
+        )
+        commit(cur)
+        token_id = cur.lastrowid
+        cur.close()
+        return token_id, token
+
+    @staticmethod
+    def user_id_for(token):
+        """Owner of a presented token, or None."""
+        cur = get_cursor()      # primary: a revoked token must stop working at once
+        cur.execute("SELECT user_id FROM api_tokens WHERE token_hash = %s",
+                    (_digest(token),))
+        row = cur.fetchone()
+        cur.close()
+        return row["user_id"] if row else None
+
+    @staticmethod
+    def get_for_user(user_id):
+        cur = get_cursor()      # primary: listed right after a token is created or revoked
+        cur.execute(
+            """SELECT id, name, created_at FROM api_tokens
+               WHERE user_id = %s ORDER BY id""",
+            (user_id,)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def revoke(token_id, user_id):
+        """Returns True if a token was removed."""
+        cur = get_cursor()
+        cur.execute("DELETE FROM api_tokens WHERE id = %s AND user_id = %s",
+                    (token_id, user_id))
+        commit(cur)
+        removed = cur.rowcount > 0
+        cur.close()
+        return removed
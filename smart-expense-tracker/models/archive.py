@@ -0,0 +1,106 @@
+"""
+models/archive.py
+Hot/cold split for expenses. Rows dated before the archive cutoff live in
+expenses_archive (compressed InnoDB); everything newer stays in expenses.
+
+MySQL cannot range-partition a table with foreign keys, so the split is done
+with two tables instead. Reads only touch the archive when their date range
+reaches back before the cutoff, so dashboard/recent/current-month queries
+never see it. The expense list pages the hot table first and only adds the
+archive once a page runs past the cutoff (Expense.get_page). Rollups cover both tables, so analytics are unaffected.
+"""
+
+import time
+
+from db import get_cursor, commit
+
+CUTOFF_TTL = 30     # seconds a worker may keep using a cached cutoff
+
+_COLUMNS = "id, user_id, category_id, amount, description, date, created_at, updated_at"
+_READ_COLUMNS = "id, user_id, category_id, amount, description, date, created_at"
+
+_cache = {"value": None, "at": 0.0}
+
+
+class Archive:
+
+    @staticmethod
+    def cutoff():
+        """Oldest date still in the hot table ('YYYY-MM-DD'), or None."""
+        if time.monotonic() - _cache["at"] > CUTOFF_TTL:
+            cur = get_cursor(readonly=True)
+            cur.execute("SELECT value FROM app_state WHERE name = 'archive_cutoff'")
+            row = cur.fetchone()
+            cur.close()
+            _cache["value"] = row["value"] if row else None
+            _cache["at"]    = time.monotonic()
+        return _cache["value"]
+
+    @staticmethod
+    def needed(date_from):
+        """Does a range starting at date_from (None = all time) reach the archive?"""
+        cutoff = Archive.cutoff()
+        return cutoff is not None and (date_from is None or str(date_from) < cutoff)
+
+    @staticmethod
+    def source(user_id, date_from, alias="e"):
+        """
+        FROM-clause for a user's expenses in a range starting at date_from.
+        Returns (from_sql, params, archived_expr): the plain hot table when the
+        range is recent, else a UNION ALL of both tables filtered by user.
+        """
+        if not Archive.needed(date_from):
+            return f"expenses {alias}", [], "0"
+        return (f"""(SELECT {_READ_COLUMNS}, 0 AS archived FROM expenses WHERE user_id = %s
+                     UNION ALL
+                     SELECT {_READ_COLUMNS}, 1 AS archived FROM expenses_archive WHERE user_id = %s
+                    ) {alias}""", [user_id, user_id], f"{alias}.archived")
+
+    # ── Archival job ──────────────────────────────────────────
+
+    @staticmethod
+    def publish_cutoff(cutoff):
+        """
+        Move the cutoff forward (never back). Must happen before rows move,
+        so readers start including the archive for the affected range.
+        """
+        cur = get_cursor()
+        cur.execute(
+            """INSERT INTO app_state (name, value) VALUES ('archive_cutoff', %s)
+               ON DUPLICATE KEY UPDATE value = GREATEST(COALESCE(value, ''), VALUES(value))""",
+            (cutoff,)
+        )
+        commit(cur)
+        cur.close()
+        _cache["at"] = 0.0
+
+    @staticmethod
+    def move_batch(cutoff, after_id, limit, shard=None):
+        """
+        Move up to `limit` expenses dated before cutoff (id > after_id) on
+        `shard` into its archive in one transaction. Returns (last id moved, rows moved);
+        last id is None once nothing is left.
+        """
+        cur = get_cursor(shard=shard)
+        cur.execute(
+            """SELECT id FROM expenses
+               WHERE id > %s AND date < %s
+               ORDER BY id LIMIT %s
+               FOR UPDATE""",
+            (after_id, cutoff, limit)
+        )
+        ids = [r["id"] for r in cur.fetchall()]
+        if not ids:
+            cur._connection.rollback()
+            cur.close()
+            return None, 0
+        marks = ", ".join(["%s"] * len(ids))
+        cur.execute(
+            f"""INSERT INTO expenses_archive ({_COLUMNS})
+                SELECT {_COLUMNS} FROM expenses WHERE id IN ({marks})""",
+            ids
+        )
+        cur.execute(f"DELETE FROM expenses WHERE id IN ({marks})", ids)
+        commit(cur)
+        cur.close()
+        return ids[-1], len(ids)
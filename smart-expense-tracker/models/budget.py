@@ -1,30 +1,113 @@
 """
 models/budget.py
-Budget goal management — monthly overall + per-category budgets.
+Budget goal management — overall + per-category budgets for a month, ISO
+week, quarter, year or rolling window of days (models/periods.py).
 """
 
-from db import get_cursor
+from datetime import date
+
+from db import get_cursor, commit
+from models import periods
+from models.analytics_cache import AnalyticsCache
+from models.budget_alert import BudgetAlerts
+from models.metrics import UserMetrics
+from models.money import Money
+from models.sync import Sync
+
+HISTORY_LIMIT = 120     # budgets shown on the history page
+
+_COLUMNS = "id, category_id, period, month, amount, created_at, updated_at"
 
 
 class Budget:
 
     @staticmethod
     def set(user_id, month, amount, category_id=None):
-        """Upsert a budget. month is 'YYYY-MM'. category_id=None → overall budget."""
-        cur = get_cursor()
+        """
+        Upsert a budget. month is a period key ('YYYY-MM', 'YYYY-Www',
+        'YYYY-Qn', 'YYYY' or 'Nd'). category_id=None → overall budget.
+        Returns the budget's id (new or existing).
+        """
+        period = periods.period_of(month)
+        if period is None:
+            raise ValueError(f"not a budget period key: {month!r}")
+        starts_on, ends_on = (None, None) if period == "rolling" else periods.bounds(month)
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """INSERT INTO budgets (user_id, category_id, period, month, starts_on, ends_on, amount)
+               VALUES (%s, %s, %s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE amount = VALUES(amount), id = LAST_INSERT_ID(id)""",
+            (user_id, category_id, period, month, starts_on, ends_on, amount)
+        )
+        budget_id = cur.lastrowid
+        BudgetAlerts.evaluate_budgets(cur, user_id, [budget_id])   # may already be crossed
+        Sync.record(cur, user_id, "budget", [budget_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
+        cur.close()
+        return budget_id
+
+    @staticmethod
+    def get_by_id(budget_id, user_id, for_update=False):
+        """for_update: lock the row until the enclosing transaction ends."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {_COLUMNS}
+                FROM budgets WHERE id = %s AND user_id = %s"""
+            + (" FOR UPDATE" if for_update else ""),
+            (budget_id, user_id)
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row
+
+    @staticmethod
+    def update_amount(budget_id, user_id, amount):
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            "UPDATE budgets SET amount = %s WHERE id = %s AND user_id = %s",
+            (amount, budget_id, user_id)
+        )
+        if cur.rowcount:
+            BudgetAlerts.evaluate_budgets(cur, user_id, [budget_id])
+            Sync.record(cur, user_id, "budget", [budget_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def get_many(user_id, ids):
+        if not ids:
+            return []
+        cur = get_cursor(user_id=user_id)
         cur.execute(
-            """INSERT INTO budgets (user_id, category_id, month, amount)
-               VALUES (%s, %s, %s, %s)
-               ON DUPLICATE KEY UPDATE amount = VALUES(amount)""",
-            (user_id, category_id, month, amount)
+            f"""SELECT {_COLUMNS}
+                FROM budgets WHERE user_id = %s AND id IN ({", ".join(["%s"] * len(ids))})""",
+            (user_id, *ids)
         )
-        cur._connection.commit()
+        rows = cur.fetchall()
         cur.close()
+        return rows
+
+    @staticmethod
+    def changed_since(user_id, since=None):
+        """Budgets updated at or after `since` (or all), from the primary, for API sync."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {_COLUMNS}
+                FROM budgets WHERE user_id = %s"""
+            + (" AND updated_at >= %s" if since else "")
+            + " ORDER BY updated_at, id",
+            (user_id, since) if since else (user_id,)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
 
     @staticmethod
     def get_for_month(user_id, month):
         """Return all budgets for a given month as list of dicts."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT b.id, b.category_id, b.month, b.amount,
                       c.name AS category_name
@@ -40,7 +123,7 @@ class Budget:
     @staticmethod
     def get_overall(user_id, month):
         """Return the overall monthly budget (category_id IS NULL), or None."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT amount FROM budgets
                WHERE user_id = %s AND month = %s AND category_id IS NULL""",
@@ -48,88 +131,104 @@ class Budget:
         )
         row = cur.fetchone()
         cur.close()
-        return float(row["amount"]) if row else None
+        return Money.of(row["amount"]) if row else None
 
     @staticmethod
     def delete(budget_id, user_id):
-        cur = get_cursor()
+        cur = get_cursor(user_id=user_id)
         cur.execute(
             "DELETE FROM budgets WHERE id = %s AND user_id = %s",
             (budget_id, user_id)
         )
-        cur._connection.commit()
+        if cur.rowcount:
+            Sync.record(cur, user_id, "budget", [budget_id], "delete")
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
 
     @staticmethod
-    def get_status_for_month(user_id, month):
+    def get_status(user_id, today=None):
         """
-        Returns a list of budget status dicts for dashboard display.
-        Each dict: { label, budget, spent, pct, over_80, overspent }
+        Status of every budget running today: this month's, week's,
+        quarter's and year's, and the rolling ones. Each dict: { id,
+        category_id, label, period, period_label, budget, spent, pct,
+        over_80, overspent }. One query for the budgets, then
+        UserMetrics.budget_spend(): expense_rollups for calendar periods,
+        expense_daily only for weeks and rolling windows.
         """
-        cur = get_cursor()
-        # Overall budget
+        today = today or date.today()
+        keys  = periods.calendar_keys(today)
+        cur   = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
-            """SELECT b.id, b.category_id, b.amount AS budget_amt,
-                      COALESCE((
-                          SELECT SUM(e.amount)
-                          FROM expenses e
-                          WHERE e.user_id = %s
-                            AND DATE_FORMAT(e.date, '%%Y-%%m') = %s
-                            AND (%s IS NULL OR e.category_id = b.category_id)
-                      ), 0) AS spent
-               FROM budgets b
-               WHERE b.user_id = %s AND b.month = %s
-               ORDER BY b.category_id IS NOT NULL, b.category_id""",
-            (user_id, month, None, user_id, month)
+            f"""SELECT b.id, b.category_id, b.period, b.month, b.amount,
+                       c.name AS category_name
+                FROM budgets b
+                LEFT JOIN categories c ON c.id = b.category_id
+                WHERE b.user_id = %s
+                  AND (b.month IN ({", ".join(["%s"] * len(keys))}) OR b.period = 'rolling')
+                ORDER BY FIELD(b.period, 'week', 'month', 'quarter', 'year', 'rolling'),
+                         b.month, b.category_id IS NOT NULL, c.name""",
+            (user_id, *keys)
         )
-        rows = cur.fetchall()
+        budgets = cur.fetchall()
+        if not budgets:
+            cur.close()
+            return []
+        spend = UserMetrics.budget_spend(cur, user_id, budgets, today)
         cur.close()
+        return [Budget._status(b, spent) for b, spent in zip(budgets, spend)]
 
-        # Simpler — do two queries
-        cur = get_cursor()
+    @staticmethod
+    def history(user_id, limit=HISTORY_LIMIT):
+        """
+        Calendar-period budgets, latest period first, with what was spent in
+        each: a single query summing expense_daily over every budget's
+        [starts_on, ends_on), at most days x categories rows per budget
+        however many expenses they stand for. Same dicts as get_status(),
+        plus starts_on, ends_on and in_progress.
+        """
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
-            """SELECT b.id, b.category_id, b.amount AS budget_amt,
-                      c.name AS category_name
-               FROM budgets b
+            """SELECT b.id, b.category_id, b.period, b.month, b.amount,
+                      b.starts_on, b.ends_on, c.name AS category_name,
+                      COALESCE(SUM(d.total), 0) AS spent
+               FROM (SELECT id, user_id, category_id, period, month, amount, starts_on, ends_on
+                     FROM budgets
+                     WHERE user_id = %s AND starts_on IS NOT NULL
+                     ORDER BY starts_on DESC, ends_on DESC
+                     LIMIT %s) b
                LEFT JOIN categories c ON c.id = b.category_id
-               WHERE b.user_id = %s AND b.month = %s""",
-            (user_id, month)
+               LEFT JOIN expense_daily d
+                      ON d.user_id = b.user_id
+                     AND d.day >= b.starts_on AND d.day < b.ends_on
+                     AND (b.category_id IS NULL OR d.category_id = b.category_id)
+               GROUP BY b.id, b.category_id, b.period, b.month, b.amount,
+                        b.starts_on, b.ends_on, c.name
+               ORDER BY b.starts_on DESC, b.ends_on DESC,
+                        b.category_id IS NOT NULL, c.name""",
+            (user_id, limit)
         )
-        budgets = cur.fetchall()
+        rows = cur.fetchall()
         cur.close()
+        today = date.today()
+        return [dict(Budget._status(r, Money.of(r["spent"])),
+                     starts_on=r["starts_on"], ends_on=r["ends_on"],
+                     in_progress=r["ends_on"] > today)
+                for r in rows]
 
-        result = []
-        for b in budgets:
-            cur = get_cursor()
-            if b["category_id"] is None:
-                cur.execute(
-                    """SELECT COALESCE(SUM(amount), 0) AS spent FROM expenses
-                       WHERE user_id = %s AND DATE_FORMAT(date, '%%Y-%%m') = %s""",
-                    (user_id, month)
-                )
-            else:
-                cur.execute(
-                    """SELECT COALESCE(SUM(amount), 0) AS spent FROM expenses
-                       WHERE user_id = %s AND category_id = %s
-                         AND DATE_FORMAT(date, '%%Y-%%m') = %s""",
-                    (user_id, b["category_id"], month)
-                )
-            spent_row = cur.fetchone()
-            cur.close()
-
-            spent  = float(spent_row["spent"])
-            budget = float(b["budget_amt"])
-            pct    = round((spent / budget * 100), 1) if budget > 0 else 0
-
-            result.append({
-                "id":           b["id"],
-                "category_id":  b["category_id"],
-                "label":        b["category_name"] if b["category_name"] else "Overall",
-                "budget":       budget,
-                "spent":        spent,
-                "pct":          pct,
-                "over_80":      pct >= 80 and pct < 100,
-                "overspent":    pct >= 100,
-            })
-
-        return result
+    @staticmethod
+    def _status(b, spent):
+        budget = Money.of(b["amount"])
+        pct    = spent.percent_of(budget)
+        return {
+            "id":           b["id"],
+            "category_id":  b["category_id"],
+            "label":        b["category_name"] if b["category_name"] else "Overall",
+            "period":       b["period"],
+            "period_label": periods.label(b["month"]),
+            "budget":       budget,
+            "spent":        spent,
+            "pct":          pct,
+            "over_80":      pct >= 80 and pct < 100,
+            "overspent":    pct >= 100,
+        }
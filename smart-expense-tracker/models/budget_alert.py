@@ -0,0 +1,128 @@
+"""
+models/budget_alert.py
+Budget alert rules, evaluated incrementally on every expense write.
+
+An expense dated d can only move the budgets of its category and the
+overall ones whose period contains d: d's month, ISO week, quarter and
+year, and the rolling windows that reach back to d. evaluate() runs on the
+writer's cursor, after the rollup delta has been applied, and checks just
+those budgets. Spending comes from UserMetrics.budget_spend(): at most
+twelve months of expense_rollups for calendar periods, and a range read of
+expense_daily only for weeks and rolling windows, never a rescan of
+expenses.
+The first time a budget reaches a threshold, a budget_alerts row is
+inserted and a notification is created (models/notification.py). The
+table's primary key means a crossing fires once: if spending dips back
+under and crosses again, nothing new fires, and neither does a concurrent
+write that crosses at the same moment. Rolling windows have no end, so
+their thresholds re-arm once a later check finds spending back below them.
+"""
+
+from datetime import date
+
+from models import periods
+from models.metrics import UserMetrics
+from models.notification import Notification
+
+BUDGETS_LINK = "/budgets"   # no url_for: also runs outside requests (group commit, CLI)
+
+# (percent of budget, notification title); the dashboard's over_80 / overspent
+THRESHOLDS = (
+    (80,  "{label} budget {pct}% used"),
+    (100, "{label} budget exceeded"),
+)
+
+_BUDGET_COLUMNS = """b.id, b.category_id, b.period, b.month, b.amount,
+                     c.name AS category_name
+                     FROM budgets b
+                     LEFT JOIN categories c ON c.id = b.category_id"""
+
+
+class BudgetAlerts:
+
+    @staticmethod
+    def evaluate(cur, user_id, days, category_ids=()):
+        """
+        Re-check the budgets that expenses dated `days` in `category_ids`
+        can move, on the caller's cursor (caller commits). Returns the
+        thresholds newly crossed as [(budget_id, percent)].
+        """
+        days = {periods.as_date(d) for d in days}
+        if not days:
+            return []
+        keys = sorted({k for d in days for k in periods.calendar_keys(d)})
+        cats = [c for c in set(category_ids) if c is not None]
+        cat_marks = ", ".join(["%s"] * len(cats)) or "NULL"
+        key_marks = ", ".join(["%s"] * len(keys))
+        cur.execute(
+            f"""SELECT {_BUDGET_COLUMNS}
+                WHERE b.user_id = %s
+                  AND (b.category_id IS NULL OR b.category_id IN ({cat_marks}))
+                  AND (b.month IN ({key_marks}) OR b.period = 'rolling')""",
+            (user_id, *cats, *keys)
+        )
+        today   = date.today()
+        budgets = [b for b in cur.fetchall()
+                   if b["period"] != "rolling"
+                   or any(periods.bounds(b["month"], today)[0] <= d <= today for d in days)]
+        return BudgetAlerts._check(cur, user_id, budgets, today)
+
+    @staticmethod
+    def evaluate_budgets(cur, user_id, budget_ids):
+        """Re-check specific budgets (after one is set or changed)."""
+        cur.execute(
+            f"""SELECT {_BUDGET_COLUMNS}
+                WHERE b.user_id = %s AND b.id IN ({", ".join(["%s"] * len(budget_ids))})""",
+            (user_id, *budget_ids)
+        )
+        return BudgetAlerts._check(cur, user_id, cur.fetchall(), date.today())
+
+    @staticmethod
+    def _check(cur, user_id, budgets, today):
+        if not budgets:
+            return []
+        spend  = UserMetrics.budget_spend(cur, user_id, budgets, today)
+        status = [(b, spent, spent.percent_of(b["amount"])) for b, spent in zip(budgets, spend)]
+        if not any(pct >= THRESHOLDS[0][0] or b["period"] == "rolling"
+                   for b, _, pct in status):
+            return []
+
+        cur.execute(
+            f"""SELECT budget_id, threshold FROM budget_alerts
+                WHERE user_id = %s AND budget_id IN ({", ".join(["%s"] * len(budgets))})""",
+            (user_id, *[b["id"] for b in budgets])
+        )
+        fired        = {(r["budget_id"], r["threshold"]) for r in cur.fetchall()}
+        new, crossed = [], {}
+        for b, spent, pct in status:
+            for threshold, title in THRESHOLDS:
+                if (b["id"], threshold) in fired:
+                    if pct < threshold and b["period"] == "rolling":    # the window moved on
+                        cur.execute(
+                            """DELETE FROM budget_alerts
+                               WHERE user_id = %s AND budget_id = %s AND threshold = %s""",
+                            (user_id, b["id"], threshold)
+                        )
+                    continue
+                if pct < threshold:
+                    continue
+                cur.execute(
+                    """INSERT INTO budget_alerts (user_id, budget_id, threshold, month, spent, budget)
+                       VALUES (%s, %s, %s, %s, %s, %s)
+                       ON DUPLICATE KEY UPDATE threshold = threshold""",
+                    (user_id, b["id"], threshold, b["month"], spent.to_decimal(), b["amount"])
+                )
+                if cur.rowcount == 1:           # 0: another transaction got there first
+                    new.append((b["id"], threshold))
+                    crossed[b["id"]] = (b, spent, pct, title)   # notify the highest
+
+        for b, spent, pct, title in crossed.values():
+            label = b["category_name"] or "Overall"
+            Notification.create(
+                cur, user_id, "budget",
+                title.format(label=label, pct=int(pct)),
+                f"₹{spent:,.2f} of your ₹{b['amount']:,.2f} {label.lower()} budget "
+                f"spent in {periods.label(b['month'])} ({pct}%).",
+                BUDGETS_LINK,
+            )
+        return new
@@ -3,7 +3,32 @@ models/expense.py
 Expense model — MySQL 8, dict cursors, full analytics including smart metrics.
 """
 
-from db import get_cursor
+import time
+
+from db import get_cursor, commit, scatter, after_commit
+from models.metrics import UserMetrics
+from models.analytics_cache import AnalyticsCache
+from models.anomaly import Anomaly, CategoryStats
+from models.archive import Archive
+from models.budget_alert import BudgetAlerts
+from models.money import Money, ZERO, sql_paise
+from models.sync import Sync
+
+CATEGORIES_TTL = 300    # seconds a worker may keep using its category list
+
+# List orders; every one ends in id so pages can be keyed on (column, id)
+SORTS = {
+    "date_desc":   "e.date DESC, e.id DESC",
+    "date_asc":    "e.date ASC, e.id ASC",
+    "amount_desc": "e.amount DESC, e.id DESC",
+    "amount_asc":  "e.amount ASC, e.id ASC",
+}
+
+# Row layout of stream_snapshot(), written out by analytics/snapshot.py
+SNAPSHOT_COLUMNS = ("id", "user_id", "category_id", "amount_paise", "description",
+                    "date", "created_at", "archived")
+
+_categories = {"rows": None, "at": 0.0}
 
 
 class Expense:
@@ -12,24 +37,69 @@ class Expense:
 
     @staticmethod
     def create(user_id, category_id, amount, description, date):
-        cur = get_cursor()
+        cur = get_cursor(user_id=user_id)
         cur.execute(
             """INSERT INTO expenses (user_id, category_id, amount, description, date)
                VALUES (%s, %s, %s, %s, %s)""",
             (user_id, category_id, amount, description, date)
         )
-        cur._connection.commit()
         last_id = cur.lastrowid
+        UserMetrics.record(cur, user_id, date, category_id, amount)
+        BudgetAlerts.evaluate(cur, user_id, [date], [category_id])
+        CategoryStats.record(cur, user_id, category_id, amount)
+        Sync.record(cur, user_id, "expense", [last_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
+        after_commit(lambda: Expense._created(user_id, [last_id], [(description, category_id)]))
         return last_id
 
     @staticmethod
-    def get_by_id(expense_id, user_id):
-        cur = get_cursor()
+    def create_many(user_id, rows):
+        """
+        Insert many expenses for one user: one rollup delta per (month,
+        category) and (day, category) and a single cache invalidation.
+        rows: dicts with category_id, amount, description, date. Returns the
+        new ids.
+        """
+        cur = get_cursor(user_id=user_id)
+        ids = []
+        for r in rows:
+            cur.execute(
+                """INSERT INTO expenses (user_id, category_id, amount, description, date)
+                   VALUES (%s, %s, %s, %s, %s)""",
+                (user_id, r["category_id"], r["amount"], r["description"], r["date"])
+            )
+            ids.append(cur.lastrowid)
+        UserMetrics.record_many(cur, user_id, rows)
+        BudgetAlerts.evaluate(cur, user_id, {r["date"] for r in rows},
+                              {r["category_id"] for r in rows})
+        CategoryStats.record_many(cur, user_id, rows)
+        Sync.record(cur, user_id, "expense", ids)
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
+        cur.close()
+        after_commit(lambda: Expense._created(
+            user_id, ids, [(r["description"], r["category_id"]) for r in rows]))
+        return ids
+
+    @staticmethod
+    def _created(user_id, ids, labelled):
+        """after_commit hook: queue new expenses for scoring and teach the categorizer."""
+        from services import categorizer
+
+        Anomaly.watch(user_id, ids)
+        categorizer.learn(user_id, labelled)
+
+    @staticmethod
+    def get_by_id(expense_id, user_id, for_update=False):
+        """for_update: lock the row until the enclosing transaction ends."""
+        cur = get_cursor(user_id=user_id)
         cur.execute(
             """SELECT e.*, c.name AS category_name
                FROM expenses e JOIN categories c ON c.id = e.category_id
-               WHERE e.id = %s AND e.user_id = %s""",
+               WHERE e.id = %s AND e.user_id = %s"""
+            + (" FOR UPDATE OF e" if for_update else ""),
             (expense_id, user_id)
         )
         row = cur.fetchone()
@@ -39,85 +109,206 @@ class Expense:
     @staticmethod
     def get_all(user_id, date_from=None, date_to=None, category_id=None,
                 search=None, amount_min=None, amount_max=None, sort="date_desc"):
-        query = """
+        # Only ranges reaching back past the archive cutoff read the archive;
+        # archived rows come back with archived = 1 (read-only in the UI).
+        conditions, params = Expense._filters(date_from, date_to, category_id,
+                                              search, amount_min, amount_max)
+        return Expense._list(Archive.source(user_id, date_from), user_id,
+                             conditions, params, SORTS.get(sort, SORTS["date_desc"]))
+
+    @staticmethod
+    def get_page(user_id, date_from=None, date_to=None, category_id=None,
+                 search=None, amount_min=None, amount_max=None, sort="date_desc",
+                 after=None, limit=100):
+        """
+        One page of get_all(): (rows, key of the last row, or None when no
+        page follows). `after` is the previous page's key, (date or amount,
+        id), so every page is an index range scan however deep it is.
+
+        Newest first (the default), every hot row sorts before every archived
+        one. The page is read from the hot table alone and the archive is
+        only added once the page runs past the cutoff. A range that ends
+        before the cutoff, or another sort over a range reaching back past
+        it, reads both tables.
+        """
+        sort   = sort if sort in SORTS else "date_desc"
+        column = "amount" if sort.startswith("amount") else "date"
+        conditions, params = Expense._filters(date_from, date_to, category_id,
+                                              search, amount_min, amount_max)
+        if after is not None:
+            op = ">" if sort.endswith("_asc") else "<"
+            conditions += f" AND (e.{column} {op} %s OR (e.{column} = %s AND e.id {op} %s))"
+            params     += [after[0], after[0], after[1]]
+
+        cutoff = Archive.cutoff()
+        rows   = None
+        if sort == "date_desc" and not (cutoff and date_to and str(date_to) < cutoff):
+            rows = Expense._list(("expenses e", [], "0"), user_id,
+                                 conditions, params, SORTS[sort], limit + 1)
+            if Archive.needed(date_from) and (len(rows) <= limit
+                                              or str(rows[-1]["date"]) < cutoff):
+                rows = None     # the rest of the page is in (or interleaves with) the archive
+        if rows is None:
+            rows = Expense._list(Archive.source(user_id, date_from), user_id,
+                                 conditions, params, SORTS[sort], limit + 1)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1][column], rows[-1]["id"])
+
+    @staticmethod
+    def _filters(date_from, date_to, category_id, search, amount_min, amount_max):
+        """(' AND …' conditions on alias e, params) for the list filters."""
+        conditions, params = "", []
+        for value, sql in ((date_from,   " AND e.date >= %s"),
+                           (date_to,     " AND e.date <= %s"),
+                           (category_id, " AND e.category_id = %s"),
+                           (search and f"%{search}%", " AND e.description LIKE %s")):
+            if value:
+                conditions += sql
+                params.append(value)
+        for value, sql in ((amount_min, " AND e.amount >= %s"),
+                           (amount_max, " AND e.amount <= %s")):
+            if value is not None:
+                conditions += sql
+                params.append(value)
+        return conditions, params
+
+    @staticmethod
+    def _list(source, user_id, conditions, params, order, limit=None):
+        """List rows from an Archive.source() triple (from_sql, params, archived_expr)."""
+        from_sql, source_params, archived = source
+        query = f"""
             SELECT e.id, e.amount, e.description, e.date,
-                   c.name AS category_name, e.category_id, e.created_at
-            FROM expenses e
+                   c.name AS category_name, e.category_id, e.created_at,
+                   {archived} AS archived
+            FROM {from_sql}
             JOIN categories c ON c.id = e.category_id
-            WHERE e.user_id = %s
+            WHERE e.user_id = %s{conditions}
+            ORDER BY {order}"""
+        args = [*source_params, user_id, *params]
+        if limit is not None:
+            query += " LIMIT %s"
+            args.append(limit)
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(query, args)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def changed_since(user_id, since=None):
+        """
+        Rows (archive included) updated at or after `since`, or all of them,
+        for API sync. Read from the primary: the caller's sync clock must
+        never be ahead of the rows it returned.
         """
-        params = [user_id]
-
-        if date_from:
-            query += " AND e.date >= %s"
-            params.append(date_from)
-        if date_to:
-            query += " AND e.date <= %s"
-            params.append(date_to)
-        if category_id:
-            query += " AND e.category_id = %s"
-            params.append(category_id)
-        if search:
-            query += " AND e.description LIKE %s"
-            params.append(f"%{search}%")
-        if amount_min is not None:
-            query += " AND e.amount >= %s"
-            params.append(amount_min)
-        if amount_max is not None:
-            query += " AND e.amount <= %s"
-            params.append(amount_max)
-
-        sort_map = {
-            "date_desc":    "e.date DESC, e.id DESC",
-            "date_asc":     "e.date ASC,  e.id ASC",
-            "amount_desc":  "e.amount DESC",
-            "amount_asc":   "e.amount ASC",
-        }
-        query += " ORDER BY " + sort_map.get(sort, "e.date DESC, e.id DESC")
-
-        cur = get_cursor()
-        cur.execute(query, params)
+        cols = "id, category_id, amount, description, date, created_at, updated_at"
+        cond = "user_id = %s" + (" AND updated_at >= %s" if since else "")
+        params = (user_id, since) if since else (user_id,)
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {cols}, 0 AS archived FROM expenses WHERE {cond}
+                UNION ALL
+                SELECT {cols}, 1 AS archived FROM expenses_archive WHERE {cond}
+                ORDER BY updated_at, id""",
+            params * 2
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def get_many(user_id, ids):
+        """Rows (archive included) with the given ids, in the shape of changed_since."""
+        if not ids:
+            return []
+        cols  = "id, category_id, amount, description, date, created_at, updated_at"
+        marks = ", ".join(["%s"] * len(ids))
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {cols}, 0 AS archived FROM expenses
+                WHERE user_id = %s AND id IN ({marks})
+                UNION ALL
+                SELECT {cols}, 1 AS archived FROM expenses_archive
+                WHERE user_id = %s AND id IN ({marks})""",
+            (user_id, *ids, user_id, *ids)
+        )
         rows = cur.fetchall()
         cur.close()
         return rows
 
+    @staticmethod
+    def _lock_for_write(cur, expense_id, user_id):
+        """Current row values (locked), so rollups can back out the old amount."""
+        cur.execute(
+            """SELECT category_id, amount, date FROM expenses
+               WHERE id = %s AND user_id = %s FOR UPDATE""",
+            (expense_id, user_id)
+        )
+        return cur.fetchone()
+
     @staticmethod
     def update(expense_id, user_id, category_id, amount, description, date):
-        cur = get_cursor()
+        cur = get_cursor(user_id=user_id)
+        old = Expense._lock_for_write(cur, expense_id, user_id)
         cur.execute(
             """UPDATE expenses
                SET category_id=%s, amount=%s, description=%s, date=%s
                WHERE id=%s AND user_id=%s""",
             (category_id, amount, description, date, expense_id, user_id)
         )
-        cur._connection.commit()
+        if old:
+            UserMetrics.record(cur, user_id, old["date"], old["category_id"],
+                               -old["amount"], -1)
+            UserMetrics.record(cur, user_id, date, category_id, amount)
+            BudgetAlerts.evaluate(cur, user_id, [date], [category_id])
+            CategoryStats.record(cur, user_id, old["category_id"], old["amount"], -1)
+            CategoryStats.record(cur, user_id, category_id, amount)
+            Anomaly.forget(cur, user_id, expense_id)
+            Sync.record(cur, user_id, "expense", [expense_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
+        if old:
+            after_commit(lambda: Anomaly.watch(user_id, [expense_id]))
 
     @staticmethod
     def delete(expense_id, user_id):
-        cur = get_cursor()
+        cur = get_cursor(user_id=user_id)
+        old = Expense._lock_for_write(cur, expense_id, user_id)
         cur.execute(
             "DELETE FROM expenses WHERE id = %s AND user_id = %s",
             (expense_id, user_id)
         )
-        cur._connection.commit()
+        if old:
+            UserMetrics.record(cur, user_id, old["date"], old["category_id"],
+                               -old["amount"], -1)
+            CategoryStats.record(cur, user_id, old["category_id"], old["amount"], -1)
+            Anomaly.forget(cur, user_id, expense_id)
+            Sync.record(cur, user_id, "expense", [expense_id], "delete")
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
 
     # ── Category helpers ──────────────────────────────────────
 
     @staticmethod
     def get_all_categories():
-        cur = get_cursor()
-        cur.execute("SELECT id, name FROM categories ORDER BY name")
-        rows = cur.fetchall()
-        cur.close()
-        return rows
+        """Categories by name; seeded reference data, so cached per worker for CATEGORIES_TTL."""
+        if time.monotonic() - _categories["at"] > CATEGORIES_TTL:
+            cur = get_cursor(readonly=True)
+            cur.execute("SELECT id, name FROM categories ORDER BY name")
+            _categories["rows"] = tuple(cur.fetchall())
+            _categories["at"]   = time.monotonic()
+            cur.close()
+        return list(_categories["rows"])
 
     # ── Analytics ─────────────────────────────────────────────
 
     @staticmethod
     def get_monthly_total(user_id):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT DATE_FORMAT(date, '%%Y-%%m') AS month,
                       SUM(amount)                  AS total
@@ -135,13 +326,14 @@ class Expense:
     @staticmethod
     def get_category_distribution(user_id):
         """Category totals for current month."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT c.name AS category, SUM(e.amount) AS total
                FROM expenses e
                JOIN categories c ON c.id = e.category_id
                WHERE e.user_id = %s
-                 AND DATE_FORMAT(e.date, '%%Y-%%m') = DATE_FORMAT(CURDATE(), '%%Y-%%m')
+                 AND e.date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                 AND e.date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01') + INTERVAL 1 MONTH
                GROUP BY c.id, c.name
                ORDER BY total DESC""",
             (user_id,)
@@ -150,44 +342,67 @@ class Expense:
         cur.close()
         return rows
 
+    @staticmethod
+    def get_daily_totals(user_id, date_from, date_to, by_category=False):
+        """Per-day totals (optionally per category) over an inclusive date range."""
+        source, params, _ = Archive.source(user_id, date_from)
+        if by_category:
+            query = f"""SELECT e.date, c.name AS category_name, SUM(e.amount) AS total
+                        FROM {source}
+                        JOIN categories c ON c.id = e.category_id
+                        WHERE e.user_id = %s AND e.date BETWEEN %s AND %s
+                        GROUP BY e.date, c.id, c.name"""
+        else:
+            query = f"""SELECT e.date, SUM(e.amount) AS total
+                        FROM {source}
+                        WHERE e.user_id = %s AND e.date BETWEEN %s AND %s
+                        GROUP BY e.date"""
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(query, (*params, user_id, date_from, date_to))
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
     @staticmethod
     def get_current_month_total(user_id):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT COALESCE(SUM(amount), 0) AS total
                FROM expenses
                WHERE user_id = %s
-                 AND DATE_FORMAT(date, '%%Y-%%m') = DATE_FORMAT(CURDATE(), '%%Y-%%m')""",
+                 AND date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                 AND date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01') + INTERVAL 1 MONTH""",
             (user_id,)
         )
         row = cur.fetchone()
         cur.close()
-        return float(row["total"]) if row else 0.0
+        return Money.of(row["total"]) if row else ZERO
 
     @staticmethod
     def get_last_month_total(user_id):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT COALESCE(SUM(amount), 0) AS total
                FROM expenses
                WHERE user_id = %s
-                 AND DATE_FORMAT(date, '%%Y-%%m') = DATE_FORMAT(
-                       DATE_SUB(CURDATE(), INTERVAL 1 MONTH), '%%Y-%%m')""",
+                 AND date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01') - INTERVAL 1 MONTH
+                 AND date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01')""",
             (user_id,)
         )
         row = cur.fetchone()
         cur.close()
-        return float(row["total"]) if row else 0.0
+        return Money.of(row["total"]) if row else ZERO
 
     @staticmethod
     def get_top_category(user_id):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT c.name AS category, SUM(e.amount) AS total
                FROM expenses e
                JOIN categories c ON c.id = e.category_id
                WHERE e.user_id = %s
-                 AND DATE_FORMAT(e.date, '%%Y-%%m') = DATE_FORMAT(CURDATE(), '%%Y-%%m')
+                 AND e.date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                 AND e.date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01') + INTERVAL 1 MONTH
                GROUP BY c.id, c.name
                ORDER BY total DESC
                LIMIT 1""",
@@ -200,13 +415,14 @@ class Expense:
     @staticmethod
     def get_top3_categories(user_id):
         """Top 3 spending categories this month."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT c.name AS category, SUM(e.amount) AS total
                FROM expenses e
                JOIN categories c ON c.id = e.category_id
                WHERE e.user_id = %s
-                 AND DATE_FORMAT(e.date, '%%Y-%%m') = DATE_FORMAT(CURDATE(), '%%Y-%%m')
+                 AND e.date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                 AND e.date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01') + INTERVAL 1 MONTH
                GROUP BY c.id, c.name
                ORDER BY total DESC
                LIMIT 3""",
@@ -219,25 +435,26 @@ class Expense:
     @staticmethod
     def get_avg_daily_spend(user_id):
         """Average daily spend for current month (days elapsed so far)."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT COALESCE(SUM(amount), 0) AS total,
                       DAY(CURDATE()) AS days_elapsed
                FROM expenses
                WHERE user_id = %s
-                 AND DATE_FORMAT(date, '%%Y-%%m') = DATE_FORMAT(CURDATE(), '%%Y-%%m')""",
+                 AND date >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+                 AND date <  DATE_FORMAT(CURDATE(), '%%Y-%%m-01') + INTERVAL 1 MONTH""",
             (user_id,)
         )
         row = cur.fetchone()
         cur.close()
         if row and row["days_elapsed"]:
-            return float(row["total"]) / row["days_elapsed"]
-        return 0.0
+            return Money.of(row["total"]) / row["days_elapsed"]
+        return ZERO
 
     @staticmethod
     def get_predicted_next_month(user_id):
         """Predict next month spend using 3-month moving average."""
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT SUM(amount) AS total
                FROM expenses
@@ -250,12 +467,12 @@ class Expense:
         row = cur.fetchone()
         cur.close()
         if row and row["total"]:
-            return float(row["total"]) / 3
-        return 0.0
+            return Money.of(row["total"]) / 3
+        return ZERO
 
     @staticmethod
     def get_recent(user_id, limit=5):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
             """SELECT e.id, e.amount, e.description, e.date,
                       c.name AS category_name
@@ -272,17 +489,80 @@ class Expense:
 
     @staticmethod
     def get_total_by_user(user_id):
-        """All-time total for a user (used in admin)."""
-        cur = get_cursor()
+        """All-time total for a user (used in admin), archive included via rollups."""
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
-            "SELECT COALESCE(SUM(amount), 0) AS total FROM expenses WHERE user_id = %s",
+            "SELECT COALESCE(SUM(total), 0) AS total FROM expense_rollups WHERE user_id = %s",
             (user_id,)
         )
         row = cur.fetchone()
         cur.close()
-        return float(row["total"]) if row else 0.0
+        return Money.of(row["total"]) if row else ZERO
+
+    @staticmethod
+    def get_totals_by_user():
+        """{user_id: all-time total} for every user, gathered from all shards."""
+        rows = scatter(
+            """SELECT user_id, SUM(total) AS total FROM expense_rollups
+               GROUP BY user_id"""
+        )
+        return {r["user_id"]: Money.of(r["total"]) for r in rows}
 
     @staticmethod
     def export_all(user_id, date_from=None, date_to=None, category_id=None):
         """All expenses for export (CSV/PDF) — same filters as get_all."""
         return Expense.get_all(user_id, date_from, date_to, category_id)
+
+    @staticmethod
+    def get_labelled(user_id=None, limit=5000):
+        """
+        Latest (description, category_id) rows for training the categorizer:
+        one user's, or everyone's (up to `limit` per shard).
+        """
+        if user_id is None:
+            return scatter(
+                "SELECT description, category_id FROM expenses ORDER BY id DESC LIMIT %s",
+                (limit,)
+            )
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT description, category_id FROM expenses
+               WHERE user_id = %s
+               ORDER BY date DESC, id DESC
+               LIMIT %s""",
+            (user_id, limit)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def stream_snapshot(user_id=None, shard=None, batch=50_000):
+        """
+        Every expense, archive included, for one user (or everyone on `shard`)
+        as lists of tuples in SNAPSHOT_COLUMNS order, `batch` rows at a time.
+        The cursor is unbuffered, so the server streams rows as they are
+        fetched and memory stays at one batch. One statement, one snapshot.
+        Dates come back as plain ints (days / seconds since 1970-01-01),
+        which are much cheaper to turn into arrays than date objects.
+        """
+        columns = (f"id, user_id, category_id, {sql_paise('amount')}, description, "
+                   "DATEDIFF(date, '1970-01-01'), "
+                   "TIMESTAMPDIFF(SECOND, '1970-01-01', created_at)")
+        where   = "" if user_id is None else "WHERE user_id = %s"
+        params  = () if user_id is None else (user_id, user_id)
+        cur = get_cursor(dictionary=False, readonly=True, user_id=user_id, shard=shard)
+        cur.execute(
+            f"""SELECT {columns}, 0 FROM expenses {where}
+                UNION ALL
+                SELECT {columns}, 1 FROM expenses_archive {where}""",
+            params
+        )
+        try:
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
@@ -0,0 +1,67 @@
+"""
+models/idempotency.py
+Idempotency-Key store for JSON API writes.
+
+The key row is inserted at the start of the request's transaction and
+filled in with the response before it commits, so a key exists if and only
+if its write landed. A retry that races the original blocks on the key's
+row lock until the original commits, then replays its response.
+"""
+
+from db import get_cursor, commit, driver, all_shards
+
+
+class Idempotency:
+
+    @staticmethod
+    def claim(cur, user_id, key, fingerprint, ttl_hours):
+        """
+        Reserve `key` on the caller's cursor, inside its transaction.
+        Returns None when this request owns the key, else the earlier
+        request's row: {fingerprint, status, headers, body}.
+        """
+        cur.execute(
+            """DELETE FROM idempotency_keys
+               WHERE user_id = %s AND idem_key = %s
+                 AND created_at < NOW() - INTERVAL %s HOUR""",
+            (user_id, key, ttl_hours)
+        )
+        try:
+            cur.execute(
+                """INSERT INTO idempotency_keys (user_id, idem_key, fingerprint)
+                   VALUES (%s, %s, %s)""",
+                (user_id, key, fingerprint)
+            )
+            return None
+        except driver().errors.IntegrityError as e:
+            if e.errno != driver().errorcode.ER_DUP_ENTRY:
+                raise
+        # Locking read: sees the committed row whatever this transaction's snapshot
+        cur.execute(
+            """SELECT fingerprint, status, headers, body FROM idempotency_keys
+               WHERE user_id = %s AND idem_key = %s FOR UPDATE""",
+            (user_id, key)
+        )
+        return cur.fetchone()
+
+    @staticmethod
+    def store(cur, user_id, key, status, headers, body):
+        """Record the response for a claimed key (committed with the request)."""
+        cur.execute(
+            """UPDATE idempotency_keys SET status = %s, headers = %s, body = %s
+               WHERE user_id = %s AND idem_key = %s""",
+            (status, headers, body, user_id, key)
+        )
+
+    @staticmethod
+    def prune(ttl_hours):
+        """Drop expired keys on every database; returns rows removed."""
+        removed = 0
+        for shard in all_shards():
+            cur = get_cursor(shard=shard)
+            cur.execute("DELETE FROM idempotency_keys WHERE created_at < NOW() - INTERVAL %s HOUR",
+                        (ttl_hours,))
+            removed += cur.rowcount
+            commit(cur)
+            cur.close()
+        return removed
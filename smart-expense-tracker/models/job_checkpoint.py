@@ -0,0 +1,35 @@
+"""
+models/job_checkpoint.py
+Progress markers for resumable batch jobs (last user id processed per run).
+"""
+
+from db import get_cursor, commit
+
+
+class JobCheckpoint:
+
+    @staticmethod
+    def get(job, run_date):
+        """Last user id finished by `job` on run_date, or 0 to start over."""
+        cur = get_cursor()
+        cur.execute(
+            """SELECT last_user_id FROM job_checkpoints
+               WHERE job = %s AND run_date = %s""",
+            (job, run_date)
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row["last_user_id"] if row else 0
+
+    @staticmethod
+    def save(job, run_date, last_user_id):
+        cur = get_cursor()
+        cur.execute(
+            """INSERT INTO job_checkpoints (job, run_date, last_user_id)
+               VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE run_date     = VALUES(run_date),
+                                       last_user_id = VALUES(last_user_id)""",
+            (job, run_date, last_user_id)
+        )
+        commit(cur)
+        cur.close()
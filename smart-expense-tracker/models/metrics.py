@@ -0,0 +1,300 @@
+"""
+models/metrics.py
+Per-user smart metrics maintained incrementally on every expense write.
+Monthly per-category totals live in expense_rollups, so the dashboard reads
+a handful of small rows instead of re-aggregating raw expenses. Daily ones
+live in expense_daily, for budget periods that are not whole months.
+"""
+
+import heapq
+from datetime import date
+
+from db import get_cursor, commit, all_shards
+from models import periods
+from models.money import Money, ZERO, sql_paise
+from models.periods import DailySpend
+
+
+def month_key(d):
+    """'YYYY-MM' for a date (or ISO date string)."""
+    if not isinstance(d, date):
+        d = date.fromisoformat(str(d))
+    return d.strftime("%Y-%m")
+
+
+def shift_month(month, delta):
+    """Shift a 'YYYY-MM' key by delta months."""
+    year, mon = int(month[:4]), int(month[5:7])
+    idx = year * 12 + (mon - 1) + delta
+    return f"{idx // 12:04d}-{idx % 12 + 1:02d}"
+
+
+def month_bounds(month):
+    """('YYYY-MM-01', first day of the next month) for a sargable date range."""
+    return f"{month}-01", f"{shift_month(month, 1)}-01"
+
+
+class UserMetrics:
+    """
+    In-memory metrics state for one user, built from persisted rollups.
+    apply() keeps sums in O(1) and the top-category heap in O(log categories).
+    """
+
+    HISTORY_MONTHS = 12
+
+    def __init__(self, today=None):
+        self.today    = today or date.today()
+        self.month    = month_key(self.today)
+        self.months   = {}   # 'YYYY-MM' -> Money total
+        self.by_cat   = {}   # category_id -> current-month Money total
+        self.names    = {}   # category_id -> name
+        self._heap    = []   # (-total, category_id), lazily invalidated
+
+    # ── Mutation ──────────────────────────────────────────────
+
+    def apply(self, month, category_id, delta, name=None):
+        """Fold one amount delta (Money or Decimal) into the state (negative for removals)."""
+        self.months[month] = self.months.get(month, ZERO) + delta
+        if name:
+            self.names[category_id] = name
+        if month == self.month:
+            total = self.by_cat.get(category_id, ZERO) + delta
+            self.by_cat[category_id] = total
+            heapq.heappush(self._heap, (-total, category_id))
+            if len(self._heap) > 2 * len(self.by_cat) + 8:
+                self._heap = [(-t, c) for c, t in self.by_cat.items()]
+                heapq.heapify(self._heap)
+
+    # ── Reads ─────────────────────────────────────────────────
+
+    def top_categories(self, n=3):
+        """Top-n current-month categories as [{category, total}]."""
+        heap, seen, result = list(self._heap), set(), []
+        while heap and len(result) < n:
+            neg_total, cat_id = heapq.heappop(heap)
+            # Skip superseded totals and categories emptied by deletes
+            if cat_id in seen or -neg_total != self.by_cat.get(cat_id) or neg_total >= 0:
+                continue
+            seen.add(cat_id)
+            result.append({"category": self.names.get(cat_id, "Unknown"),
+                           "total": -neg_total})
+        return result
+
+    def category_distribution(self):
+        return self.top_categories(n=len(self.by_cat))
+
+    def month_total(self, offset=0):
+        return self.months.get(shift_month(self.month, offset), ZERO)
+
+    @property
+    def current_total(self):
+        return self.month_total(0)
+
+    @property
+    def last_total(self):
+        return self.month_total(-1)
+
+    @property
+    def trailing3_total(self):
+        return sum(self.month_total(-i) for i in (1, 2, 3))
+
+    @property
+    def avg_daily(self):
+        return self.current_total / self.today.day
+
+    @property
+    def predicted_next(self):
+        return self.trailing3_total / 3
+
+    @property
+    def growth_pct(self):
+        return float((self.current_total - self.last_total).percent_of(self.last_total))
+
+    def monthly_series(self):
+        """(labels, totals) for the trailing HISTORY_MONTHS months with spend."""
+        start = shift_month(self.month, -(self.HISTORY_MONTHS - 1))
+        labels = sorted(m for m, t in self.months.items()
+                        if start <= m <= self.month and t)
+        return labels, [self.months[m] for m in labels]
+
+    # ── Persistence ───────────────────────────────────────────
+
+    @staticmethod
+    def load(user_id, today=None):
+        """Build the state from expense_rollups with a single indexed query."""
+        state = UserMetrics(today)
+        start = shift_month(state.month, -(UserMetrics.HISTORY_MONTHS - 1))
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT r.month, r.category_id, r.total, c.name AS category_name
+               FROM expense_rollups r
+               JOIN categories c ON c.id = r.category_id
+               WHERE r.user_id = %s AND r.month >= %s""",
+            (user_id, start)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        for r in rows:
+            state.apply(r["month"], r["category_id"], r["total"], r["category_name"])
+        return state
+
+    @staticmethod
+    def monthly_totals(user_id, start_month, end_month):
+        """Rollup rows {month, category_id, category_name, total} in a month range."""
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT r.month, r.category_id, c.name AS category_name, r.total
+               FROM expense_rollups r
+               JOIN categories c ON c.id = r.category_id
+               WHERE r.user_id = %s AND r.month BETWEEN %s AND %s""",
+            (user_id, start_month, end_month)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def month_spent(cur, user_id, month):
+        """
+        {category_id: Money} spent in one month, from the running rollups on
+        the caller's cursor (so a write transaction sees its own deltas).
+        """
+        cur.execute(
+            """SELECT category_id, total FROM expense_rollups
+               WHERE user_id = %s AND month = %s""",
+            (user_id, month)
+        )
+        return {r["category_id"]: Money.of(r["total"]) for r in cur.fetchall()}
+
+    @staticmethod
+    def daily_spend(cur, user_id, start, end):
+        """
+        DailySpend prefix sums over [start, end) from expense_daily, on the
+        caller's cursor: at most days x categories rows, however many
+        expenses they stand for.
+        """
+        cur.execute(
+            f"""SELECT day, category_id, {sql_paise("total")} AS paise FROM expense_daily
+                WHERE user_id = %s AND day >= %s AND day < %s""",
+            (user_id, start, end)
+        )
+        return DailySpend(start, end, [(r["day"], r["category_id"], r["paise"])
+                                       for r in cur.fetchall()])
+
+    @staticmethod
+    def budget_spend(cur, user_id, budgets, today=None):
+        """
+        [Money] spent against each budget (dicts with its key in month and
+        category_id), on the caller's cursor. Months, quarters and years add
+        up their expense_rollups rows, at most 12 months x categories;
+        only weeks and rolling windows read expense_daily.
+        """
+        months = sorted({m for b in budgets if periods.period_of(b["month"]) in periods.MONTHLY
+                         for m in periods.months_in(b["month"])})
+        monthly = {}
+        if months:
+            cur.execute(
+                f"""SELECT month, category_id, {sql_paise("total")} AS paise FROM expense_rollups
+                    WHERE user_id = %s AND month >= %s AND month <= %s""",
+                (user_id, months[0], months[-1])
+            )
+            for r in cur.fetchall():
+                for key in ((r["month"], r["category_id"]), (r["month"], None)):
+                    monthly[key] = monthly.get(key, 0) + r["paise"]
+        ranges = {b["id"]: periods.bounds(b["month"], today) for b in budgets
+                  if periods.period_of(b["month"]) not in periods.MONTHLY}
+        daily  = UserMetrics.daily_spend(cur, user_id,
+                                         min(s for s, _ in ranges.values()),
+                                         max(e for _, e in ranges.values())) if ranges else None
+        return [daily.spent(*ranges[b["id"]], b["category_id"]) if b["id"] in ranges
+                else Money(sum(monthly.get((m, b["category_id"]), 0)
+                               for m in periods.months_in(b["month"])))
+                for b in budgets]
+
+    @staticmethod
+    def record(cur, user_id, expense_date, category_id, amount, count=1):
+        """
+        Apply an expense delta to the persisted rollups on the caller's cursor.
+        Call with negative amount/count for the old values of edits and deletes;
+        the caller commits together with the expense write.
+        """
+        cur.execute(
+            """INSERT INTO expense_rollups (user_id, month, category_id, total, cnt)
+               VALUES (%s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                       cnt   = cnt   + VALUES(cnt)""",
+            (user_id, month_key(expense_date), category_id, amount, count)
+        )
+        cur.execute(
+            """INSERT INTO expense_daily (user_id, day, category_id, total, cnt)
+               VALUES (%s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                       cnt   = cnt   + VALUES(cnt)""",
+            (user_id, expense_date, category_id, amount, count)
+        )
+
+    @staticmethod
+    def record_many(cur, user_id, rows):
+        """
+        record() for many new expenses (dicts with date, category_id, amount):
+        one upsert per touched (month, category) and (day, category).
+        """
+        monthly, daily = {}, {}
+        for r in rows:
+            for deltas, key in ((monthly, (month_key(r["date"]), r["category_id"])),
+                                (daily,   (str(r["date"]), r["category_id"]))):
+                amount, count = deltas.get(key, (0, 0))
+                deltas[key] = (amount + r["amount"], count + 1)
+        for table, column, deltas in (("expense_rollups", "month", monthly),
+                                      ("expense_daily",   "day",   daily)):
+            cur.executemany(
+                f"""INSERT INTO {table} (user_id, {column}, category_id, total, cnt)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                            cnt   = cnt   + VALUES(cnt)""",
+                [(user_id, key, category_id, amount, count)
+                 for (key, category_id), (amount, count) in deltas.items()]
+            )
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute rollups from raw expenses, archive included (all users, or one)."""
+        params = (user_id, user_id)
+        for shard in ([None] if user_id is not None else all_shards()):
+            UserMetrics._rebuild_on(get_cursor(user_id=user_id, shard=shard), params)
+
+    @staticmethod
+    def _rebuild_on(cur, params):
+        cur.execute(
+            "DELETE FROM expense_rollups WHERE (%s IS NULL OR user_id = %s)",
+            params
+        )
+        cur.execute(
+            "DELETE FROM expense_daily WHERE (%s IS NULL OR user_id = %s)",
+            params
+        )
+        cur.execute(
+            """INSERT INTO expense_rollups (user_id, month, category_id, total, cnt)
+               SELECT user_id, DATE_FORMAT(date, '%%Y-%%m'), category_id,
+                      SUM(amount), COUNT(*)
+               FROM (SELECT user_id, category_id, amount, date FROM expenses
+                     WHERE (%s IS NULL OR user_id = %s)
+                     UNION ALL
+                     SELECT user_id, category_id, amount, date FROM expenses_archive
+                     WHERE (%s IS NULL OR user_id = %s)) e
+               GROUP BY user_id, DATE_FORMAT(date, '%%Y-%%m'), category_id""",
+            params * 2
+        )
+        cur.execute(
+            """INSERT INTO expense_daily (user_id, day, category_id, total, cnt)
+               SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+               FROM (SELECT user_id, category_id, amount, date FROM expenses
+                     WHERE (%s IS NULL OR user_id = %s)
+                     UNION ALL
+                     SELECT user_id, category_id, amount, date FROM expenses_archive
+                     WHERE (%s IS NULL OR user_id = %s)) e
+               GROUP BY user_id, date, category_id""",
+            params * 2
+        )
+        commit(cur)
+        cur.close()
@@ -0,0 +1,171 @@
+"""
+models/money.py
+Money as an exact integer number of paise.
+
+MySQL stores amounts as DECIMAL(10,2) and the connector returns them as
+Decimal. Money.of() converts each value to paise once, where it leaves the
+model. After that, sums, differences and comparisons are plain int
+arithmetic, which is exact and cheaper than Decimal or float. Dividing by a
+count (averages, per-day rates) rounds half-up to the paisa. Ratios
+(percentages, forecasting maths) are the only values that become float.
+
+Where many rows are summed in Python, paise_array() and sum_paise() fold
+them with NumPy int64, which is exact up to about 9.2e16 paise. NumPy is
+imported on first use, so it stays off the web worker boot path.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+_HUNDRED = Decimal(100)
+
+
+def to_paise(value):
+    """
+    Exact paise for a rupee amount (Decimal, int, str or float; None = 0).
+    Fractions of a paisa round half-up. A float goes through its shortest
+    repr, so 0.1 gives 10 paise.
+    """
+    if type(value) is not Decimal:
+        if value is None:
+            return 0
+        if isinstance(value, Money):
+            return value.paise
+        if isinstance(value, int):
+            return value * 100
+        value = Decimal(str(value))
+    scaled = value * _HUNDRED
+    paise  = int(scaled)
+    return paise if paise == scaled else int(scaled.to_integral_value(ROUND_HALF_UP))
+
+
+def sql_paise(expr):
+    """SQL for `expr` (a DECIMAL(…,2) amount) as integer paise, e.g. sql_paise("SUM(amount)")."""
+    return f"CAST(({expr}) * 100 AS SIGNED)"
+
+
+class Money:
+    """An amount in whole paise. Immutable, hashable, and ordered like its value."""
+
+    __slots__ = ("paise",)
+
+    def __init__(self, paise=0):
+        object.__setattr__(self, "paise", int(paise))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return (Money, (self.paise,))
+
+    @classmethod
+    def of(cls, value):
+        """Money for a rupee amount (see to_paise); Money passes through."""
+        return value if isinstance(value, Money) else cls(to_paise(value))
+
+    @classmethod
+    def sum(cls, values):
+        """Exact total of rupee amounts or Money values."""
+        return cls(sum(to_paise(v) for v in values))
+
+    # ── Conversions ───────────────────────────────────────────
+
+    def to_decimal(self):
+        return Decimal(self.paise).scaleb(-2)
+
+    def __float__(self):
+        return self.paise / 100
+
+    def __str__(self):
+        rupees, paise = divmod(abs(self.paise), 100)
+        return f"{'-' if self.paise < 0 else ''}{rupees}.{paise:02d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec or "")
+
+    # ── Arithmetic ────────────────────────────────────────────
+
+    def __add__(self, other):
+        return Money(self.paise + to_paise(other))
+
+    __radd__ = __add__          # lets sum() start from 0
+
+    def __sub__(self, other):
+        return Money(self.paise - to_paise(other))
+
+    def __rsub__(self, other):
+        return Money(to_paise(other) - self.paise)
+
+    def __neg__(self):
+        return Money(-self.paise)
+
+    def __abs__(self):
+        return Money(abs(self.paise))
+
+    def __mul__(self, n):
+        if not isinstance(n, int):
+            return NotImplemented
+        return Money(self.paise * n)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Money / Money is a float ratio; Money / n is Money, rounded half-up."""
+        if isinstance(other, Money):
+            return self.paise / other.paise
+        quotient = Decimal(self.paise) / Decimal(str(other))
+        return Money(quotient.to_integral_value(ROUND_HALF_UP))
+
+    def percent_of(self, whole, ndigits=1):
+        """self as a percentage of `whole` (0 when whole is not positive)."""
+        whole = to_paise(whole)
+        return round(self.paise * 100 / whole, ndigits) if whole > 0 else 0
+
+    # ── Comparison ────────────────────────────────────────────
+
+    def __bool__(self):
+        return self.paise != 0
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        try:
+            return self.paise == to_paise(other)
+        except (TypeError, ValueError, ArithmeticError):
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self.to_decimal())     # equal Decimals / ints hash alike
+
+    def __lt__(self, other):
+        return self.paise < to_paise(other)
+
+    def __le__(self, other):
+        return self.paise <= to_paise(other)
+
+    def __gt__(self, other):
+        return self.paise > to_paise(other)
+
+    def __ge__(self, other):
+        return self.paise >= to_paise(other)
+
+
+ZERO = Money(0)
+
+
+# ── Column aggregation ────────────────────────────────────────
+
+def paise_array(values):
+    """NumPy int64 array of paise for an iterable of amounts."""
+    import numpy as np
+
+    return np.fromiter(map(to_paise, values), dtype=np.int64)
+
+
+def sum_paise(paise):
+    """Exact Money total of a sequence (or NumPy array) of int paise."""
+    import numpy as np
+
+    return Money(int(np.asarray(paise, dtype=np.int64).sum()))
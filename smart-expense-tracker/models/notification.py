@@ -0,0 +1,122 @@
+"""
+models/notification.py
+In-app notifications, plus the outbox for delivering them elsewhere.
+
+Notifications are written on the caller's cursor, inside the transaction
+that caused them, so a notification exists exactly when its cause
+committed. For each channel in NOTIFY_CHANNELS ('email', 'webhook') the
+same transaction adds an outbox row; `flask notify deliver` sends those
+later (services/outbox.py), so a slow mail server never holds up a write.
+"""
+
+from flask import current_app
+
+from db import get_cursor, commit, all_shards
+
+OUTBOX_MAX_ATTEMPTS = 8
+
+
+class Notification:
+
+    @staticmethod
+    def create(cur, user_id, kind, title, body, link=None):
+        """Add a notification (and its outbox rows) on the caller's cursor; returns its id."""
+        cur.execute(
+            """INSERT INTO notifications (user_id, kind, title, body, link)
+               VALUES (%s, %s, %s, %s, %s)""",
+            (user_id, kind, title[:200], body[:500], link)
+        )
+        notification_id = cur.lastrowid
+        channels = current_app.config["NOTIFY_CHANNELS"]
+        if channels:
+            cur.executemany(
+                """INSERT INTO notification_outbox (user_id, notification_id, channel)
+                   VALUES (%s, %s, %s)""",
+                [(user_id, notification_id, channel) for channel in channels]
+            )
+        return notification_id
+
+    @staticmethod
+    def get_recent(user_id, limit=50):
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            """SELECT id, kind, title, body, link, created_at, read_at
+               FROM notifications
+               WHERE user_id = %s
+               ORDER BY id DESC
+               LIMIT %s""",
+            (user_id, limit)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def mark_read(user_id, up_to_id):
+        """Mark everything up to and including up_to_id as read."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """UPDATE notifications SET read_at = NOW()
+               WHERE user_id = %s AND id <= %s AND read_at IS NULL""",
+            (user_id, up_to_id)
+        )
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def prune(days):
+        """Drop read notifications older than `days` on every database; returns rows removed."""
+        removed = 0
+        for shard in all_shards():
+            cur = get_cursor(shard=shard)
+            cur.execute(
+                """DELETE FROM notifications
+                   WHERE read_at IS NOT NULL AND created_at < NOW() - INTERVAL %s DAY""",
+                (days,)
+            )
+            removed += cur.rowcount
+            commit(cur)
+            cur.close()
+        return removed
+
+
+class Outbox:
+
+    @staticmethod
+    def claim(shard, limit):
+        """
+        Lock up to `limit` due, unsent entries on one database for sending
+        (SKIP LOCKED, so concurrent delivery runs split the work). Returns
+        (cursor, rows); finish with Outbox.done() / Outbox.failed(), then
+        commit on the returned cursor.
+        """
+        cur = get_cursor(shard=shard)
+        cur.execute(
+            """SELECT o.id, o.user_id, o.channel, o.attempts,
+                      n.kind, n.title, n.body, n.link, n.created_at
+               FROM notification_outbox o
+               JOIN notifications n ON n.id = o.notification_id
+               WHERE o.sent_at IS NULL AND o.next_attempt_at <= NOW()
+                 AND o.attempts < %s
+               ORDER BY o.id
+               LIMIT %s
+               FOR UPDATE OF o SKIP LOCKED""",
+            (OUTBOX_MAX_ATTEMPTS, limit)
+        )
+        return cur, cur.fetchall()
+
+    @staticmethod
+    def done(cur, outbox_id):
+        cur.execute("UPDATE notification_outbox SET sent_at = NOW() WHERE id = %s",
+                    (outbox_id,))
+
+    @staticmethod
+    def failed(cur, outbox_id, attempts, error):
+        """Record a failure and back off exponentially (1, 2, 4, ... minutes)."""
+        cur.execute(
+            """UPDATE notification_outbox
+               SET attempts = attempts + 1, last_error = %s,
+                   next_attempt_at = NOW() + INTERVAL %s MINUTE
+               WHERE id = %s""",
+            (str(error)[:255], 2 ** attempts, outbox_id)
+        )
@@ -0,0 +1,166 @@
+"""
+models/periods.py
+Budget periods and the prefix sums that evaluate them.
+
+A budget's period is encoded in its key (budgets.month):
+
+    month    2026-10     calendar month
+    week     2026-W42    ISO week, Monday to Sunday
+    quarter  2026-Q4
+    year     2026
+    rolling  30d         the last 30 days up to and including today
+
+bounds() turns a key into a [start, end) date range. Months, quarters and
+years are whole calendar months (months_in()), so their spend adds up at
+most twelve expense_rollups rows per category. Weeks and rolling windows
+use DailySpend: cumulative per-category totals over a range of
+expense_daily rows, so the spend of any period inside that range is one
+subtraction. Neither depends on the number of expenses behind it.
+"""
+
+import re
+from datetime import date, timedelta
+
+from models.money import Money, ZERO
+
+PERIODS      = ("month", "week", "quarter", "year", "rolling")
+MONTHLY      = ("month", "quarter", "year")     # made of whole calendar months
+ROLLING_DAYS = (1, 366)         # allowed window, inclusive
+
+_KEYS = {
+    "month":   re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$"),
+    "week":    re.compile(r"^(\d{4})-W(0[1-9]|[1-4]\d|5[0-3])$"),
+    "quarter": re.compile(r"^(\d{4})-Q([1-4])$"),
+    "year":    re.compile(r"^(\d{4})$"),
+    "rolling": re.compile(r"^(\d{1,3})d$"),
+}
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def as_date(d):
+    return d if isinstance(d, date) else date.fromisoformat(str(d))
+
+
+def period_of(key):
+    """The period a key belongs to, or None if it is not a valid key."""
+    for period, pattern in _KEYS.items():
+        m = pattern.match(key or "")
+        if m:
+            if period == "week":
+                try:
+                    date.fromisocalendar(int(m[1]), int(m[2]), 1)
+                except ValueError:      # W53 in a 52-week year
+                    return None
+            if period == "rolling" and not ROLLING_DAYS[0] <= int(m[1]) <= ROLLING_DAYS[1]:
+                return None
+            return period
+    return None
+
+
+def key_for(period, d, days=None):
+    """Key of the `period` containing day `d`; rolling needs `days`."""
+    d = as_date(d)
+    if period == "month":
+        return f"{d.year:04d}-{d.month:02d}"
+    if period == "week":
+        year, week, _ = d.isocalendar()
+        return f"{year:04d}-W{week:02d}"
+    if period == "quarter":
+        return f"{d.year:04d}-Q{(d.month - 1) // 3 + 1}"
+    if period == "year":
+        return f"{d.year:04d}"
+    if period == "rolling":
+        return f"{int(days)}d"
+    raise ValueError(f"unknown period {period!r}")
+
+
+def calendar_keys(d):
+    """Keys of every calendar period containing `d` (what an expense dated d moves)."""
+    return [key_for(p, d) for p in PERIODS if p != "rolling"]
+
+
+def bounds(key, today=None):
+    """[start, end) dates of a key; rolling windows end with `today`."""
+    period = period_of(key)
+    if period is None:
+        raise ValueError(f"not a budget period key: {key!r}")
+    m = _KEYS[period].match(key)
+    if period == "rolling":
+        end = (today or date.today()) + timedelta(days=1)
+        return end - timedelta(days=int(m[1])), end
+    year = int(m[1])
+    if period == "week":
+        start = date.fromisocalendar(year, int(m[2]), 1)
+        return start, start + timedelta(days=7)
+    if period == "year":
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    first, months = (int(m[2]), 1) if period == "month" else (3 * int(m[2]) - 2, 3)
+    idx = year * 12 + first - 1 + months
+    return date(year, first, 1), date(idx // 12, idx % 12 + 1, 1)
+
+
+def months_in(key):
+    """'YYYY-MM' keys of the months a month, quarter or year key covers."""
+    if period_of(key) not in MONTHLY:
+        raise ValueError(f"not a calendar-month period key: {key!r}")
+    start, end = bounds(key)
+    first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(first, last)]
+
+
+def label(key):
+    """Human label: 'Oct 2026', 'Week 42, 2026', 'Q4 2026', '2026', 'Last 30 days'."""
+    period = period_of(key)
+    if period is None:
+        return key
+    m = _KEYS[period].match(key)
+    if period == "month":
+        return f"{_MONTHS[int(m[2]) - 1]} {m[1]}"
+    if period == "week":
+        return f"Week {int(m[2])}, {m[1]}"
+    if period == "quarter":
+        return f"Q{m[2]} {m[1]}"
+    if period == "rolling":
+        return "Last day" if m[1] == "1" else f"Last {int(m[1])} days"
+    return key
+
+
+class DailySpend:
+    """
+    Prefix sums of daily spend in paise over [start, end): per category, and
+    for all categories under None. Building is O(days x categories) over
+    expense_daily rows; spent() is O(1).
+    """
+
+    __slots__ = ("start", "days", "_prefix")
+
+    def __init__(self, start, end, rows):
+        """rows: (day, category_id, paise) with start <= day < end."""
+        self.start = start
+        self.days  = max((end - start).days, 0)
+        daily = {}
+        for day, category_id, paise in rows:
+            series = daily.get(category_id)
+            if series is None:
+                series = daily[category_id] = [0] * (self.days + 1)
+            series[(day - start).days + 1] += paise
+        overall = [0] * (self.days + 1)
+        for series in daily.values():
+            running = 0
+            for i in range(1, self.days + 1):
+                running += series[i]
+                series[i] = running
+                overall[i] += running
+        daily[None] = overall
+        self._prefix = daily
+
+    def _index(self, d):
+        return min(max((d - self.start).days, 0), self.days)
+
+    def spent(self, start, end, category_id=None):
+        """Money spent in [start, end) (clipped to the loaded range); None = every category."""
+        prefix = self._prefix.get(category_id)
+        if prefix is None:
+            return ZERO
+        return Money(prefix[self._index(end)] - prefix[self._index(start)])
@@ -1,22 +1,33 @@
 """
 models/recurring.py
 Recurring expense management (subscriptions, EMI, rent, etc).
-Auto-insert logic checks if current-month expense already exists before inserting.
+Each rule keeps next_due, its earliest occurrence not yet inserted
+(models/schedule.py). materialize() picks up only rules whose next_due has
+passed, inserts every missed occurrence in one batch and moves next_due on,
+all in one transaction, so nothing is inserted twice.
 """
 
-from datetime import date
-from db import get_cursor
+from datetime import date, timedelta
+from db import get_cursor, commit, transaction, all_shards, end_snapshot, ShardMoving
+from models import schedule
+from models.analytics_cache import AnalyticsCache
+from models.expense import Expense
+from models.money import Money
+from models.sync import Sync
+
+_COLUMNS = """id, category_id, amount, description, frequency, day_of_month,
+              starts_on, ends_on, next_due, active, created_at, updated_at"""
 
 
 class Recurring:
 
     @staticmethod
     def get_all(user_id):
-        cur = get_cursor()
+        cur = get_cursor(readonly=True, user_id=user_id)
         cur.execute(
-            """SELECT r.id, r.category_id, r.amount, r.description,
-                      r.day_of_month, r.active, r.created_at,
-                      c.name AS category_name
+            """SELECT r.id, r.category_id, r.amount, r.description, r.frequency,
+                      r.day_of_month, r.starts_on, r.ends_on, r.next_due,
+                      r.active, r.created_at, c.name AS category_name
                FROM recurring_expenses r
                JOIN categories c ON c.id = r.category_id
                WHERE r.user_id = %s
@@ -28,89 +39,262 @@ class Recurring:
         return rows
 
     @staticmethod
-    def create(user_id, category_id, amount, description, day_of_month=1):
-        cur = get_cursor()
+    def get_monthly_commitments(user_id):
+        """Active recurring charges per month (on average), as {category_id: amount}."""
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute(
+            f"""SELECT category_id, SUM({schedule.monthly_amount_sql()}) AS total
+                FROM recurring_expenses
+                WHERE user_id = %s AND active = 1 AND next_due IS NOT NULL
+                GROUP BY category_id""",
+            (user_id,)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return {r["category_id"]: Money.of(r["total"]) for r in rows}
+
+    @staticmethod
+    def create(user_id, category_id, amount, description, day_of_month=1,
+               frequency="monthly", starts_on=None, ends_on=None):
+        """
+        Add a rule. Its first occurrence is the first on or after starts_on
+        (default today); a starts_on in the past backfills from there.
+        """
+        rule = {"frequency": frequency, "day_of_month": day_of_month,
+                "starts_on": starts_on or date.today(), "ends_on": ends_on}
+        cur = get_cursor(user_id=user_id)
         cur.execute(
             """INSERT INTO recurring_expenses
-               (user_id, category_id, amount, description, day_of_month, active)
-               VALUES (%s, %s, %s, %s, %s, 1)""",
-            (user_id, category_id, amount, description, day_of_month)
+               (user_id, category_id, amount, description, frequency, day_of_month,
+                starts_on, ends_on, next_due, active)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1)""",
+            (user_id, category_id, amount, description, frequency, day_of_month,
+             rule["starts_on"], ends_on, schedule.next_on_or_after(rule, rule["starts_on"]))
         )
-        cur._connection.commit()
         last_id = cur.lastrowid
+        Sync.record(cur, user_id, "recurring", [last_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
         return last_id
 
+    @staticmethod
+    def get_by_id(rec_id, user_id, for_update=False):
+        """for_update: lock the row until the enclosing transaction ends."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {_COLUMNS}
+                FROM recurring_expenses WHERE id = %s AND user_id = %s"""
+            + (" FOR UPDATE" if for_update else ""),
+            (rec_id, user_id)
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row
+
+    @staticmethod
+    def _next_due(old, rule, active, today):
+        """
+        next_due after an edit. Occurrences up to today that were still
+        owed stay owed; a rule that is resumed (or had ended) starts again
+        from today, with nothing owed for the time it was off.
+        """
+        if old["active"] and old["next_due"] is not None and active:
+            start = min(old["next_due"], today + timedelta(days=1))
+        else:
+            start = today
+        return schedule.next_on_or_after(rule, start)
+
+    @staticmethod
+    def update(rec_id, user_id, category_id, amount, description, day_of_month, active,
+               frequency="monthly", starts_on=None, ends_on=None):
+        """Replace a rule; starts_on=None keeps the current one."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT active, starts_on, next_due FROM recurring_expenses
+               WHERE id = %s AND user_id = %s FOR UPDATE""",
+            (rec_id, user_id)
+        )
+        old = cur.fetchone()
+        if old:
+            rule = {"frequency": frequency, "day_of_month": day_of_month,
+                    "starts_on": starts_on or old["starts_on"], "ends_on": ends_on}
+            cur.execute(
+                """UPDATE recurring_expenses
+                   SET category_id=%s, amount=%s, description=%s, frequency=%s,
+                       day_of_month=%s, starts_on=%s, ends_on=%s, next_due=%s, active=%s
+                   WHERE id=%s AND user_id=%s""",
+                (category_id, amount, description, frequency, day_of_month,
+                 rule["starts_on"], ends_on,
+                 Recurring._next_due(old, rule, active, date.today()),
+                 int(active), rec_id, user_id)
+            )
+            Sync.record(cur, user_id, "recurring", [rec_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def get_many(user_id, ids):
+        if not ids:
+            return []
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {_COLUMNS}
+                FROM recurring_expenses
+                WHERE user_id = %s AND id IN ({", ".join(["%s"] * len(ids))})""",
+            (user_id, *ids)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def changed_since(user_id, since=None):
+        """Items updated at or after `since` (or all), from the primary, for API sync."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            f"""SELECT {_COLUMNS}
+                FROM recurring_expenses WHERE user_id = %s"""
+            + (" AND updated_at >= %s" if since else "")
+            + " ORDER BY updated_at, id",
+            (user_id, since) if since else (user_id,)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
     @staticmethod
     def toggle_active(rec_id, user_id):
-        cur = get_cursor()
+        """Pause, or resume from today (occurrences while paused are skipped)."""
+        cur = get_cursor(user_id=user_id)
         cur.execute(
-            """UPDATE recurring_expenses
-               SET active = NOT active
-               WHERE id = %s AND user_id = %s""",
+            f"""SELECT {_COLUMNS} FROM recurring_expenses
+                WHERE id = %s AND user_id = %s FOR UPDATE""",
             (rec_id, user_id)
         )
-        cur._connection.commit()
+        rule = cur.fetchone()
+        if rule:
+            next_due = rule["next_due"] if rule["active"] \
+                else schedule.next_on_or_after(rule, date.today())
+            cur.execute(
+                """UPDATE recurring_expenses SET active = %s, next_due = %s
+                   WHERE id = %s AND user_id = %s""",
+                (int(not rule["active"]), next_due, rec_id, user_id)
+            )
+            Sync.record(cur, user_id, "recurring", [rec_id])
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
 
     @staticmethod
     def delete(rec_id, user_id):
-        cur = get_cursor()
+        cur = get_cursor(user_id=user_id)
         cur.execute(
             "DELETE FROM recurring_expenses WHERE id = %s AND user_id = %s",
             (rec_id, user_id)
         )
-        cur._connection.commit()
+        if cur.rowcount:
+            Sync.record(cur, user_id, "recurring", [rec_id], "delete")
+        AnalyticsCache.invalidate(cur, user_id)
+        commit(cur)
         cur.close()
 
+    # ── Materialization ───────────────────────────────────────
+
     @staticmethod
-    def auto_insert_for_month(user_id, year, month):
+    def get_due(today, limit=1000, user_id=None, shard=None, after=None):
         """
-        For each active recurring expense, insert into expenses for the given
-        year/month if not already present (idempotent).
-        Returns count of newly inserted expenses.
+        Active rules with an occurrence on or before `today`, as {id, user_id,
+        next_due}, in (next_due, user_id, id) order: for one user, or across
+        one database. `after` is the last row's (next_due, user_id, id) from
+        the previous page. A range scan of idx_rec_user_due / idx_rec_due,
+        from the primary.
         """
-        cur = get_cursor()
+        conditions, params = "active = 1 AND next_due <= %s", [today]
+        if user_id is not None:
+            conditions += " AND user_id = %s"
+            params.append(user_id)
+        if after is not None:
+            conditions += (" AND (next_due > %s OR (next_due = %s AND"
+                           " (user_id > %s OR (user_id = %s AND id > %s))))")
+            params     += [after[0], after[0], after[1], after[1], after[2]]
+        cur = get_cursor(user_id=user_id, shard=shard)
         cur.execute(
-            """SELECT * FROM recurring_expenses
-               WHERE user_id = %s AND active = 1""",
-            (user_id,)
+            f"""SELECT id, user_id, next_due FROM recurring_expenses
+                WHERE {conditions}
+                ORDER BY next_due, user_id, id LIMIT %s""",
+            (*params, limit)
         )
-        recurrings = cur.fetchall()
+        rows = cur.fetchall()
         cur.close()
+        return rows
 
-        inserted = 0
-        for rec in recurrings:
-            # Clamp day_of_month to valid range for the month
-            import calendar
-            max_day = calendar.monthrange(year, month)[1]
-            day     = min(rec["day_of_month"], max_day)
-            exp_date = date(year, month, day)
-
-            # Check if already inserted this month
-            cur = get_cursor()
+    @staticmethod
+    def materialize(user_id, today=None, rule_ids=None):
+        """
+        Insert every occurrence up to `today` of the user's due rules (or
+        just `rule_ids`) as expenses, in one batch, and move each rule's
+        next_due past today, in one transaction. Rules locked by a
+        concurrent run are skipped. Returns the number of expenses inserted.
+        """
+        today = today or date.today()
+        only  = f" AND id IN ({', '.join(['%s'] * len(rule_ids))})" if rule_ids else ""
+        with transaction():
+            cur = get_cursor(user_id=user_id)
             cur.execute(
-                """SELECT COUNT(*) AS cnt FROM expenses
-                   WHERE user_id = %s AND category_id = %s
-                     AND amount = %s AND description = %s
-                     AND DATE_FORMAT(date, '%%Y-%%m') = %s""",
-                (user_id, rec["category_id"], rec["amount"],
-                 rec["description"], f"{year:04d}-{month:02d}")
+                f"""SELECT {_COLUMNS} FROM recurring_expenses
+                    WHERE user_id = %s AND active = 1 AND next_due <= %s{only}
+                    FOR UPDATE SKIP LOCKED""",
+                (user_id, today, *(rule_ids or ()))
             )
-            exists = cur.fetchone()["cnt"] > 0
+            rules = cur.fetchall()
+            rows, moves = [], []
+            for rule in rules:
+                rows += [{"category_id": rule["category_id"], "amount": rule["amount"],
+                          "description": rule["description"], "date": d}
+                         for d in schedule.occurrences(rule, rule["next_due"], today)]
+                moves.append((schedule.next_on_or_after(rule, today + timedelta(days=1)),
+                              rule["id"]))
+            if moves:
+                cur.executemany("UPDATE recurring_expenses SET next_due = %s WHERE id = %s",
+                                moves)
+                Sync.record(cur, user_id, "recurring", [rule["id"] for rule in rules])
+                commit(cur)
             cur.close()
+            if rows:
+                Expense.create_many(user_id, rows)
+        return len(rows)
 
-            if not exists:
-                cur = get_cursor()
-                cur.execute(
-                    """INSERT INTO expenses
-                       (user_id, category_id, amount, description, date)
-                       VALUES (%s, %s, %s, %s, %s)""",
-                    (user_id, rec["category_id"], rec["amount"],
-                     rec["description"], exp_date)
-                )
-                cur._connection.commit()
-                cur.close()
-                inserted += 1
-
-        return inserted
+    @staticmethod
+    def materialize_due(batch=1000, today=None):
+        """
+        materialize() every user with due rules, on every database, reading
+        `batch` due rules at a time. Pages follow on from the last rule read,
+        so skipped rules are never read twice and the first ones being locked
+        does not stall the walk. Returns (rules read, expenses inserted).
+        Rules locked by a concurrent run, or of a user being moved between
+        shards, are left for the next run.
+        """
+        today = today or date.today()
+        read, inserted = 0, 0
+        for shard in all_shards():
+            after = None
+            while True:
+                end_snapshot()      # current placement and due rules for each page
+                due = Recurring.get_due(today, batch, shard=shard, after=after)
+                if not due:
+                    break
+                read += len(due)
+                after = (due[-1]["next_due"], due[-1]["user_id"], due[-1]["id"])
+                by_user = {}
+                for r in due:
+                    by_user.setdefault(r["user_id"], []).append(r["id"])
+                for user_id, ids in by_user.items():
+                    try:
+                        inserted += Recurring.materialize(user_id, today, ids)
+                    except ShardMoving:
+                        continue
+                if len(due) < batch:
+                    break
+        return read, inserted
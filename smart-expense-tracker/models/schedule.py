@@ -0,0 +1,82 @@
+"""
+models/schedule.py
+Occurrence dates of recurring expense rules (models/recurring.py).
+
+A rule is a recurring_expenses row: frequency, day_of_month, starts_on
+and ends_on.
+
+    weekly / biweekly   every 7 / 14 days from starts_on (its weekday)
+    monthly             day_of_month of every month
+    quarterly           day_of_month every third month, from starts_on's month
+    yearly              day_of_month of starts_on's month, every year
+
+day_of_month is clamped to the month's length. LAST_DAY (31) is therefore
+always the last day of the month. No occurrence falls before starts_on or
+after ends_on. Everything here is arithmetic on one rule, with no loop
+over past periods, so next_due can be kept for millions of rules.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+FREQUENCIES = ("weekly", "biweekly", "monthly", "quarterly", "yearly")
+LAST_DAY    = 31
+
+_STEP_DAYS   = {"weekly": 7, "biweekly": 14}
+_STEP_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+PER_YEAR     = {"weekly": 52, "biweekly": 26, "monthly": 12, "quarterly": 4, "yearly": 1}
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _in_month(idx, day):
+    """Occurrence in month index idx (year * 12 + month - 1), day clamped."""
+    year, month = divmod(idx, 12)
+    return date(year, month + 1, min(day, calendar.monthrange(year, month + 1)[1]))
+
+
+def next_on_or_after(rule, d):
+    """First occurrence on or after `d`, or None if the rule has ended by then."""
+    d = max(d, rule["starts_on"])
+    start, freq = rule["starts_on"], rule["frequency"]
+    if freq in _STEP_DAYS:
+        step = _STEP_DAYS[freq]
+        due  = start + timedelta(days=-(-(d - start).days // step) * step)
+    else:
+        step   = _STEP_MONTHS[freq]
+        anchor = start.year * 12 + start.month - 1
+        idx    = d.year * 12 + d.month - 1
+        idx   += (anchor - idx) % step                  # first month of the cycle at or after d
+        due    = _in_month(idx, rule["day_of_month"])
+        if due < d:
+            due = _in_month(idx + step, rule["day_of_month"])
+    ends_on = rule.get("ends_on")
+    return None if ends_on is not None and due > ends_on else due
+
+
+def occurrences(rule, start, end):
+    """Occurrence dates in [start, end], oldest first."""
+    out, due = [], next_on_or_after(rule, start)
+    while due is not None and due <= end:
+        out.append(due)
+        due = next_on_or_after(rule, due + timedelta(days=1))
+    return out
+
+
+def describe(rule):
+    """'Weekly · Mon', 'Monthly · day 5', 'Quarterly · last day', 'Yearly · 12 Mar'."""
+    freq = rule["frequency"]
+    if freq in _STEP_DAYS:
+        return f"{freq.capitalize()} · {_WEEKDAYS[rule['starts_on'].weekday()]}"
+    day = "last day" if rule["day_of_month"] == LAST_DAY else f"day {rule['day_of_month']}"
+    if freq == "yearly":
+        month = rule["starts_on"].strftime("%b")
+        day   = f"last day of {month}" if rule["day_of_month"] == LAST_DAY \
+            else f"{rule['day_of_month']} {month}"
+    return f"{freq.capitalize()} · {day}"
+
+
+def monthly_amount_sql(amount="amount", frequency="frequency"):
+    """SQL for a rule's average charge per month, e.g. SUM(monthly_amount_sql())."""
+    cases = " ".join(f"WHEN '{f}' THEN {n}" for f, n in PER_YEAR.items())
+    return f"{amount} * CASE {frequency} {cases} END / 12"
@@ -0,0 +1,214 @@
+"""
+models/shards.py
+Shard placement and online rebalancing.
+
+The directory database (MYSQL_*) keeps users, categories, app state and
+user_shards. Each shard holds the per-user tables below, plus a copy of
+categories and a stub users row (no password) for every resident user so
+its foreign keys hold. Routing itself lives in db.py.
+"""
+
+import time
+
+from flask import current_app
+
+from db import get_cursor, commit, sharded, all_shards, is_directory, scatter, ID_STRIDE
+
+# Per-user tables, parents first (copy order; deletes run in reverse)
+SHARD_TABLES = ("recurring_expenses", "budgets", "expenses", "expenses_archive",
+                "expense_rollups", "expense_daily", "idempotency_keys", "sync_seq",
+                "change_log", "category_stats", "expense_anomalies", "budget_alerts",
+                "notifications", "notification_outbox")
+# Per-user caches: dropped on a move instead of copied
+SHARD_CACHES = ("analytics_cache",)
+# Tables whose AUTO_INCREMENT a new shard must start above
+ID_TABLES    = ("recurring_expenses", "budgets", "expenses", "notifications",
+                "notification_outbox")
+
+COPY_BATCH = 1000
+
+
+class Shards:
+
+    # ── Placement ─────────────────────────────────────────────
+
+    @staticmethod
+    def place(cur, user_id):
+        """
+        Record a new user's home shard on the caller's directory cursor
+        (caller commits). Returns the shard, or None when unsharded.
+
+        When the directory is also a shard its connection allocates ids
+        with the shard stride, so every user id has the same remainder
+        mod ID_STRIDE. user_id // ID_STRIDE counts signups either way.
+        """
+        if not sharded():
+            return None
+        shards = all_shards()
+        shard  = shards[(user_id // ID_STRIDE) % len(shards)]
+        cur.execute("INSERT INTO user_shards (user_id, shard) VALUES (%s, %s)",
+                    (user_id, shard))
+        return shard
+
+    @staticmethod
+    def placement(user_id):
+        """(shard, moving) read straight from the directory (no request cache)."""
+        cur = get_cursor()
+        cur.execute("SELECT shard, moving FROM user_shards WHERE user_id = %s",
+                    (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        return (row["shard"], bool(row["moving"])) if row else (0, False)
+
+    @staticmethod
+    def ensure_stub(user_id, shard):
+        """Mirror the user's directory row onto `shard` so its foreign keys hold."""
+        if is_directory(shard):
+            return
+        cur = get_cursor()
+        cur.execute("SELECT id, username, email, role, created_at FROM users WHERE id = %s",
+                    (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        if row is None:
+            return
+        cur = get_cursor(shard=shard)
+        cur.execute(
+            """INSERT INTO users (id, username, email, password, role, created_at)
+               VALUES (%s, %s, %s, '', %s, %s)
+               ON DUPLICATE KEY UPDATE username = VALUES(username),
+                                       email    = VALUES(email)""",
+            (row["id"], row["username"], row["email"], row["role"], row["created_at"])
+        )
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def counts():
+        """{shard: users placed there}; users without a directory row count as shard 0."""
+        cur = get_cursor()
+        cur.execute("SELECT shard, COUNT(*) AS cnt FROM user_shards GROUP BY shard")
+        counts = {r["shard"]: r["cnt"] for r in cur.fetchall()}
+        cur.execute("""SELECT COUNT(*) AS cnt FROM users u
+                       LEFT JOIN user_shards s ON s.user_id = u.id
+                       WHERE s.user_id IS NULL""")
+        counts[0] = counts.get(0, 0) + cur.fetchone()["cnt"]
+        cur.close()
+        return counts
+
+    # ── New shard ─────────────────────────────────────────────
+
+    @staticmethod
+    def init_shard(shard, schema_sql):
+        """
+        Prepare an empty shard database: load the baseline schema, copy
+        categories, and start its id counters above every id in use anywhere
+        (the per-connection stride then keeps new ids disjoint).
+        """
+        from migrations import split_statements
+
+        cur = get_cursor(shard=shard)
+        for stmt in split_statements(schema_sql):
+            if stmt.upper().startswith(("CREATE DATABASE", "USE ")):
+                continue
+            cur.execute(stmt)
+        commit(cur)
+
+        src = get_cursor()
+        src.execute("SELECT id, name FROM categories")
+        cur.executemany("INSERT IGNORE INTO categories (id, name) VALUES (%s, %s)",
+                        [(r["id"], r["name"]) for r in src.fetchall()])
+        src.close()
+
+        for table in ID_TABLES:
+            top = max((r["top"] or 0 for r in scatter(f"SELECT MAX(id) AS top FROM {table}")),
+                      default=0)
+            if table == "expenses":
+                top = max([top] + [r["top"] or 0 for r in
+                                   scatter("SELECT MAX(id) AS top FROM expenses_archive")])
+            cur.execute(f"ALTER TABLE {table} AUTO_INCREMENT = {int(top) + 1}")
+        commit(cur)
+        cur.close()
+
+    # ── Rebalancing ───────────────────────────────────────────
+
+    @staticmethod
+    def _set(user_id, shard, moving):
+        cur = get_cursor()
+        cur.execute(
+            """INSERT INTO user_shards (user_id, shard, moving) VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE shard = VALUES(shard), moving = VALUES(moving)""",
+            (user_id, shard, moving)
+        )
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def _copy(user_id, source, target):
+        """Copy the user's rows source -> target in one target transaction; verify counts."""
+        src = get_cursor(shard=source)
+        dst = get_cursor(shard=target)
+        for table in reversed(SHARD_TABLES + SHARD_CACHES):     # leftovers of a failed move
+            dst.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+
+        copied = {}
+        for table in SHARD_TABLES:
+            src.execute(f"SELECT * FROM {table} WHERE user_id = %s", (user_id,))
+            copied[table] = 0
+            while True:
+                rows = src.fetchmany(COPY_BATCH)
+                if not rows:
+                    break
+                cols = list(rows[0])
+                dst.executemany(
+                    f"""INSERT INTO {table} ({", ".join(f"`{c}`" for c in cols)})
+                        VALUES ({", ".join(["%s"] * len(cols))})""",
+                    [tuple(r[c] for c in cols) for r in rows]
+                )
+                copied[table] += len(rows)
+
+        for table, n in copied.items():
+            dst.execute(f"SELECT COUNT(*) AS cnt FROM {table} WHERE user_id = %s", (user_id,))
+            if dst.fetchone()["cnt"] != n:
+                dst._connection.rollback()
+                raise RuntimeError(f"{table}: copy count mismatch for user {user_id}")
+        commit(dst)
+        src.close()
+        dst.close()
+        return copied
+
+    @staticmethod
+    def _purge(user_id, shard):
+        cur = get_cursor(shard=shard)
+        for table in reversed(SHARD_TABLES + SHARD_CACHES):
+            cur.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+        if not is_directory(shard):
+            cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        commit(cur)
+        cur.close()
+
+    @staticmethod
+    def move_user(user_id, target):
+        """
+        Move one user's rows to `target` while the app keeps running:
+        flag the user as moving (reads continue, writes get ShardMoving),
+        wait out in-flight writes, copy and verify, flip the directory,
+        then delete the old copy. Returns {table: rows copied}.
+        """
+        source, moving = Shards.placement(user_id)
+        if moving:
+            raise RuntimeError(f"user {user_id} is already being moved")
+        if source == target:
+            return {}
+
+        Shards._set(user_id, source, moving=1)
+        try:
+            time.sleep(current_app.config["SHARD_MOVE_GRACE"])
+            Shards.ensure_stub(user_id, target)
+            copied = Shards._copy(user_id, source, target)
+            Shards._set(user_id, target, moving=0)
+        except Exception:
+            Shards._set(user_id, source, moving=0)
+            raise
+        Shards._purge(user_id, source)
+        return copied
@@ -0,0 +1,140 @@
+"""
+models/sync.py
+Per-user change log for API sync.
+
+Every expense, budget and recurring write calls Sync.record() on its own
+cursor, in its own transaction. That takes the next numbers from the user's
+sync_seq row and upserts one change_log entry per row: (kind, row_id) ->
+latest seq, upsert or delete. The sync_seq row stays locked until commit,
+so a user's changes commit in seq order. A reader that sees seq N therefore
+sees every change up to N, and a client holding cursor N only needs the
+entries with seq > N.
+
+Delete entries older than SYNC_TOMBSTONE_DAYS are pruned. pruned_seq
+records the highest pruned seq, and older cursors must sync from scratch.
+The updated_at-based ?since= lists read the same delete entries.
+"""
+
+from flask import current_app
+
+from db import get_cursor, commit, all_shards
+
+KINDS = ("expense", "budget", "recurring")
+
+
+class Sync:
+
+    # ── Writes ────────────────────────────────────────────────
+
+    @staticmethod
+    def record(cur, user_id, kind, row_ids, op="upsert"):
+        """Log a write to `row_ids` on the caller's cursor (caller commits)."""
+        if not row_ids:
+            return
+        n = len(row_ids)
+        cur.execute(
+            """INSERT INTO sync_seq (user_id, seq) VALUES (%s, LAST_INSERT_ID(%s))
+               ON DUPLICATE KEY UPDATE seq = LAST_INSERT_ID(seq + %s)""",
+            (user_id, n, n)
+        )
+        first = cur.lastrowid - n + 1
+        cur.executemany(
+            """INSERT INTO change_log (user_id, kind, row_id, seq, op)
+               VALUES (%s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE seq = VALUES(seq), op = VALUES(op),
+                                       changed_at = CURRENT_TIMESTAMP""",
+            [(user_id, kind, row_id, first + i, op) for i, row_id in enumerate(row_ids)]
+        )
+
+    # ── Reads (primary unless noted; one snapshot per request) ─
+
+    @staticmethod
+    def state(user_id):
+        """(current seq, pruned_seq) for the user; (0, 0) before the first write."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute("SELECT seq, pruned_seq FROM sync_seq WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        return (row["seq"], row["pruned_seq"]) if row else (0, 0)
+
+    @staticmethod
+    def version(user_id):
+        """
+        Current seq on the read connection, for keying caches of data read
+        there (services/fragments.py); same snapshot as the data itself.
+        """
+        cur = get_cursor(readonly=True, user_id=user_id)
+        cur.execute("SELECT seq FROM sync_seq WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        return row["seq"] if row else 0
+
+    @staticmethod
+    def changes(user_id, since, limit):
+        """Log entries after seq `since`, oldest first: [{seq, kind, row_id, op}]."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT seq, kind, row_id, op FROM change_log
+               WHERE user_id = %s AND seq > %s
+               ORDER BY seq LIMIT %s""",
+            (user_id, since, limit)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    @staticmethod
+    def clock(user_id):
+        """
+        (next_since, horizon) for the updated_at-based lists: the cursor for
+        the next request, and the oldest `since` still covered by the log.
+        """
+        cfg = current_app.config
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT NOW() - INTERVAL %s SECOND AS next_since,
+                      NOW() - INTERVAL %s DAY    AS horizon""",
+            (cfg["SYNC_OVERLAP"], cfg["SYNC_TOMBSTONE_DAYS"])
+        )
+        row = cur.fetchone()
+        cur.close()
+        return row["next_since"], row["horizon"]
+
+    @staticmethod
+    def deleted_since(user_id, kind, since):
+        """Ids of `kind` rows deleted at or after the time `since`."""
+        cur = get_cursor(user_id=user_id)
+        cur.execute(
+            """SELECT row_id FROM change_log
+               WHERE user_id = %s AND op = 'delete' AND changed_at >= %s AND kind = %s
+               ORDER BY row_id""",
+            (user_id, since, kind)
+        )
+        rows = [r["row_id"] for r in cur.fetchall()]
+        cur.close()
+        return rows
+
+    # ── Housekeeping ──────────────────────────────────────────
+
+    @staticmethod
+    def prune(days):
+        """Drop delete entries older than `days` on every database; returns rows removed."""
+        removed = 0
+        for shard in all_shards():
+            cur = get_cursor(shard=shard)
+            cur.execute("SELECT NOW() - INTERVAL %s DAY AS cutoff", (days,))
+            cutoff = cur.fetchone()["cutoff"]
+            cur.execute(
+                """UPDATE sync_seq s
+                   JOIN (SELECT user_id, MAX(seq) AS top FROM change_log
+                         WHERE op = 'delete' AND changed_at < %s
+                         GROUP BY user_id) d ON d.user_id = s.user_id
+                   SET s.pruned_seq = GREATEST(s.pruned_seq, d.top)""",
+                (cutoff,)
+            )
+            cur.execute("DELETE FROM change_log WHERE op = 'delete' AND changed_at < %s",
+                        (cutoff,))
+            removed += cur.rowcount
+            commit(cur)
+            cur.close()
+        return removed
@@ -5,7 +5,16 @@ Includes role-based access (user / admin).
 """
 
 from flask_login import UserMixin
-from db import get_cursor
+from db import get_cursor, commit, driver, all_databases
+from models.shards import Shards
+
+
+class DuplicateUserError(Exception):
+    """Signup hit a unique key; `field` is 'username' or 'email'."""
+
+    def __init__(self, field):
+        super().__init__(f"{field} already exists")
+        self.field = field
 
 
 class User(UserMixin):
@@ -24,6 +33,9 @@ class User(UserMixin):
 
     @staticmethod
     def get_by_id(user_id):
+        # Primary: the session user is loaded on every request, and role
+        # changes and signups do not bump sync_seq, so a replica could serve
+        # a demoted admin or miss a user who just signed up
         cur = get_cursor()
         cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
         row = cur.fetchone()
@@ -46,25 +58,9 @@ class User(UserMixin):
         cur.close()
         return User(row) if row else None
 
-    @staticmethod
-    def username_exists(username):
-        cur = get_cursor()
-        cur.execute("SELECT 1 FROM users WHERE username = %s", (username,))
-        exists = cur.fetchone() is not None
-        cur.close()
-        return exists
-
-    @staticmethod
-    def email_exists(email):
-        cur = get_cursor()
-        cur.execute("SELECT 1 FROM users WHERE email = %s", (email,))
-        exists = cur.fetchone() is not None
-        cur.close()
-        return exists
-
     @staticmethod
     def get_total_count():
-        cur = get_cursor()
+        cur = get_cursor(readonly=True)
         cur.execute("SELECT COUNT(*) AS cnt FROM users")
         row = cur.fetchone()
         cur.close()
@@ -75,25 +71,71 @@ class User(UserMixin):
     @staticmethod
     def create(username, email, hashed_password):
         """
-        Insert a new user. First user ever is auto-promoted to admin.
+        Insert a new user in one transaction, relying on the unique keys
+        instead of existence checks. Raises DuplicateUserError on a clash.
+
+        The first user ever is auto-promoted to admin: claiming the
+        'first_admin' row in app_state is atomic (concurrent claimers block
+        on its primary key), and a failed signup rolls its claim back.
+        When sharded, the home shard is recorded in the same transaction.
         """
-        role = "admin" if User.get_total_count() == 0 else "user"
-        cur  = get_cursor()
+        cur = get_cursor()
+        try:
+            cur.execute(
+                """INSERT IGNORE INTO app_state (name, value)
+                   VALUES ('first_admin', %s)""",
+                (username,)
+            )
+            role = "admin" if cur.rowcount == 1 else "user"
+            cur.execute(
+                """INSERT INTO users (username, email, password, role)
+                   VALUES (%s, %s, %s, %s)""",
+                (username, email, hashed_password, role)
+            )
+            last_id = cur.lastrowid
+            shard   = Shards.place(cur, last_id)
+            commit(cur)
+        except driver().errors.IntegrityError as e:
+            cur._connection.rollback()
+            if e.errno != driver().errorcode.ER_DUP_ENTRY:
+                raise
+            raise DuplicateUserError(
+                "email" if "uq_users_email" in str(e) else "username"
+            ) from e
+        finally:
+            cur.close()
+        if shard is not None:
+            Shards.ensure_stub(last_id, shard)
+        return last_id
+
+    @staticmethod
+    def delete_where_username_like(pattern):
+        """Remove users whose username matches a LIKE pattern (load-test cleanup)."""
+        deleted = 0
+        for shard in all_databases():          # shard stubs cascade to their rows
+            cur = get_cursor(shard=shard)
+            cur.execute("DELETE FROM users WHERE username LIKE %s", (pattern,))
+            if shard is None:
+                deleted = cur.rowcount
+            commit(cur)
+            cur.close()
+        return deleted
+
+    @staticmethod
+    def update_password(user_id, hashed_password):
+        cur = get_cursor()
         cur.execute(
-            """INSERT INTO users (username, email, password, role)
-               VALUES (%s, %s, %s, %s)""",
-            (username, email, hashed_password, role)
+            "UPDATE users SET password = %s WHERE id = %s",
+            (hashed_password, user_id)
         )
-        cur._connection.commit()
-        last_id = cur.lastrowid
+        commit(cur)
         cur.close()
-        return last_id
 
     # ── Admin helpers ─────────────────────────────────────────
 
     @staticmethod
     def get_all():
-        cur = get_cursor()
+        cur = get_cursor()      # primary: shows promote/demote right away
         cur.execute(
             "SELECT id, username, email, role, created_at FROM users ORDER BY created_at DESC"
         )
@@ -101,13 +143,62 @@ class User(UserMixin):
         cur.close()
         return rows
 
+    @staticmethod
+    def get_usernames(user_ids):
+        """{id: username} for a set of ids, from the directory."""
+        if not user_ids:
+            return {}
+        cur = get_cursor(readonly=True)
+        cur.execute(
+            f"""SELECT id, username FROM users
+                WHERE id IN ({", ".join(["%s"] * len(user_ids))})""",
+            tuple(user_ids)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return {r["id"]: r["username"] for r in rows}
+
+    @staticmethod
+    def signups_by_month(since):
+        """{'YYYY-MM': users who signed up that month}, from `since` (a date) on."""
+        cur = get_cursor(readonly=True)
+        cur.execute(
+            """SELECT DATE_FORMAT(created_at, '%%Y-%%m') AS month, COUNT(*) AS cnt
+               FROM users WHERE created_at >= %s
+               GROUP BY month""",
+            (since,)
+        )
+        rows = cur.fetchall()
+        cur.close()
+        return {r["month"]: r["cnt"] for r in rows}
+
+    @staticmethod
+    def get_ids_after(last_id, limit):
+        """Next `limit` user ids above last_id (keyset pagination for batch jobs)."""
+        cur = get_cursor()
+        cur.execute(
+            "SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s",
+            (last_id, limit)
+        )
+        ids = [r["id"] for r in cur.fetchall()]
+        cur.close()
+        return ids
+
+    @staticmethod
+    def count_after(last_id):
+        cur = get_cursor()
+        cur.execute("SELECT COUNT(*) AS cnt FROM users WHERE id > %s", (last_id,))
+        row = cur.fetchone()
+        cur.close()
+        return row["cnt"] if row else 0
+
     @staticmethod
     def promote(user_id):
         cur = get_cursor()
         cur.execute(
             "UPDATE users SET role = 'admin' WHERE id = %s", (user_id,)
         )
-        cur._connection.commit()
+        commit(cur)
         cur.close()
 
     @staticmethod
@@ -116,5 +207,5 @@ class User(UserMixin):
         cur.execute(
             "UPDATE users SET role = 'user' WHERE id = %s", (user_id,)
         )
-        cur._connection.commit()
+        commit(cur)
         cur.close()
@@ -4,12 +4,18 @@ Admin-only views. First registered user is auto-promoted to admin.
 Access protected by @admin_required decorator.
 """
 
+from datetime import date
 from functools import wraps
-from flask import Blueprint, render_template, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, jsonify, request
 from flask_login import login_required, current_user
 
+from analytics import platform
+from models import periods
+from models.metrics import month_key, shift_month
 from models.user import User
 from models.expense import Expense
+from models.money import ZERO
+from services import counters
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -31,10 +37,11 @@ def admin_required(f):
 @admin_bp.route("/")
 @admin_required
 def dashboard():
-    users = User.get_all()
-    # Annotate each user with their total spend
+    users  = User.get_all()
+    # Annotate each user with their total spend (one query per shard, in parallel)
+    totals = Expense.get_totals_by_user()
     for u in users:
-        u["total_spent"] = Expense.get_total_by_user(u["id"])
+        u["total_spent"] = totals.get(u["id"], ZERO)
     total_users    = len(users)
     total_expenses = sum(u["total_spent"] for u in users)
     return render_template("admin/dashboard.html",
@@ -43,6 +50,37 @@ def dashboard():
                            total_expenses=total_expenses)
 
 
+@admin_bp.route("/analytics")
+@admin_required
+def analytics():
+    """Platform-wide activity, spend, retention and top spenders (analytics/platform.py)."""
+    today = date.today()
+    month = request.args.get("month") or month_key(today)
+    if periods.period_of(month) != "month":
+        abort(400)
+    (activity, t1), (spend, t2), (cohorts, t3), (spenders, t4) = (
+        platform.cached(platform.activity, today),
+        platform.cached(platform.category_spend, month),
+        platform.cached(platform.retention, today),
+        platform.cached(platform.top_spenders, month),
+    )
+    return render_template("admin/analytics.html",
+                           month=month,
+                           months=[shift_month(month_key(today), -i) for i in range(12)],
+                           activity=activity,
+                           spend=spend,
+                           cohorts=cohorts,
+                           spenders=spenders,
+                           computed_at=min(t1, t2, t3, t4))
+
+
+@admin_bp.route("/metrics")
+@admin_required
+def metrics():
+    """Per-worker counters and gauges (hash queue depth, rejections, ...)."""
+    return jsonify(counters.snapshot())
+
+
 @admin_bp.route("/users/<int:user_id>/promote", methods=["POST"])
 @admin_required
 def promote_user(user_id):
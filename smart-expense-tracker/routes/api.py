@@ -0,0 +1,390 @@
+"""
+routes/api.py
+Versioned JSON API (/api/v1) for expenses, budgets and recurring items,
+built on the same models as the HTML views.
+
+- Auth: the browser session (send the CSRF token as X-CSRFToken on
+  writes), or "Authorization: Bearer <token>" from `flask api token`.
+- Writes take an optional Idempotency-Key header. The first response for a
+  key is stored in the same transaction as the write and replayed for
+  retries, so a retried POST never creates a second row.
+- Single rows carry an ETag. PUT/DELETE honour If-Match (412 when the row
+  changed since it was read); GET honours If-None-Match.
+- Collection GETs are delta-sync endpoints: ?since=<next_since of the last
+  reply> (or If-Modified-Since with its Last-Modified) returns only rows
+  changed since, plus the ids deleted since.
+- /sync is the change-log feed for offline clients (static/js/sync.js):
+  every kind at once, by sequence number instead of time.
+"""
+
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, request, current_app, url_for, abort, g
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from db import get_cursor, transaction
+from extensions import csrf
+from models.expense import Expense
+from models.budget import Budget
+from models.recurring import Recurring
+from models.idempotency import Idempotency
+from models.sync import Sync, KINDS
+from routes.validation import parse_expense, parse_budget, parse_recurring
+from services.jsonresp import dumps, loads, json_response
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+csrf.exempt(api_bp)     # checked in _authenticate unless a bearer token was used
+
+_REPLAY_HEADERS = ("ETag", "Location")
+
+
+@api_bp.before_request
+def _authenticate():
+    if not current_user.is_authenticated:
+        return json_response({"error": "Authentication required"}, status=401)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and not g.get("api_token_auth"):
+        csrf.protect()
+
+
+@api_bp.errorhandler(HTTPException)
+def _http_error(e):
+    return json_response({"error": e.description}, status=e.code)
+
+
+# ── Representations ───────────────────────────────────────────
+
+def _expense(row):
+    return {
+        "id":          row["id"],
+        "category_id": row["category_id"],
+        "amount":      row["amount"],
+        "description": row["description"],
+        "date":        row["date"],
+        "archived":    bool(row.get("archived", 0)),
+        "updated_at":  row["updated_at"],
+    }
+
+
+def _budget(row):
+    return {
+        "id":          row["id"],
+        "category_id": row["category_id"],
+        "period":      row["period"],
+        "month":       row["month"],
+        "amount":      row["amount"],
+        "updated_at":  row["updated_at"],
+    }
+
+
+def _recurring(row):
+    return {
+        "id":           row["id"],
+        "category_id":  row["category_id"],
+        "amount":       row["amount"],
+        "description":  row["description"],
+        "frequency":    row["frequency"],
+        "day_of_month": row["day_of_month"],
+        "starts_on":    row["starts_on"],
+        "ends_on":      row["ends_on"],
+        "next_due":     row["next_due"],
+        "active":       bool(row["active"]),
+        "updated_at":   row["updated_at"],
+    }
+
+
+# ── Helpers ───────────────────────────────────────────────────
+
+def _etag(rep):
+    return hashlib.sha1(dumps(rep)).hexdigest()[:20]
+
+
+def _one(rep, status=200):
+    """Single-row response with its ETag (304 for a matching If-None-Match)."""
+    response = json_response(rep, status=status)
+    response.set_etag(_etag(rep))
+    return response.make_conditional(request)
+
+
+def _current(row, to_rep):
+    """404 for a missing row, 412 if If-Match names another version; returns the rep."""
+    if row is None:
+        abort(404, description="Not found")
+    rep = to_rep(row)
+    if request.if_match and not request.if_match.contains(_etag(rep)):
+        abort(412, description="Modified since it was read (If-Match)")
+    return rep
+
+
+def _body(parser):
+    category_ids = {c["id"] for c in Expense.get_all_categories()}
+    row, error = parser(request.get_json(silent=True), category_ids)
+    if error:
+        abort(400, description=error)
+    return row
+
+
+def _no_content():
+    return current_app.response_class(status=204)
+
+
+def _replay(seen):
+    response = current_app.response_class(bytes(seen["body"] or b""), status=seen["status"],
+                                          mimetype="application/json")
+    for name, value in loads(seen["headers"] or "{}").items():
+        response.headers[name] = value
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _write(view):
+    """
+    Run a write view as one transaction. With an Idempotency-Key, the key,
+    the rows and the response commit together; a repeat of the same request
+    gets the stored response, a different request under the key gets 422.
+    Errors roll everything back, so a failed request can be retried as-is.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is not None and not 0 < len(key) <= 64:
+            abort(400, description="Idempotency-Key must be 1-64 characters")
+        with transaction():
+            if key is None:
+                return view(*args, **kwargs)
+            uid = current_user.id
+            fingerprint = hashlib.sha256(b"\n".join((
+                request.method.encode(), request.path.encode(), request.get_data()
+            ))).hexdigest()
+            cur = get_cursor(user_id=uid)
+            try:
+                seen = Idempotency.claim(cur, uid, key, fingerprint,
+                                         current_app.config["IDEMPOTENCY_TTL_HOURS"])
+                if seen is not None:
+                    if seen["fingerprint"] != fingerprint:
+                        abort(422, description="Idempotency-Key was used for a different request")
+                    return _replay(seen)
+                response = view(*args, **kwargs)
+                headers = {h: response.headers[h] for h in _REPLAY_HEADERS if h in response.headers}
+                Idempotency.store(cur, uid, key, response.status_code,
+                                  dumps(headers).decode("utf-8"), response.get_data())
+                return response
+            finally:
+                cur.close()
+    return wrapper
+
+
+def _sync(kind, changed_since, to_rep):
+    """Collection reply: every row, or with a cursor only the changes since it."""
+    uid   = current_user.id
+    since = request.args.get("since")
+    conditional = False
+    if since:
+        try:
+            since = datetime.fromisoformat(since).replace(tzinfo=None)
+        except ValueError:
+            abort(400, description="since must be the next_since of an earlier reply")
+    elif request.if_modified_since:
+        since, conditional = request.if_modified_since.replace(tzinfo=None), True
+
+    # Clock first: rows committed after this point are picked up next time
+    next_since, horizon = Sync.clock(uid)
+    if since and since < horizon:
+        abort(410, description="since is older than the deletion log; sync again without it")
+    rows    = changed_since(uid, since)
+    deleted = Sync.deleted_since(uid, kind, since) if since else []
+    if conditional and not rows and not deleted:
+        return current_app.response_class(status=304)
+
+    response = json_response({
+        "items":      [to_rep(r) for r in rows],
+        "deleted":    deleted,
+        "full":       since is None,
+        "next_since": next_since,
+    })
+    response.last_modified = next_since
+    return response
+
+
+# ── Change-log sync ───────────────────────────────────────────
+
+# kind -> (reply key, loader by id, full loader, representation)
+_SYNC_KINDS = {
+    "expense":   ("expenses",  Expense.get_many,   Expense.changed_since,   _expense),
+    "budget":    ("budgets",   Budget.get_many,    Budget.changed_since,    _budget),
+    "recurring": ("recurring", Recurring.get_many, Recurring.changed_since, _recurring),
+}
+
+
+@api_bp.route("/sync")
+def sync():
+    """
+    ?since=<seq of the last reply>. Without it: every row plus the current
+    seq. With it: the current state of rows changed after that seq and the
+    ids deleted since, at most SYNC_PAGE changes per reply (`more` = call
+    again with the returned seq). All reads share one snapshot, and the log
+    commits in seq order, so nothing up to `seq` is ever missed.
+    """
+    uid   = current_user.id
+    since = request.args.get("since", type=int)
+    seq, pruned_seq = Sync.state(uid)
+    reply = {"user_id": uid, "full": since is None, "more": False,
+             "deleted": {kind: [] for kind in KINDS}}
+
+    if since is None:
+        reply["categories"] = Expense.get_all_categories()
+        for key, _, load_all, to_rep in _SYNC_KINDS.values():
+            reply[key] = [to_rep(r) for r in load_all(uid)]
+    else:
+        if not pruned_seq <= since <= seq:
+            abort(410, description="sync cursor expired; sync again without since")
+        limit   = current_app.config["SYNC_PAGE"]
+        changes = Sync.changes(uid, since, limit + 1)
+        if len(changes) > limit:
+            changes = changes[:limit]
+            reply["more"], seq = True, changes[-1]["seq"]
+        for kind, (key, load_many, _, to_rep) in _SYNC_KINDS.items():
+            ids = [c["row_id"] for c in changes if c["kind"] == kind and c["op"] == "upsert"]
+            reply[key] = [to_rep(r) for r in load_many(uid, ids)]
+            reply["deleted"][kind] = [c["row_id"] for c in changes
+                                      if c["kind"] == kind and c["op"] == "delete"]
+    reply["seq"] = seq
+    return json_response(reply)
+
+
+# ── Categories ────────────────────────────────────────────────
+
+@api_bp.route("/categories")
+def list_categories():
+    return json_response({"items": Expense.get_all_categories()})
+
+
+# ── Expenses ──────────────────────────────────────────────────
+
+@api_bp.route("/expenses")
+def list_expenses():
+    return _sync("expense", Expense.changed_since, _expense)
+
+
+@api_bp.route("/expenses", methods=["POST"])
+@_write
+def create_expense():
+    uid = current_user.id
+    expense_id = Expense.create(user_id=uid, **_body(parse_expense))
+    response = _one(_expense(Expense.get_by_id(expense_id, uid)), status=201)
+    response.headers["Location"] = url_for("api.get_expense", expense_id=expense_id)
+    return response
+
+
+@api_bp.route("/expenses/<int:expense_id>")
+def get_expense(expense_id):
+    return _one(_current(Expense.get_by_id(expense_id, current_user.id), _expense))
+
+
+@api_bp.route("/expenses/<int:expense_id>", methods=["PUT"])
+@_write
+def update_expense(expense_id):
+    uid = current_user.id
+    _current(Expense.get_by_id(expense_id, uid, for_update=True), _expense)
+    Expense.update(expense_id=expense_id, user_id=uid, **_body(parse_expense))
+    return _one(_expense(Expense.get_by_id(expense_id, uid)))
+
+
+@api_bp.route("/expenses/<int:expense_id>", methods=["DELETE"])
+@_write
+def delete_expense(expense_id):
+    uid = current_user.id
+    _current(Expense.get_by_id(expense_id, uid, for_update=True), _expense)
+    Expense.delete(expense_id, uid)
+    return _no_content()
+
+
+# ── Budgets ───────────────────────────────────────────────────
+
+@api_bp.route("/budgets")
+def list_budgets():
+    return _sync("budget", Budget.changed_since, _budget)
+
+
+@api_bp.route("/budgets", methods=["POST"])
+@_write
+def set_budget():
+    """Upsert: one budget per (period key, category); null category = overall."""
+    uid = current_user.id
+    budget_id = Budget.set(user_id=uid, **_body(parse_budget))
+    response = _one(_budget(Budget.get_by_id(budget_id, uid)))
+    response.headers["Location"] = url_for("api.get_budget", budget_id=budget_id)
+    return response
+
+
+@api_bp.route("/budgets/<int:budget_id>")
+def get_budget(budget_id):
+    return _one(_current(Budget.get_by_id(budget_id, current_user.id), _budget))
+
+
+@api_bp.route("/budgets/<int:budget_id>", methods=["PUT"])
+@_write
+def update_budget(budget_id):
+    """Change the amount; month and category identify the budget and are fixed."""
+    uid = current_user.id
+    rep  = _current(Budget.get_by_id(budget_id, uid, for_update=True), _budget)
+    data = _body(parse_budget)
+    if (data["month"], data["category_id"]) != (rep["month"], rep["category_id"]):
+        abort(400, description="month and category_id cannot change; create a new budget")
+    Budget.update_amount(budget_id, uid, data["amount"])
+    return _one(_budget(Budget.get_by_id(budget_id, uid)))
+
+
+@api_bp.route("/budgets/<int:budget_id>", methods=["DELETE"])
+@_write
+def delete_budget(budget_id):
+    uid = current_user.id
+    _current(Budget.get_by_id(budget_id, uid, for_update=True), _budget)
+    Budget.delete(budget_id, uid)
+    return _no_content()
+
+
+# ── Recurring ─────────────────────────────────────────────────
+
+@api_bp.route("/recurring")
+def list_recurring():
+    return _sync("recurring", Recurring.changed_since, _recurring)
+
+
+@api_bp.route("/recurring", methods=["POST"])
+@_write
+def create_recurring():
+    uid  = current_user.id
+    data = _body(parse_recurring)
+    active = data.pop("active")
+    rec_id = Recurring.create(user_id=uid, **data)
+    if not active:
+        Recurring.toggle_active(rec_id, uid)
+    response = _one(_recurring(Recurring.get_by_id(rec_id, uid)), status=201)
+    response.headers["Location"] = url_for("api.get_recurring", rec_id=rec_id)
+    return response
+
+
+@api_bp.route("/recurring/<int:rec_id>")
+def get_recurring(rec_id):
+    return _one(_current(Recurring.get_by_id(rec_id, current_user.id), _recurring))
+
+
+@api_bp.route("/recurring/<int:rec_id>", methods=["PUT"])
+@_write
+def update_recurring(rec_id):
+    uid = current_user.id
+    _current(Recurring.get_by_id(rec_id, uid, for_update=True), _recurring)
+    Recurring.update(rec_id=rec_id, user_id=uid, **_body(parse_recurring))
+    return _one(_recurring(Recurring.get_by_id(rec_id, uid)))
+
+
+@api_bp.route("/recurring/<int:rec_id>", methods=["DELETE"])
+@_write
+def delete_recurring(rec_id):
+    uid = current_user.id
+    _current(Recurring.get_by_id(rec_id, uid, for_update=True), _recurring)
+    Recurring.delete(rec_id, uid)
+    return _no_content()
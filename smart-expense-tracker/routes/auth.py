@@ -10,8 +10,9 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
 
-from models.user import User
-from extensions import bcrypt
+from models.user import User, DuplicateUserError
+from services.hashing import (hash_password, check_password, needs_rehash,
+                              HashPoolBusy)
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -34,12 +35,13 @@ class RegisterForm(FlaskForm):
     def validate_username(self, field):
         if not re.match(r'^[A-Za-z0-9_]+$', field.data):
             raise ValidationError("Letters, numbers and underscores only.")
-        if User.username_exists(field.data):
-            raise ValidationError("Username already taken.")
 
-    def validate_email(self, field):
-        if User.email_exists(field.data.strip().lower()):
-            raise ValidationError("Email already registered.")
+    # Uniqueness is enforced by the insert itself (see User.create); the
+    # resulting DuplicateUserError is mapped back onto these messages.
+    DUPLICATE_ERRORS = {
+        "username": "Username already taken.",
+        "email":    "Email already registered.",
+    }
 
 
 class LoginForm(FlaskForm):
@@ -55,12 +57,20 @@ def register():
         return redirect(url_for("main.dashboard"))
     form = RegisterForm()
     if form.validate_on_submit():
-        hashed = bcrypt.generate_password_hash(form.password.data).decode("utf-8")
-        User.create(
-            form.username.data.strip(),
-            form.email.data.strip().lower(),
-            hashed
-        )
+        try:
+            hashed = hash_password(form.password.data)
+        except HashPoolBusy:
+            flash("We're busy right now — please try again in a moment.", "warning")
+            return render_template("auth/register.html", form=form), 503
+        try:
+            User.create(
+                form.username.data.strip(),
+                form.email.data.strip().lower(),
+                hashed
+            )
+        except DuplicateUserError as e:
+            getattr(form, e.field).errors.append(form.DUPLICATE_ERRORS[e.field])
+            return render_template("auth/register.html", form=form)
         flash("Account created! Please log in.", "success")
         return redirect(url_for("auth.login"))
     return render_template("auth/register.html", form=form)
@@ -73,7 +83,20 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.get_by_email(form.email.data.strip().lower())
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        try:
+            valid = user is not None and check_password(user.password, form.password.data)
+        except HashPoolBusy:
+            flash("We're busy right now — please try again in a moment.", "warning")
+            return render_template("auth/login.html", form=form), 503
+        if valid and needs_rehash(user.password):
+            # Cost setting changed since this hash was made: upgrade it now
+            # while we have the plaintext. Optional, so a busy pool skips it
+            # until the next login rather than failing this one.
+            try:
+                User.update_password(user.id, hash_password(form.password.data))
+            except HashPoolBusy:
+                pass
+        if valid:
             login_user(user)
             session.permanent = True
             next_page = request.args.get("next")
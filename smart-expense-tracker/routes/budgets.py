@@ -1,17 +1,20 @@
 """
 routes/budgets.py
-Set and manage monthly + category-wise budgets.
+Set and manage overall + category-wise budgets per month, week, quarter,
+year or rolling window, and review past periods.
 """
 
 from datetime import date
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
-from wtforms import DecimalField, SelectField, HiddenField
+from wtforms import DecimalField, SelectField, HiddenField, IntegerField, DateField
 from wtforms.validators import DataRequired, NumberRange, Optional
 
+from models import periods
 from models.budget import Budget
 from models.expense import Expense
+from services import fragments
 
 budgets_bp = Blueprint("budgets", __name__)
 
@@ -21,6 +24,28 @@ class BudgetForm(FlaskForm):
     amount      = DecimalField("Budget Amount (₹)", validators=[
         DataRequired(), NumberRange(min=1)
     ], places=2)
+    period      = SelectField("Period", default="month", choices=[
+        ("month", "Month"), ("week", "Week (Mon–Sun)"), ("quarter", "Quarter"),
+        ("year", "Year"), ("rolling", "Rolling window"),
+    ])
+    on          = DateField("Period containing", validators=[Optional()])
+    window_days = IntegerField("Window (days)", validators=[
+        Optional(), NumberRange(min=periods.ROLLING_DAYS[0], max=periods.ROLLING_DAYS[1])
+    ])
+
+    def validate(self, extra_validators=None):
+        # Not an inline validator: Optional() stops the chain on an empty field
+        if not super().validate(extra_validators):
+            return False
+        if self.period.data == "rolling" and not self.window_days.data:
+            self.window_days.errors.append("Enter how many days the rolling window covers.")
+            return False
+        return True
+
+    def period_key(self):
+        """Budget key for the chosen period (the one containing `on`, default today)."""
+        return periods.key_for(self.period.data, self.on.data or date.today(),
+                               self.window_days.data)
 
     def populate_categories(self):
         cats = Expense.get_all_categories()
@@ -32,24 +57,36 @@ class BudgetForm(FlaskForm):
 @budgets_bp.route("/budgets", methods=["GET", "POST"])
 @login_required
 def manage_budgets():
-    month = date.today().strftime("%Y-%m")
+    today = date.today()
     form  = BudgetForm()
     form.populate_categories()
 
     if form.validate_on_submit():
         cat_id = form.category_id.data or None  # 0 → None = overall
+        key    = form.period_key()
         Budget.set(
             user_id=current_user.id,
-            month=month,
+            month=key,
             amount=form.amount.data,
             category_id=cat_id
         )
-        flash("Budget saved successfully.", "success")
+        flash(f"Budget for {periods.label(key)} saved successfully.", "success")
         return redirect(url_for("budgets.manage_budgets"))
 
-    budgets = Budget.get_status_for_month(current_user.id, month)
+    uid    = current_user.id
+    status = fragments.render(
+        "budgets/_status.html", (uid, fragments.version(uid), today),
+        lambda: {"budgets": Budget.get_status(uid, today)},
+    )
     return render_template("budgets/manage.html",
-                           form=form, budgets=budgets, month=month)
+                           form=form, status=status, today=today)
+
+
+@budgets_bp.route("/budgets/history")
+@login_required
+def budget_history():
+    return render_template("budgets/history.html",
+                           budgets=Budget.history(current_user.id))
 
 
 @budgets_bp.route("/budgets/<int:budget_id>/delete", methods=["POST"])
@@ -6,7 +6,6 @@ Advanced filtering: search, amount range, sort.
 
 import io
 import csv
-import json
 from datetime import date
 
 from flask import (Blueprint, render_template, redirect, url_for,
@@ -16,9 +15,20 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, DecimalField, SelectField, DateField
 from wtforms.validators import DataRequired, NumberRange, Length
 
+from db import pin_primary
 from models.expense import Expense
 from models.budget import Budget
 from models.recurring import Recurring
+from models.metrics import UserMetrics
+from models.money import Money
+from models.analytics_cache import AnalyticsCache
+from models.anomaly import Anomaly
+from models.archive import Archive
+from analytics.payload import build_payload, COLUMNAR_SECTIONS
+from routes.validation import parse_expense
+from services import categorizer, fragments, groupcommit
+from services.jsonresp import dumps, loads, json_response, columnar, wants_columns
+from analytics.series import parse_args, build_series, SeriesError
 
 expenses_bp = Blueprint("expenses", __name__)
 
@@ -47,6 +57,17 @@ def _owned_or_404(expense_id):
     return row
 
 
+def _page_key(value, sort):
+    """?after=<date or amount>_<id> from the previous page's link, or None."""
+    column, _, expense_id = (value or "").rpartition("_")
+    try:
+        column = Money.of(column).to_decimal() if sort.startswith("amount") \
+            else date.fromisoformat(column)
+        return column, int(expense_id)
+    except (ArithmeticError, ValueError):
+        return None
+
+
 def _date_val(row_date):
     if isinstance(row_date, date):
         return row_date
@@ -67,28 +88,42 @@ def list_expenses():
     sort        = request.args.get("sort", "date_desc")
 
     # Convert to correct types
-    amount_min = float(amount_min) if amount_min else None
-    amount_max = float(amount_max) if amount_max else None
+    amount_min = Money.of(amount_min).to_decimal() if amount_min else None
+    amount_max = Money.of(amount_max).to_decimal() if amount_max else None
     cat_id_int = int(category_id) if category_id else None
 
-    expenses   = Expense.get_all(current_user.id, date_from, date_to, cat_id_int,
-                                  search, amount_min, amount_max, sort)
+    filters = {
+        "date_from":   date_from,
+        "date_to":     date_to,
+        "category_id": cat_id_int,
+        "search":      search,
+        "amount_min":  amount_min,
+        "amount_max":  amount_max,
+        "sort":        sort,
+    }
+    after      = _page_key(request.args.get("after"), sort)
+    uid        = current_user.id
     categories = Expense.get_all_categories()
+    key        = tuple(filters.values())
 
-    return render_template(
-        "expenses/list.html",
-        expenses=expenses,
-        categories=categories,
-        filters={
-            "date_from":   date_from,
-            "date_to":     date_to,
-            "category_id": cat_id_int,
-            "search":      search,
-            "amount_min":  amount_min,
-            "amount_max":  amount_max,
-            "sort":        sort,
-        },
+    filter_bar = fragments.render(
+        "expenses/_filter_bar.html",
+        key + tuple((c["id"], c["name"]) for c in categories),
+        lambda: {"filters": filters, "categories": categories},
     )
+    def table_context():
+        rows, last = Expense.get_page(uid, date_from, date_to, cat_id_int, search,
+                                      amount_min, amount_max, sort, after,
+                                      current_app.config["EXPENSE_PAGE_SIZE"])
+        return {"filters": filters, "expenses": rows, "first_page": after is None,
+                "next_page": last and f"{last[0]}_{last[1]}"}
+
+    table = fragments.render(
+        "expenses/_table.html",
+        (uid, fragments.version(uid), Archive.cutoff(), after) + key,
+        table_context,
+    )
+    return render_template("expenses/list.html", filter_bar=filter_bar, table=table)
 
 
 # ── Add ───────────────────────────────────────────────────────
@@ -99,13 +134,14 @@ def add_expense():
     form = ExpenseForm()
     form.populate_categories()
     if form.validate_on_submit():
-        Expense.create(
-            user_id=current_user.id,
-            category_id=form.category_id.data,
-            amount=form.amount.data,
-            description=form.description.data.strip(),
-            date=form.date.data,
-        )
+        uid, data = current_user.id, form.data
+        groupcommit.write(uid, lambda: Expense.create(
+            user_id=uid,
+            category_id=data["category_id"],
+            amount=data["amount"],
+            description=data["description"].strip(),
+            date=data["date"],
+        ))
         flash("Expense added successfully.", "success")
         return redirect(url_for("expenses.list_expenses"))
     if request.method == "GET":
@@ -113,6 +149,57 @@ def add_expense():
     return render_template("expenses/form.html", form=form, action="Add")
 
 
+@expenses_bp.route("/api/expenses/batch", methods=["POST"])
+@login_required
+def add_expenses_batch():
+    """
+    Create many expenses in one transaction:
+    {"expenses": [{amount, category_id, description, date}, ...]}.
+    category_id may be omitted; it is then suggested from the description
+    (reported back under "categorized"). All-or-nothing: any invalid item
+    rejects the whole batch. Send the CSRF token in the X-CSRFToken header.
+    """
+    body  = request.get_json(silent=True) or {}
+    items = body.get("expenses")
+    limit = current_app.config["EXPENSE_BATCH_MAX"]
+    if not isinstance(items, list) or not items:
+        return json_response({"error": "expenses must be a non-empty list"}, status=400)
+    if len(items) > limit:
+        return json_response({"error": f"at most {limit} expenses per batch"}, status=400)
+
+    category_ids = {c["id"] for c in Expense.get_all_categories()}
+    uid          = current_user.id
+    rows, errors, suggested = [], {}, {}
+    for i, item in enumerate(items):
+        # Items may leave category_id out; the categorizer fills it in when confident
+        if isinstance(item, dict) and item.get("category_id") is None \
+                and isinstance(item.get("description"), str):
+            category_id, _, _ = categorizer.suggest(uid, item["description"])
+            if category_id is not None:
+                item = {**item, "category_id": category_id}
+                suggested[str(i)] = category_id
+        row, error = parse_expense(item, category_ids)
+        if error:
+            errors[str(i)] = error
+        rows.append(row)
+    if errors:
+        return json_response({"error": "invalid expenses", "items": errors}, status=400)
+
+    ids = groupcommit.write(uid, lambda: Expense.create_many(uid, rows))
+    return json_response({"created": len(ids), "ids": ids, "categorized": suggested},
+                         status=201)
+
+
+@expenses_bp.route("/api/expenses/suggest-category")
+@login_required
+def suggest_category():
+    """?description=... -> {category_id, confidence, source}; category_id null if unsure."""
+    description = (request.args.get("description") or "").strip()[:255]
+    category_id, p, source = categorizer.suggest(current_user.id, description)
+    return json_response({"category_id": category_id, "confidence": round(p, 3),
+                          "source": source})
+
+
 # ── Edit ──────────────────────────────────────────────────────
 
 @expenses_bp.route("/expenses/<int:expense_id>/edit", methods=["GET", "POST"])
@@ -166,7 +253,7 @@ def export_csv():
             str(exp["date"]),
             exp["category_name"],
             exp["description"],
-            f"{float(exp['amount']):.2f}",
+            str(Money.of(exp["amount"])),
         ])
     output.seek(0)
     filename = f"expenses_{date.today().strftime('%Y%m%d')}.csv"
@@ -210,17 +297,17 @@ def export_pdf():
     # Table
     header = ["Date", "Category", "Description", "Amount (₹)"]
     rows   = [header]
-    total  = 0.0
+    total  = 0                          # paise
     for exp in expenses:
-        amt = float(exp["amount"])
-        total += amt
+        amt = Money.of(exp["amount"])
+        total += amt.paise
         rows.append([
             str(exp["date"]),
             exp["category_name"],
             exp["description"][:50],
             f"₹{amt:,.2f}",
         ])
-    rows.append(["", "", "TOTAL", f"₹{total:,.2f}"])
+    rows.append(["", "", "TOTAL", f"₹{Money(total):,.2f}"])
 
     t = Table(rows, colWidths=[3*cm, 3.5*cm, 8*cm, 3*cm])
     t.setStyle(TableStyle([
@@ -257,71 +344,54 @@ def analytics_api():
         from datetime import datetime
         now   = datetime.now()
         month = now.strftime("%Y-%m")
-
-        # Auto-insert recurring expenses for this month
-        Recurring.auto_insert_for_month(current_user.id, now.year, now.month)
-
-        monthly_rows = Expense.get_monthly_total(current_user.id)
-        cat_rows     = Expense.get_category_distribution(current_user.id)
-        month_total  = Expense.get_current_month_total(current_user.id)
-        last_total   = Expense.get_last_month_total(current_user.id)
-        top_cat      = Expense.get_top_category(current_user.id)
-        top3         = Expense.get_top3_categories(current_user.id)
-        avg_daily    = Expense.get_avg_daily_spend(current_user.id)
-        predicted    = Expense.get_predicted_next_month(current_user.id)
-        recent       = Expense.get_recent(current_user.id, limit=5)
-        budget_status = Budget.get_status_for_month(current_user.id, month)
-
-        # Growth percentage vs last month
-        if last_total > 0:
-            growth_pct = round((month_total - last_total) / last_total * 100, 1)
-        else:
-            growth_pct = 0.0
-
-        payload = {
-            "monthly": {
-                "labels": [r["month"] for r in monthly_rows],
-                "data":   [float(r["total"]) for r in monthly_rows],
-            },
-            "category": {
-                "labels": [r["category"] for r in cat_rows],
-                "data":   [float(r["total"]) for r in cat_rows],
-            },
-            "month_total": float(month_total),
-            "top_category": {
-                "name":  top_cat["category"] if top_cat else "N/A",
-                "total": float(top_cat["total"]) if top_cat else 0.0,
-            },
-            "smart": {
-                "top3_categories": [
-                    {"name": r["category"], "total": float(r["total"])} for r in top3
-                ],
-                "avg_daily_spend":   round(avg_daily, 2),
-                "last_month_total":  float(last_total),
-                "growth_pct":        growth_pct,
-                "predicted_next":    round(predicted, 2),
-            },
-            "budgets": budget_status,
-            "recent": [
-                {
-                    "id":          r["id"],
-                    "amount":      float(r["amount"]),
-                    "description": r["description"],
-                    "date":        str(r["date"]),
-                    "category":    r["category_name"],
-                }
-                for r in recent
-            ],
-        }
-
-        return current_app.response_class(
-            json.dumps(payload),
-            mimetype="application/json"
-        )
+        today = now.date()
+
+        # Insert recurring expenses that have fallen due (one indexed probe
+        # when nothing is due; `flask recurring materialize` does everyone)
+        if Recurring.get_due(today, limit=1, user_id=current_user.id):
+            Recurring.materialize(current_user.id, today)
+
+        # Warm path: precomputed by `flask analytics precompute` or an
+        # earlier request today, and dropped by any write since.
+        cached = AnalyticsCache.get(current_user.id, today)
+        if cached is None:
+            from analytics.forecast import forecast_next_month  # NumPy: load on demand
+            # Build from the primary (a lagging replica could cache pre-write
+            # data), reading the cache version in the same snapshot as the
+            # inputs: put() refuses the payload if a write has bumped it since.
+            pin_primary()
+            version = AnalyticsCache.version(current_user.id)
+            payload = build_payload(
+                UserMetrics.load(current_user.id, today),
+                forecast_next_month(current_user.id, today),
+                Expense.get_recent(current_user.id, limit=5),
+                Budget.get_for_month(current_user.id, month),
+                Anomaly.recent(current_user.id),
+            )
+            cached = dumps(payload).decode("utf-8")
+            AnalyticsCache.put(current_user.id, cached, today, version)
+
+        if wants_columns():
+            payload = loads(cached)
+            for key in COLUMNAR_SECTIONS:
+                payload[key] = columnar(payload[key])
+            return json_response(payload)
+        return json_response(cached, raw=True)
 
     except Exception as e:
         current_app.logger.error(f"Analytics error: {e}", exc_info=True)
-        return current_app.response_class(
-            json.dumps({"error": "Failed to load analytics"}),
-            status=500, mimetype="application/json"
-        )
+        return json_response({"error": "Failed to load analytics"}, status=500)
+
+
+@expenses_bp.route("/api/analytics/series")
+@login_required
+def analytics_series():
+    """
+    Bucketed spend over any date range:
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD&bucket=day|week|month|year&group=category
+    """
+    try:
+        start, end, bucket, group = parse_args(request.args)
+    except SeriesError as e:
+        return json_response({"error": str(e)}, status=400)
+    return json_response(build_series(current_user.id, start, end, bucket, group))
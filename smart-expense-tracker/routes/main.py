@@ -1,11 +1,13 @@
 """
 routes/main.py
-Landing page and analytics dashboard.
+Landing page, analytics dashboard and notifications.
 """
 
-from flask import Blueprint, render_template, redirect, url_for
+from flask import Blueprint, render_template, redirect, url_for, request
 from flask_login import login_required, current_user
 
+from models.notification import Notification
+
 main_bp = Blueprint("main", __name__)
 
 
@@ -21,3 +23,20 @@ def index():
 def dashboard():
     """Dashboard shell — chart data is loaded via /api/analytics (AJAX)."""
     return render_template("dashboard.html")
+
+
+@main_bp.route("/notifications")
+@login_required
+def notifications():
+    """Budget alerts and other notifications, newest first."""
+    return render_template("notifications.html",
+                           notifications=Notification.get_recent(current_user.id))
+
+
+@main_bp.route("/notifications/read", methods=["POST"])
+@login_required
+def mark_notifications_read():
+    up_to = request.form.get("up_to", type=int)
+    if up_to:
+        Notification.mark_read(current_user.id, up_to)
+    return redirect(url_for("main.notifications"))
@@ -6,11 +6,15 @@ Manage recurring expenses (subscriptions, EMI, rent, etc).
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
-from wtforms import StringField, DecimalField, SelectField, IntegerField
-from wtforms.validators import DataRequired, NumberRange, Length
+from datetime import date
+
+from wtforms import StringField, DecimalField, SelectField, DateField
+from wtforms.validators import DataRequired, NumberRange, Length, Optional, ValidationError
 
 from models.recurring import Recurring
 from models.expense import Expense
+from models.schedule import LAST_DAY
+from services import fragments
 
 recurring_bp = Blueprint("recurring", __name__)
 
@@ -21,9 +25,19 @@ class RecurringForm(FlaskForm):
         DataRequired(), NumberRange(min=0.01)
     ], places=2)
     category_id  = SelectField("Category", coerce=int, validators=[DataRequired()])
-    day_of_month = IntegerField("Day of Month (1–28)", validators=[
-        DataRequired(), NumberRange(min=1, max=28)
+    frequency    = SelectField("Repeats", default="monthly", choices=[
+        ("weekly", "Weekly"), ("biweekly", "Every 2 weeks"), ("monthly", "Monthly"),
+        ("quarterly", "Quarterly"), ("yearly", "Yearly"),
     ])
+    day_of_month = SelectField("Day of Month", coerce=int, default=1,
+                               choices=[(d, str(d)) for d in range(1, 29)]
+                               + [(LAST_DAY, "Last day of month")])
+    starts_on    = DateField("Starts", validators=[Optional()])
+    ends_on      = DateField("Ends", validators=[Optional()])
+
+    def validate_ends_on(self, field):
+        if field.data and field.data < (self.starts_on.data or date.today()):
+            raise ValidationError("The end date must not be before the start.")
 
     def populate_categories(self):
         cats = Expense.get_all_categories()
@@ -43,12 +57,19 @@ def manage_recurring():
             amount=form.amount.data,
             description=form.description.data.strip(),
             day_of_month=form.day_of_month.data,
+            frequency=form.frequency.data,
+            starts_on=form.starts_on.data,
+            ends_on=form.ends_on.data,
         )
         flash("Recurring expense added.", "success")
         return redirect(url_for("recurring.manage_recurring"))
 
-    entries = Recurring.get_all(current_user.id)
-    return render_template("recurring/manage.html", form=form, entries=entries)
+    uid     = current_user.id
+    listing = fragments.render(
+        "recurring/_list.html", (uid, fragments.version(uid)),
+        lambda: {"entries": Recurring.get_all(uid)},
+    )
+    return render_template("recurring/manage.html", form=form, listing=listing)
 
 
 @recurring_bp.route("/recurring/<int:rec_id>/toggle", methods=["POST"])
@@ -0,0 +1,113 @@
+"""
+routes/validation.py
+Validation for JSON request bodies, mirroring the WTForms rules of the HTML
+forms. Each parser returns (clean row, None) or (None, error message).
+"""
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from models.periods import period_of
+from models.schedule import FREQUENCIES, LAST_DAY
+
+_CENT  = Decimal("0.01")
+
+
+def _amount(value, low, high=Decimal("999999.99")):
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or not low <= amount <= high or amount != amount.quantize(_CENT):
+        return None
+    return amount
+
+
+def _description(item):
+    description = str(item.get("description") or "").strip()
+    return description if 0 < len(description) <= 255 else None
+
+
+def _optional_date(item, name):
+    """(date or None, ok)."""
+    value = item.get(name)
+    if value is None:
+        return None, True
+    try:
+        return date.fromisoformat(str(value)), True
+    except ValueError:
+        return None, False
+
+
+def parse_expense(item, category_ids):
+    """{amount, category_id, description, date} as ExpenseForm validates it."""
+    if not isinstance(item, dict):
+        return None, "must be an object"
+    amount = _amount(item.get("amount"), _CENT)
+    if amount is None:
+        return None, "amount must be 0.01-999999.99 with at most 2 decimals"
+    if item.get("category_id") not in category_ids:
+        return None, "unknown category_id"
+    description = _description(item)
+    if description is None:
+        return None, "description must be 1-255 characters"
+    try:
+        day = date.fromisoformat(str(item.get("date")))
+    except ValueError:
+        return None, "date must be YYYY-MM-DD"
+    return {"category_id": item["category_id"], "amount": amount,
+            "description": description, "date": day}, None
+
+
+def parse_budget(item, category_ids):
+    """
+    {month, category_id (null = overall), amount} as BudgetForm validates it;
+    month is any period key (models/periods.py), e.g. 2026-10 or 30d.
+    """
+    if not isinstance(item, dict):
+        return None, "must be an object"
+    amount = _amount(item.get("amount"), Decimal("1"), Decimal("99999999.99"))
+    if amount is None:
+        return None, "amount must be at least 1 with at most 2 decimals"
+    category_id = item.get("category_id")
+    if category_id is not None and category_id not in category_ids:
+        return None, "unknown category_id"
+    month = item.get("month")
+    if not isinstance(month, str) or period_of(month) is None:
+        return None, "month must be a period key: YYYY-MM, YYYY-Www, YYYY-Qn, YYYY or Nd"
+    return {"month": month, "category_id": category_id, "amount": amount}, None
+
+
+def parse_recurring(item, category_ids):
+    """
+    {amount, category_id, description, day_of_month, frequency?, starts_on?,
+    ends_on?, active?} as RecurringForm validates it.
+    """
+    if not isinstance(item, dict):
+        return None, "must be an object"
+    amount = _amount(item.get("amount"), _CENT)
+    if amount is None:
+        return None, "amount must be 0.01-999999.99 with at most 2 decimals"
+    if item.get("category_id") not in category_ids:
+        return None, "unknown category_id"
+    description = _description(item)
+    if description is None:
+        return None, "description must be 1-255 characters"
+    frequency = item.get("frequency", "monthly")
+    if frequency not in FREQUENCIES:
+        return None, f"frequency must be one of {', '.join(FREQUENCIES)}"
+    day = item.get("day_of_month", 1)
+    if not isinstance(day, int) or isinstance(day, bool) or not (1 <= day <= 28 or day == LAST_DAY):
+        return None, f"day_of_month must be an integer 1-28, or {LAST_DAY} for the last day"
+    starts_on, ok = _optional_date(item, "starts_on")
+    if not ok:
+        return None, "starts_on must be YYYY-MM-DD"
+    ends_on, ok = _optional_date(item, "ends_on")
+    if not ok or (ends_on and ends_on < (starts_on or date.today())):
+        return None, "ends_on must be YYYY-MM-DD, not before starts_on"
+    active = item.get("active", True)
+    if not isinstance(active, bool):
+        return None, "active must be true or false"
+    return {"category_id": item["category_id"], "amount": amount,
+            "description": description, "day_of_month": day, "frequency": frequency,
+            "starts_on": starts_on, "ends_on": ends_on, "active": active}, None
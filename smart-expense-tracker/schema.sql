@@ -1,6 +1,7 @@
 -- ============================================================
 --  Smart Expense Tracker — Schema (MySQL 8)
---  Run once to set up or migrate the database.
+--  Baseline schema: run once to set up the database, then apply
+--  later changes with `flask db upgrade` (files in migrations/).
 --  Safe to re-run: uses IF NOT EXISTS / IF NOT EXISTS guards.
 -- ============================================================
 
@@ -80,6 +81,69 @@ CREATE TABLE IF NOT EXISTS recurring_expenses (
     INDEX idx_rec_user_active (user_id, active)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- ── Expense Rollups ───────────────────────────────────────────
+-- Running monthly per-category totals, maintained on every expense write
+-- (see models/metrics.py). Backfilled from expenses at the bottom of this file.
+CREATE TABLE IF NOT EXISTS expense_rollups (
+    user_id     INT UNSIGNED    NOT NULL,
+    month       CHAR(7)         NOT NULL COMMENT 'YYYY-MM',
+    category_id INT UNSIGNED    NOT NULL,
+    total       DECIMAL(14, 2)  NOT NULL DEFAULT 0,
+    cnt         INT             NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, category_id),
+    CONSTRAINT fk_rollup_user     FOREIGN KEY (user_id)     REFERENCES users(id)      ON DELETE CASCADE,
+    CONSTRAINT fk_rollup_category FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ── Analytics Cache ───────────────────────────────────────────
+-- Precomputed /api/analytics payloads (flask analytics precompute)
+CREATE TABLE IF NOT EXISTS analytics_cache (
+    user_id     INT UNSIGNED    NOT NULL,
+    payload     MEDIUMTEXT      NULL     COMMENT 'NULL = invalidated',
+    computed_on DATE            NOT NULL,
+    computed_at DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    invalidated_at DATETIME(6)  NULL,
+    PRIMARY KEY (user_id),
+    CONSTRAINT fk_cache_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ── Job Checkpoints ───────────────────────────────────────────
+-- Resume markers for batch commands
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job          VARCHAR(50)    NOT NULL,
+    run_date     DATE           NOT NULL,
+    last_user_id INT UNSIGNED   NOT NULL DEFAULT 0,
+    updated_at   DATETIME       NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (job)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ── App State ─────────────────────────────────────────────────
+-- Named singleton flags claimed atomically (e.g. 'first_admin')
+CREATE TABLE IF NOT EXISTS app_state (
+    name        VARCHAR(50)     NOT NULL,
+    value       VARCHAR(255)    NULL,
+    updated_at  DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ── Expense Archive ───────────────────────────────────────────
+-- Cold rows moved out of expenses by `flask expenses archive` (see
+-- models/archive.py). Same columns and ids; compressed, read-only in the app.
+CREATE TABLE IF NOT EXISTS expenses_archive (
+    id          INT UNSIGNED    NOT NULL,
+    user_id     INT UNSIGNED    NOT NULL,
+    category_id INT UNSIGNED    NOT NULL,
+    amount      DECIMAL(10, 2)  NOT NULL,
+    description VARCHAR(255)    NOT NULL,
+    date        DATE            NOT NULL,
+    created_at  DATETIME        NOT NULL,
+    updated_at  DATETIME        NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT fk_archive_user     FOREIGN KEY (user_id)     REFERENCES users(id)      ON DELETE CASCADE,
+    CONSTRAINT fk_archive_category FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT,
+    INDEX idx_archive_user_date (user_id, date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
 -- ── Seed categories ───────────────────────────────────────────
 INSERT IGNORE INTO categories (name) VALUES
     ('Food'),
@@ -93,3 +157,17 @@ INSERT IGNORE INTO categories (name) VALUES
 -- Add role column if upgrading from initial schema
 ALTER TABLE users
     ADD COLUMN IF NOT EXISTS role ENUM('user','admin') NOT NULL DEFAULT 'user' AFTER password;
+
+-- Backfill rollups from existing expenses, archive included
+-- (recomputes, so re-running is safe)
+INSERT INTO expense_rollups (user_id, month, category_id, total, cnt)
+SELECT user_id, DATE_FORMAT(date, '%Y-%m'), category_id, SUM(amount), COUNT(*)
+FROM (SELECT user_id, category_id, amount, date FROM expenses
+      UNION ALL
+      SELECT user_id, category_id, amount, date FROM expenses_archive) e
+GROUP BY user_id, DATE_FORMAT(date, '%Y-%m'), category_id
+ON DUPLICATE KEY UPDATE total = VALUES(total), cnt = VALUES(cnt);
+
+-- Existing installs already have their first admin
+INSERT IGNORE INTO app_state (name, value)
+SELECT 'first_admin', MIN(username) FROM users HAVING COUNT(*) > 0;
@@ -0,0 +1,4 @@
+"""
+services/
+Request-path infrastructure shared by the blueprints (hashing pool, counters).
+"""
@@ -0,0 +1,74 @@
+"""
+services/anomalies.py
+Background anomaly scoring.
+
+Expense writes update the per-category statistics in their own transaction
+(models/anomaly.py) and, once committed, hand the new expense ids to
+enqueue(). A per-process worker thread scores them with Anomaly.score() on
+its own connection, so the request never waits for the scoring queries.
+The queue is bounded by ANOMALY_QUEUE_MAX: when it is full the ids are
+dropped and counted (anomaly_dropped), never blocking the writer;
+`flask analytics anomalies-rebuild` catches up on anything missed.
+"""
+
+import os
+import queue
+import threading
+
+from flask import current_app
+
+import db
+from models.anomaly import Anomaly
+from services import counters
+
+_lock  = threading.Lock()
+_queue = None
+_pid   = None
+
+
+def _score_queue():
+    """Per-process queue and worker thread, started on first use (never inherited across fork)."""
+    global _queue, _pid
+    with _lock:
+        if _queue is None or _pid != os.getpid():
+            cfg = current_app.config
+            _queue, _pid = queue.Queue(maxsize=cfg["ANOMALY_QUEUE_MAX"]), os.getpid()
+            threading.Thread(target=_worker, name="anomaly-scorer", daemon=True,
+                             args=(current_app._get_current_object(), _queue)).start()
+        return _queue
+
+
+def score(user_id, expense_ids):
+    """Score expenses now, on this thread's connection. Returns how many were flagged."""
+    flagged = 0
+    for expense_id in expense_ids:
+        flagged += bool(Anomaly.score(user_id, expense_id))
+    counters.incr("anomaly_scored", len(expense_ids))
+    counters.incr("anomaly_flagged", flagged)
+    return flagged
+
+
+def _worker(app, q):
+    with app.app_context():             # one long-lived connection for the worker
+        while True:
+            user_id, expense_ids = q.get()
+            try:
+                db.pin_primary()        # score what was just committed, not a lagging replica
+                score(user_id, expense_ids)
+            except Exception:
+                app.logger.exception("anomaly scoring failed for user %s", user_id)
+                db.close_db()
+            else:
+                db.end_snapshot()       # fresh directory and data for the next item
+            finally:
+                counters.gauge("anomaly_queue", q.qsize())
+
+
+def enqueue(user_id, expense_ids):
+    """Queue committed expenses for scoring; never blocks."""
+    if not current_app.config["ANOMALY_ENABLED"] or not expense_ids:
+        return
+    try:
+        _score_queue().put_nowait((user_id, list(expense_ids)))
+    except queue.Full:
+        counters.incr("anomaly_dropped", len(expense_ids))
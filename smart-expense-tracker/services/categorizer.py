@@ -0,0 +1,108 @@
+"""
+services/categorizer.py
+Category suggestions for new expenses (the add form and bulk imports).
+
+Each worker keeps naive Bayes models (analytics/categorize.py) in memory:
+one per recently active user, trained on that user's latest
+CATEGORIZER_TRAIN_ROWS expenses and kept in an LRU of CATEGORIZER_USERS,
+plus one global model trained on recent expenses from everyone, which
+covers new users and descriptions a user has never used. Expenses created
+in this worker are learned as soon as they commit. Models are retrained
+from the database after CATEGORIZER_TTL seconds, which picks up writes
+made through other workers, edits and deletes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from analytics.categorize import NaiveBayes, choose
+from models.expense import Expense
+from services import counters
+
+_lock   = threading.Lock()
+_models = None          # user_id -> (model, trained_at), least recently used first
+_global = {"model": None, "at": 0.0}
+_pid    = None
+
+
+def _cache():
+    """Per-process model cache (never inherited across fork)."""
+    global _models, _pid
+    if _models is None or _pid != os.getpid():
+        _models, _pid = OrderedDict(), os.getpid()
+        _global.update(model=None, at=0.0)
+    return _models
+
+
+def clear():
+    with _lock:
+        _cache().clear()
+        _global.update(model=None, at=0.0)
+
+
+def _user_model(user_id):
+    cfg, now = current_app.config, time.monotonic()
+    with _lock:
+        cached = _cache().get(user_id)
+        if cached is not None and now - cached[1] < cfg["CATEGORIZER_TTL"]:
+            _models.move_to_end(user_id)
+            counters.incr("categorizer_hits")
+            return cached[0]
+
+    # Train outside the lock; a concurrent miss for the same user just trains twice
+    rows  = Expense.get_labelled(user_id, cfg["CATEGORIZER_TRAIN_ROWS"])
+    model = NaiveBayes.train((r["description"], r["category_id"]) for r in rows)
+    counters.incr("categorizer_trained")
+    with _lock:
+        models = _cache()
+        models[user_id] = (model, now)
+        models.move_to_end(user_id)
+        while len(models) > cfg["CATEGORIZER_USERS"]:
+            models.popitem(last=False)
+            counters.incr("categorizer_evictions")
+    return model
+
+
+def _global_model():
+    cfg, now = current_app.config, time.monotonic()
+    with _lock:
+        _cache()
+        if _global["model"] is not None and now - _global["at"] < cfg["CATEGORIZER_TTL"]:
+            return _global["model"]
+    rows  = Expense.get_labelled(None, cfg["CATEGORIZER_GLOBAL_ROWS"])
+    model = NaiveBayes.train((r["description"], r["category_id"]) for r in rows)
+    with _lock:
+        _global.update(model=model, at=now)
+    return model
+
+
+def suggest(user_id, description):
+    """
+    (category_id, probability, source) for a description; see
+    analytics.categorize.choose. (None, 0.0, None) when unsure or disabled.
+    """
+    cfg = current_app.config
+    if not cfg["CATEGORIZER_ENABLED"]:
+        return None, 0.0, None
+    user_model, global_model = _user_model(user_id), _global_model()
+    with _lock:
+        result = choose(user_model, global_model, description,
+                        cfg["CATEGORIZER_MIN_EXAMPLES"], cfg["CATEGORIZER_MIN_CONFIDENCE"])
+    if result[0] is not None:
+        counters.incr("categorizer_suggested")
+    return result
+
+
+def learn(user_id, rows):
+    """Fold committed (description, category_id) pairs into this worker's warm models."""
+    with _lock:
+        cached = _cache().get(user_id)
+        for description, category_id in rows:
+            if cached is not None:
+                cached[0].learn(description, category_id)
+            if _global["model"] is not None:
+                _global["model"].learn(description, category_id)
@@ -0,0 +1,34 @@
+"""
+services/counters.py
+Tiny in-process metrics registry: monotonically increasing counters and
+point-in-time gauges, exposed to admins at /admin/metrics.
+Values are per worker process.
+"""
+
+import threading
+
+_lock     = threading.Lock()
+_counters = {}
+_gauges   = {}
+
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
+
+
+def reset():
+    """Clear everything (used after fork so workers don't inherit the master's)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
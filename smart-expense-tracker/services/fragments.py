@@ -0,0 +1,120 @@
+"""
+services/fragments.py
+Cache for rendered template fragments.
+
+Pages render their heavy parts (the expense table, the filter bar, budget
+status, the recurring list) from partial templates through render(). A
+fragment's key includes the user's data version, the sync seq from
+models/sync.py. Every expense, budget and recurring write bumps that seq in
+its own transaction, so a write invalidates all of the user's fragments
+without an explicit purge; superseded entries age out of the LRU. The
+version is read on the same connection as the fragment's data, inside the
+same snapshot, so a cached fragment always matches its key.
+
+The build function (the queries) only runs on a miss. Per-row forms need
+the session's CSRF token, which must not be cached: partials write
+{{ csrf }} (CSRF_SLOT) and render() puts the live token in on the way out.
+
+Entries live in this process, up to FRAGMENT_CACHE_MB. With FRAGMENT_CACHE
+off every fragment is rendered fresh (benchmarks/fragment_render.py
+compares both).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+
+from models.sync import Sync
+from services import counters
+
+CSRF_SLOT = "\x00csrf\x00"
+
+
+class LRU:
+    """Byte-bounded LRU of rendered strings."""
+
+    def __init__(self, max_bytes):
+        self._lock      = threading.Lock()
+        self._entries   = OrderedDict()     # key -> str
+        self._bytes     = 0
+        self.max_bytes  = max_bytes
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = html
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped)
+                counters.incr("fragment_evictions")
+            counters.gauge("fragment_cache_bytes", self._bytes)
+            counters.gauge("fragment_cache_entries", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_lock  = threading.Lock()
+_cache = None
+_pid   = None
+
+
+def _lru():
+    """This process's cache, created on first use (never inherited across fork)."""
+    global _cache, _pid
+    with _lock:
+        if _cache is None or _pid != os.getpid():
+            _cache = LRU(int(current_app.config["FRAGMENT_CACHE_MB"] * 1024 * 1024))
+            _pid   = os.getpid()
+        return _cache
+
+
+def clear():
+    _lru().clear()
+
+
+def version(user_id):
+    """The user's data version, read where (and when) their fragment data is read."""
+    return Sync.version(user_id)
+
+
+def render(template, key, build):
+    """
+    Rendered partial `template` for `key` (hashable, including version()
+    where the fragment shows user data). build() returns the template's
+    context and runs only on a miss.
+    """
+    if not current_app.config["FRAGMENT_CACHE"]:
+        html = render_template(template, csrf=CSRF_SLOT, **build())
+    else:
+        cache = _lru()
+        full  = (template,) + tuple(key)
+        html  = cache.get(full)
+        if html is None:
+            counters.incr("fragment_misses")
+            html = render_template(template, csrf=CSRF_SLOT, **build())
+            cache.put(full, html)
+        else:
+            counters.incr("fragment_hits")
+    if CSRF_SLOT in html:
+        html = html.replace(CSRF_SLOT, generate_csrf())
+    return Markup(html)
@@ -0,0 +1,149 @@
+"""
+services/groupcommit.py
+Group commit for small, frequent writes.
+
+write(user_id, fn) runs fn() — model calls for one user — as one unit of
+work. With GROUP_COMMIT_MS = 0 (the default) that is simply its own
+transaction. With a window set, units are handed to a per-process writer
+thread that gathers whatever arrives within the window (up to
+GROUP_COMMIT_MAX units), runs each under its own SAVEPOINT on a shared
+connection and commits them together: a burst of N writes costs one log
+flush instead of N. A unit that fails is rolled back to its savepoint and
+its exception is re-raised in the caller; the rest still commit. Callers
+block until the shared COMMIT has returned, so nothing is acknowledged
+before it is durable. When sharded, a batch commits once per shard, and a
+failed COMMIT fails only the units on that shard.
+
+A unit still queued after GROUP_COMMIT_TIMEOUT is cancelled and the caller
+gets GroupCommitBusy (a 503): nothing was written, so a retry is safe. A
+unit the writer has already started is waited for, since its outcome is
+only known once the shared COMMIT returns.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from flask import current_app, g
+
+import db
+from services import counters
+
+_lock  = threading.Lock()
+_queue = None
+_pid   = None
+
+
+class GroupCommitBusy(Exception):
+    """A unit waited GROUP_COMMIT_TIMEOUT in the queue and was cancelled unwritten (HTTP 503)."""
+
+
+def _writer_queue():
+    """Per-process queue and writer thread, started on first use (never inherited across fork)."""
+    global _queue, _pid
+    with _lock:
+        if _queue is None or _pid != os.getpid():
+            _queue, _pid = queue.Queue(), os.getpid()
+            threading.Thread(target=_writer, name="group-commit", daemon=True,
+                             args=(current_app._get_current_object(), _queue)).start()
+        return _queue
+
+
+def _collect(q, window, limit):
+    """Block for one unit, then take what else arrives within `window` seconds."""
+    batch    = [q.get()]
+    deadline = time.monotonic() + window
+    while len(batch) < limit:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(q.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run_batch(batch):
+    # Units whose callers gave up are dropped; the rest can no longer be cancelled
+    batch = [unit for unit in batch if unit[2].set_running_or_notify_cancel()]
+    if not batch:
+        return
+    db.end_snapshot()                   # fresh directory snapshot for every batch
+    # One transaction per shard: commits on different shards are not atomic
+    # together, so a failed COMMIT must only fail the units it covered
+    shard_of = {user_id: shard
+                for shard, user_ids in db.group_by_shard(sorted({u for u, _, _ in batch})).items()
+                for user_id in user_ids}
+    by_shard = {}
+    for unit in batch:
+        by_shard.setdefault(shard_of[unit[0]], []).append(unit)
+    for units in by_shard.values():
+        _commit_units(units)
+
+
+def _commit_units(units):
+    """Run units (all on one shard) under savepoints and commit them together."""
+    outcomes = []
+    try:
+        with db.transaction():
+            for n, (user_id, fn, future) in enumerate(units):
+                cur, hooks = None, len(g.uow_after)
+                try:
+                    cur = db.get_cursor(user_id=user_id)
+                    cur.execute(f"SAVEPOINT unit{n}")
+                    result = fn()
+                except Exception as e:
+                    if cur is not None:
+                        cur.execute(f"ROLLBACK TO SAVEPOINT unit{n}")
+                    del g.uow_after[hooks:]     # its after_commit hooks go with it
+                    outcomes.append((future, None, e))
+                else:
+                    cur.execute(f"RELEASE SAVEPOINT unit{n}")
+                    outcomes.append((future, result, None))
+                finally:
+                    if cur is not None:
+                        cur.close()
+    except Exception as e:              # this shard's COMMIT failed: none of these landed
+        db.close_db()
+        for _, _, future in units:
+            future.set_exception(e)
+        return
+
+    counters.incr("group_commit_batches")
+    counters.incr("group_commit_units", len(units))
+    counters.gauge("group_commit_last_batch", len(units))
+    for future, result, error in outcomes:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def _writer(app, q):
+    window = app.config["GROUP_COMMIT_MS"] / 1000
+    limit  = app.config["GROUP_COMMIT_MAX"]
+    with app.app_context():             # one long-lived connection for the writer
+        while True:
+            _run_batch(_collect(q, window, limit))
+
+
+def write(user_id, fn):
+    """Run fn() as one unit of work for user_id; group-committed when enabled."""
+    cfg = current_app.config
+    if not cfg["GROUP_COMMIT_MS"]:
+        with db.transaction():
+            return fn()
+    future = Future()
+    _writer_queue().put((user_id, fn, future))
+    try:
+        result = future.result(timeout=cfg["GROUP_COMMIT_TIMEOUT"])
+    except FutureTimeout:
+        if future.cancel():
+            counters.incr("group_commit_timeouts")
+            raise GroupCommitBusy() from None
+        result = future.result()        # in a batch already: wait for its COMMIT
+    db.note_write()
+    return result
@@ -0,0 +1,101 @@
+"""
+services/hashing.py
+Password hashing on a bounded thread pool.
+
+bcrypt releases the GIL while it works, so a small pool lets a threaded
+worker keep serving other requests during a login storm. At most
+HASH_POOL_WORKERS hashes run at once and at most HASH_POOL_MAX_QUEUE wait;
+beyond that callers get HashPoolBusy immediately instead of piling up.
+A hash that has not finished within HASH_TIMEOUT also raises HashPoolBusy,
+so the caller answers 503 rather than failing the request.
+
+The pool only overlaps hashing with other requests when the worker serves
+several requests at once, i.e. gunicorn's gthread workers (gunicorn.conf.py).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+
+from extensions import bcrypt
+from services import counters
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing queue is full or a hash outlives HASH_TIMEOUT."""
+
+
+_lock     = threading.Lock()
+_pool     = None
+_pool_pid = None
+_slots    = None
+_pending  = 0
+
+
+def _executor():
+    """Per-process pool, created on first use (never inherited across fork)."""
+    global _pool, _pool_pid, _slots, _pending
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            cfg       = current_app.config
+            workers   = cfg["HASH_POOL_WORKERS"] or os.cpu_count() or 2
+            _pool     = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="bcrypt")
+            _slots    = threading.BoundedSemaphore(workers + cfg["HASH_POOL_MAX_QUEUE"])
+            _pool_pid = os.getpid()
+            _pending  = 0
+        return _pool, _slots
+
+
+def _track(delta):
+    global _pending
+    with _lock:
+        _pending += delta
+        counters.gauge("hash_queue_depth", _pending)
+
+
+def _run(fn, *args):
+    pool, slots = _executor()
+    if not slots.acquire(blocking=False):
+        counters.incr("hash_rejected")
+        raise HashPoolBusy()
+    _track(+1)
+
+    def _done(_):
+        # Free the slot when the hash actually finishes, even if the caller
+        # gave up waiting, so admission always reflects real CPU use.
+        _track(-1)
+        slots.release()
+        counters.incr("hash_ops")
+
+    future = pool.submit(fn, *args)
+    future.add_done_callback(_done)
+    try:
+        return future.result(timeout=current_app.config["HASH_TIMEOUT"])
+    except FutureTimeout:
+        future.cancel()         # still queued: never run it (frees the slot now)
+        counters.incr("hash_timeouts")
+        raise HashPoolBusy() from None
+
+
+def hash_password(password):
+    rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+    return _run(bcrypt.generate_password_hash, password, rounds).decode("utf-8")
+
+
+def check_password(hashed, password):
+    return _run(bcrypt.check_password_hash, hashed, password)
+
+
+def hash_cost(hashed):
+    """Work factor encoded in a bcrypt hash ('$2b$12$...' -> 12), or None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return hash_cost(hashed) != current_app.config["BCRYPT_LOG_ROUNDS"]
@@ -0,0 +1,143 @@
+"""
+services/jsonresp.py
+JSON response pipeline for every API endpoint.
+
+- Serialisation uses orjson when installed (stdlib json otherwise); both
+  handle Money, Decimal, date/datetime and NumPy scalars natively, so models
+  can hand rows straight to the encoder. Money goes out as a JSON number:
+  paise / 100 is a float whose shortest repr is the exact 2-place amount.
+- Responses above JSON_COMPRESS_MIN_BYTES are gzip- or brotli-encoded when
+  the client accepts it.
+- columnar() packs a list of row dicts into column arrays for charts.
+"""
+
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, request
+from flask.json.provider import JSONProvider
+
+from models.money import Money
+
+try:
+    import orjson
+except ImportError:     # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import brotli
+except ImportError:     # pragma: no cover - optional
+    brotli = None
+
+
+def _default(obj):
+    if isinstance(obj, Money):
+        return obj.paise / 100
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):            # NumPy scalar
+        return obj.item()
+    if hasattr(obj, "tolist"):          # NumPy array
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialise to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider so jsonify() and request.get_json() use the same path."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return current_app.response_class(dumps(obj), mimetype="application/json")
+
+
+def json_response(payload, status=200, raw=False):
+    """Response for a payload object (or pre-serialised JSON when raw=True)."""
+    body = payload if raw else dumps(payload)
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
+def columnar(rows, columns=None):
+    """[{a: 1, b: 2}, {a: 3, b: 4}] -> {a: [1, 3], b: [2, 4]}."""
+    if not rows:
+        return {c: [] for c in (columns or [])}
+    columns = columns or list(rows[0].keys())
+    return {c: [r[c] for r in rows] for c in columns}
+
+
+def wants_columns():
+    return request.args.get("layout") == "columns"
+
+
+# ── Compression ───────────────────────────────────────────────
+
+def _accepted(header):
+    """Encodings the client accepts (q=0 excluded)."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress_response(response):
+    """
+    after_request hook: encode large JSON bodies. Every JSON response varies
+    on Accept-Encoding, compressed or not, so a shared cache never hands a
+    stored identity body to a client that asked for gzip (or the reverse).
+    """
+    if response.mimetype != "application/json":
+        return response
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+
+    body = response.get_data()
+    if len(body) < current_app.config["JSON_COMPRESS_MIN_BYTES"]:
+        return response
+
+    accepted = _accepted(request.headers.get("Accept-Encoding", ""))
+    if brotli is not None and "br" in accepted:
+        data, encoding = brotli.compress(body, quality=4), "br"
+    elif "gzip" in accepted:
+        data, encoding = gzip.compress(body, compresslevel=6), "gzip"
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"]   = str(len(data))
+    return response
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
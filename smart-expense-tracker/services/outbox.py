@@ -0,0 +1,77 @@
+"""
+services/outbox.py
+Sends notification outbox entries (models/notification.py) by email or
+webhook. Runs from `flask notify deliver`, never in a web request.
+
+Entries are claimed with SKIP LOCKED, so several delivery runs can work
+side by side without sending anything twice. An entry is marked sent in
+the same transaction that held its lock. A failure backs off
+exponentially, and an entry gives up after OUTBOX_MAX_ATTEMPTS.
+Delivery is at least once: a crash between sending and COMMIT re-sends.
+"""
+
+import json
+import smtplib
+import urllib.request
+from email.message import EmailMessage
+
+from flask import current_app
+
+from db import all_shards, commit
+from models.notification import Outbox
+from models.user import User
+from services import counters
+
+
+def _email(row):
+    cfg  = current_app.config
+    user = User.get_by_id(row["user_id"])
+    if user is None:
+        raise LookupError("user no longer exists")
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = cfg["SMTP_FROM"], user.email, row["title"]
+    msg.set_content(row["body"])
+    with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"], timeout=cfg["NOTIFY_TIMEOUT"]) as smtp:
+        smtp.send_message(msg)
+
+
+def _webhook(row):
+    cfg = current_app.config
+    if not cfg["NOTIFY_WEBHOOK_URL"]:
+        raise LookupError("NOTIFY_WEBHOOK_URL is not set")
+    body = json.dumps({
+        "user_id":    row["user_id"],
+        "kind":       row["kind"],
+        "title":      row["title"],
+        "body":       row["body"],
+        "link":       row["link"],
+        "created_at": row["created_at"].isoformat(),
+    }).encode("utf-8")
+    req = urllib.request.Request(cfg["NOTIFY_WEBHOOK_URL"], data=body, method="POST",
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=cfg["NOTIFY_TIMEOUT"]):
+        pass                            # any 2xx; errors raise
+
+
+_SENDERS = {"email": _email, "webhook": _webhook}
+
+
+def deliver(batch=100):
+    """Send one batch of due entries from every database; returns (sent, failed)."""
+    sent = failed = 0
+    for shard in all_shards():
+        cur, rows = Outbox.claim(shard, batch)
+        for row in rows:
+            try:
+                _SENDERS[row["channel"]](row)
+            except Exception as e:
+                Outbox.failed(cur, row["id"], row["attempts"], e)
+                failed += 1
+            else:
+                Outbox.done(cur, row["id"])
+                sent += 1
+        commit(cur)
+        cur.close()
+    counters.incr("notify_sent", sent)
+    counters.incr("notify_failed", failed)
+    return sent, failed
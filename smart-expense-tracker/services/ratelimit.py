@@ -0,0 +1,263 @@
+"""
+services/ratelimit.py
+Rate limiting and admission control, checked before every request.
+
+- Token buckets: one per (endpoint class, user) — per API token for bearer
+  clients, per IP before login — plus one per IP across all classes. Rates are RATELIMIT_RULES /
+  RATELIMIT_IP, in requests per minute with a burst allowance. Over the
+  limit a request gets 429 with Retry-After.
+- Concurrency caps: at most RATELIMIT_CONCURRENCY[class] requests of a
+  heavy class (exports) run at once in a worker; more get 503.
+- Admission: with ADMISSION_MAX_INFLIGHT set, a worker already running that
+  many requests sheds new ones with 503 instead of queueing them on the DB.
+
+Buckets live in this process by default. With RATELIMIT_STORAGE set to a
+file path they live in a SQLite file, shared by every gunicorn worker on
+the host. If the store fails, requests are let through and counted as
+ratelimit_errors. Everything is counted in services/counters
+(/admin/metrics).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, request, session
+
+from services import counters
+
+# Endpoints that are not "default"; the api blueprint is "api" as a whole
+ENDPOINT_CLASSES = {
+    "auth.login":                 "auth",
+    "auth.register":              "auth",
+    "expenses.export_csv":        "export",
+    "expenses.export_pdf":        "export",
+    "expenses.analytics_api":     "analytics",
+    "expenses.analytics_series":  "analytics",
+    "expenses.add_expenses_batch": "api",
+    "expenses.suggest_category":  "api",
+}
+
+
+class RateLimited(Exception):
+    """Over a token bucket; retry after `retry_after` seconds (HTTP 429)."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """Concurrency cap or admission limit reached (HTTP 503)."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("overloaded")
+        self.retry_after = retry_after
+
+
+def _refill(tokens, at, per_second, burst, now):
+    return min(burst, tokens + (now - at) * per_second)
+
+
+def _charge(states, buckets, now):
+    """
+    Refill every bucket, then spend one token from each of them, or from none
+    if any is empty: a request refused by one bucket costs nothing in the
+    others. states: (tokens, at) or None per (key, per_second, burst) bucket.
+    Returns ([(tokens, at)] to store, seconds to wait; 0 = allowed).
+    """
+    refilled = [_refill(*(state or (burst, now)), per_second, burst, now)
+                for state, (_, per_second, burst) in zip(states, buckets)]
+    wait = max(((1 - tokens) / per_second
+                for tokens, (_, per_second, _) in zip(refilled, buckets) if tokens < 1),
+               default=0)
+    return [(tokens if wait else tokens - 1, now) for tokens in refilled], wait
+
+
+# ── Bucket stores ─────────────────────────────────────────────
+
+class MemoryBuckets:
+    """Per-process buckets."""
+
+    PRUNE_AT = 10000
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._buckets = {}      # key -> (tokens, at)
+
+    def take(self, buckets, now):
+        """
+        Spend one token from every (key, per_second, burst) bucket; returns 0
+        if allowed, else seconds until all of them have one (nothing spent).
+        """
+        with self._lock:
+            states, wait = _charge([self._buckets.get(key) for key, _, _ in buckets],
+                                   buckets, now)
+            for (key, _, _), state in zip(buckets, states):
+                self._buckets[key] = state
+            if len(self._buckets) > self.PRUNE_AT:
+                # Drop buckets idle long enough to have refilled completely
+                self._buckets = {k: v for k, v in self._buckets.items()
+                                 if now - v[1] < 600}
+            return wait
+
+
+class SQLiteBuckets:
+    """Buckets in a SQLite file shared by all processes on the host."""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=0.5, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")    # losing a bucket on crash is fine
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                   key    TEXT PRIMARY KEY,
+                   tokens REAL NOT NULL,
+                   at     REAL NOT NULL
+               )"""
+        )
+        self._takes = 0
+
+    def take(self, buckets, now):
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                states = [c.execute("SELECT tokens, at FROM buckets WHERE key = ?",
+                                    (key,)).fetchone() for key, _, _ in buckets]
+                states, wait = _charge(states, buckets, now)
+                c.executemany(
+                    """INSERT INTO buckets (key, tokens, at) VALUES (?, ?, ?)
+                       ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens,
+                                                      at     = excluded.at""",
+                    [(key, *state) for (key, _, _), state in zip(buckets, states)]
+                )
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    c.execute("DELETE FROM buckets WHERE at < ?", (now - 600,))
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            return wait
+
+
+# ── Per-process state ─────────────────────────────────────────
+
+_lock     = threading.Lock()
+_pid      = None
+_store    = None
+_slots    = {}      # class -> BoundedSemaphore
+_inflight = 0
+
+
+def _state():
+    """Store and semaphores for this process, created on first use (never inherited across fork)."""
+    global _pid, _store, _slots, _inflight
+    with _lock:
+        if _pid != os.getpid():
+            cfg    = current_app.config
+            path   = cfg["RATELIMIT_STORAGE"]
+            _store = SQLiteBuckets(path) if path and path != "memory" else MemoryBuckets()
+            _slots = {cls: threading.BoundedSemaphore(n)
+                      for cls, n in cfg["RATELIMIT_CONCURRENCY"].items() if n}
+            _inflight, _pid = 0, os.getpid()
+        return _store, _slots
+
+
+def endpoint_class():
+    endpoint = request.endpoint or ""
+    cls = ENDPOINT_CLASSES.get(endpoint)
+    if cls is None and endpoint.startswith("api."):
+        cls = "api"
+    if cls == "auth" and request.method != "POST":
+        cls = None                  # showing the form is cheap
+    return cls or "default"
+
+
+def client_key(cls):
+    """
+    Who a request is charged to, without loading the user (a rejected
+    request should cost no DB query): the user id in the signed session
+    cookie, else a digest of the bearer token, else, and always on the
+    auth endpoints, the client IP.
+    """
+    if cls != "auth":
+        user_id = session.get("_user_id")
+        if user_id is not None:
+            return f"u{user_id}"
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token.strip():
+            return "t" + hashlib.sha256(token.strip().encode("utf-8")).hexdigest()[:32]
+    return f"ip{request.remote_addr or '-'}"
+
+
+def _take(store, rules, now):
+    """Charge {key: (per minute, burst)} together; seconds to wait, 0 if allowed."""
+    try:
+        return store.take([(key, per_minute / 60.0, burst)
+                           for key, (per_minute, burst) in rules.items()], now)
+    except Exception:
+        counters.incr("ratelimit_errors")
+        return 0
+
+
+# ── Hooks ─────────────────────────────────────────────────────
+
+def admit():
+    """before_request: charge the buckets, take a slot; raises RateLimited / Overloaded."""
+    global _inflight
+    cfg = current_app.config
+    if not cfg["RATELIMIT_ENABLED"] or request.endpoint in (None, "static"):
+        return
+    store, slots = _state()
+    cls = endpoint_class()
+    ip  = request.remote_addr or "-"
+    who = client_key(cls)
+    now = time.time()
+
+    wait = _take(store, {f"{cls}:{who}": cfg["RATELIMIT_RULES"][cls],
+                         f"ip:{ip}":     cfg["RATELIMIT_IP"]}, now)
+    if wait:
+        counters.incr(f"ratelimit_rejected[{cls}]")
+        raise RateLimited(int(wait) + 1)
+
+    limit = cfg["ADMISSION_MAX_INFLIGHT"]
+    with _lock:
+        if limit and _inflight >= limit:
+            counters.incr("admission_shed")
+            raise Overloaded()
+        _inflight += 1
+        g.ratelimit_inflight = True
+        counters.gauge("requests_inflight", _inflight)
+
+    slot = slots.get(cls)
+    if slot is not None:
+        if not slot.acquire(blocking=False):
+            counters.incr(f"concurrency_rejected[{cls}]")
+            raise Overloaded()
+        g.ratelimit_slot = slot
+    counters.incr(f"ratelimit_allowed[{cls}]")
+
+
+def release(exc=None):
+    """teardown_request: give back the in-flight count and any concurrency slot."""
+    global _inflight
+    slot = g.pop("ratelimit_slot", None)
+    if slot is not None:
+        slot.release()
+    if g.pop("ratelimit_inflight", None):
+        with _lock:
+            _inflight -= 1
+            counters.gauge("requests_inflight", _inflight)
+
+
+def init_app(app):
+    app.before_request(admit)
+    app.teardown_request(release)
@@ -15,14 +15,13 @@ function fmt(n) { return INR.format(n); }
 
 async function fetchAnalytics() {
   try {
-    const res = await fetch("/api/analytics");
-    const data = await res.json();
-    if (data.error) throw new Error(data.error);
+    const data = await loadAnalytics();
 
     renderStatCards(data);
     renderSmartAnalytics(data);
     renderCharts(data);
     renderRecentTransactions(data.recent || []);
+    renderAnomalies(data.anomalies || []);
     removeShimmers();
   } catch (e) {
     console.error("Analytics load failed:", e);
@@ -30,6 +29,34 @@ async function fetchAnalytics() {
   }
 }
 
+// The payload only changes when the user's data does (or the day rolls
+// over), so reuse the copy kept next to the sync mirror while its seq and
+// day still match.
+async function loadAnalytics() {
+  const mirror = typeof ExpenseSync !== "undefined";
+  const today = new Date().toLocaleDateString("en-CA");   // local YYYY-MM-DD
+  if (mirror) {
+    try {
+      const seq = await ExpenseSync.pull();
+      const cached = await ExpenseSync.getMeta("analytics");
+      if (cached && cached.seq === seq && cached.day === today) return cached.payload;
+    } catch (e) {
+      console.warn("Sync unavailable:", e);
+    }
+  }
+
+  const res = await fetch("/api/analytics");
+  const data = await res.json();
+  if (data.error) throw new Error(data.error);
+  if (mirror) {
+    // The request may have auto-inserted recurring expenses: store under the new seq
+    ExpenseSync.pull()
+      .then(seq => ExpenseSync.setMeta("analytics", { seq, day: today, payload: data }))
+      .catch(() => {});
+  }
+  return data;
+}
+
 /* ── Stat Cards ─────────────────────────────────────────────── */
 function renderStatCards(data) {
   // Month total — count-up
@@ -60,6 +87,10 @@ function renderSmartAnalytics(data) {
   // Predicted next month
   const predEl = document.getElementById("predicted");
   if (predEl) predEl.textContent = fmt(smart.predicted_next ?? 0);
+  const bandEl = document.getElementById("predictedBand");
+  if (bandEl && smart.predicted_high) {
+    bandEl.textContent = `Likely ${fmt(smart.predicted_low)} – ${fmt(smart.predicted_high)}`;
+  }
 
   // Top 3 categories
   const top3El = document.getElementById("top3List");
@@ -198,6 +229,33 @@ function renderRecentTransactions(recent) {
   el.innerHTML = `<div class="recent-list">${rows}</div>`;
 }
 
+/* ── Unusual Spending ────────────────────────────────────────── */
+function renderAnomalies(anomalies) {
+  const card = document.getElementById("anomalyCard");
+  const el   = document.getElementById("anomalyList");
+  if (!card || !el) return;
+  card.hidden = !anomalies.length;
+  if (!anomalies.length) return;
+
+  const rows = anomalies.map(a => {
+    const slug = (a.category || "").toLowerCase().replace(/\s+/g, "");
+    const why  = a.kind === "duplicate"
+      ? "Looks like a duplicate entry"
+      : `About ${Math.round(a.amount / a.typical)}× your usual ${fmt(a.typical)}`;
+    return `<div class="recent-row">
+      <div class="recent-info">
+        <span class="badge badge-${slug}">${a.category}</span>
+        <span class="recent-desc">${a.description} · ${why}</span>
+      </div>
+      <div class="recent-right">
+        <span class="amount-cell">${fmt(a.amount)}</span>
+      </div>
+    </div>`;
+  }).join("");
+
+  el.innerHTML = `<div class="recent-list">${rows}</div>`;
+}
+
 /* ── Helpers ──────────────────────────────────────────────────── */
 function removeShimmers() {
   document.querySelectorAll(".shimmer").forEach(el => el.classList.remove("shimmer"));
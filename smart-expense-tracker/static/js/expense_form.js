@@ -0,0 +1,42 @@
+/**
+ * expense_form.js — Suggests a category on the Add Expense form from the
+ * description, until the user picks one themselves.
+ */
+
+document.addEventListener("DOMContentLoaded", () => {
+  const desc   = document.getElementById("description");
+  const select = document.getElementById("category_id");
+  const hint   = document.getElementById("categoryHint");
+  const url    = desc?.dataset.suggestUrl;
+  if (!desc || !select || !url) return;
+
+  let chosenByUser = false;
+  let timer = null;
+  let seq   = 0;
+
+  select.addEventListener("change", () => { chosenByUser = true; if (hint) hint.hidden = true; });
+
+  desc.addEventListener("input", () => {
+    clearTimeout(timer);
+    if (chosenByUser || desc.value.trim().length < 3) return;
+    timer = setTimeout(suggest, 250);
+  });
+
+  async function suggest() {
+    const mine = ++seq;
+    try {
+      const res = await fetch(`${url}?description=${encodeURIComponent(desc.value.trim())}`,
+                              { headers: { Accept: "application/json" } });
+      if (!res.ok) return;
+      const data = await res.json();
+      if (mine !== seq || chosenByUser || data.category_id == null) return;
+      select.value = String(data.category_id);
+      if (hint) {
+        hint.textContent = `Suggested from your description (${Math.round(data.confidence * 100)}% sure)`;
+        hint.hidden = false;
+      }
+    } catch (e) {
+      /* suggestions are best-effort */
+    }
+  }
+});
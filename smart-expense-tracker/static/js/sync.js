@@ -0,0 +1,228 @@
+/**
+ * sync.js — Offline mirror of the user's data in IndexedDB, kept current
+ * through the change-log feed (/api/v1/sync). Pages read from the mirror:
+ * the expense list filters and sorts client-side, and the dashboard reuses
+ * its analytics payload until the data (or the day) changes.
+ */
+
+const ExpenseSync = (() => {
+  const DB_NAME = "expenseiq";
+  const STORES = ["expenses", "budgets", "recurring", "categories", "meta"];
+  const KIND_STORE = { expense: "expenses", budget: "budgets", recurring: "recurring" };
+
+  let dbPromise = null;
+  let state = { seq: null, userId: null };
+
+  /* ── IndexedDB plumbing ───────────────────────────────────── */
+  function open() {
+    if (!("indexedDB" in window)) return Promise.reject(new Error("IndexedDB unavailable"));
+    if (!dbPromise) {
+      dbPromise = new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => {
+          const db = req.result;
+          STORES.forEach(name => {
+            if (!db.objectStoreNames.contains(name)) {
+              db.createObjectStore(name, name === "meta" ? undefined : { keyPath: "id" });
+            }
+          });
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+      });
+    }
+    return dbPromise;
+  }
+
+  function done(tx) {
+    return new Promise((resolve, reject) => {
+      tx.oncomplete = () => resolve();
+      tx.onerror = tx.onabort = () => reject(tx.error);
+    });
+  }
+
+  function request(req) {
+    return new Promise((resolve, reject) => {
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  async function getAll(store) {
+    const db = await open();
+    return request(db.transaction(store).objectStore(store).getAll());
+  }
+
+  async function getMeta(key) {
+    const db = await open();
+    return request(db.transaction("meta").objectStore("meta").get(key));
+  }
+
+  async function setMeta(key, value) {
+    const db = await open();
+    const tx = db.transaction("meta", "readwrite");
+    tx.objectStore("meta").put(value, key);
+    return done(tx);
+  }
+
+  async function clear() {
+    const db = await open();
+    const tx = db.transaction(STORES, "readwrite");
+    STORES.forEach(name => tx.objectStore(name).clear());
+    state = { seq: null, userId: null };
+    return done(tx);
+  }
+
+  /* ── Pull ─────────────────────────────────────────────────── */
+  // One reply is applied in one transaction, together with its seq.
+  async function apply(reply) {
+    const db = await open();
+    const tx = db.transaction(STORES, "readwrite");
+    if (reply.full) {
+      STORES.forEach(name => tx.objectStore(name).clear());
+      (reply.categories || []).forEach(c => tx.objectStore("categories").put(c));
+    }
+    Object.entries(KIND_STORE).forEach(([kind, name]) => {
+      const store = tx.objectStore(name);
+      (reply[name] || []).forEach(row => store.put(row));
+      (reply.deleted?.[kind] || []).forEach(id => store.delete(id));
+    });
+    tx.objectStore("meta").put(reply.seq, "seq");
+    tx.objectStore("meta").put(reply.user_id, "user_id");
+    await done(tx);
+    state = { seq: reply.seq, userId: reply.user_id };
+  }
+
+  async function fetchReply(since) {
+    const url = since == null ? "/api/v1/sync" : `/api/v1/sync?since=${since}`;
+    const res = await fetch(url, { credentials: "same-origin" });
+    if (res.status === 410) return null;        // cursor expired: start over
+    if (!res.ok) throw new Error(`sync failed: ${res.status}`);
+    return res.json();
+  }
+
+  let pulling = null;
+  function pull() {
+    // Concurrent callers share one pull
+    if (!pulling) pulling = doPull().finally(() => { pulling = null; });
+    return pulling;
+  }
+
+  async function doPull() {
+    let since = await getMeta("seq");
+    for (;;) {
+      let reply = await fetchReply(since ?? null);
+      if (reply === null) reply = await fetchReply(null);
+      const stored = await getMeta("user_id");
+      if (!reply.full && stored != null && stored !== reply.user_id) {
+        await clear();                           // another account on this browser
+        reply = await fetchReply(null);
+      }
+      await apply(reply);
+      if (!reply.more) return state.seq;
+      since = reply.seq;
+    }
+  }
+
+  /* ── Queries ──────────────────────────────────────────────── */
+  const SORTS = {
+    date_desc:   (a, b) => b.date.localeCompare(a.date) || b.id - a.id,
+    date_asc:    (a, b) => a.date.localeCompare(b.date) || a.id - b.id,
+    amount_desc: (a, b) => b.amount - a.amount,
+    amount_asc:  (a, b) => a.amount - b.amount,
+  };
+
+  // Same filters and sorts as Expense.get_all
+  async function expenses(f = {}) {
+    const [rows, cats] = await Promise.all([getAll("expenses"), getAll("categories")]);
+    const names = new Map(cats.map(c => [c.id, c.name]));
+    const search = (f.search || "").toLowerCase();
+    const out = rows.filter(e =>
+      (!f.date_from || e.date >= f.date_from) &&
+      (!f.date_to || e.date <= f.date_to) &&
+      (!f.category_id || e.category_id === Number(f.category_id)) &&
+      (!search || e.description.toLowerCase().includes(search)) &&
+      (f.amount_min == null || f.amount_min === "" || e.amount >= Number(f.amount_min)) &&
+      (f.amount_max == null || f.amount_max === "" || e.amount <= Number(f.amount_max))
+    ).map(e => ({ ...e, category_name: names.get(e.category_id) || "" }));
+    return out.sort(SORTS[f.sort] || SORTS.date_desc);
+  }
+
+  // {"YYYY-MM": total} over the mirror, for client-side charts
+  async function monthlyTotals() {
+    const totals = {};
+    (await getAll("expenses")).forEach(e => {
+      const month = e.date.slice(0, 7);
+      totals[month] = (totals[month] || 0) + e.amount;
+    });
+    return totals;
+  }
+
+  return {
+    pull, clear, expenses, monthlyTotals, getMeta, setMeta,
+    get seq() { return state.seq; },
+  };
+})();
+
+
+/* ── Page wiring ──────────────────────────────────────────────── */
+document.addEventListener("DOMContentLoaded", () => {
+  // Don't leave one account's data behind for the next person on this browser
+  document.querySelectorAll(".logout-btn").forEach(a =>
+    a.addEventListener("click", () => { ExpenseSync.clear().catch(() => {}); }));
+  initExpenseListFilters();
+});
+
+function initExpenseListFilters() {
+  const form = document.getElementById("filterForm");
+  const tbody = document.querySelector(".card .table tbody");
+  if (!form || !tbody) return;
+
+  let ready = false;
+  ExpenseSync.pull().then(() => { ready = true; }).catch(e => console.warn("Sync unavailable:", e));
+
+  form.addEventListener("submit", async (e) => {
+    if (!ready) return;                          // mirror not there: normal page load
+    e.preventDefault();
+    const filters = Object.fromEntries(new FormData(form).entries());
+    const rows = await ExpenseSync.expenses(filters);
+    renderExpenseRows(tbody, rows);
+    const qs = new URLSearchParams(Object.entries(filters).filter(([, v]) => v !== ""));
+    history.replaceState(null, "", `${form.action}?${qs}`);
+  });
+}
+
+const LIST_MONEY = new Intl.NumberFormat("en-US", { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+const LIST_DATE = new Intl.DateTimeFormat("en-GB", { day: "2-digit", month: "short", year: "numeric" });
+
+function escapeHtml(s) {
+  return String(s).replace(/[&<>"']/g, c => ({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+  })[c]);
+}
+
+// Same markup as templates/expenses/list.html
+function renderExpenseRows(tbody, rows) {
+  const inr = n => "₹" + LIST_MONEY.format(n);
+  tbody.innerHTML = rows.map(e => {
+    const slug = e.category_name.toLowerCase().replace(/ /g, "");
+    const actions = e.archived
+      ? `<span title="Archived — read only">🗄️</span>`
+      : `<a href="/expenses/${e.id}/edit" class="btn btn-icon btn-sm btn-edit" title="Edit">✏️</a>
+         <button class="btn btn-icon btn-sm btn-delete" data-delete-url="/expenses/${e.id}/delete"
+           title="Delete">🗑️</button>`;
+    return `<tr>
+      <td class="date-cell">${LIST_DATE.format(new Date(e.date + "T00:00:00"))}</td>
+      <td>${escapeHtml(e.description)}</td>
+      <td><span class="badge badge-${slug}">${escapeHtml(e.category_name)}</span></td>
+      <td class="text-right amount-cell">${inr(e.amount)}</td>
+      <td class="text-center" style="white-space:nowrap">${actions}</td>
+    </tr>`;
+  }).join("");
+
+  const total = rows.reduce((sum, e) => sum + e.amount, 0);
+  const totalCell = tbody.parentElement.querySelector("tfoot .amount-cell");
+  if (totalCell) totalCell.textContent = inr(total);
+  const count = document.querySelector(".card-header h3 span");
+  if (count) count.textContent = `(${rows.length} result${rows.length !== 1 ? "s" : ""})`;
+}
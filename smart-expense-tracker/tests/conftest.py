@@ -0,0 +1,212 @@
+"""
+tests/conftest.py
+No MySQL server is needed: tests marked `mysql` (the *_sql.py files) are
+skipped unless TEST_MYSQL_DB names a scratch database, and run inside the
+module-scoped `mysql_db` fixture's app context on that database.
+
+Routing, API and model tests run against `standins`: each MySQL host db.py
+connects to is a SQLite file behind a connection that speaks just enough of
+mysql-connector and MySQL for them (dict cursors, %s parameters, ON
+DUPLICATE KEY UPDATE, LAST_INSERT_ID(expr), IF(), CURDATE(), NOW() -
+INTERVAL, duplicate keys as ER_DUP_ENTRY).
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mysql: needs TEST_MYSQL_DB (a scratch MySQL database)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("TEST_MYSQL_DB"):
+        return
+    skip = pytest.mark.skip(reason="set TEST_MYSQL_DB to a scratch MySQL database")
+    for item in items:
+        if "mysql" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="module")
+def mysql_db():
+    """An app context on TEST_MYSQL_DB (MYSQL_HOST, MYSQL_USER, ... as usual) for a module."""
+    from app import app
+
+    saved = app.config["MYSQL_DB"]
+    app.config["MYSQL_DB"] = os.environ["TEST_MYSQL_DB"]
+    try:
+        with app.app_context():
+            yield app
+    finally:
+        app.config["MYSQL_DB"] = saved
+
+
+class StandInCursor:
+
+    def __init__(self, conn, dictionary):
+        self._connection = conn
+        self._dictionary = dictionary
+        self._rows, self.rowcount, self.lastrowid = [], -1, None
+
+    def execute(self, operation, params=None):
+        server = self._connection.server
+        sql    = operation.strip()
+        server.log.append(sql)
+        if server.fail_on and server.fail_on in sql:
+            raise sqlite3.OperationalError(f"stand-in {server.name} refused: {server.fail_on}")
+        if sql.upper().startswith("SET "):
+            self._rows = []
+            return
+        if sql.upper().startswith(("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")):
+            self._rows = [] if server.lag is None else [{"Seconds_Behind_Source": server.lag}]
+            return
+        self._connection.last_insert_id = None
+        try:
+            cur = self._connection.db.execute(_translate(sql), tuple(params or ()))
+        except sqlite3.IntegrityError as e:
+            import mysql.connector
+            raise mysql.connector.errors.IntegrityError(
+                msg=f"Duplicate entry: {e}", errno=mysql.connector.errorcode.ER_DUP_ENTRY) from e
+        names = [d[0] for d in cur.description or ()]
+        self._rows = [dict(zip(names, r)) for r in cur.fetchall()]
+        self.rowcount  = cur.rowcount
+        self.lastrowid = self._connection.last_insert_id or cur.lastrowid
+
+    def executemany(self, operation, seq_params):
+        for params in seq_params:
+            self.execute(operation, params)
+
+    def _out(self, rows):
+        return rows if self._dictionary else [tuple(r.values()) for r in rows]
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return self._out(rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return self._out(rows)
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+
+    def __init__(self, server):
+        self.server = server
+        self.db     = sqlite3.connect(server.path, timeout=5, check_same_thread=False)
+        self.open   = True
+        self.last_insert_id = None
+        self.db.create_function("LAST_INSERT_ID", 1, self._set_insert_id)
+
+    def _set_insert_id(self, value):
+        self.last_insert_id = value
+        return value
+
+    def cursor(self, dictionary=False):
+        return StandInCursor(self, dictionary)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+        self.open = False
+
+    def is_connected(self):
+        return self.open
+
+
+_UNITS = {"SECOND": "seconds", "HOUR": "hours", "DAY": "days"}
+
+
+def _translate(sql):
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"NOW\(\) - INTERVAL (\?|\d+) (SECOND|HOUR|DAY)",
+                 lambda m: f"datetime('now', '-' || {m[1]} || ' {_UNITS[m[2]]}')", sql)
+    sql = re.sub(r"\s+FOR UPDATE$", "", sql)
+    sql = re.sub(r"\bIF\(", "IIF(", sql).replace("CURDATE()", "date('now')")
+    sql = re.sub(r"^INSERT IGNORE", "INSERT OR IGNORE", sql)
+    sql = sql.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+    return re.sub(r"VALUES\((\w+)\)", r"excluded.\1", sql)
+
+
+class StandIn:
+    """One stood-in MySQL server. lag: SHOW REPLICA STATUS answer; down: refuse connections."""
+
+    def __init__(self, name, path):
+        self.name, self.path = name, str(path)
+        self.lag, self.down, self.fail_on = 0.0, False, None
+        self.log = []
+
+    def run(self, sql, params=()):
+        """Set-up and inspection outside the app: autocommitted, rows as dicts."""
+        conn = StandInConnection(self)
+        cur  = conn.cursor(dictionary=True)
+        cur.execute(sql, params)
+        conn.commit()
+        conn.close()
+        return cur.fetchall()
+
+
+@pytest.fixture
+def standins(tmp_path, monkeypatch):
+    """{host: StandIn}, created on first use; db._connect goes to them."""
+    import db
+
+    class Servers(dict):
+        def __missing__(self, host):
+            self[host] = StandIn(host, tmp_path / f"{host}.sqlite")
+            return self[host]
+
+    servers = Servers()
+
+    def connect(host, port, database=None, **extra):
+        if servers[host].down:
+            raise db.driver().Error(msg=f"stand-in {host} is down")
+        return StandInConnection(servers[host])
+
+    monkeypatch.setattr(db, "_connect", connect)
+    monkeypatch.setattr(db, "_replicas", {})
+    return servers
+
+
+@pytest.fixture
+def api_client(standins, monkeypatch):
+    """
+    Test client for /api/v1 on an unsharded stood-in primary, no replicas,
+    no rate limits. Requests carry a bearer token for user 7; Flask-Login's
+    user lookups don't touch the database.
+    """
+    from app import app
+    from models.api_token import ApiToken
+    from models.user import User
+
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    monkeypatch.setitem(app.config, "RATELIMIT_ENABLED", False)
+    monkeypatch.setattr(ApiToken, "user_id_for",
+                        staticmethod(lambda token: 7 if token == "good" else None))
+    user = {"id": 7, "username": "seven", "email": "seven@example.test", "password": ""}
+    monkeypatch.setattr(User, "get_by_id",
+                        staticmethod(lambda user_id: User(user) if user_id == 7 else None))
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = "Bearer good"
+        yield client
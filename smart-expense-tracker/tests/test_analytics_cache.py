@@ -0,0 +1,60 @@
+"""
+tests/test_analytics_cache.py
+The version guard on stored analytics payloads: a payload computed from
+data read before a write is refused once that write's invalidation has
+committed, whether or not the user had a cache row yet; one computed
+after it is stored.
+"""
+
+import pytest
+
+import db
+from app import app
+from models.analytics_cache import AnalyticsCache
+
+DAY = "2026-10-19"
+
+
+@pytest.fixture
+def cache(standins, monkeypatch):
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    standins["primary"].run("""CREATE TABLE analytics_cache (user_id INTEGER PRIMARY KEY,
+                                   payload TEXT, computed_on TEXT,
+                                   version INTEGER NOT NULL DEFAULT 0)""")
+    with app.app_context():
+        yield standins["primary"]
+
+
+def write(user_id=7):
+    """An expense write's share: invalidate in its own committed transaction."""
+    cur = db.get_cursor(user_id=user_id)
+    AnalyticsCache.invalidate(cur, user_id)
+    db.commit(cur)
+    cur.close()
+
+
+@pytest.mark.parametrize("cached_before", [False, True])
+def test_payload_read_before_an_invalidate_is_refused(cache, cached_before):
+    if cached_before:
+        AnalyticsCache.put(7, '{"old": 1}', DAY, AnalyticsCache.version(7))
+        assert AnalyticsCache.get(7, DAY) == '{"old": 1}'
+
+    version = AnalyticsCache.version(7)     # precompute reads its inputs here...
+    write()                                 # ...a write commits meanwhile...
+    AnalyticsCache.put(7, '{"stale": 1}', DAY, version)
+    assert AnalyticsCache.get(7, DAY) is None
+
+    AnalyticsCache.put(7, '{"fresh": 1}', DAY, AnalyticsCache.version(7))
+    assert AnalyticsCache.get(7, DAY) == '{"fresh": 1}'
+
+
+def test_put_many_guards_each_user_separately(cache):
+    versions = AnalyticsCache.versions(db.get_cursor(), [7, 8])
+    write(8)
+    AnalyticsCache.put_many([(7, '{"u": 7}', versions[7]), (8, '{"u": 8}', versions[8])], DAY)
+    assert AnalyticsCache.get(7, DAY) == '{"u": 7}'
+    assert AnalyticsCache.get(8, DAY) is None
+    assert cache.run("SELECT user_id, version FROM analytics_cache ORDER BY user_id") == [
+        {"user_id": 7, "version": 0}, {"user_id": 8, "version": 1}]
@@ -0,0 +1,98 @@
+"""
+tests/test_anomaly.py
+Anomaly.score() on the worker's one long-lived connection: each call must
+end its transaction, or later expenses are invisible to the next one.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app import app
+from models import anomaly
+
+
+class SnapshotConnection:
+    """REPEATABLE READ in miniature: reads see the expenses as of the transaction's first read."""
+
+    def __init__(self):
+        self.expenses = {}
+        self.snapshot = None
+        self.flags    = []
+
+    def cursor(self):
+        return SnapshotCursor(self)
+
+    def read(self):
+        if self.snapshot is None:
+            self.snapshot = dict(self.expenses)
+        return self.snapshot
+
+    def commit(self):
+        self.snapshot = None
+
+    rollback = commit
+
+
+class SnapshotCursor:
+    """Answers the handful of statements Anomaly.score() runs."""
+
+    def __init__(self, conn):
+        self._connection = conn
+        self._row        = None
+
+    def execute(self, sql, params=()):
+        rows = self._connection.read()
+        if "FROM expenses WHERE id" in sql:
+            self._row = rows.get(params[0])
+        elif "FROM expenses" in sql:        # _duplicate_of
+            _, category_id, amount, expense_id, *_ = params
+            e = rows[expense_id]
+            self._row = next(({"id": r["id"]} for r in rows.values()
+                              if r["id"] != expense_id and r["category_id"] == category_id
+                              and r["amount"] == amount
+                              and r["description"] == e["description"]), None)
+        else:                               # category_stats: none yet; cache bumps
+            self._row = None
+
+    def executemany(self, sql, rows):
+        self._connection.flags += rows
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = SnapshotConnection()
+    monkeypatch.setattr(anomaly, "get_cursor", lambda **kw: conn.cursor())
+    with app.app_context():
+        yield conn
+
+
+def add(conn, expense_id):
+    conn.expenses[expense_id] = {
+        "id": expense_id, "category_id": 3, "amount": Decimal("450.00"),
+        "description": "Dinner", "date": date(2024, 5, 1),
+        "created_at": datetime(2024, 5, 1, 20, 0),
+    }
+
+
+def test_second_expense_is_seen_after_an_unflagged_first(conn):
+    add(conn, 1)
+    assert anomaly.Anomaly.score(7, 1) == []
+    assert conn.snapshot is None            # no transaction left open
+
+    add(conn, 2)                            # committed by another connection meanwhile
+    flags = anomaly.Anomaly.score(7, 2)
+    assert [(f["kind"], f["ref_id"]) for f in flags] == [("duplicate", 1)]
+    assert conn.snapshot is None
+
+
+def test_missing_expense_ends_the_transaction_too(conn):
+    assert anomaly.Anomaly.score(7, 99) == []
+    assert conn.snapshot is None
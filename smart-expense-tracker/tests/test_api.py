@@ -0,0 +1,145 @@
+"""
+tests/test_api.py
+JSON API writes and conditional requests against a stood-in primary: a
+retry under the same Idempotency-Key replays the stored response without
+writing again, the key with a different body is 422, a failed write leaves
+no key behind, and ETags give 412 on a stale If-Match and 304 on a
+matching If-None-Match.
+
+Expense is replaced by a small table-backed stand-in so only routes/api.py,
+db.transaction and models/idempotency.py are under test.
+"""
+
+import pytest
+
+import db
+from app import app
+from models.expense import Expense
+
+LUNCH = {"amount": "120.50", "category_id": 1, "description": "lunch", "date": "2026-10-01"}
+
+
+class Expenses:
+    """Expense's CRUD over the stand-in's expenses table; `fail` breaks create after its INSERT."""
+
+    fail = False
+
+    @staticmethod
+    def create(user_id, category_id, amount, description, date):
+        cur = db.get_cursor(user_id=user_id)
+        cur.execute("""INSERT INTO expenses (user_id, category_id, amount, description, date)
+                       VALUES (%s, %s, %s, %s, %s)""",
+                    (user_id, category_id, str(amount), description, date.isoformat()))
+        if Expenses.fail:
+            raise RuntimeError("rollup update failed")
+        db.commit(cur)
+        return cur.lastrowid
+
+    @staticmethod
+    def get_by_id(expense_id, user_id, for_update=False):
+        cur = db.get_cursor(user_id=user_id)
+        cur.execute("SELECT * FROM expenses WHERE id = %s AND user_id = %s", (expense_id, user_id))
+        return cur.fetchone()
+
+    @staticmethod
+    def update(expense_id, user_id, category_id, amount, description, date):
+        cur = db.get_cursor(user_id=user_id)
+        cur.execute("""UPDATE expenses SET category_id = %s, amount = %s, description = %s,
+                              date = %s WHERE id = %s AND user_id = %s""",
+                    (category_id, str(amount), description, date.isoformat(),
+                     expense_id, user_id))
+        db.commit(cur)
+
+
+@pytest.fixture
+def client(api_client, standins, monkeypatch):
+    monkeypatch.setitem(app.config, "PROPAGATE_EXCEPTIONS", True)
+    monkeypatch.setattr(Expense, "get_all_categories",
+                        staticmethod(lambda: [{"id": 1, "name": "Food"}]))
+    for name in ("create", "get_by_id", "update"):
+        monkeypatch.setattr(Expense, name, getattr(Expenses, name))
+    monkeypatch.setattr(Expenses, "fail", False)
+    primary = standins["primary"]
+    primary.run("""CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       user_id INTEGER, category_id INTEGER, amount TEXT, description TEXT,
+                       date TEXT, archived INTEGER DEFAULT 0,
+                       updated_at TEXT DEFAULT '2026-10-01 12:00:00')""")
+    primary.run("""CREATE TABLE idempotency_keys (user_id INTEGER, idem_key TEXT,
+                       fingerprint TEXT, status INTEGER DEFAULT 0, headers TEXT, body BLOB,
+                       created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                       PRIMARY KEY (user_id, idem_key))""")
+    return api_client
+
+
+def post(client, body, key="k-1"):
+    return client.post("/api/v1/expenses", json=body, headers={"Idempotency-Key": key})
+
+
+def count(standins, table):
+    return standins["primary"].run(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+
+
+# ── Idempotency-Key ───────────────────────────────────────────
+
+def test_retry_replays_the_stored_response(client, standins):
+    first = post(client, LUNCH)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    again = post(client, LUNCH)
+    assert again.status_code == 201
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_data() == first.get_data()
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.headers["Location"] == first.headers["Location"]
+    assert count(standins, "expenses") == 1
+
+
+def test_key_reused_for_another_request_is_422(client, standins):
+    assert post(client, LUNCH).status_code == 201
+    other = post(client, {**LUNCH, "amount": "99.00"})
+    assert other.status_code == 422
+    assert count(standins, "expenses") == 1
+    assert post(client, {**LUNCH, "amount": "99.00"}, key="k-2").status_code == 201
+
+
+def test_failed_write_leaves_no_key(client, standins):
+    Expenses.fail = True
+    with pytest.raises(RuntimeError):
+        post(client, LUNCH)
+    assert count(standins, "expenses") == 0
+    assert count(standins, "idempotency_keys") == 0
+
+    Expenses.fail = False
+    retry = post(client, LUNCH)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+    assert count(standins, "expenses") == 1
+
+
+def test_key_longer_than_64_is_400(client):
+    assert post(client, LUNCH, key="k" * 65).status_code == 400
+
+
+# ── ETags ─────────────────────────────────────────────────────
+
+def test_if_none_match_gives_304(client):
+    location = post(client, LUNCH).headers["Location"]
+    etag = client.get(location).headers["ETag"]
+    assert client.get(location, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(location, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_stale_if_match_gives_412(client, standins):
+    location = post(client, LUNCH).headers["Location"]
+    read = client.get(location).headers["ETag"]
+
+    changed = client.put(location, json={**LUNCH, "amount": "80.00"},
+                         headers={"If-Match": read})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != read
+
+    stale = client.put(location, json={**LUNCH, "amount": "60.00"},
+                       headers={"If-Match": read})
+    assert stale.status_code == 412
+    assert standins["primary"].run("SELECT amount FROM expenses") == [{"amount": "80.00"}]
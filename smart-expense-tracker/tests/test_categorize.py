@@ -0,0 +1,125 @@
+"""
+tests/test_categorize.py
+The categorizer: naive Bayes learns from counts (so one example at a time
+gives the same model as training on all of them), choose() falls back from
+the user's model to the global one when the user has too few examples or
+is unsure, and services/categorizer.py trains each user once, folds in new
+expenses without retraining, and keeps at most CATEGORIZER_USERS models.
+"""
+
+import pytest
+
+from analytics.categorize import NaiveBayes, choose, tokens
+from app import app
+from models.expense import Expense
+from services import categorizer
+
+FOOD, TRAVEL, BILLS = 1, 2, 3
+
+GLOBAL = [("swiggy dinner", FOOD), ("zomato lunch", FOOD), ("uber to airport", TRAVEL),
+          ("ola cab office", TRAVEL), ("electricity bill", BILLS), ("mobile recharge", BILLS)] * 5
+
+# User 7 files cabs under Bills (expensed to work); user 8 barely uses the app
+USERS = {7: [("uber to office", BILLS), ("ola cab office", BILLS), ("swiggy lunch", FOOD)] * 10,
+         8: [("uber home", FOOD)]}
+
+
+def test_prediction_follows_the_training_data():
+    model = NaiveBayes.train(GLOBAL)
+    assert model.examples == len(GLOBAL)
+    category, p = model.predict("Swiggy order #1234")
+    assert category == FOOD and 0.5 < p <= 1
+    assert model.predict("swiggyinstamart")[0] == FOOD      # via the "swig*" prefix
+    assert model.predict("12 34 !!") == (None, 0.0)
+    assert model.predict("gym membership") == (None, 0.0)
+
+
+def test_learning_one_at_a_time_equals_training():
+    model = NaiveBayes()
+    for description, category in GLOBAL:
+        model.learn(description, category)
+    trained = NaiveBayes.train(GLOBAL)
+    assert (model.docs, model.totals, model.counts) == (trained.docs, trained.totals,
+                                                        trained.counts)
+
+
+def test_tokens():
+    assert tokens("Uber to Airport 42") == [
+        "uber", "to", "airport", "uber to", "to airport", "airp*"]
+
+
+@pytest.mark.parametrize("user_rows, description, threshold, expected", [
+    (USERS[7], "uber to office", 0.6, (BILLS, "user")),         # confident user model wins
+    (USERS[7][:5], "uber to office", 0.6, (TRAVEL, "global")),  # too few examples: global
+    (USERS[7], "office lunch", 0.8, (None, None)),              # nobody sure enough
+])
+def test_choose_falls_back_to_the_global_model(user_rows, description, threshold, expected):
+    user, everyone = NaiveBayes.train(user_rows), NaiveBayes.train(GLOBAL)
+    category, p, source = choose(user, everyone, description, 20, threshold)
+    assert (category, source) == expected
+    assert (p >= threshold) if category else p == 0.0
+
+
+def test_unsure_user_model_falls_back():
+    user = NaiveBayes.train([("uber", FOOD), ("uber", TRAVEL)] * 10)
+    category, p, source = choose(user, NaiveBayes.train(GLOBAL), "uber", 20, 0.6)
+    assert (category, source) == (TRAVEL, "global")
+
+
+# ── services/categorizer.py ───────────────────────────────────
+
+@pytest.fixture
+def trained(monkeypatch):
+    """Warm-model cache over USERS / GLOBAL; returns {user_id or None: times trained}."""
+    calls = {}
+
+    def get_labelled(user_id=None, limit=5000):
+        calls[user_id] = calls.get(user_id, 0) + 1
+        rows = GLOBAL if user_id is None else USERS.get(user_id, [])
+        return [{"description": d, "category_id": c} for d, c in rows[:limit]]
+
+    monkeypatch.setattr(Expense, "get_labelled", staticmethod(get_labelled))
+    for name, value in (("CATEGORIZER_ENABLED", True), ("CATEGORIZER_USERS", 2),
+                        ("CATEGORIZER_TTL", 900), ("CATEGORIZER_MIN_EXAMPLES", 20),
+                        ("CATEGORIZER_MIN_CONFIDENCE", 0.6)):
+        monkeypatch.setitem(app.config, name, value)
+    with app.app_context():
+        categorizer.clear()
+        yield calls
+        categorizer.clear()
+
+
+def test_models_are_trained_once_and_reused(trained):
+    assert categorizer.suggest(7, "uber to office")[::2] == (BILLS, "user")
+    assert categorizer.suggest(8, "uber home")[::2] == (TRAVEL, "global")   # 1 example
+    assert categorizer.suggest(7, "ola cab")[::2] == (BILLS, "user")
+    assert trained == {7: 1, 8: 1, None: 1}
+
+
+def test_learned_expenses_apply_without_retraining(trained):
+    assert categorizer.suggest(7, "netflix")[0] is None
+    categorizer.learn(7, [("netflix subscription", BILLS)] * 20)
+    assert categorizer.suggest(7, "netflix")[::2] == (BILLS, "user")
+    assert categorizer.suggest(9, "netflix")[::2] == (BILLS, "global")      # global learned too
+    assert trained[7] == 1 and trained[None] == 1
+
+
+def test_least_recently_used_model_is_evicted(trained):
+    for user_id in (7, 8, 7, 9):            # 8 is least recent when 9 arrives
+        categorizer.suggest(user_id, "uber")
+    assert list(categorizer._cache()) == [7, 9]
+    categorizer.suggest(8, "uber")
+    assert trained[8] == 2 and trained[7] == 1
+
+
+def test_expired_models_are_retrained(trained, monkeypatch):
+    categorizer.suggest(7, "uber")
+    monkeypatch.setitem(app.config, "CATEGORIZER_TTL", 0)
+    categorizer.suggest(7, "uber")
+    assert trained[7] == 2 and trained[None] == 2
+
+
+def test_disabled_suggests_nothing(trained, monkeypatch):
+    monkeypatch.setitem(app.config, "CATEGORIZER_ENABLED", False)
+    assert categorizer.suggest(7, "uber to office") == (None, 0.0, None)
+    assert trained == {}
@@ -0,0 +1,17 @@
+"""
+tests/test_cold_start.py
+A web worker boots within the cold-start budget and leaves the heavy
+dependencies for first use (see benchmarks/cold_start.py).
+"""
+
+from benchmarks import cold_start
+
+
+def test_heavy_modules_stay_off_the_boot_path():
+    loaded = {name for name, _ in cold_start.importtime()}
+    assert "wsgi" in loaded
+    assert [m for m in cold_start.DEFERRED if m in loaded] == []
+
+
+def test_boot_fits_the_budget():
+    assert cold_start.measure(runs=3) <= cold_start.BUDGET_MS
@@ -0,0 +1,117 @@
+"""
+tests/test_expense_pages.py
+Expense.get_page against a stood-in database with an archive cutoff:
+following the page keys visits exactly the rows get_all() would list, in
+the same order, for every sort and date range — including pages that
+straddle the cutoff, ranges that end before it, and amount sorts over the
+hot/archive UNION. Newest-first pages that stay above the cutoff read only
+the hot table.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from app import app
+from models import archive
+from models.expense import SORTS, Expense
+
+CUTOFF = "2026-04-01"
+START  = date(2026, 1, 1)
+DAYS   = 180
+USER   = 7
+
+ranges = st.tuples(st.none() | st.integers(0, DAYS - 1), st.none() | st.integers(0, DAYS - 1))
+
+
+@pytest.fixture
+def expenses(standins, monkeypatch):
+    """80 rows for USER over DAYS, those before CUTOFF archived; a few for another user."""
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    monkeypatch.setitem(archive._cache, "at", 0.0)
+    primary = standins["primary"]
+    primary.run("CREATE TABLE app_state (name TEXT PRIMARY KEY, value TEXT)")
+    primary.run("INSERT INTO app_state VALUES ('archive_cutoff', %s)", (CUTOFF,))
+    primary.run("CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)")
+    primary.run("INSERT INTO categories VALUES (1, 'Food'), (2, 'Rent')")
+    for table in ("expenses", "expenses_archive"):
+        primary.run(f"""CREATE TABLE {table} (id INTEGER PRIMARY KEY, user_id INTEGER,
+                            category_id INTEGER, amount REAL, description TEXT, date TEXT,
+                            created_at TEXT DEFAULT CURRENT_TIMESTAMP)""")
+    rng, rows = random.Random(34), []
+    for i in range(1, 91):
+        row = {"id": i, "user_id": USER if i <= 80 else 8, "category_id": rng.choice((1, 2)),
+               "amount": rng.choice((10.0, 25.5, 99.0, 120.0)),        # plenty of ties
+               "date": (START + timedelta(days=rng.randrange(0, DAYS, 3))).isoformat()}
+        table = "expenses_archive" if row["date"] < CUTOFF else "expenses"
+        primary.run(f"""INSERT INTO {table} (id, user_id, category_id, amount, description, date)
+                        VALUES (%s, %s, %s, %s, 'x', %s)""",
+                    (row["id"], row["user_id"], row["category_id"], row["amount"], row["date"]))
+        rows.append(row)
+    with app.app_context():
+        yield [r for r in rows if r["user_id"] == USER]
+
+
+def expected(rows, sort, date_from=None, date_to=None):
+    """Ids get_all() lists: the filter and order done in Python."""
+    column = "amount" if sort.startswith("amount") else "date"
+    kept = [r for r in rows if (date_from is None or r["date"] >= date_from)
+            and (date_to is None or r["date"] <= date_to)]
+    kept.sort(key=lambda r: (r[column], r["id"]), reverse=sort.endswith("_desc"))
+    return [r["id"] for r in kept]
+
+
+def walk(sort, limit, **filters):
+    """Every page of a listing: [[ids of page 1], [ids of page 2], ...]."""
+    pages, after = [], None
+    while True:
+        rows, after = Expense.get_page(USER, sort=sort, after=after, limit=limit, **filters)
+        pages.append(rows)
+        if after is None:
+            return pages
+        assert len(rows) == limit
+
+
+def ids(pages):
+    return [r["id"] for page in pages for r in page]
+
+
+def day(offset):
+    return None if offset is None else (START + timedelta(days=offset)).isoformat()
+
+
+@settings(max_examples=60, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.sampled_from(sorted(SORTS)), st.integers(1, 30), ranges)
+def test_pages_list_every_row_once_in_order(expenses, sort, limit, offsets):
+    date_from, date_to = map(day, offsets)
+    pages = walk(sort, limit, date_from=date_from, date_to=date_to)
+    assert ids(pages) == expected(expenses, sort, date_from, date_to)
+
+
+def test_page_straddling_the_cutoff(expenses, standins):
+    hot   = sum(r["date"] >= CUTOFF for r in expenses)
+    pages = walk("date_desc", hot - 2)
+    assert [r["archived"] for r in pages[0]] == [0] * (hot - 2)
+    assert {r["archived"] for r in pages[1]} == {0, 1}
+    assert ids(pages) == expected(expenses, "date_desc")
+    first_page_sql = next(sql for sql in standins["primary"].log if "ORDER BY" in sql)
+    assert "expenses_archive" not in first_page_sql
+
+
+def test_range_ending_before_the_cutoff_reads_the_archive(expenses):
+    date_to = "2026-03-15"
+    pages   = walk("date_desc", 7, date_to=date_to)
+    assert {r["archived"] for page in pages for r in page} == {1}
+    assert ids(pages) == expected(expenses, "date_desc", date_to=date_to)
+
+
+@pytest.mark.parametrize("sort", ["amount_desc", "amount_asc"])
+def test_amount_sorts_merge_hot_and_archived_rows(expenses, sort):
+    pages = walk(sort, 9)
+    assert ids(pages) == expected(expenses, sort)
+    assert {r["archived"] for r in pages[0]} == {0, 1}
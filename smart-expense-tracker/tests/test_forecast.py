@@ -0,0 +1,62 @@
+"""
+tests/test_forecast.py
+The forecast model and its walk-forward backtest, on synthetic histories.
+"""
+
+import numpy as np
+from hypothesis import given, settings, strategies as st
+
+from analytics.forecast import backtest, combine, smooth
+
+
+def test_constant_history_is_forecast_exactly():
+    history = np.full((3, 2, 24), 1500.0)
+    result  = backtest(history, holdout=6)
+    assert result["samples"] == 3 * 6
+    assert result["mae"] == 0
+    assert result["baseline_mae"] == 0
+    assert result["coverage"] == 1
+
+
+def test_backtest_skips_targets_without_three_months_of_past():
+    result = backtest(np.ones((2, 1, 5)), holdout=5)
+    assert result["samples"] == 2 * 1       # only the last target has 3 months before its gap
+
+
+def test_seasonal_history_beats_the_three_month_average():
+    rng     = np.random.default_rng(7)
+    months  = np.arange(36)
+    season  = 1 + 0.6 * np.sin(2 * np.pi * months / 12)
+    history = (5000 * season + rng.normal(0, 150, (50, 1, 36))).clip(0)
+    result  = backtest(history, holdout=12)
+    assert result["mae"] < result["baseline_mae"]
+
+
+@settings(max_examples=50, deadline=None)
+@given(st.integers(min_value=1, max_value=4), st.integers(min_value=1, max_value=3),
+       st.integers(min_value=4, max_value=30), st.integers(min_value=1, max_value=8),
+       st.integers(min_value=0, max_value=2**32 - 1))
+def test_backtest_metrics_are_well_formed(users, cats, months, holdout, seed):
+    history = np.random.default_rng(seed).gamma(2.0, 800.0, (users, cats, months))
+    result  = backtest(history, holdout=holdout)
+    usable  = sum(1 for t in range(months - holdout, months) if t >= 4)
+    assert result["samples"] == users * usable
+    assert result["mae"] >= 0 and result["baseline_mae"] >= 0
+    assert 0 <= result["coverage"] <= 1
+
+
+@given(st.integers(min_value=0, max_value=2**32 - 1))
+def test_forecast_interval_brackets_the_point(seed):
+    rng       = np.random.default_rng(seed)
+    history   = rng.gamma(2.0, 800.0, (4, 3, 24))
+    recurring = rng.choice([0.0, 499.0], (4, 3))
+    point, low, high, per_category = combine(history, recurring)
+    assert np.all(low <= point) and np.all(point <= high)
+    assert np.all(low >= recurring.sum(axis=-1) - 1e-9)
+    assert np.allclose(per_category.sum(axis=-1), point)
+
+
+def test_leading_empty_months_do_not_drag_the_level():
+    history = np.array([0, 0, 0, 0, 0, 0, 900, 900, 900, 900], dtype=float)
+    point, sigma = smooth(history)
+    assert point == 900 and sigma == 0
@@ -0,0 +1,122 @@
+"""
+tests/test_fragments.py
+The fragment cache: a fragment is built once per data version, a write
+(a new sync seq) makes the next render build again, the CSRF token goes in
+on the way out and never into the cache, and the LRU stays within its byte
+budget by dropping the least recently used entries.
+"""
+
+import itertools
+
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+import db
+from app import app
+from models.sync import Sync
+from services import fragments
+from services.fragments import CSRF_SLOT, LRU
+
+TEMPLATES = {"tests/_row.html": '<form><input value="{{ csrf }}">{{ total }}</form>'}
+
+
+@pytest.fixture
+def cache(standins, monkeypatch):
+    """A fresh fragment cache, a stood-in sync_seq table and numbered CSRF tokens."""
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    monkeypatch.setitem(app.config, "FRAGMENT_CACHE", True)
+    monkeypatch.setitem(app.config, "FRAGMENT_CACHE_MB", 1)
+    monkeypatch.setattr(fragments, "_cache", None)
+    monkeypatch.setattr(app.jinja_env, "loader",
+                        ChoiceLoader([DictLoader(TEMPLATES), app.jinja_env.loader]))
+    tokens = itertools.count(1)
+    monkeypatch.setattr(fragments, "generate_csrf", lambda: f"token-{next(tokens)}")
+    standins["primary"].run("""CREATE TABLE sync_seq (user_id INTEGER PRIMARY KEY,
+                                   seq INTEGER NOT NULL DEFAULT 0, pruned_seq INTEGER DEFAULT 0)""")
+    standins["primary"].run("""CREATE TABLE change_log (user_id INTEGER, kind TEXT,
+                                   row_id INTEGER, seq INTEGER, op TEXT, changed_at TEXT,
+                                   PRIMARY KEY (user_id, kind, row_id))""")
+    with app.test_request_context():
+        yield fragments._lru()
+
+
+class Build:
+    """build() for render(): counts its calls, shows `total`."""
+
+    def __init__(self, total=100):
+        self.calls, self.total = 0, total
+
+    def __call__(self):
+        self.calls += 1
+        return {"total": self.total}
+
+
+def render(build, user_id=7):
+    return str(fragments.render("tests/_row.html", (user_id, fragments.version(user_id)), build))
+
+
+def write(user_id=7):
+    cur = db.get_cursor(user_id=user_id)
+    Sync.record(cur, user_id, "expense", [1])
+    db.commit(cur)
+    cur.close()
+
+
+def test_second_render_of_a_version_is_a_hit(cache):
+    build = Build()
+    first, second = render(build), render(build)
+    assert build.calls == 1
+    assert first.replace("token-1", "") == second.replace("token-2", "")
+
+
+def test_write_makes_the_next_render_build_again(cache):
+    build = Build()
+    render(build)
+    build.total = 250
+    assert ">100<" in render(build)         # same version: the cached fragment
+    write()
+    assert ">250<" in render(build)
+    assert build.calls == 2
+    assert ">100<" in render(Build(), user_id=8)        # another user's own entry
+
+
+def test_csrf_token_is_filled_in_but_not_cached(cache):
+    assert 'value="token-1"' in render(Build())
+    assert 'value="token-2"' in render(Build())
+    [cached] = cache._entries.values()
+    assert CSRF_SLOT in cached and "token-" not in cached
+
+
+def test_cache_off_builds_every_time(cache, monkeypatch):
+    monkeypatch.setitem(app.config, "FRAGMENT_CACHE", False)
+    build = Build()
+    render(build), render(build)
+    assert build.calls == 2
+    assert not cache._entries
+
+
+# ── LRU ───────────────────────────────────────────────────────
+
+def test_lru_evicts_least_recently_used_within_its_budget():
+    lru = LRU(max_bytes=10)
+    lru.put("a", "aaaa")
+    lru.put("b", "bbbb")
+    assert lru.get("a") == "aaaa"           # a is now the most recent
+    lru.put("c", "cccc")
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == ("aaaa", "cccc")
+    assert lru._bytes == 8
+
+    lru.put("a", "aaaaaa")                  # replacing counts the new size only
+    assert lru._bytes == 10 and lru.get("c") == "cccc"
+    lru.put("d", "dd")
+    assert lru.get("a") is None and lru._bytes == 6
+
+
+def test_lru_skips_entries_larger_than_the_budget():
+    lru = LRU(max_bytes=10)
+    lru.put("a", "aaaa")
+    lru.put("big", "x" * 11)
+    assert lru.get("big") is None and lru.get("a") == "aaaa"
@@ -0,0 +1,101 @@
+"""
+tests/test_groupcommit.py
+A write that times out while still queued is cancelled, never run, and
+answered with a retryable 503. A batch commits once per shard, so a failed
+COMMIT fails only the units on its shard.
+"""
+
+import queue
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+from flask import g
+
+from app import app
+from services import groupcommit
+
+
+@pytest.fixture
+def stalled_writer(monkeypatch):
+    """Group commit on, with a queue nobody drains."""
+    q = queue.Queue()
+    monkeypatch.setattr(groupcommit, "_writer_queue", lambda: q)
+    monkeypatch.setitem(app.config, "GROUP_COMMIT_MS", 5)
+    monkeypatch.setitem(app.config, "GROUP_COMMIT_TIMEOUT", 0.05)
+    with app.test_request_context():
+        yield q
+
+
+def test_queued_unit_is_cancelled_on_timeout(stalled_writer):
+    ran = []
+    with pytest.raises(groupcommit.GroupCommitBusy):
+        groupcommit.write(1, lambda: ran.append(1))
+    _, _, future = stalled_writer.get_nowait()
+    assert future.cancelled()
+    groupcommit._run_batch([(1, lambda: ran.append(1), future)])    # the writer skips it
+    assert ran == []
+
+
+def test_timeout_is_a_retryable_503():
+    with app.test_request_context("/api/expenses/batch", method="POST"):
+        response = app.handle_user_exception(groupcommit.GroupCommitBusy())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+
+class FakeCursor:
+
+    def __init__(self, log, shard):
+        self.log, self.shard = log, shard
+
+    def execute(self, sql, params=None):
+        self.log.append((self.shard, sql))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def two_shards(monkeypatch):
+    """Users 1 and 3 on shard 0, user 2 on shard 1, whose COMMIT fails."""
+    shard_of, log, current = {1: 0, 2: 1, 3: 0}, [], []
+
+    @contextmanager
+    def transaction():
+        g.uow_after = []
+        current.clear()
+        yield
+        if 1 in current:
+            raise RuntimeError("COMMIT failed on shard 1")
+        log.append((current[0], "COMMIT"))
+
+    def get_cursor(user_id):
+        current.append(shard_of[user_id])
+        return FakeCursor(log, shard_of[user_id])
+
+    def group_by_shard(user_ids):
+        groups = {}
+        for uid in user_ids:
+            groups.setdefault(shard_of[uid], []).append(uid)
+        return groups
+
+    monkeypatch.setattr(groupcommit.db, "end_snapshot", lambda: None)
+    monkeypatch.setattr(groupcommit.db, "close_db", lambda: None)
+    monkeypatch.setattr(groupcommit.db, "transaction", transaction)
+    monkeypatch.setattr(groupcommit.db, "get_cursor", get_cursor)
+    monkeypatch.setattr(groupcommit.db, "group_by_shard", group_by_shard)
+    with app.test_request_context():
+        yield log
+
+
+def test_failed_commit_fails_only_its_shards_units(two_shards):
+    units = [(uid, lambda uid=uid: f"wrote {uid}", Future()) for uid in (1, 2, 3)]
+    groupcommit._run_batch(units)
+
+    (_, _, one), (_, _, two), (_, _, three) = units
+    assert one.result() == "wrote 1"
+    assert three.result() == "wrote 3"
+    with pytest.raises(RuntimeError):
+        two.result()
+    assert two_shards.count((0, "COMMIT")) == 1       # shard 0's units committed together
@@ -0,0 +1,106 @@
+"""
+tests/test_hashing.py
+The bounded hashing pool sheds load with HashPoolBusy (a 503), never a 500.
+At login only verifying the password can answer 503; upgrading an old hash
+is skipped when the pool is busy.
+"""
+
+import threading
+
+import pytest
+
+from app import app
+from services import hashing
+
+
+@pytest.fixture
+def config():
+    saved = {k: app.config[k] for k in ("HASH_POOL_WORKERS", "HASH_POOL_MAX_QUEUE", "HASH_TIMEOUT",
+                                     "BCRYPT_LOG_ROUNDS")}
+    with app.app_context():
+        yield app.config
+    app.config.update(saved)
+    hashing._pool = None        # the next caller builds a pool from the restored config
+
+
+def test_slow_hash_raises_busy(config):
+    config.update(HASH_POOL_WORKERS=1, HASH_POOL_MAX_QUEUE=1, HASH_TIMEOUT=0.05)
+    hashing._pool = None
+    release = threading.Event()
+    with pytest.raises(hashing.HashPoolBusy):
+        hashing._run(release.wait, 5)
+    release.set()
+
+
+def test_full_queue_raises_busy(config):
+    config.update(HASH_POOL_WORKERS=1, HASH_POOL_MAX_QUEUE=0, HASH_TIMEOUT=0.05)
+    hashing._pool = None
+    release = threading.Event()
+    with pytest.raises(hashing.HashPoolBusy):
+        hashing._run(release.wait, 5)       # times out, but keeps its slot while it runs
+    with pytest.raises(hashing.HashPoolBusy):
+        hashing._run(lambda: None)
+    release.set()
+
+
+def test_hash_round_trip(config):
+    config.update(BCRYPT_LOG_ROUNDS=4)
+    hashed = hashing.hash_password("correct horse")
+    assert hashing.check_password(hashed, "correct horse")
+    assert not hashing.check_password(hashed, "battery staple")
+    assert hashing.hash_cost(hashed) == 4
+    assert not hashing.needs_rehash(hashed)
+
+
+# ── Login ─────────────────────────────────────────────────────
+
+@pytest.fixture
+def login(config, monkeypatch):
+    """POST /login for a user whose hash predates the current cost; returns (post, rehashed)."""
+    from models.user import User
+    from routes import auth
+
+    config.update(BCRYPT_LOG_ROUNDS=4)
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    monkeypatch.setitem(app.config, "RATELIMIT_ENABLED", False)
+    old_hash = hashing.hash_password("correct horse").replace("$04$", "$05$", 1)
+    user = User({"id": 7, "username": "seven", "email": "seven@example.com",
+                 "password": old_hash})
+    rehashed = []
+    monkeypatch.setattr(User, "get_by_email", staticmethod(lambda email: user))
+    monkeypatch.setattr(User, "update_password",
+                        staticmethod(lambda user_id, hashed: rehashed.append(hashed)))
+    monkeypatch.setattr(auth, "check_password", lambda hashed, password: True)
+
+    def post():
+        with app.test_client() as client:
+            return client.post("/login", data={"email": user.email, "password": "correct horse"})
+    return post, rehashed
+
+
+def test_login_upgrades_an_old_hash(login):
+    post, rehashed = login
+    assert post().status_code == 302
+    assert len(rehashed) == 1 and hashing.hash_cost(rehashed[0]) == 4
+
+
+def test_busy_pool_skips_the_rehash_but_logs_in(login, monkeypatch):
+    from routes import auth
+
+    def busy(password):
+        raise hashing.HashPoolBusy()
+    monkeypatch.setattr(auth, "hash_password", busy)
+    post, rehashed = login
+    assert post().status_code == 302
+    assert rehashed == []
+
+
+def test_busy_pool_during_verification_is_503(login, monkeypatch):
+    from routes import auth
+
+    def busy(hashed, password):
+        raise hashing.HashPoolBusy()
+    monkeypatch.setattr(auth, "check_password", busy)
+    post, rehashed = login
+    assert post().status_code == 503
+    assert rehashed == []
@@ -0,0 +1,54 @@
+"""
+tests/test_jsonresp.py
+JSON encoding and response compression.
+"""
+
+import gzip
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import app
+from models.money import Money
+from services.jsonresp import columnar, compress_response, dumps, json_response, loads
+
+
+def _respond(payload, accept="gzip"):
+    with app.test_request_context(headers={"Accept-Encoding": accept}):
+        return compress_response(json_response(payload))
+
+
+@pytest.mark.parametrize("accept", ["gzip", "identity", ""])
+@pytest.mark.parametrize("size", [10, 10_000])
+def test_json_always_varies_on_accept_encoding(accept, size):
+    response = _respond({"x": "a" * size}, accept)
+    assert "Accept-Encoding" in response.vary
+
+
+def test_large_json_is_gzipped_when_accepted():
+    payload  = {"rows": list(range(2000))}
+    response = _respond(payload)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert loads(gzip.decompress(response.get_data())) == payload
+
+
+def test_small_json_is_sent_as_is():
+    response = _respond({"ok": True})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_other_content_types_are_untouched():
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(app.response_class("<p>hi</p>" * 1000, mimetype="text/html"))
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" not in response.vary
+
+
+def test_money_and_dates_encode():
+    out = loads(dumps({"m": Money(1999), "d": Decimal("2.50"), "on": date(2026, 10, 19)}))
+    assert out == {"m": 19.99, "d": 2.5, "on": "2026-10-19"}
+
+
+def test_columnar():
+    assert columnar([{"a": 1, "b": 2}, {"a": 3, "b": 4}]) == {"a": [1, 3], "b": [2, 4]}
@@ -0,0 +1,119 @@
+"""
+tests/test_metrics.py
+UserMetrics folded one write at a time must agree with a full recompute
+from the surviving expenses, whatever mix of inserts, edits and deletes.
+This checks the in-memory fold; test_metrics_sql.py checks the rollup
+tables against SQL aggregates on a real database.
+"""
+
+from datetime import date
+
+from hypothesis import given, strategies as st
+
+from models.metrics import UserMetrics, month_bounds, month_key, shift_month
+from models.money import Money, ZERO
+
+TODAY      = date(2026, 10, 19)
+CATEGORIES = {1: "Food", 2: "Transport", 3: "Rent", 4: "Fun"}
+
+months  = st.sampled_from([shift_month(month_key(TODAY), -i) for i in range(14)])
+expense = st.tuples(months, st.sampled_from(sorted(CATEGORIES)),
+                    st.integers(min_value=1, max_value=10_000_000).map(Money))
+# (kind, index into the live expenses, new values for inserts and edits)
+write   = st.tuples(st.sampled_from(["insert", "edit", "delete"]),
+                    st.integers(min_value=0), expense)
+
+
+def incremental(writes):
+    """Replay writes through apply() the way Expense.create/update/delete do."""
+    state, live = UserMetrics(TODAY), []
+    for kind, i, new in writes:
+        if kind != "insert" and not live:
+            kind = "insert"
+        if kind != "insert":
+            i %= len(live)
+            month, cat, amount = live[i]
+            state.apply(month, cat, -amount, CATEGORIES[cat])
+        if kind == "delete":
+            live.pop(i)
+            continue
+        state.apply(*new, CATEGORIES[new[1]])
+        if kind == "edit":
+            live[i] = new
+        else:
+            live.append(new)
+    return state, live
+
+
+def recompute(live):
+    """A fresh state from (month, category) totals of the surviving rows."""
+    totals = {}
+    for month, cat, amount in live:
+        totals[(month, cat)] = totals.get((month, cat), ZERO) + amount
+    state = UserMetrics(TODAY)
+    for (month, cat), total in sorted(totals.items()):
+        state.apply(month, cat, total, CATEGORIES[cat])
+    return state
+
+
+@given(st.lists(write, max_size=60))
+def test_incremental_matches_full_recompute(writes):
+    state, live = incremental(writes)
+    full = recompute(live)
+    for offset in range(-13, 1):
+        assert state.month_total(offset) == full.month_total(offset)
+    assert state.current_total == full.current_total
+    assert state.last_total == full.last_total
+    assert state.trailing3_total == full.trailing3_total
+    assert state.avg_daily == full.avg_daily
+    assert state.predicted_next == full.predicted_next
+    assert state.growth_pct == full.growth_pct
+    assert state.monthly_series() == full.monthly_series()
+    assert state.top_categories() == full.top_categories()
+    assert state.category_distribution() == full.category_distribution()
+
+
+@given(st.lists(write, max_size=60))
+def test_top_categories_are_sorted_and_positive(writes):
+    top = incremental(writes)[0].category_distribution()
+    totals = [c["total"] for c in top]
+    assert totals == sorted(totals, reverse=True)
+    assert all(t > 0 for t in totals)
+    assert len({c["category"] for c in top}) == len(top)
+
+
+def test_delete_empties_category():
+    state = UserMetrics(TODAY)
+    state.apply("2026-10", 1, Money(500), "Food")
+    state.apply("2026-10", 2, Money(300), "Transport")
+    state.apply("2026-10", 1, Money(-500), "Food")
+    assert state.top_categories() == [{"category": "Transport", "total": Money(300)}]
+    assert state.current_total == Money(300)
+
+
+month = st.builds(lambda y, m: f"{y:04d}-{m:02d}",
+                  st.integers(min_value=1900, max_value=2100), st.integers(min_value=1, max_value=12))
+delta = st.integers(min_value=-1200, max_value=1200)
+
+
+@given(month, delta, delta)
+def test_shift_month_composes(m, a, b):
+    assert shift_month(shift_month(m, a), b) == shift_month(m, a + b)
+    assert shift_month(m, 0) == m
+    assert shift_month(shift_month(m, a), -a) == m
+
+
+@given(st.dates(min_value=date(1900, 1, 1), max_value=date(2100, 12, 31)))
+def test_month_bounds_contain_the_month(d):
+    start, end = (date.fromisoformat(s) for s in month_bounds(month_key(d)))
+    assert start <= d < end
+    assert start.day == 1 and end.day == 1
+    assert month_key(end) == shift_month(month_key(d), 1)
+    assert (end - start).days in (28, 29, 30, 31)
+
+
+def test_shift_month_across_years():
+    assert shift_month("2026-01", -1) == "2025-12"
+    assert shift_month("2026-12", 1) == "2027-01"
+    assert shift_month("2026-10", -22) == "2024-12"
+    assert month_bounds("2024-02") == ("2024-02-01", "2024-03-01")
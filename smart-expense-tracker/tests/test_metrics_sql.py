@@ -0,0 +1,88 @@
+"""
+tests/test_metrics_sql.py
+The SQL path against a real database. Expense.create/update/delete keep
+expense_rollups and expense_daily in step, so UserMetrics.load() agrees
+with the raw aggregates `flask metrics verify` compares it to, and a
+rebuild from the expenses changes nothing.
+
+Needs MySQL: set TEST_MYSQL_DB to a scratch database with schema.sql and
+migrations/ applied (MYSQL_HOST, MYSQL_USER, ... as usual). Skipped
+otherwise. Test users are deleted afterwards.
+"""
+
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from app import app
+from models.expense import Expense
+from models.metrics import UserMetrics, month_bounds, month_key, shift_month
+from models.money import Money
+from models.user import User
+
+pytestmark = pytest.mark.mysql
+
+TODAY = date.today()        # the SQL aggregates use CURDATE()
+
+expense = st.tuples(st.integers(min_value=0, max_value=5),      # months back
+                    st.integers(min_value=1, max_value=28),     # day of month
+                    st.integers(min_value=0),                   # category, by index
+                    st.integers(min_value=1, max_value=10_000_000))
+write   = st.tuples(st.sampled_from(["insert", "edit", "delete"]),
+                    st.integers(min_value=0), expense)
+
+
+@pytest.fixture(scope="module")
+def scratch(mysql_db):
+    saved = app.config["ANOMALY_ENABLED"]
+    app.config["ANOMALY_ENABLED"] = False
+    prefix = "metrics_" + uuid.uuid4().hex[:8]
+    try:
+        yield prefix, [c["id"] for c in Expense.get_all_categories()]
+    finally:
+        User.delete_where_username_like(prefix + "_%")
+        app.config["ANOMALY_ENABLED"] = saved
+
+
+def values(categories, months_back, day, category, paise):
+    start = date.fromisoformat(month_bounds(shift_month(month_key(TODAY), -months_back))[0])
+    return {"category_id": categories[category % len(categories)],
+            "amount": Decimal(paise) / 100, "description": "metrics test",
+            "date": start.replace(day=day)}
+
+
+@settings(max_examples=25, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.lists(write, max_size=30))
+def test_rollups_match_the_sql_aggregates(scratch, writes):
+    prefix, categories = scratch
+    name = f"{prefix}_{uuid.uuid4().hex[:8]}"
+    uid  = User.create(name, f"{name}@example.test", "x" * 60)
+    live = []
+    for kind, i, new in writes:
+        row = values(categories, *new)
+        if kind == "insert" or not live:
+            live.append(Expense.create(user_id=uid, **row))
+        elif kind == "edit":
+            Expense.update(live[i % len(live)], uid, **row)
+        else:
+            Expense.delete(live.pop(i % len(live)), uid)
+
+    state = UserMetrics.load(uid, TODAY)
+    assert state.current_total  == Expense.get_current_month_total(uid)
+    assert state.last_total     == Expense.get_last_month_total(uid)
+    assert state.avg_daily      == Expense.get_avg_daily_spend(uid)
+    assert state.predicted_next == Expense.get_predicted_next_month(uid)
+    assert (sorted(c["total"] for c in state.top_categories(3))
+            == sorted(Money.of(r["total"]) for r in Expense.get_top3_categories(uid)))
+
+    result = app.test_cli_runner().invoke(args=["metrics", "verify", "--user", str(uid)])
+    assert result.exit_code == 0, result.output
+
+    UserMetrics.rebuild(uid)
+    rebuilt = UserMetrics.load(uid, TODAY)
+    assert rebuilt.monthly_series() == state.monthly_series()
+    assert rebuilt.category_distribution() == state.category_distribution()
@@ -0,0 +1,62 @@
+"""
+tests/test_migrations.py
+`flask db upgrade` runs a migration one statement at a time, as cut by
+split_statements(); every file in migrations/ has to come apart into whole
+statements, and a `;` inside a string or comment must not end one. DDL
+commits implicitly, so each file alters a table at most once.
+"""
+
+import pytest
+
+import migrations
+
+FILES = migrations.discover()
+
+
+@pytest.mark.parametrize("migration", FILES, ids=lambda m: f"{m.version:04d}_{m.name}")
+def test_statements_have_balanced_quotes(migration):
+    statements = migration.statements()
+    assert statements
+    for stmt in statements:
+        for quote in "'\"`":
+            assert stmt.count(quote) % 2 == 0, f"unbalanced {quote} in: {stmt[:80]}"
+
+
+@pytest.mark.parametrize("migration", FILES, ids=lambda m: f"{m.version:04d}_{m.name}")
+def test_statements_are_whole(migration):
+    for stmt in migration.statements():
+        assert stmt.split(None, 1)[0].upper() in {"ALTER", "CREATE", "DELETE", "DROP",
+                                                  "INSERT", "RENAME", "UPDATE"}, stmt[:80]
+        assert "--" not in stmt
+
+
+@pytest.mark.parametrize("migration", FILES, ids=lambda m: f"{m.version:04d}_{m.name}")
+def test_one_alter_per_table(migration):
+    altered = [stmt.split()[2].strip("`").lower() for stmt in migration.statements()
+               if stmt.upper().startswith("ALTER TABLE")]
+    assert len(altered) == len(set(altered)), altered
+
+
+def test_semicolon_in_string_does_not_split():
+    sql = ("ALTER TABLE t ADD COLUMN c INT COMMENT 'a; b';\n"
+           "UPDATE t SET s = 'it''s; fine', d = \"x;\\\"y\";\n")
+    assert migrations.split_statements(sql) == [
+        "ALTER TABLE t ADD COLUMN c INT COMMENT 'a; b'",
+        "UPDATE t SET s = 'it''s; fine', d = \"x;\\\"y\"",
+    ]
+
+
+def test_semicolon_in_comment_does_not_split():
+    sql = ("-- leading comment; with a semicolon\n"
+           "ALTER TABLE t ADD COLUMN c INT, -- trailing; comment\n"
+           "    ADD COLUMN d INT /* block; comment */;\n"
+           "UPDATE t SET c = 1 - -1;\n")
+    assert migrations.split_statements(sql) == [
+        "ALTER TABLE t ADD COLUMN c INT, \n    ADD COLUMN d INT",
+        "UPDATE t SET c = 1 - -1",
+    ]
+
+
+def test_no_trailing_semicolon():
+    assert migrations.split_statements("SELECT 1;\nSELECT 2\n") == ["SELECT 1", "SELECT 2"]
+    assert migrations.split_statements("-- only a comment\n") == []
@@ -0,0 +1,68 @@
+"""
+tests/test_money.py
+Money keeps amounts as integer paise: conversions round half-up to the
+paisa, and sums match exact Decimal arithmetic.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+from hypothesis import given, strategies as st
+
+from models.money import Money, ZERO, paise_array, sum_paise, to_paise
+
+paise   = st.integers(min_value=-10**13, max_value=10**13)
+rupees  = st.decimals(min_value=-10**8, max_value=10**8, places=2)
+precise = st.decimals(min_value=-10**8, max_value=10**8, places=4)
+
+
+@given(rupees)
+def test_two_place_decimals_are_exact(value):
+    assert to_paise(value) == int(value * 100)
+    assert Money.of(value).to_decimal() == value
+
+
+@given(precise)
+def test_fractions_of_a_paisa_round_half_up(value):
+    assert to_paise(value) == int((value * 100).to_integral_value(ROUND_HALF_UP))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (Decimal("0.005"), 1), (Decimal("-0.005"), -1), (Decimal("0.0049"), 0),
+    (Decimal("2.675"), 268), (0.1, 10), (2.675, 268), ("19.99", 1999),
+    (7, 700), (None, 0), (Money(42), 42),
+])
+def test_to_paise(value, expected):
+    assert to_paise(value) == expected
+
+
+@given(st.integers(min_value=-10**11, max_value=10**11))
+def test_floats_go_through_their_shortest_repr(n):
+    assert to_paise(n / 100) == n
+
+
+@given(paise)
+def test_str_round_trips(p):
+    assert Money.of(str(Money(p))) == Money(p)
+    assert Money.of(Money(p).to_decimal()).paise == p
+
+
+@given(st.lists(rupees, max_size=50))
+def test_sums_are_exact(values):
+    assert Money.sum(values).to_decimal() == sum(values, Decimal(0))
+    assert sum((Money.of(v) for v in values), ZERO) == Money.sum(values)
+    assert sum_paise(paise_array(values)) == Money.sum(values)
+
+
+@given(paise, st.integers(min_value=1, max_value=10**6))
+def test_division_rounds_half_up(p, n):
+    expected = (Decimal(p) / n).to_integral_value(ROUND_HALF_UP)
+    assert (Money(p) / n).paise == int(expected)
+
+
+@given(paise, paise)
+def test_ordering_and_equality_follow_paise(a, b):
+    assert (Money(a) < Money(b)) == (a < b)
+    assert (Money(a) == Money(b)) == (a == b)
+    assert (Money(a) - Money(b)).paise == a - b
+    assert hash(Money(a)) == hash(Money(a).to_decimal())
@@ -0,0 +1,58 @@
+"""
+tests/test_money_sql.py
+Integer-paise totals against MySQL's own SUM over DECIMAL(10,2) amounts:
+Money.sum and sum_paise over the fetched column, and the sql_paise()
+expressions the analytics queries use, all equal SUM(amount) exactly.
+
+Needs MySQL: set TEST_MYSQL_DB to a scratch database (MYSQL_HOST,
+MYSQL_USER, ... as usual). Skipped otherwise. The amounts go into a
+TEMPORARY table, so nothing persists.
+"""
+
+from decimal import Decimal
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from db import get_cursor
+from models.money import Money, paise_array, sql_paise, sum_paise
+
+pytestmark = pytest.mark.mysql
+
+amounts = st.lists(st.integers(min_value=-99_999_999, max_value=99_999_999),
+                   min_size=1, max_size=500)
+
+
+@pytest.fixture(scope="module")
+def cur(mysql_db):
+    cur = get_cursor()
+    cur.execute("""CREATE TEMPORARY TABLE money_check (
+                       id     INT AUTO_INCREMENT PRIMARY KEY,
+                       amount DECIMAL(10,2) NOT NULL
+                   )""")
+    try:
+        yield cur
+    finally:
+        cur.execute("DROP TEMPORARY TABLE money_check")
+        cur.close()
+
+
+@settings(max_examples=50, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(amounts)
+def test_paise_totals_match_sql_sum(cur, paise):
+    cur.execute("DELETE FROM money_check")
+    cur.executemany("INSERT INTO money_check (amount) VALUES (%s)",
+                    [(Decimal(p).scaleb(-2),) for p in paise])
+    cur.execute(f"""SELECT SUM(amount) AS total, {sql_paise("SUM(amount)")} AS paise
+                    FROM money_check""")
+    row = cur.fetchone()
+    assert Money.of(row["total"]) == Money(sum(paise))
+    assert row["paise"] == sum(paise)
+
+    cur.execute(f"SELECT amount, {sql_paise('amount')} AS paise FROM money_check")
+    rows   = cur.fetchall()
+    column = [r["amount"] for r in rows]
+    assert Money.sum(column) == Money.of(row["total"])
+    assert sum_paise(paise_array(column)) == Money.of(row["total"])
+    assert sum_paise([r["paise"] for r in rows]) == Money.of(row["total"])
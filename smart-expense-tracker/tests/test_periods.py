@@ -0,0 +1,205 @@
+"""
+tests/test_periods.py
+Budget period keys and their [start, end) bounds, DailySpend prefix sums
+against a direct sum over the same rows, and the cost of evaluating budgets:
+Budget.get_status and BudgetAlerts.evaluate read the same number of rows
+whether the rollups stand for a few expenses or many.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from hypothesis import given, strategies as st
+
+import models.budget
+from app import app
+from models.budget import Budget
+from models.budget_alert import BudgetAlerts
+from models.money import Money
+from models.periods import (DailySpend, MONTHLY, PERIODS, bounds, calendar_keys, key_for,
+                            label, months_in, period_of)
+
+CALENDAR = [p for p in PERIODS if p != "rolling"]
+days     = st.dates(min_value=date(1990, 1, 1), max_value=date(2090, 12, 31))
+
+
+@given(st.sampled_from(CALENDAR), days)
+def test_bounds_of_key_for_contain_the_day(period, d):
+    key = key_for(period, d)
+    assert period_of(key) == period
+    start, end = bounds(key)
+    assert start <= d < end
+    assert key_for(period, start) == key
+    assert key_for(period, end - timedelta(days=1)) == key
+
+
+@given(st.sampled_from(CALENDAR), days)
+def test_calendar_periods_tile_time(period, d):
+    start, end = bounds(key_for(period, d))
+    assert bounds(key_for(period, end))[0] == end
+    assert bounds(key_for(period, start - timedelta(days=1)))[1] == start
+
+
+@given(days)
+def test_calendar_keys_cover_every_period(d):
+    keys = calendar_keys(d)
+    assert [period_of(k) for k in keys] == CALENDAR
+    assert all(bounds(k)[0] <= d < bounds(k)[1] for k in keys)
+
+
+@given(st.integers(min_value=1, max_value=366), days)
+def test_rolling_window_ends_today(n, today):
+    start, end = bounds(key_for("rolling", today, days=n), today)
+    assert end == today + timedelta(days=1)
+    assert (end - start).days == n
+
+
+@pytest.mark.parametrize("key, expected", [
+    ("2026-10",  (date(2026, 10, 1), date(2026, 11, 1))),
+    ("2026-12",  (date(2026, 12, 1), date(2027, 1, 1))),
+    ("2026-W42", (date(2026, 10, 12), date(2026, 10, 19))),
+    ("2026-W01", (date(2025, 12, 29), date(2026, 1, 5))),
+    ("2026-Q4",  (date(2026, 10, 1), date(2027, 1, 1))),
+    ("2024-Q1",  (date(2024, 1, 1), date(2024, 4, 1))),
+    ("2024",     (date(2024, 1, 1), date(2025, 1, 1))),
+])
+def test_bounds(key, expected):
+    assert bounds(key) == expected
+
+
+@pytest.mark.parametrize("key", ["2026-13", "2026-W00", "2025-W53", "2026-Q5",
+                                 "0d", "367d", "monthly", "", None])
+def test_invalid_keys(key):
+    assert period_of(key) is None
+    with pytest.raises(ValueError):
+        bounds(key)
+
+
+@given(st.sampled_from(MONTHLY), days)
+def test_months_in_tile_the_period(period, d):
+    key    = key_for(period, d)
+    months = months_in(key)
+    assert len(months) == {"month": 1, "quarter": 3, "year": 12}[period]
+    assert months[0] == key_for("month", bounds(key)[0])
+    assert all(bounds(m)[0] == bounds(n)[1] for m, n in zip(months[1:], months))
+    assert bounds(months[-1])[1] == bounds(key)[1]
+
+
+def test_months_in_rejects_days():
+    for key in ("2026-W42", "30d"):
+        with pytest.raises(ValueError):
+            months_in(key)
+
+
+def test_labels():
+    assert label("2026-10") == "Oct 2026"
+    assert label("2026-W42") == "Week 42, 2026"
+    assert label("2026-Q4") == "Q4 2026"
+    assert label("1d") == "Last day"
+    assert label("30d") == "Last 30 days"
+
+
+START, END = date(2026, 1, 1), date(2026, 4, 1)
+row   = st.tuples(st.integers(min_value=0, max_value=(END - START).days - 1),
+                  st.integers(min_value=1, max_value=4),
+                  st.integers(min_value=1, max_value=10**7))
+span  = st.integers(min_value=-10, max_value=(END - START).days + 10)
+
+
+@given(st.lists(row, max_size=80), span, span, st.sampled_from([None, 1, 2, 3, 4, 5]))
+def test_daily_spend_matches_direct_sum(rows, a, b, category):
+    rows  = [(START + timedelta(days=i), cat, p) for i, cat, p in rows]
+    spend = DailySpend(START, END, rows)
+    lo, hi = (START + timedelta(days=i) for i in sorted((a, b)))
+    expected = sum(p for day, cat, p in rows
+                   if max(lo, START) <= day < min(hi, END) and category in (None, cat))
+    assert spend.spent(lo, hi, category) == Money(expected)
+
+
+TODAY = date(2026, 10, 19)
+CELL  = 40_000          # paise spent per (day, category), however many expenses
+
+
+class CountingCursor:
+    """
+    Answers the budget reads from in-memory rollups of `expenses` (day,
+    category_id, paise) and counts the queries run and rows fetched.
+    """
+
+    def __init__(self, budgets, expenses):
+        self.budgets, self.daily, self.monthly = budgets, {}, {}
+        for day, cat, paise in expenses:
+            self.daily[day, cat] = self.daily.get((day, cat), 0) + paise
+            month = key_for("month", day)
+            self.monthly[month, cat] = self.monthly.get((month, cat), 0) + paise
+        self.queries, self.rows, self.rowcount, self.lastrowid = 0, 0, 0, 1
+        self._result = []
+
+    def execute(self, sql, params=()):
+        self.queries += 1
+        self.rowcount, self._result = 1, []
+        if "FROM budgets" in sql:
+            self._result = [dict(b) for b in self.budgets]
+        elif "FROM expense_rollups" in sql:
+            _, lo, hi = params
+            self._result = [{"month": m, "category_id": c, "paise": p}
+                            for (m, c), p in self.monthly.items() if lo <= m <= hi]
+        elif "FROM expense_daily" in sql:
+            _, lo, hi = params
+            self._result = [{"day": d, "category_id": c, "paise": p}
+                            for (d, c), p in self.daily.items() if lo <= d < hi]
+
+    def executemany(self, sql, rows):
+        self.queries += 1
+
+    def fetchall(self):
+        self.rows += len(self._result)
+        return self._result
+
+    def close(self):
+        pass
+
+
+def expenses(per_cell):
+    """This year's spending, CELL a day in each of 3 categories, split per_cell ways."""
+    day, rows = date(TODAY.year, 1, 1), []
+    while day <= TODAY:
+        for cat in (1, 2, 3):
+            rows += [(day, cat, CELL // per_cell)] * per_cell
+        day += timedelta(days=1)
+    return rows
+
+
+BUDGETS = [{"id": i, "category_id": cat, "category_name": cat and f"Cat {cat}",
+            "period": period_of(key), "month": key, "amount": amount}
+           for i, (key, cat, amount) in enumerate([
+               (key_for("week", TODAY),    None, 5_000),
+               (key_for("month", TODAY),   1,    100_000),
+               (key_for("quarter", TODAY), None, 50_000),
+               (key_for("year", TODAY),    2,    200_000),
+               ("30d",                     3,    1_000),
+           ], start=1)]
+
+
+def cost(per_cell, monkeypatch):
+    """(queries, rows, statuses, alerts) of one get_status and one evaluate."""
+    data = expenses(per_cell)
+    cur  = CountingCursor(BUDGETS, data)
+    monkeypatch.setattr(models.budget, "get_cursor", lambda **kw: cur)
+    status = Budget.get_status(7, TODAY)
+    with app.app_context():
+        alerts = BudgetAlerts.evaluate(cur, 7, [TODAY], [1, 2, 3])
+    for b, s in zip(BUDGETS, status):
+        start, end = bounds(b["month"], TODAY)
+        assert s["spent"] == Money(sum(p for d, c, p in data
+                                       if start <= d < end and b["category_id"] in (None, c)))
+    return cur.queries, cur.rows, [s["pct"] for s in status], alerts
+
+
+def test_budget_evaluation_cost_does_not_grow_with_expenses(monkeypatch):
+    few, many = cost(1, monkeypatch), cost(50, monkeypatch)
+    assert len(expenses(50)) == 50 * len(expenses(1))
+    assert few == many
+    queries, rows, _, alerts = few
+    assert alerts                   # the threshold path ran too
+    assert rows < len(expenses(1)) / 2   # less than a scan of even the smaller history
@@ -0,0 +1,103 @@
+"""
+tests/test_ratelimit.py
+Token buckets: a request is charged to every bucket it belongs to, or to
+none of them when any one is empty. Requests are keyed on the session's user
+id or the bearer token, so charging (and refusing) one loads no user.
+"""
+
+import pytest
+from hypothesis import given, strategies as st
+
+from flask import session
+
+from app import app, login_manager
+from services import ratelimit
+from services.ratelimit import (MemoryBuckets, RateLimited, SQLiteBuckets, admit, client_key,
+                                release)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryBuckets() if request.param == "memory" else SQLiteBuckets(tmp_path / "rl.sqlite")
+
+
+def test_burst_then_wait(store):
+    bucket = [("u1", 1.0, 3)]
+    assert [store.take(bucket, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert store.take(bucket, 100.0) == pytest.approx(1.0)
+    assert store.take(bucket, 101.0) == 0
+
+
+def test_refused_request_is_not_charged_to_the_other_bucket(store):
+    user, ip = ("user", 1.0, 1), ("ip", 1.0, 5)
+    assert store.take([user, ip], 100.0) == 0
+    for _ in range(10):                     # the user bucket is empty: all refused
+        assert store.take([user, ip], 100.0) > 0
+    # ...and none of them spent the shared IP bucket (4 tokens left)
+    assert [store.take([ip], 100.0) for _ in range(5)] == [0, 0, 0, 0, pytest.approx(1.0)]
+
+
+def test_wait_is_the_longest_of_the_empty_buckets(store):
+    slow, fast = ("slow", 0.5, 1), ("fast", 2.0, 1)
+    assert store.take([slow, fast], 100.0) == 0
+    assert store.take([slow, fast], 100.0) == pytest.approx(2.0)
+
+
+@given(st.lists(st.tuples(st.booleans(), st.floats(min_value=0, max_value=2)), max_size=40))
+def test_allowed_requests_never_exceed_either_bucket(requests):
+    store = MemoryBuckets()
+    a, b  = ("a", 1.0, 3), ("b", 0.5, 2)
+    now, allowed = 0.0, {"a": 0, "b": 0}
+    for both, step in requests:
+        now += step
+        buckets = [a, b] if both else [b]
+        if store.take(buckets, now) == 0:
+            for key, _, _ in buckets:
+                allowed[key] += 1
+    assert allowed["a"] <= 3 + 1.0 * now
+    assert allowed["b"] <= 2 + 0.5 * now
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    """The app with a one-request burst for "default" endpoints and user loaders that fail."""
+    def no_db(*args):
+        raise AssertionError("rate limiting loaded the user")
+
+    monkeypatch.setattr(ratelimit, "_pid", None)        # fresh in-memory buckets
+    monkeypatch.setitem(app.config, "RATELIMIT_ENABLED", True)
+    monkeypatch.setitem(app.config, "RATELIMIT_STORAGE", "memory")
+    monkeypatch.setitem(app.config, "RATELIMIT_RULES",
+                        dict(app.config["RATELIMIT_RULES"], default=(1, 1)))
+    monkeypatch.setattr(login_manager, "_user_callback", no_db)
+    monkeypatch.setattr(login_manager, "_request_callback", no_db)
+    return app
+
+
+@pytest.mark.parametrize("headers, session_user, expected", [
+    ({},                                    "7",  "u7"),
+    ({"Authorization": "Bearer tok"},       None, "t"),
+    ({"Authorization": "Basic dXNlcg=="},   None, "ip"),
+    ({},                                    None, "ip"),
+])
+def test_requests_are_keyed_without_loading_the_user(limited_app, headers, session_user,
+                                                     expected):
+    with limited_app.test_request_context("/dashboard", headers=headers):
+        if session_user:
+            session["_user_id"] = session_user
+        assert client_key("default").startswith(expected)
+        assert client_key("auth").startswith("ip")
+        admit()
+        release()
+        with pytest.raises(RateLimited):
+            admit()
+
+
+def test_bearer_tokens_get_separate_buckets(limited_app):
+    keys = set()
+    for token in ("a", "b", "a"):
+        with limited_app.test_request_context(
+                "/dashboard", headers={"Authorization": f"Bearer {token}"}):
+            keys.add(client_key("api"))
+    assert len(keys) == 2
+    assert not any("a" == k[1:] or "b" == k[1:] for k in keys)    # the token is not stored
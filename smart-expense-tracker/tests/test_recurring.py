@@ -0,0 +1,55 @@
+"""
+tests/test_recurring.py
+materialize_due() walks every due rule once, page after page, even when
+the rules at the front of the index stay due (locked by a concurrent run
+or their user is moving shards).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import app
+from db import ShardMoving
+from models.recurring import Recurring
+
+TODAY = date(2024, 5, 31)
+
+
+@pytest.fixture
+def rules(monkeypatch):
+    """Due rules in memory; materialize() skips users 1 and 2 like a locked or moving user."""
+    due = {i: {"id": i, "user_id": i % 7, "next_due": TODAY - timedelta(days=i % 5)}
+           for i in range(1, 38)}
+    reads = []
+
+    def get_due(today, limit=1000, user_id=None, shard=None, after=None):
+        key  = lambda r: (r["next_due"], r["user_id"], r["id"])
+        rows = sorted((r for r in due.values() if after is None or key(r) > after), key=key)
+        reads.append([r["id"] for r in rows[:limit]])
+        return [dict(r) for r in rows[:limit]]
+
+    def materialize(user_id, today=None, rule_ids=None):
+        if user_id == 2:
+            raise ShardMoving(user_id)
+        if user_id == 1:
+            return 0
+        for i in rule_ids:
+            del due[i]
+        return len(rule_ids)
+
+    monkeypatch.setattr(Recurring, "get_due", staticmethod(get_due))
+    monkeypatch.setattr(Recurring, "materialize", staticmethod(materialize))
+    with app.app_context():
+        yield due, reads
+
+
+@pytest.mark.parametrize("batch", [1, 4, 10, 37, 100])
+def test_every_rule_is_read_once(rules, batch):
+    due, reads = rules
+    read, inserted = Recurring.materialize_due(batch, TODAY)
+    ids = [i for page in reads for i in page]
+    assert read == len(ids) == len(set(ids)) == 37
+    assert sorted(r["user_id"] for r in due.values()) == sorted(
+        i % 7 for i in range(1, 38) if i % 7 in (1, 2))
+    assert inserted == 37 - len(due)
@@ -0,0 +1,92 @@
+"""
+tests/test_replicas.py
+Read/write splitting against a stood-in primary and replica: a read goes to
+the replica only while it is healthy, within REPLICA_MAX_LAG and caught up
+with the user's sync seq; otherwise, and after the request writes, it goes
+to the primary.
+"""
+
+import pytest
+
+import db
+from app import app
+
+REPLICA = "replica:3306"
+
+
+@pytest.fixture
+def servers(standins, monkeypatch):
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [REPLICA])
+    monkeypatch.setitem(app.config, "REPLICA_MAX_LAG", 5)
+    monkeypatch.setitem(app.config, "REPLICA_HEALTH_TTL", 0)
+    monkeypatch.setitem(app.config, "REPLICA_LAG_CHECK", True)
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    for host in ("primary", "replica"):
+        standins[host].run("CREATE TABLE sync_seq (user_id INTEGER PRIMARY KEY, seq INTEGER)")
+        standins[host].run("INSERT INTO sync_seq VALUES (7, 5)")
+    with app.test_request_context():
+        yield standins["primary"], standins["replica"]
+
+
+def served_by(conn):
+    return conn.server.name
+
+
+def test_healthy_caught_up_replica_serves_reads(servers):
+    assert served_by(db.get_read_db(7)) == "replica"
+    assert served_by(db.get_read_db()) == "replica"
+    assert db.read_from_replica()
+
+
+def test_lagging_replica_falls_back_to_the_primary(servers):
+    _, replica = servers
+    replica.lag = 30
+    assert served_by(db.get_read_db(7)) == "primary"
+    replica.lag = 0                         # caught up again mid-request...
+    assert served_by(db.get_read_db(7)) == "primary"    # ...but this request stays put
+    assert not db.read_from_replica()
+    assert db.replica_status()[REPLICA]["ok"]
+
+
+def test_stopped_replication_counts_as_lagging(servers):
+    _, replica = servers
+    replica.lag = None
+    assert served_by(db.get_read_db()) == "primary"
+    assert not db.replica_status()[REPLICA]["ok"]
+
+
+def test_replica_behind_the_users_seq_pins_the_primary(servers):
+    _, replica = servers
+    replica.run("UPDATE sync_seq SET seq = 4 WHERE user_id = 7")
+    assert served_by(db.get_read_db(8)) == "replica"        # user 8 never wrote
+    assert served_by(db.get_read_db(7)) == "primary"
+    assert served_by(db.get_read_db(8)) == "primary"        # pinned for the request
+    assert not db.read_from_replica()
+
+
+def test_unreachable_replica_is_marked_down(servers):
+    _, replica = servers
+    replica.down = True
+    assert served_by(db.get_read_db(7)) == "primary"
+    assert not db.replica_status()[REPLICA]["ok"]
+
+
+def test_reads_after_a_write_go_to_the_primary(servers):
+    primary, _ = servers
+    cur = db.get_cursor()
+    cur.execute("UPDATE sync_seq SET seq = seq + 1 WHERE user_id = %s", (7,))
+    db.commit(cur)
+    assert served_by(db.get_read_db(8)) == "primary"
+    assert served_by(db.get_cursor(readonly=True)._connection) == "primary"
+    assert primary.run("SELECT seq FROM sync_seq WHERE user_id = 7") == [{"seq": 6}]
+
+
+def test_later_request_waits_for_the_replica_to_catch_up(servers):
+    primary, replica = servers
+    primary.run("UPDATE sync_seq SET seq = 6 WHERE user_id = 7")     # replica not yet
+    with app.app_context():                 # a new request: its own g
+        assert served_by(db.get_read_db(7)) == "primary"
+    replica.run("UPDATE sync_seq SET seq = 6 WHERE user_id = 7")
+    with app.app_context():
+        assert served_by(db.get_read_db(7)) == "replica"
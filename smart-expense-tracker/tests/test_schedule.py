@@ -0,0 +1,90 @@
+"""
+tests/test_schedule.py
+next_on_or_after() is arithmetic on one rule; check it against walking the
+calendar a day at a time.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+import pytest
+from hypothesis import given, strategies as st
+
+from models.schedule import FREQUENCIES, LAST_DAY, describe, next_on_or_after, occurrences
+
+days = st.dates(min_value=date(2000, 1, 1), max_value=date(2040, 12, 31))
+
+
+@st.composite
+def rules(draw):
+    starts_on = draw(days)
+    ends_on   = draw(st.none() | st.dates(min_value=starts_on, max_value=date(2041, 12, 31)))
+    return {"frequency":    draw(st.sampled_from(FREQUENCIES)),
+            "day_of_month": draw(st.sampled_from([*range(1, 29), LAST_DAY])),
+            "starts_on":    starts_on,
+            "ends_on":      ends_on}
+
+
+def occurs(rule, d):
+    """Whether `d` is an occurrence of `rule`, by definition."""
+    start = rule["starts_on"]
+    if d < start or (rule["ends_on"] is not None and d > rule["ends_on"]):
+        return False
+    freq = rule["frequency"]
+    if freq in ("weekly", "biweekly"):
+        return (d - start).days % (7 if freq == "weekly" else 14) == 0
+    step = {"monthly": 1, "quarterly": 3, "yearly": 12}[freq]
+    months = (d.year - start.year) * 12 + d.month - start.month
+    last   = calendar.monthrange(d.year, d.month)[1]
+    return months % step == 0 and d.day == min(rule["day_of_month"], last)
+
+
+def walk(rule, d):
+    """First occurrence on or after d, a day at a time (None past ends_on)."""
+    d = max(d, rule["starts_on"])
+    for _ in range(800):
+        if occurs(rule, d):
+            return d
+        if rule["ends_on"] is not None and d > rule["ends_on"]:
+            return None
+        d += timedelta(days=1)
+    raise AssertionError("no occurrence within 800 days")
+
+
+@given(rules(), days)
+def test_next_on_or_after_matches_walking_the_calendar(rule, d):
+    assert next_on_or_after(rule, d) == walk(rule, d)
+
+
+@given(rules(), days, st.integers(min_value=0, max_value=400))
+def test_occurrences_are_exactly_the_matching_days(rule, start, length):
+    end = start + timedelta(days=length)
+    expected = [start + timedelta(days=i) for i in range(length + 1)
+                if occurs(rule, start + timedelta(days=i))]
+    assert occurrences(rule, start, end) == expected
+
+
+@pytest.mark.parametrize("rule, d, expected", [
+    ({"frequency": "monthly", "day_of_month": LAST_DAY, "starts_on": date(2024, 1, 31)},
+     date(2024, 2, 1), date(2024, 2, 29)),
+    ({"frequency": "monthly", "day_of_month": 30, "starts_on": date(2025, 1, 1)},
+     date(2025, 2, 1), date(2025, 2, 28)),
+    ({"frequency": "quarterly", "day_of_month": 15, "starts_on": date(2026, 2, 10)},
+     date(2026, 3, 1), date(2026, 5, 15)),
+    ({"frequency": "yearly", "day_of_month": 29, "starts_on": date(2024, 2, 29)},
+     date(2024, 3, 1), date(2025, 2, 28)),
+    ({"frequency": "biweekly", "day_of_month": 1, "starts_on": date(2026, 10, 5)},
+     date(2026, 10, 6), date(2026, 10, 19)),
+    ({"frequency": "weekly", "day_of_month": 1, "starts_on": date(2026, 10, 5),
+      "ends_on": date(2026, 10, 11)}, date(2026, 10, 6), None),
+])
+def test_edge_cases(rule, d, expected):
+    assert next_on_or_after(rule, d) == expected
+
+
+def test_describe():
+    assert describe({"frequency": "weekly", "starts_on": date(2026, 10, 19)}) == "Weekly · Mon"
+    assert describe({"frequency": "monthly", "day_of_month": LAST_DAY,
+                     "starts_on": date(2026, 1, 1)}) == "Monthly · last day"
+    assert describe({"frequency": "yearly", "day_of_month": 12,
+                     "starts_on": date(2026, 3, 1)}) == "Yearly · 12 Mar"
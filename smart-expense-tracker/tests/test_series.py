@@ -0,0 +1,53 @@
+"""
+tests/test_series.py
+Argument parsing and bucket arithmetic for /api/analytics/series.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from hypothesis import given, strategies as st
+
+from analytics.series import (BUCKETS, MAX_BUCKETS, SeriesError, bucket_labels,
+                              count_buckets, fit_bucket, parse_args)
+
+days = st.dates(min_value=date(2000, 1, 1), max_value=date(2040, 12, 31))
+
+
+@pytest.mark.parametrize("today, start", [
+    (date(2024, 2, 29), date(2023, 2, 1)),
+    (date(2026, 10, 19), date(2025, 10, 1)),
+    (date(2026, 1, 1), date(2025, 1, 1)),
+])
+def test_default_range_is_a_year_back_from_the_month_start(today, start):
+    assert parse_args({}, today) == (start, today, "month", None)
+
+
+def test_leap_day_as_to():
+    assert parse_args({"to": "2028-02-29"})[0] == date(2027, 2, 1)
+
+
+@pytest.mark.parametrize("args", [
+    {"from": "2026-13-01"}, {"to": "yesterday"},
+    {"from": "2026-10-02", "to": "2026-10-01"},
+    {"bucket": "hour"}, {"group": "merchant"},
+])
+def test_bad_args(args):
+    with pytest.raises(SeriesError):
+        parse_args(args, date(2026, 10, 19))
+
+
+@given(days, st.integers(min_value=0, max_value=3000), st.sampled_from(BUCKETS))
+def test_labels_match_the_bucket_count(start, length, bucket):
+    end = start + timedelta(days=length)
+    labels = bucket_labels(start, end, bucket)
+    assert len(labels) == count_buckets(start, end, bucket)
+    assert labels == sorted(set(labels))
+
+
+@given(days, st.integers(min_value=0, max_value=20000), st.sampled_from(BUCKETS))
+def test_fit_bucket_stays_within_max_points(start, length, bucket):
+    end    = start + timedelta(days=length)
+    fitted = fit_bucket(start, end, bucket)
+    assert BUCKETS.index(fitted) >= BUCKETS.index(bucket)
+    assert fitted == "year" or count_buckets(start, end, fitted) <= MAX_BUCKETS
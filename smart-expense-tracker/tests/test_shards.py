@@ -0,0 +1,172 @@
+"""
+tests/test_shards.py
+Sharding against a stood-in directory and three shards: placement spreads
+users evenly despite the id stride, reads route to the user's shard,
+scatter() reaches every shard, and move_user copies, verifies and flips,
+or leaves the user where they were if the copy fails. While a user's rows
+are being moved, their cursors keep serving plain reads and refuse writes
+and locking reads with ShardMoving.
+"""
+
+from collections import Counter
+
+import pytest
+
+import db
+from app import app
+from db import ID_STRIDE, ShardMoving, _MovingCursor
+from models.shards import SHARD_CACHES, SHARD_TABLES, Shards
+
+SHARDS = {n: (f"shard{n}", 3306, f"s{n}") for n in range(3)}
+
+
+@pytest.fixture
+def cluster(standins, monkeypatch):
+    """The directory and shards 0-2; user 10 lives on shard 1 with a few rows."""
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "directory")
+    monkeypatch.setitem(app.config, "MYSQL_PORT", 3306)
+    monkeypatch.setitem(app.config, "MYSQL_DB", "app")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", SHARDS)
+    monkeypatch.setitem(app.config, "SHARD_MOVE_GRACE", 0)
+    users = """CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT,
+                                   password TEXT, role TEXT, created_at TEXT)"""
+    directory = standins["directory"]
+    directory.run(users)
+    directory.run("""CREATE TABLE user_shards (user_id INTEGER PRIMARY KEY,
+                                               shard INTEGER, moving INTEGER DEFAULT 0)""")
+    directory.run("INSERT INTO users VALUES (10, 'ten', 'ten@example.test', 'x', 'user', "
+                  "'2026-01-01')")
+    directory.run("INSERT INTO user_shards (user_id, shard) VALUES (10, 1), (11, 2)")
+    for n in SHARDS:
+        shard = standins[f"shard{n}"]
+        shard.run(users)
+        for table in SHARD_TABLES + SHARD_CACHES:
+            shard.run(f"CREATE TABLE {table} (id INTEGER, user_id INTEGER, note TEXT)")
+    home = standins["shard1"]
+    home.run("INSERT INTO users VALUES (10, 'ten', 'ten@example.test', '', 'user', "
+             "'2026-01-01')")
+    for i in range(5):
+        home.run("INSERT INTO expenses VALUES (%s, 10, 'lunch')", (100 + i,))
+    home.run("INSERT INTO budgets VALUES (7, 10, 'food')")
+    home.run("INSERT INTO expenses VALUES (200, 99, 'someone else')")
+    with app.app_context():
+        yield standins
+
+
+def rows(server, table, user_id=10):
+    return server.run(f"SELECT id FROM {table} WHERE user_id = %s ORDER BY id", (user_id,))
+
+
+class RecordingCursor:
+
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, operation, params=None):
+        self.executed.append((operation, params))
+
+    def executemany(self, operation, seq_params):
+        self.executed.append((operation, seq_params))
+
+
+# ── Placement and routing ─────────────────────────────────────
+
+def test_placement_spreads_strided_ids_evenly(cluster):
+    cur    = RecordingCursor()
+    placed = Counter(Shards.place(cur, 1 + k * ID_STRIDE) for k in range(300))
+    assert placed == {0: 100, 1: 100, 2: 100}
+    assert len(cur.executed) == 300
+
+
+def test_placement_is_off_when_unsharded(monkeypatch):
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    cur = RecordingCursor()
+    with app.app_context():
+        assert Shards.place(cur, 1) is None
+    assert cur.executed == []
+
+
+def test_reads_route_to_the_users_shard(cluster):
+    assert db.shard_for(10) == (1, False)
+    assert db.shard_for(12) == (db.DEFAULT_SHARD, False)        # no directory row
+    assert db.group_by_shard([10, 11, 12, 13]) == {1: [10], 2: [11], 0: [12, 13]}
+    cur = db.get_cursor(user_id=10)
+    cur.execute("SELECT id FROM expenses WHERE user_id = %s", (10,))
+    assert len(cur.fetchall()) == 5
+    assert cur._connection.server.name == "shard1"
+
+
+def test_scatter_reads_every_shard(cluster):
+    cluster["shard2"].run("INSERT INTO expenses VALUES (300, 11, 'rent')")
+    found = sorted(r["id"] for r in db.scatter("SELECT id FROM expenses"))
+    assert found == [100, 101, 102, 103, 104, 200, 300]
+
+
+# ── Moving a user ─────────────────────────────────────────────
+
+def test_move_copies_verifies_and_flips(cluster):
+    copied = Shards.move_user(10, 2)
+    assert copied["expenses"] == 5 and copied["budgets"] == 1
+    assert Shards.placement(10) == (2, False)
+    assert len(rows(cluster["shard2"], "expenses")) == 5
+    assert cluster["shard2"].run("SELECT id FROM users") == [{"id": 10}]
+    assert rows(cluster["shard1"], "expenses") == []
+    assert cluster["shard1"].run("SELECT id FROM users") == []
+    assert rows(cluster["shard1"], "expenses", user_id=99) == [{"id": 200}]   # untouched
+
+
+def test_failed_copy_leaves_the_user_in_place(cluster):
+    cluster["shard2"].fail_on = "INSERT INTO expenses"
+    with pytest.raises(Exception, match="refused"):
+        Shards.move_user(10, 2)
+    db.close_db()                           # the request ends: uncommitted copies go
+    assert Shards.placement(10) == (1, False)
+    assert len(rows(cluster["shard1"], "expenses")) == 5
+    assert rows(cluster["shard2"], "expenses") == []
+    assert rows(cluster["shard2"], "budgets") == []
+
+
+def test_moving_user_reads_but_does_not_write(cluster):
+    cluster["directory"].run("UPDATE user_shards SET moving = 1 WHERE user_id = 10")
+    cur = db.get_cursor(user_id=10)
+    cur.execute("SELECT id FROM expenses WHERE user_id = %s", (10,))
+    assert len(cur.fetchall()) == 5
+    with pytest.raises(ShardMoving):
+        cur.execute("DELETE FROM expenses WHERE user_id = %s", (10,))
+    assert len(rows(cluster["shard1"], "expenses")) == 5
+    with pytest.raises(RuntimeError, match="already being moved"):
+        Shards.move_user(10, 2)
+
+
+# ── Cursor guard during a move ────────────────────────────────
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM expenses WHERE id = %s AND user_id = %s",
+    "  (SELECT id FROM budgets) UNION (SELECT id FROM budgets)",
+    """select id, category_id
+       from budgets where user_id = %s""",
+    "SHOW WARNINGS",
+])
+def test_reads_go_through(sql):
+    raw = RecordingCursor()
+    _MovingCursor(raw, 7).execute(sql, (1, 7))
+    assert raw.executed == [(sql, (1, 7))]
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO expenses (user_id, amount) VALUES (%s, %s)",
+    "UPDATE budgets SET amount = %s WHERE id = %s",
+    "DELETE FROM recurring_expenses WHERE id = %s",
+    "SELECT * FROM budgets WHERE id = %s FOR UPDATE",
+    "SELECT * FROM budgets WHERE id = %s LOCK IN SHARE MODE",
+    "WITH t AS (SELECT 1) UPDATE budgets SET amount = 1",
+])
+def test_writes_raise_shard_moving(sql):
+    raw = RecordingCursor()
+    cur = _MovingCursor(raw, 7)
+    with pytest.raises(ShardMoving):
+        cur.execute(sql, (1,))
+    with pytest.raises(ShardMoving):
+        cur.executemany(sql, [(1,)])
+    assert raw.executed == []
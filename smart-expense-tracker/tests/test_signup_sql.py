@@ -0,0 +1,95 @@
+"""
+tests/test_signup_sql.py
+Concurrent signups against a real database. User.create relies on the
+unique keys instead of existence checks, so racing signups for one email
+leave exactly one user and DuplicateUserError for the rest, and racing
+claims on the first-admin slot promote exactly one user.
+
+Needs MySQL: set TEST_MYSQL_DB to a scratch database with schema.sql and
+migrations/ applied (MYSQL_HOST, MYSQL_USER, ... as usual). Skipped
+otherwise. The first_admin claim is cleared for the test and put back
+afterwards; test users are deleted.
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import app
+from db import get_cursor, commit
+from models.user import DuplicateUserError, User
+
+pytestmark = pytest.mark.mysql
+
+CLIENTS = 16
+
+
+def _set_first_admin(value):
+    cur = get_cursor()
+    cur.execute("DELETE FROM app_state WHERE name = 'first_admin'")
+    if value is not None:
+        cur.execute("INSERT INTO app_state (name, value) VALUES ('first_admin', %s)", (value,))
+    commit(cur)
+    cur.close()
+
+
+@pytest.fixture
+def scratch(mysql_db):
+    """A username prefix, with the first-admin slot free for the test."""
+    prefix = "signup_" + uuid.uuid4().hex[:8]
+    saved  = first_admin()
+    _set_first_admin(None)
+    try:
+        yield prefix
+    finally:
+        User.delete_where_username_like(prefix + "_%")
+        _set_first_admin(saved)
+
+
+def signup_all(accounts):
+    """Run User.create for every (username, email) at once: [user id or DuplicateUserError]."""
+    def signup(account):
+        with app.app_context():
+            try:
+                return User.create(*account, "x" * 60)
+            except DuplicateUserError as e:
+                return e
+
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        return list(pool.map(signup, accounts))
+
+
+def first_admin():
+    cur = get_cursor()
+    cur.execute("SELECT value FROM app_state WHERE name = 'first_admin'")
+    row = cur.fetchone()
+    cur.close()
+    return row and row["value"]
+
+
+def test_duplicate_email_signups_create_one_user(scratch):
+    email    = f"{scratch}@example.test"
+    accounts = [(f"{scratch}_{i}", email) for i in range(CLIENTS)]
+    outcomes = signup_all(accounts)
+
+    created = [o for o in outcomes if not isinstance(o, DuplicateUserError)]
+    failed  = [o for o in outcomes if isinstance(o, DuplicateUserError)]
+    assert len(created) == 1
+    assert len(failed) == CLIENTS - 1
+    assert all(e.field == "email" for e in failed)
+
+    user = User.get_by_email(email)
+    assert user.id == created[0]
+    assert user.is_admin()                  # the losers' claims were rolled back
+    assert first_admin() == user.username
+
+
+def test_concurrent_signups_claim_first_admin_once(scratch):
+    accounts = [(f"{scratch}_{i}", f"{scratch}_{i}@example.test") for i in range(CLIENTS)]
+    outcomes = signup_all(accounts)
+
+    assert not any(isinstance(o, DuplicateUserError) for o in outcomes)
+    admins = [u for u in map(User.get_by_id, outcomes) if u.is_admin()]
+    assert len(admins) == 1
+    assert first_admin() == admins[0].username
@@ -0,0 +1,120 @@
+"""
+tests/test_sketches.py
+HyperLogLog and QuantileSketch: the Python positions match the SQL the
+shards run, counts stay within 3 standard errors, quantiles within
+QUANTILE_ALPHA, and merging is exact — merged sketches equal the sketch of
+all the data, and merging a sketch into itself changes nothing.
+
+The SQL is checked by evaluating it with Python stand-ins for the MySQL
+functions it uses; tests/test_sketches_sql.py runs it on MySQL itself.
+"""
+
+import hashlib
+import math
+import re
+
+import pytest
+from hypothesis import given, strategies as st
+
+from analytics.sketches import (HLL_P, QUANTILE_ALPHA, HyperLogLog, QuantileSketch,
+                                bucket_of, bucket_sql, hll_hash_sql, hll_position, hll_sql)
+
+# The MySQL functions in hll_hash_sql / hll_sql / bucket_sql, on Python values
+MYSQL = {
+    "MD5":    lambda v: hashlib.md5(str(v).encode()).hexdigest(),
+    "LEFT":   lambda s, n: s[:n],
+    "CONV":   lambda s, src, dst: str(int(s, src)),
+    "BIN":    lambda n: format(n, "b"),
+    "LENGTH": len,
+    "LN":     math.log,
+    "CEIL":   math.ceil,
+}
+
+STANDARD_ERROR = 1.04 / math.sqrt(1 << HLL_P)       # 1.6%
+
+amounts = st.lists(st.floats(min_value=0.01, max_value=1e7), min_size=1, max_size=300)
+user_ids = st.sets(st.integers(min_value=1, max_value=10**9), max_size=300)
+
+
+def evaluate(sql, **columns):
+    """Evaluate one of the sketch SQL expressions (integer ops, full parentheses) in Python."""
+    sql = re.sub(r"CAST\((.*) AS UNSIGNED\)", r"int(\1)", sql)
+    return eval(sql, dict(MYSQL), columns)
+
+
+def sketch(values):
+    hll = HyperLogLog()
+    for v in values:
+        hll.add(v)
+    return hll
+
+
+def quantiles(values):
+    qs = QuantileSketch()
+    for v in values:
+        qs.add(v)
+    return qs
+
+
+# ── SQL agreement ─────────────────────────────────────────────
+
+@given(st.integers(min_value=0, max_value=2**32 - 1))
+def test_hll_position_matches_the_sql(user_id):
+    h = evaluate(hll_hash_sql("user_id"), user_id=user_id)
+    register, rank = (evaluate(expr, h=h) for expr in hll_sql("h"))
+    assert (register, rank) == hll_position(user_id)
+    assert 0 <= register < 1 << HLL_P and 1 <= rank <= 64 - HLL_P + 1
+
+
+@given(st.floats(min_value=0.01, max_value=1e9))
+def test_bucket_of_matches_the_sql(amount):
+    assert evaluate(bucket_sql("amount"), amount=amount) == bucket_of(amount)
+
+
+# ── HyperLogLog ───────────────────────────────────────────────
+
+@pytest.mark.parametrize("n", [10, 1_000, 20_000, 100_000])
+def test_count_is_within_three_standard_errors(n):
+    assert abs(sketch(range(n)).count() - n) <= 3 * STANDARD_ERROR * n + 1
+
+
+@given(user_ids, user_ids)
+def test_union_equals_sketch_of_all_users(a, b):
+    union = HyperLogLog.union([sketch(a), sketch(b)])
+    assert union.registers == sketch(a | b).registers
+
+
+@given(user_ids)
+def test_merge_and_add_are_idempotent(ids):
+    hll = sketch(ids)
+    before = bytes(hll.registers)
+    hll.merge(HyperLogLog(before))
+    for v in ids:
+        hll.add(v)
+    assert bytes(hll.registers) == before
+
+
+def test_register_rows_round_trip():
+    hll  = sketch(range(500))
+    rows = [(i, r) for i, r in enumerate(hll.registers) if r]
+    assert HyperLogLog.from_rows(rows).registers == hll.registers
+
+
+# ── Quantiles ─────────────────────────────────────────────────
+
+@given(amounts, st.sampled_from([0, 0.1, 0.5, 0.9, 0.99, 1]))
+def test_quantile_is_within_alpha_of_the_true_value(values, q):
+    true = sorted(values)[math.floor(q * (len(values) - 1))]
+    assert abs(quantiles(values).quantile(q) - true) <= QUANTILE_ALPHA * true * (1 + 1e-9)
+
+
+@given(amounts, amounts)
+def test_merged_sketches_equal_sketch_of_all_values(a, b):
+    merged = quantiles(a).merge(quantiles(b))
+    whole  = quantiles(a + b)
+    assert (merged.buckets, merged.n) == (whole.buckets, whole.n)
+
+
+def test_empty_sketch_has_no_quantile():
+    assert QuantileSketch().quantile(0.5) is None
+    assert QuantileSketch.from_rows([(bucket_of(5.0), 3)]).n == 3
@@ -0,0 +1,45 @@
+"""
+tests/test_sketches_sql.py
+The sketch SQL on MySQL itself: hll_sql(hll_hash_sql()) gives the
+(register, rank) hll_position computes, and bucket_sql() the bucket_of
+bucket, for the same values.
+
+Needs MySQL: set TEST_MYSQL_DB to a scratch database (MYSQL_HOST,
+MYSQL_USER, ... as usual). Skipped otherwise. Nothing is written.
+"""
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from analytics.sketches import bucket_of, bucket_sql, hll_hash_sql, hll_position, hll_sql
+from db import get_cursor
+
+pytestmark = pytest.mark.mysql
+
+
+@pytest.fixture(scope="module")
+def cur(mysql_db):
+    cur = get_cursor()
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+
+@settings(max_examples=200, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.integers(min_value=0, max_value=2**32 - 1))
+def test_hll_sql_matches_hll_position(cur, user_id):
+    register, rank = hll_sql("h")
+    cur.execute(f"""SELECT {register} AS reg, {rank} AS rnk
+                    FROM (SELECT {hll_hash_sql("%s")} AS h) t""", (user_id,))
+    row = cur.fetchone()
+    assert (row["reg"], row["rnk"]) == hll_position(user_id)
+
+
+@settings(max_examples=200, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.decimals(min_value="0.01", max_value="99999999.99", places=2))
+def test_bucket_sql_matches_bucket_of(cur, amount):
+    cur.execute(f"SELECT {bucket_sql('%s')} AS bucket", (amount,))
+    assert cur.fetchone()["bucket"] == bucket_of(float(amount))
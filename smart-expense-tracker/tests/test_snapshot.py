@@ -0,0 +1,109 @@
+"""
+tests/test_snapshot.py
+Snapshots round-trip: rows streamed in batches come back from load() as
+memory-mapped columns equal to what went in, with the row count filled into
+each .npy header once the export ends. An empty export loads as empty
+columns, and a new export replaces the old one (and any half-written
+.tmp left by an interrupted run).
+"""
+
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from analytics import snapshot
+from models.expense import SNAPSHOT_COLUMNS
+
+CATEGORIES = [{"id": 1, "name": "Food"}, {"id": 2, "name": "Travel"}]
+EPOCH      = date(1970, 1, 1)
+
+
+def rows(n, seed=45):
+    """n Expense.stream_snapshot() tuples, dates as days / seconds since 1970."""
+    rng  = np.random.default_rng(seed)
+    base = int((datetime(2026, 1, 1) - datetime(1970, 1, 1)).total_seconds())
+    return [(i + 1, int(rng.integers(1, 50)), int(rng.integers(1, 3)),
+             int(rng.integers(-10**6, 10**9)), ("chai ☕ " * (i % 4)).strip() or "x",
+             (date(2026, 1, 1) - EPOCH).days + i, base + 60 * i, i % 3 == 0)
+            for i in range(n)]
+
+
+def batches(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def assert_columns(cols, data):
+    expected = dict(zip(SNAPSHOT_COLUMNS, zip(*data))) if data else {}
+    for name, dtype in snapshot.DTYPES.items():
+        column = cols[name]
+        assert isinstance(column, np.memmap) and column.dtype == dtype
+        assert column.shape == (len(data),)
+        assert column.astype(np.int64).tolist() == [int(v) for v in expected.get(name, ())]
+    assert list(cols["description"]) == list(expected.get("description", ()))
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_npy_round_trip(tmp_path, size):
+    data = rows(23)
+    path = str(tmp_path / "snap")
+    assert snapshot.write(path, batches(data, size), CATEGORIES, fmt="npy",
+                          scope="user 7") == ("npy", 23)
+
+    cols, meta = snapshot.load(path)
+    assert_columns(cols, data)
+    assert meta["rows"] == 23 and meta["scope"] == "user 7"
+    assert meta["categories"] == {"1": "Food", "2": "Travel"}
+    assert cols["description"][-1] == data[-1][4]
+    assert cols["amount_paise"].sum() == sum(r[3] for r in data)
+
+
+def test_headers_are_rewritten_with_the_row_count(tmp_path):
+    data = rows(10)
+    path = str(tmp_path / "snap")
+    snapshot.write(path, batches(data, 3), CATEGORIES, fmt="npy")
+    lengths = {name: 10 for name in snapshot.DTYPES}
+    lengths["description_offsets"] = 11
+    lengths["description_data"]    = sum(len(r[4].encode("utf-8")) for r in data)
+    for name, n in lengths.items():
+        file = os.path.join(path, f"{name}.npy")
+        with open(file, "rb") as f:
+            assert f.read(snapshot._NPY_HEADER).endswith(b"\n")
+        assert np.load(file, mmap_mode="r").shape == (n,)
+
+
+def test_empty_export(tmp_path):
+    path = str(tmp_path / "snap")
+    assert snapshot.write(path, [], CATEGORIES, fmt="npy") == ("npy", 0)
+    cols, meta = snapshot.load(path)
+    assert_columns(cols, [])
+    assert meta["rows"] == 0 and len(cols["description"]) == 0
+    with pytest.raises(IndexError):
+        cols["description"][0]
+
+
+def test_new_export_replaces_the_old_one(tmp_path):
+    path = str(tmp_path / "snap")
+    snapshot.write(path, [rows(5)], CATEGORIES, fmt="npy")
+    os.makedirs(f"{path}.tmp")              # an interrupted run's leftovers
+    open(f"{path}.tmp/id.npy", "wb").close()
+    snapshot.write(path, [rows(3, seed=1)], CATEGORIES, fmt="npy")
+    assert_columns(snapshot.load(path)[0], rows(3, seed=1))
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_arrow_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    data = rows(23)
+    path = str(tmp_path / "snap.arrow")
+    assert snapshot.write(path, batches(data, 7), CATEGORIES, fmt="arrow") == ("arrow", 23)
+    table, meta = snapshot.load(path)
+    assert table.num_rows == 23 and meta["categories"]["2"] == "Travel"
+    assert table.column("amount_paise").to_pylist() == [r[3] for r in data]
+    assert table.column("description").to_pylist() == [r[4] for r in data]
+
+
+def test_unknown_format_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        snapshot.write(str(tmp_path / "snap"), [], CATEGORIES, fmt="parquet")
@@ -0,0 +1,121 @@
+"""
+tests/test_sync.py
+The change log against a stood-in primary: Sync.record hands out each
+user's seqs in order with no gaps, a row written again keeps only its
+latest entry, and /sync pages through the log SYNC_PAGE entries at a time
+and answers 410 for cursors outside [pruned_seq, seq].
+"""
+
+import pytest
+
+import db
+from app import app
+from models.expense import Expense
+from models.sync import Sync
+from routes import api
+
+
+@pytest.fixture
+def log(standins, monkeypatch):
+    monkeypatch.setitem(app.config, "MYSQL_HOST", "primary")
+    monkeypatch.setitem(app.config, "MYSQL_REPLICAS", [])
+    monkeypatch.setitem(app.config, "SHARD_MAP", {})
+    primary = standins["primary"]
+    primary.run("""CREATE TABLE sync_seq (user_id INTEGER PRIMARY KEY,
+                       seq INTEGER NOT NULL DEFAULT 0, pruned_seq INTEGER NOT NULL DEFAULT 0)""")
+    primary.run("""CREATE TABLE change_log (user_id INTEGER, kind TEXT, row_id INTEGER,
+                       seq INTEGER, op TEXT, changed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                       PRIMARY KEY (user_id, kind, row_id))""")
+    return primary
+
+
+@pytest.fixture
+def client(api_client, log, monkeypatch):
+    """/sync with each kind's rows stood in by {"id": row_id}."""
+    monkeypatch.setitem(app.config, "SYNC_PAGE", 2)
+    monkeypatch.setattr(Expense, "get_all_categories", staticmethod(lambda: []))
+    for kind, (key, _, _, _) in list(api._SYNC_KINDS.items()):
+        monkeypatch.setitem(api._SYNC_KINDS, kind, (
+            key,
+            lambda uid, ids: [{"id": i} for i in ids],
+            lambda uid: [],
+            lambda row: row,
+        ))
+    return api_client
+
+
+def record(*writes, user_id=7):
+    """Sync.record each (kind, row_ids[, op]) in its own committed transaction."""
+    with app.app_context():
+        for kind, row_ids, *op in writes:
+            cur = db.get_cursor(user_id=user_id)
+            Sync.record(cur, user_id, kind, row_ids, *op)
+            db.commit(cur)
+            cur.close()
+
+
+def entries(log, user_id=7):
+    return log.run("""SELECT seq, kind, row_id, op FROM change_log
+                      WHERE user_id = %s ORDER BY seq""", (user_id,))
+
+
+# ── Sync.record ───────────────────────────────────────────────
+
+def test_seqs_are_consecutive_across_writes(log):
+    record(("expense", [11, 12, 13]), ("budget", [5]), ("expense", [14, 15]))
+    record(("expense", [40]), user_id=8)
+    assert [(e["seq"], e["row_id"]) for e in entries(log)] == [
+        (1, 11), (2, 12), (3, 13), (4, 5), (5, 14), (6, 15)]
+    assert [e["seq"] for e in entries(log, user_id=8)] == [1]
+    with app.app_context():
+        assert Sync.state(7) == (6, 0)
+        assert [c["row_id"] for c in Sync.changes(7, 4, 10)] == [14, 15]
+        assert Sync.changes(7, 6, 10) == []
+
+
+def test_rewritten_row_keeps_only_its_latest_entry(log):
+    record(("expense", [11, 12]), ("expense", [11]), ("expense", [11], "delete"))
+    assert entries(log) == [
+        {"seq": 2, "kind": "expense", "row_id": 12, "op": "upsert"},
+        {"seq": 4, "kind": "expense", "row_id": 11, "op": "delete"},
+    ]
+
+
+def test_empty_write_takes_no_seq(log):
+    record(("expense", []))
+    with app.app_context():
+        assert Sync.state(7) == (0, 0)
+
+
+# ── /sync ─────────────────────────────────────────────────────
+
+def test_sync_pages_through_the_log(client):
+    record(("expense", [11, 12, 13]), ("budget", [5]), ("expense", [12], "delete"))
+    since, pages = 0, []
+    while True:
+        reply = client.get(f"/api/v1/sync?since={since}").get_json()
+        pages.append(reply)
+        assert reply["seq"] > since
+        since = reply["seq"]
+        if not reply["more"]:
+            break
+
+    assert [p["seq"] for p in pages] == [3, 5]
+    assert [p["more"] for p in pages] == [True, False]
+    upserts = [(k, r["id"]) for p in pages for k in ("expenses", "budgets") for r in p[k]]
+    assert sorted(upserts) == [("budgets", 5), ("expenses", 11), ("expenses", 13)]
+    assert [p["deleted"]["expense"] for p in pages] == [[], [12]]
+
+    caught_up = client.get(f"/api/v1/sync?since={since}").get_json()
+    assert caught_up["seq"] == since and not caught_up["more"]
+    assert caught_up["expenses"] == [] and caught_up["deleted"]["expense"] == []
+
+
+def test_cursor_outside_the_log_is_410(client, log):
+    record(("expense", [11, 12, 13, 14]))
+    log.run("UPDATE sync_seq SET pruned_seq = 2 WHERE user_id = 7")
+    assert client.get("/api/v1/sync?since=1").status_code == 410
+    assert client.get("/api/v1/sync?since=5").status_code == 410
+    assert client.get("/api/v1/sync?since=2").status_code == 200
+    full = client.get("/api/v1/sync").get_json()
+    assert full["full"] and full["seq"] == 4
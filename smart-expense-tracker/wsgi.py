@@ -0,0 +1,17 @@
+"""
+wsgi.py — Gunicorn entry point (see gunicorn.conf.py).
+"""
+
+from app import app  # noqa: F401
+
+
+def warm_imports():
+    """
+    Import the modules the request path loads lazily (MySQL driver, NumPy
+    forecasting). Called in the gunicorn master when preload_app is on, so
+    forked workers share them instead of each paying the import on its first
+    request.
+    """
+    import db
+    import analytics.forecast  # noqa: F401
+    db.driver()